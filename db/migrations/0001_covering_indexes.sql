@@ -0,0 +1,35 @@
+-- Secondary indexes for the lookups done by friendsNet.database.Connection.
+-- Every list query filters on a foreign key and most of them sort by time, so
+-- the index contains both columns and the rows come out already ordered.
+-- Indexes on the link tables contain all their columns (covering indexes).
+
+-- get_statuses_for_user, get_friends_statuses_for_user
+CREATE INDEX IF NOT EXISTS statuses_creator_time_idx ON statuses(creator_id, creation_time);
+
+-- get_comments_for_user, get_comments_for_status
+CREATE INDEX IF NOT EXISTS comments_user_time_idx ON comments(user_id, creation_time);
+CREATE INDEX IF NOT EXISTS comments_status_time_idx ON comments(status_id, creation_time);
+
+-- get_messages_for_conversation, sender_id is set to NULL when a user is deleted
+CREATE INDEX IF NOT EXISTS messages_conversation_time_idx ON messages(conversation_id, time_sent);
+CREATE INDEX IF NOT EXISTS messages_sender_idx ON messages(sender_id);
+
+-- get_friendships_for_user, get_conversations_for_user (user1_id side uses the UNIQUE index)
+CREATE INDEX IF NOT EXISTS friendships_user2_idx ON friendships(user2_id, user1_id);
+CREATE INDEX IF NOT EXISTS conversations_user2_idx ON conversations(user2_id, user1_id);
+
+-- get_rates_for_user (get_rates_for_status uses the UNIQUE(status_id, user_id) index)
+CREATE INDEX IF NOT EXISTS rates_user_idx ON rates(user_id, status_id, rate);
+
+-- get_tagged_statuses_for_user, get_groups_for_user
+CREATE INDEX IF NOT EXISTS statuses_tags_lists_user_idx ON statuses_tags_lists(user_id, status_id);
+CREATE INDEX IF NOT EXISTS groups_members_lists_user_idx ON groups_members_lists(user_id, group_id, administrator);
+CREATE INDEX IF NOT EXISTS groups_requests_lists_user_idx ON groups_requests_lists(user_id, group_id);
+
+-- Group check of get_friends_statuses_for_user and ON DELETE CASCADE of statuses and media items
+CREATE INDEX IF NOT EXISTS groups_statuses_lists_status_idx ON groups_statuses_lists(status_id, group_id);
+CREATE INDEX IF NOT EXISTS statuses_media_lists_media_idx ON statuses_media_lists(media_item_id, status_id);
+
+-- ON DELETE SET NULL of media items used as profile pictures
+CREATE INDEX IF NOT EXISTS users_profiles_picture_idx ON users_profiles(prof_picture_id);
+CREATE INDEX IF NOT EXISTS groups_picture_idx ON groups(prof_picture_id);
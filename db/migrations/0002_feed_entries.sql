@@ -0,0 +1,89 @@
+-- Home feed inbox: one row for every status visible in the feed of a user,
+-- i.e. statuses posted on their own profile (not in a group) by accepted friends.
+-- Rows are written when statuses and friendships change (fan-out on write), so
+-- reading a feed is a range scan on the primary key.
+CREATE TABLE IF NOT EXISTS feed_entries (
+	user_id	INTEGER NOT NULL,
+	status_id	INTEGER NOT NULL,
+	creator_id	INTEGER NOT NULL,
+	creation_time	INTEGER NOT NULL,
+	PRIMARY KEY(user_id, creation_time, status_id),
+	FOREIGN KEY(user_id) REFERENCES users_credentials(user_id) ON DELETE CASCADE ON UPDATE CASCADE,
+	FOREIGN KEY(status_id) REFERENCES statuses(status_id) ON DELETE CASCADE ON UPDATE CASCADE
+) WITHOUT ROWID;
+
+-- Retraction of deleted statuses (ON DELETE CASCADE) and of statuses posted in groups
+CREATE INDEX IF NOT EXISTS feed_entries_status_idx ON feed_entries(status_id);
+
+-- Status posted on a profile: push it to the feed of every accepted friend of the creator
+CREATE TRIGGER IF NOT EXISTS feed_entries_status_insert AFTER INSERT ON statuses
+WHEN NOT EXISTS (SELECT 1 FROM groups_statuses_lists WHERE status_id = NEW.status_id)
+BEGIN
+	INSERT OR IGNORE INTO feed_entries
+		SELECT user2_id, NEW.status_id, NEW.creator_id, NEW.creation_time FROM friendships
+		WHERE user1_id = NEW.creator_id AND friendship_status = 1
+		UNION ALL
+		SELECT user1_id, NEW.status_id, NEW.creator_id, NEW.creation_time FROM friendships
+		WHERE user2_id = NEW.creator_id AND friendship_status = 1;
+END;
+
+-- Status posted in a group: the status is inserted before being linked to the group, so retract it
+CREATE TRIGGER IF NOT EXISTS feed_entries_group_status_insert AFTER INSERT ON groups_statuses_lists
+BEGIN
+	DELETE FROM feed_entries WHERE status_id = NEW.status_id;
+END;
+
+-- Status no longer in a group (the group has been deleted) but still existing: it's a profile status again
+CREATE TRIGGER IF NOT EXISTS feed_entries_group_status_delete AFTER DELETE ON groups_statuses_lists
+WHEN NOT EXISTS (SELECT 1 FROM groups_statuses_lists WHERE status_id = OLD.status_id)
+BEGIN
+	INSERT OR IGNORE INTO feed_entries
+		SELECT friendships.user2_id, statuses.status_id, statuses.creator_id, statuses.creation_time
+		FROM statuses JOIN friendships ON friendships.user1_id = statuses.creator_id
+		WHERE statuses.status_id = OLD.status_id AND friendships.friendship_status = 1
+		UNION ALL
+		SELECT friendships.user1_id, statuses.status_id, statuses.creator_id, statuses.creation_time
+		FROM statuses JOIN friendships ON friendships.user2_id = statuses.creator_id
+		WHERE statuses.status_id = OLD.status_id AND friendships.friendship_status = 1;
+END;
+
+-- Friendship accepted (or inserted already accepted): backfill the feeds of both users
+CREATE TRIGGER IF NOT EXISTS feed_entries_friendship_insert AFTER INSERT ON friendships
+WHEN NEW.friendship_status = 1
+BEGIN
+	INSERT OR IGNORE INTO feed_entries
+		SELECT NEW.user1_id, status_id, creator_id, creation_time FROM statuses
+		WHERE creator_id = NEW.user2_id AND NOT EXISTS (SELECT 1 FROM groups_statuses_lists WHERE groups_statuses_lists.status_id = statuses.status_id)
+		UNION ALL
+		SELECT NEW.user2_id, status_id, creator_id, creation_time FROM statuses
+		WHERE creator_id = NEW.user1_id AND NOT EXISTS (SELECT 1 FROM groups_statuses_lists WHERE groups_statuses_lists.status_id = statuses.status_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS feed_entries_friendship_accept AFTER UPDATE OF friendship_status ON friendships
+WHEN NEW.friendship_status = 1 AND OLD.friendship_status = 0
+BEGIN
+	INSERT OR IGNORE INTO feed_entries
+		SELECT NEW.user1_id, status_id, creator_id, creation_time FROM statuses
+		WHERE creator_id = NEW.user2_id AND NOT EXISTS (SELECT 1 FROM groups_statuses_lists WHERE groups_statuses_lists.status_id = statuses.status_id)
+		UNION ALL
+		SELECT NEW.user2_id, status_id, creator_id, creation_time FROM statuses
+		WHERE creator_id = NEW.user1_id AND NOT EXISTS (SELECT 1 FROM groups_statuses_lists WHERE groups_statuses_lists.status_id = statuses.status_id);
+END;
+
+-- Friendship deleted: prune the statuses of each user from the feed of the other one
+CREATE TRIGGER IF NOT EXISTS feed_entries_friendship_delete AFTER DELETE ON friendships
+WHEN OLD.friendship_status = 1
+BEGIN
+	DELETE FROM feed_entries WHERE user_id = OLD.user1_id AND creator_id = OLD.user2_id;
+	DELETE FROM feed_entries WHERE user_id = OLD.user2_id AND creator_id = OLD.user1_id;
+END;
+
+-- Feeds of the existing data
+INSERT OR IGNORE INTO feed_entries
+	SELECT friendships.user1_id, statuses.status_id, statuses.creator_id, statuses.creation_time
+	FROM friendships JOIN statuses ON statuses.creator_id = friendships.user2_id
+	WHERE friendships.friendship_status = 1 AND NOT EXISTS (SELECT 1 FROM groups_statuses_lists WHERE groups_statuses_lists.status_id = statuses.status_id)
+	UNION ALL
+	SELECT friendships.user2_id, statuses.status_id, statuses.creator_id, statuses.creation_time
+	FROM friendships JOIN statuses ON statuses.creator_id = friendships.user1_id
+	WHERE friendships.friendship_status = 1 AND NOT EXISTS (SELECT 1 FROM groups_statuses_lists WHERE groups_statuses_lists.status_id = statuses.status_id);
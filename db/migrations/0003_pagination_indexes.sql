@@ -0,0 +1,4 @@
+-- Pages of the rates of a user are sought by rate_id: the index must be ordered
+-- by it (and still cover the whole row) to avoid sorting all the rates of the user.
+DROP INDEX IF EXISTS rates_user_idx;
+CREATE INDEX IF NOT EXISTS rates_user_idx ON rates(user_id, rate_id, status_id, rate);
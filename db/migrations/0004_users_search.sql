@@ -0,0 +1,31 @@
+-- Full text index over the names of the users (requires sqlite compiled with FTS5).
+-- The index stores no copy of the names (external content table) and is kept in sync by triggers.
+-- Prefix indexes make "name*" queries a direct lookup for prefixes of 2 and 3 characters.
+CREATE VIRTUAL TABLE IF NOT EXISTS users_search USING fts5(
+	first_name,
+	middle_name,
+	surname,
+	content = 'users_profiles',
+	content_rowid = 'user_id',
+	tokenize = 'unicode61 remove_diacritics 2',
+	prefix = '2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS users_search_insert AFTER INSERT ON users_profiles
+BEGIN
+	INSERT INTO users_search(rowid, first_name, middle_name, surname) VALUES (NEW.user_id, NEW.first_name, NEW.middle_name, NEW.surname);
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_search_delete AFTER DELETE ON users_profiles
+BEGIN
+	INSERT INTO users_search(users_search, rowid, first_name, middle_name, surname) VALUES ('delete', OLD.user_id, OLD.first_name, OLD.middle_name, OLD.surname);
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_search_update AFTER UPDATE OF first_name, middle_name, surname ON users_profiles
+BEGIN
+	INSERT INTO users_search(users_search, rowid, first_name, middle_name, surname) VALUES ('delete', OLD.user_id, OLD.first_name, OLD.middle_name, OLD.surname);
+	INSERT INTO users_search(rowid, first_name, middle_name, surname) VALUES (NEW.user_id, NEW.first_name, NEW.middle_name, NEW.surname);
+END;
+
+-- Index the existing users
+INSERT INTO users_search(users_search) VALUES ('rebuild');
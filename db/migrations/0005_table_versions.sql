@@ -0,0 +1,217 @@
+-- Version counter of every table, increased by triggers at each insert, update and delete.
+-- The API reads the counters of the tables a representation is built from to compute its
+-- ETag without reading (nor rendering) the representation itself.
+CREATE TABLE IF NOT EXISTS table_versions (
+	table_name	TEXT NOT NULL PRIMARY KEY,
+	version	INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+INSERT OR IGNORE INTO table_versions (table_name) VALUES ('users_credentials'), ('users_profiles'), ('statuses'), ('rates'), ('messages'), ('media_items'), ('groups'), ('groups_members_lists'), ('groups_requests_lists'), ('groups_statuses_lists'), ('statuses_media_lists'), ('statuses_tags_lists'), ('friendships'), ('conversations'), ('comments'), ('feed_entries');
+
+CREATE TRIGGER IF NOT EXISTS users_credentials_insert_version AFTER INSERT ON users_credentials
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'users_credentials';
+END;
+CREATE TRIGGER IF NOT EXISTS users_credentials_update_version AFTER UPDATE ON users_credentials
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'users_credentials';
+END;
+CREATE TRIGGER IF NOT EXISTS users_credentials_delete_version AFTER DELETE ON users_credentials
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'users_credentials';
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_profiles_insert_version AFTER INSERT ON users_profiles
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'users_profiles';
+END;
+CREATE TRIGGER IF NOT EXISTS users_profiles_update_version AFTER UPDATE ON users_profiles
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'users_profiles';
+END;
+CREATE TRIGGER IF NOT EXISTS users_profiles_delete_version AFTER DELETE ON users_profiles
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'users_profiles';
+END;
+
+CREATE TRIGGER IF NOT EXISTS statuses_insert_version AFTER INSERT ON statuses
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'statuses';
+END;
+CREATE TRIGGER IF NOT EXISTS statuses_update_version AFTER UPDATE ON statuses
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'statuses';
+END;
+CREATE TRIGGER IF NOT EXISTS statuses_delete_version AFTER DELETE ON statuses
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'statuses';
+END;
+
+CREATE TRIGGER IF NOT EXISTS rates_insert_version AFTER INSERT ON rates
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'rates';
+END;
+CREATE TRIGGER IF NOT EXISTS rates_update_version AFTER UPDATE ON rates
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'rates';
+END;
+CREATE TRIGGER IF NOT EXISTS rates_delete_version AFTER DELETE ON rates
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'rates';
+END;
+
+CREATE TRIGGER IF NOT EXISTS messages_insert_version AFTER INSERT ON messages
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'messages';
+END;
+CREATE TRIGGER IF NOT EXISTS messages_update_version AFTER UPDATE ON messages
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'messages';
+END;
+CREATE TRIGGER IF NOT EXISTS messages_delete_version AFTER DELETE ON messages
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'messages';
+END;
+
+CREATE TRIGGER IF NOT EXISTS media_items_insert_version AFTER INSERT ON media_items
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'media_items';
+END;
+CREATE TRIGGER IF NOT EXISTS media_items_update_version AFTER UPDATE ON media_items
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'media_items';
+END;
+CREATE TRIGGER IF NOT EXISTS media_items_delete_version AFTER DELETE ON media_items
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'media_items';
+END;
+
+CREATE TRIGGER IF NOT EXISTS groups_insert_version AFTER INSERT ON groups
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'groups';
+END;
+CREATE TRIGGER IF NOT EXISTS groups_update_version AFTER UPDATE ON groups
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'groups';
+END;
+CREATE TRIGGER IF NOT EXISTS groups_delete_version AFTER DELETE ON groups
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'groups';
+END;
+
+CREATE TRIGGER IF NOT EXISTS groups_members_lists_insert_version AFTER INSERT ON groups_members_lists
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'groups_members_lists';
+END;
+CREATE TRIGGER IF NOT EXISTS groups_members_lists_update_version AFTER UPDATE ON groups_members_lists
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'groups_members_lists';
+END;
+CREATE TRIGGER IF NOT EXISTS groups_members_lists_delete_version AFTER DELETE ON groups_members_lists
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'groups_members_lists';
+END;
+
+CREATE TRIGGER IF NOT EXISTS groups_requests_lists_insert_version AFTER INSERT ON groups_requests_lists
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'groups_requests_lists';
+END;
+CREATE TRIGGER IF NOT EXISTS groups_requests_lists_update_version AFTER UPDATE ON groups_requests_lists
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'groups_requests_lists';
+END;
+CREATE TRIGGER IF NOT EXISTS groups_requests_lists_delete_version AFTER DELETE ON groups_requests_lists
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'groups_requests_lists';
+END;
+
+CREATE TRIGGER IF NOT EXISTS groups_statuses_lists_insert_version AFTER INSERT ON groups_statuses_lists
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'groups_statuses_lists';
+END;
+CREATE TRIGGER IF NOT EXISTS groups_statuses_lists_update_version AFTER UPDATE ON groups_statuses_lists
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'groups_statuses_lists';
+END;
+CREATE TRIGGER IF NOT EXISTS groups_statuses_lists_delete_version AFTER DELETE ON groups_statuses_lists
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'groups_statuses_lists';
+END;
+
+CREATE TRIGGER IF NOT EXISTS statuses_media_lists_insert_version AFTER INSERT ON statuses_media_lists
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'statuses_media_lists';
+END;
+CREATE TRIGGER IF NOT EXISTS statuses_media_lists_update_version AFTER UPDATE ON statuses_media_lists
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'statuses_media_lists';
+END;
+CREATE TRIGGER IF NOT EXISTS statuses_media_lists_delete_version AFTER DELETE ON statuses_media_lists
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'statuses_media_lists';
+END;
+
+CREATE TRIGGER IF NOT EXISTS statuses_tags_lists_insert_version AFTER INSERT ON statuses_tags_lists
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'statuses_tags_lists';
+END;
+CREATE TRIGGER IF NOT EXISTS statuses_tags_lists_update_version AFTER UPDATE ON statuses_tags_lists
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'statuses_tags_lists';
+END;
+CREATE TRIGGER IF NOT EXISTS statuses_tags_lists_delete_version AFTER DELETE ON statuses_tags_lists
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'statuses_tags_lists';
+END;
+
+CREATE TRIGGER IF NOT EXISTS friendships_insert_version AFTER INSERT ON friendships
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'friendships';
+END;
+CREATE TRIGGER IF NOT EXISTS friendships_update_version AFTER UPDATE ON friendships
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'friendships';
+END;
+CREATE TRIGGER IF NOT EXISTS friendships_delete_version AFTER DELETE ON friendships
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'friendships';
+END;
+
+CREATE TRIGGER IF NOT EXISTS conversations_insert_version AFTER INSERT ON conversations
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'conversations';
+END;
+CREATE TRIGGER IF NOT EXISTS conversations_update_version AFTER UPDATE ON conversations
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'conversations';
+END;
+CREATE TRIGGER IF NOT EXISTS conversations_delete_version AFTER DELETE ON conversations
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'conversations';
+END;
+
+CREATE TRIGGER IF NOT EXISTS comments_insert_version AFTER INSERT ON comments
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'comments';
+END;
+CREATE TRIGGER IF NOT EXISTS comments_update_version AFTER UPDATE ON comments
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'comments';
+END;
+CREATE TRIGGER IF NOT EXISTS comments_delete_version AFTER DELETE ON comments
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'comments';
+END;
+
+CREATE TRIGGER IF NOT EXISTS feed_entries_insert_version AFTER INSERT ON feed_entries
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'feed_entries';
+END;
+CREATE TRIGGER IF NOT EXISTS feed_entries_update_version AFTER UPDATE ON feed_entries
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'feed_entries';
+END;
+CREATE TRIGGER IF NOT EXISTS feed_entries_delete_version AFTER DELETE ON feed_entries
+BEGIN
+	UPDATE table_versions SET version = version + 1 WHERE table_name = 'feed_entries';
+END;
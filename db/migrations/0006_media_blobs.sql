@@ -0,0 +1,29 @@
+-- Content of the uploaded media, stored once per distinct content under its SHA-256 hash
+-- (see friendsNet/storage.py). Media items pointing to the same content share the blob,
+-- whose references are counted by triggers on media_items_blobs.
+CREATE TABLE IF NOT EXISTS media_blobs (
+	content_hash	TEXT NOT NULL PRIMARY KEY,
+	size	INTEGER NOT NULL,
+	references_count	INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+-- Blob of the media items uploaded after this migration (the older ones are plain files named as their url)
+CREATE TABLE IF NOT EXISTS media_items_blobs (
+	media_item_id	INTEGER NOT NULL PRIMARY KEY,
+	content_hash	TEXT NOT NULL,
+	FOREIGN KEY(media_item_id) REFERENCES media_items(media_item_id) ON DELETE CASCADE ON UPDATE CASCADE,
+	FOREIGN KEY(content_hash) REFERENCES media_blobs(content_hash)
+);
+
+CREATE INDEX IF NOT EXISTS media_items_blobs_content_hash_idx ON media_items_blobs(content_hash);
+
+CREATE TRIGGER IF NOT EXISTS media_items_blobs_insert_reference AFTER INSERT ON media_items_blobs
+BEGIN
+	UPDATE media_blobs SET references_count = references_count + 1 WHERE content_hash = NEW.content_hash;
+END;
+
+-- Fired also when the media item is deleted (cascade)
+CREATE TRIGGER IF NOT EXISTS media_items_blobs_delete_reference AFTER DELETE ON media_items_blobs
+BEGIN
+	UPDATE media_blobs SET references_count = references_count - 1 WHERE content_hash = OLD.content_hash;
+END;
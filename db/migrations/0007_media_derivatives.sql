@@ -0,0 +1,11 @@
+-- Downscaled JPEG variants of the images, generated in background after the upload (see friendsNet/derivatives.py).
+-- They belong to the content, so media items sharing a blob share its variants too.
+CREATE TABLE IF NOT EXISTS media_derivatives (
+	content_hash	TEXT NOT NULL,
+	variant	TEXT NOT NULL,
+	width	INTEGER NOT NULL,
+	height	INTEGER NOT NULL,
+	size	INTEGER NOT NULL,
+	PRIMARY KEY(content_hash, variant),
+	FOREIGN KEY(content_hash) REFERENCES media_blobs(content_hash) ON DELETE CASCADE ON UPDATE CASCADE
+) WITHOUT ROWID;
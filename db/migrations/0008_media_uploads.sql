@@ -0,0 +1,8 @@
+-- Resumable uploads in progress (see Media_uploads in friendsNet/resources.py). The chunks received so far are
+-- in a file of the blob storage named after upload_id; the row is deleted when the upload becomes a media item.
+CREATE TABLE IF NOT EXISTS media_uploads (
+	upload_id	TEXT NOT NULL PRIMARY KEY,
+	file_extension	TEXT NOT NULL,
+	size	INTEGER NOT NULL CHECK(size > 0),
+	creation_time	INTEGER NOT NULL
+) WITHOUT ROWID;
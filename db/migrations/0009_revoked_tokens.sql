@@ -0,0 +1,9 @@
+-- Authentication tokens revoked before they expire (see User_authentication.delete in friendsNet/resources.py),
+-- shared by all the processes of the service. Tokens are stored as their SHA-256 digest; a row is useless once
+-- the token has expired and it is deleted by the next revocation.
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+	token_hash	TEXT NOT NULL PRIMARY KEY,
+	expiration	INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS revoked_tokens_expiration ON revoked_tokens(expiration);
@@ -0,0 +1,168 @@
+'''
+Compact representation of the friendsNet Collection+JSON collections.
+
+The compact representation has no "prompt" in the data and in the links, no
+"template" and no "queries", and optionally only some fields of the data of
+the items. Items of the same collection have all the same shape (the same
+names in "data" and the same relations in "links"), so :py:class:`CompactEncoder`
+builds once for every shape the JSON of the item with placeholders for the
+values (the skeleton). The values of a whole batch of items are then encoded
+with a single call to the C encoder of :py:mod:`json` and put in the skeletons.
+'''
+import json
+
+MAX_SKELETONS = 1024        #Skeletons cached before the cache is emptied (the fields asked by the clients are unbounded)
+
+#Separator of the encoded values of a batch. It is never in the JSON of a string, integer, float, boolean or null
+#(control characters are escaped in JSON strings): a value with more members is detected by the count of the values
+VALUE_SEPARATOR = "\x00"
+
+ITEM_MEMBERS = frozenset(("href", "data", "links", "embedded"))
+OMITTED_COLLECTION_MEMBERS = frozenset(("template", "queries", "items"))
+
+def strip_prompts(value):
+    '''
+    :return: a copy of the JSON value without the "prompt" members of its objects.
+    '''
+    if isinstance(value, dict):
+        return dict((key, strip_prompts(member)) for key, member in value.iteritems() if key != "prompt")
+    if isinstance(value, list):
+        return [strip_prompts(member) for member in value]
+    return value
+
+class CompactEncoder(object):
+    '''
+    Encoder of the compact representation of the collections.
+
+    Items whose data are objects with "name" and "value" and whose links are
+    objects with "href" and "rel" are encoded from the skeleton of their shape
+    (other members of the data and of the links are not in the compact
+    representation). Any other item is encoded as it is, without prompts.
+
+    :Example:
+
+    compact_encoder = CompactEncoder(json.dumps)
+    compact_encoder.encode_items(items, frozenset(["id", "content"]))     #['{"href": ..., "data": [{"name": "id", "value": 1}, ...]}', ...]
+
+    :param dumps: JSON encoding function of the collection members and of the embedded sub-resources.
+    '''
+    def __init__(self, dumps):
+        super(CompactEncoder, self).__init__()
+        self.dumps = dumps
+        self._values_encoder = json.JSONEncoder(separators = (VALUE_SEPARATOR, ":"))
+        self._skeletons = {}            #(shape, fields) -> (template, positions of the data values kept, number of values)
+
+    def _shape(self, item):
+        '''
+        :return: (has href, names of the data, relations of the links, has embedded) of the item,
+            or None if the item has no skeleton.
+        '''
+        if not ITEM_MEMBERS.issuperset(item):
+            return None
+        try:
+            names = tuple([entry["name"] for entry in item["data"]]) if "data" in item else None
+            rels = tuple([link["rel"] for link in item["links"]]) if "links" in item else None
+        except (KeyError, TypeError):   #Data or links which are not objects with a name or a relation
+            return None
+        return "href" in item, names, rels, "embedded" in item
+
+    def _skeleton(self, shape, fields):
+        key = (shape, fields)
+        skeleton = self._skeletons.get(key, None)
+        if skeleton is not None:
+            return skeleton
+
+        has_href, names, rels, has_embedded = shape
+        members = []
+        kept = []
+        if has_href:
+            members.append('"href": %s')
+        if names is not None:
+            entries = []
+            for position, name in enumerate(names):
+                if fields is None or name in fields:
+                    kept.append(position)
+                    entries.append('{"name": %s, "value": %%s}' % self.dumps(name).replace("%", "%%"))
+            members.append('"data": [%s]' % ", ".join(entries))
+        if rels is not None:
+            members.append('"links": [%s]' % ", ".join('{"href": %%s, "rel": %s}' % self.dumps(rel).replace("%", "%%") for rel in rels))
+        if has_embedded:
+            members.append('"embedded": %s')
+        skeleton = ("{%s}" % ", ".join(members), tuple(kept), int(has_href) + len(kept) + len(rels or ()))
+
+        if len(self._skeletons) >= MAX_SKELETONS:
+            self._skeletons = {}
+        self._skeletons[key] = skeleton
+        return skeleton
+
+    def compact_item(self, item, fields = None):
+        '''
+        :return: the compact version of the item, as a dictionary.
+        '''
+        item = strip_prompts(item)
+        if fields is not None and isinstance(item.get("data", None), list):
+            item["data"] = [entry for entry in item["data"] if isinstance(entry, dict) and entry.get("name", None) in fields]
+        return item
+
+    def encode_items(self, items, fields = None):
+        '''
+        Encode the compact version of the items of a collection.
+
+        :param items: the items, as built for the full representation (iterable of dict).
+        :param fields: names of the data to keep, None for all of them (frozenset).
+        :return: list of the JSON of the items (str).
+        '''
+        items = list(items)
+        parts = []                      #For every item (template, number of values, embedded) or (None, 0, item without skeleton)
+        values = []
+        for item in items:
+            shape = self._shape(item)
+            if shape is not None:
+                template, kept, count = self._skeleton(shape, fields)
+                try:
+                    item_values = [item["href"]] if shape[0] else []
+                    if kept:
+                        data = item["data"]
+                        item_values.extend([data[position]["value"] for position in kept])
+                    if shape[2]:
+                        item_values.extend([link["href"] for link in item["links"]])
+                except KeyError:
+                    shape = None
+            if shape is None:
+                parts.append((None, 0, item))
+            else:
+                values.extend(item_values)
+                parts.append((template, count, self.dumps(strip_prompts(item["embedded"])) if shape[3] else None))
+
+        encoded = self._values_encoder.encode(values)[1:-1].split(VALUE_SEPARATOR) if values else []
+        if len(encoded) != len(values):         #Some value is not a string, number, boolean or null
+            return [self.dumps(self.compact_item(item, fields)) for item in items]
+
+        result = []
+        position = 0
+        for template, count, extra in parts:
+            if template is None:
+                result.append(self.dumps(self.compact_item(extra, fields)))
+                continue
+            item_values = tuple(encoded[position:position + count])
+            position += count
+            result.append(template % (item_values + (extra,) if extra is not None else item_values))
+        return result
+
+    def collection_members(self, collection):
+        '''
+        :return: the members of the compact version of a collection, items excluded (dict).
+        '''
+        return dict((key, strip_prompts(member)) for key, member in collection.iteritems() if key not in OMITTED_COLLECTION_MEMBERS)
+
+    def encode_collection(self, envelope, fields = None):
+        '''
+        Encode the compact version of a collection.
+
+        :param envelope: the collection, as built for the full representation ({"collection" : {...}}).
+        :param fields: names of the data of the items to keep, None for all of them (frozenset).
+        :return: JSON of the collection (str).
+        '''
+        collection = envelope["collection"]
+        members = "".join("%s: %s, " % (self.dumps(key), self.dumps(member)) for key, member in self.collection_members(collection).iteritems())
+        return '{"collection": {' + members + '"items": [' + ", ".join(self.encode_items(collection.get("items", ()), fields)) + ']}}'
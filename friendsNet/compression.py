@@ -0,0 +1,345 @@
+'''
+WSGI middleware compressing the responses of friendsNet.
+
+The hypermedia representations are repetitive JSON which shrinks several
+times when compressed. :py:class:`CompressionMiddleware` compresses them with
+the coding negotiated from ``Accept-Encoding`` (gzip or deflate) while they are
+streamed, and it can keep the compressed bytes of the responses having an
+ETag, so the same representation is compressed once until it changes.
+'''
+import collections
+import itertools
+import threading
+import time
+import zlib
+
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header, parse_options_header, parse_set_header, quote_etag, unquote_etag
+
+DEFAULT_MIN_SIZE = 1024                     #Bodies smaller than this (bytes) are sent as they are
+DEFAULT_LEVEL = 6                           #zlib compression level
+DEFAULT_CACHE_SIZE = 8 * 1024 * 1024        #Bytes of compressed bodies kept in the cache, 0 disables it
+DEFAULT_CACHE_ENTRY_SIZE = 256 * 1024       #Greatest compressed body kept in the cache
+
+#Window bits of zlib for every content coding: "gzip" has the gzip container, "deflate" the zlib one (RFC 7230 4.2.2)
+CODINGS = collections.OrderedDict([("gzip", 16 + zlib.MAX_WBITS), ("deflate", zlib.MAX_WBITS)])
+
+#Media types which are compressed. Images and videos (e.g. the .jpg and .mp4 of Media_item_data) are compressed already
+COMPRESSIBLE_TYPES = frozenset(("text/plain", "text/html", "text/css", "text/csv", "application/json", "application/javascript", "application/xml"))
+COMPRESSIBLE_SUFFIXES = ("+json", "+xml")
+
+def is_compressible(content_type):
+    '''
+    :param content_type: value of the Content-Type header (str).
+    :return: True if the media type is worth compressing.
+    '''
+    mimetype = parse_options_header(content_type)[0].lower()
+    return mimetype in COMPRESSIBLE_TYPES or mimetype.endswith(COMPRESSIBLE_SUFFIXES)
+
+def negotiate_coding(accept_encoding):
+    '''
+    :param accept_encoding: value of the Accept-Encoding header (str).
+    :return: the preferred coding among :py:data:`CODINGS` ("gzip" on equal quality), None if the client accepts none.
+    '''
+    accept = parse_accept_header(accept_encoding)
+    best, best_quality = None, 0
+    for coding in CODINGS:
+        quality = accept.quality(coding)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+def add_vary(headers, header_name):
+    '''
+    Add a header to the Vary header of a response, which may exist already.
+    '''
+    vary = parse_set_header(headers.get("Vary", ""))
+    vary.add(header_name)
+    headers["Vary"] = vary.to_header()
+
+def coded_etag(etag, coding):
+    '''
+    :return: the ETag of the representation compressed with coding: a strong ETag identifies the bytes sent.
+    '''
+    value, weak = unquote_etag(etag)
+    return quote_etag("%s-%s" % (value, coding), weak)
+
+def uncoded_etags(if_none_match):
+    '''
+    :return: the If-None-Match header with the ETags given by :py:func:`coded_etag` replaced by the ones of the
+        application, and the coding found in them (None if there is none).
+    '''
+    found = None
+    for coding in CODINGS:
+        suffix = '-%s"' % coding
+        if suffix in if_none_match:
+            if_none_match = if_none_match.replace(suffix, '"')
+            found = coding
+    return if_none_match, found
+
+class CompressionStats(object):
+    '''
+    Counters of the work of a :py:class:`CompressionMiddleware`, safe to update from many threads.
+    '''
+    def __init__(self):
+        super(CompressionStats, self).__init__()
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        '''Set all the counters to zero.'''
+        with self._lock:
+            self.compressed = 0             #Responses compressed
+            self.skipped = 0                #Responses not compressed (small, not compressible or not accepted)
+            self.cache_hits = 0             #Responses sent from the cache of compressed bodies
+            self.bytes_in = 0               #Bytes given to the compressor
+            self.bytes_out = 0              #Bytes produced by the compressor
+            self.cpu_time = 0.0             #Processor seconds spent compressing
+
+    def record_compressed(self, bytes_in, bytes_out, cpu_time):
+        with self._lock:
+            self.compressed += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.cpu_time += cpu_time
+
+    def record_skipped(self):
+        with self._lock:
+            self.skipped += 1
+
+    def record_cache_hit(self):
+        with self._lock:
+            self.cache_hits += 1
+
+    def snapshot(self):
+        '''
+        :return: dictionary with the counters and ``ratio``, the compressed size over the original size (float, None
+            before the first compression), and ``cpu_time_per_mb``, the processor seconds spent for every MB compressed.
+        '''
+        with self._lock:
+            values = {"compressed" : self.compressed, "skipped" : self.skipped, "cache_hits" : self.cache_hits,
+                      "bytes_in" : self.bytes_in, "bytes_out" : self.bytes_out, "cpu_time" : self.cpu_time}
+        values["ratio"] = float(values["bytes_out"]) / values["bytes_in"] if values["bytes_in"] else None
+        values["cpu_time_per_mb"] = values["cpu_time"] * 1048576 / values["bytes_in"] if values["bytes_in"] else None
+        return values
+
+class CompressedCache(object):
+    '''
+    Least recently used compressed bodies, keyed by (ETag, coding), bounded by their total size.
+
+    :param max_size: greatest number of bytes kept.
+    '''
+    def __init__(self, max_size):
+        super(CompressedCache, self).__init__()
+        self.max_size = max_size
+        self.size = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.pop(key, None)
+            if body is not None:
+                self._entries[key] = body               #Most recently used
+            return body
+
+    def put(self, key, body):
+        if len(body) > self.max_size:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = body
+            self.size += len(body)
+            while self.size > self.max_size:
+                _, oldest = self._entries.popitem(last = False)
+                self.size -= len(oldest)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+class CompressionMiddleware(object):
+    '''
+    Compress the responses of a WSGI application.
+
+    A response is compressed when the client accepts gzip or deflate, it is a
+    200 response of a compressible media type (see :py:func:`is_compressible`)
+    without Content-Encoding and Cache-Control no-transform, and its body is
+    at least ``min_size`` bytes. Bodies without Content-Length (streamed) are
+    buffered until ``min_size`` bytes to know it, then they are compressed
+    while they are produced.
+
+    The compressed responses get the ETag ``"<etag>-<coding>"`` and
+    If-None-Match is given back to the application without the coding, so
+    conditional requests keep working. Compressed bodies of responses with an
+    ETag (and without Set-Cookie) are kept in a cache of ``cache_size`` bytes:
+    when the application gives the same ETag again its body is not even read.
+
+    :Example:
+
+    app.wsgi_app = CompressionMiddleware(app.wsgi_app, min_size = 1024)
+    app.wsgi_app.stats.snapshot()       #{"compressed" : 10, "ratio" : 0.12, "cpu_time" : 0.004, ...}
+
+    :param app: the WSGI application.
+    :param min_size: smallest body compressed (bytes).
+    :param level: zlib compression level, 1 (fastest) to 9 (smallest).
+    :param cache_size: bytes of compressed bodies kept in the cache, 0 to disable it.
+    :param cache_entry_size: greatest compressed body kept in the cache (bytes).
+    '''
+    def __init__(self, app, min_size=DEFAULT_MIN_SIZE, level=DEFAULT_LEVEL, cache_size=DEFAULT_CACHE_SIZE, cache_entry_size=DEFAULT_CACHE_ENTRY_SIZE):
+        super(CompressionMiddleware, self).__init__()
+        self.app = app
+        self.min_size = min_size
+        self.level = level
+        self.cache = CompressedCache(cache_size) if cache_size > 0 else None
+        self.cache_entry_size = min(cache_entry_size, cache_size)
+        self.stats = CompressionStats()
+
+    def __call__(self, environ, start_response):
+        coding = None
+        if environ.get("REQUEST_METHOD", "GET") != "HEAD":
+            coding = negotiate_coding(environ.get("HTTP_ACCEPT_ENCODING", ""))
+        validated_coding = None
+        if "HTTP_IF_NONE_MATCH" in environ:
+            environ["HTTP_IF_NONE_MATCH"], validated_coding = uncoded_etags(environ["HTTP_IF_NONE_MATCH"])
+
+        response = {}
+        def capture(status, headers, exc_info=None):
+            response["status"], response["headers"], response["exc_info"] = status, headers, exc_info
+            return write_not_supported
+        app_iter = self.app(environ, capture)
+        if not response:                                            #start_response called at the first iteration
+            app_iter = iter(app_iter)
+            first = [chunk for chunk in itertools.islice(app_iter, 1)]
+            app_iter = ClosingIterator(itertools.chain(first, app_iter), app_iter)
+
+        status = response["status"]
+        headers = Headers(response["headers"])
+
+        if status.startswith("304") and validated_coding is not None and "ETag" in headers:
+            headers["ETag"] = coded_etag(headers["ETag"], validated_coding)
+            start_response(status, headers.to_wsgi_list(), response["exc_info"])
+            return app_iter
+
+        compressible = (status.startswith("200") and "Content-Encoding" not in headers and is_compressible(headers.get("Content-Type", ""))
+                        and "no-transform" not in headers.get("Cache-Control", ""))
+        if compressible:
+            add_vary(headers, "Accept-Encoding")
+        if not compressible or coding is None:
+            self.stats.record_skipped()
+            start_response(status, headers.to_wsgi_list(), response["exc_info"])
+            return app_iter
+
+        content_length = headers.get("Content-Length", None, type = int)
+        if content_length is not None and content_length < self.min_size:
+            self.stats.record_skipped()
+            start_response(status, headers.to_wsgi_list(), response["exc_info"])
+            return app_iter
+
+        cache_key = None
+        if self.cache is not None and "ETag" in headers and "Set-Cookie" not in headers:
+            cache_key = (headers["ETag"], coding)
+            body = self.cache.get(cache_key)
+            if body is not None:                                    #The representation has not changed: its body is not read
+                close = getattr(app_iter, "close", None)
+                if close is not None:
+                    close()
+                self.stats.record_cache_hit()
+                self._set_coded_headers(headers, coding, len(body))
+                start_response(status, headers.to_wsgi_list(), response["exc_info"])
+                return [body]
+
+        buffered = []
+        chunks = iter(app_iter)
+        if content_length is None:                                  #Streamed body: read it until it is big enough
+            size = 0
+            for chunk in chunks:
+                buffered.append(chunk)
+                size += len(chunk)
+                if size >= self.min_size:
+                    break
+            else:
+                close = getattr(app_iter, "close", None)
+                if close is not None:
+                    close()
+                self.stats.record_skipped()
+                body = "".join(buffered)
+                headers["Content-Length"] = str(len(body))
+                start_response(status, headers.to_wsgi_list(), response["exc_info"])
+                return [body]
+
+        self._set_coded_headers(headers, coding, None)
+        start_response(status, headers.to_wsgi_list(), response["exc_info"])
+        return self._compress(itertools.chain(buffered, chunks), app_iter, coding, cache_key)
+
+    def _set_coded_headers(self, headers, coding, content_length):
+        headers["Content-Encoding"] = coding
+        if content_length is None:
+            headers.pop("Content-Length", None)
+        else:
+            headers["Content-Length"] = str(content_length)
+        if "ETag" in headers:
+            headers["ETag"] = coded_etag(headers["ETag"], coding)
+
+    def _compress(self, chunks, app_iter, coding, cache_key):
+        '''
+        Generator of the compressed body. The chunks of the application are compressed while they are produced
+        (zlib gives its output when it has enough of it) and the whole body is cached at the end if cache_key is given.
+        app_iter is the iterable returned by the application, closed at the end.
+        '''
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, CODINGS[coding])
+        output = [] if cache_key is not None else None
+        bytes_in = bytes_out = 0
+        cpu_time = 0.0
+        try:
+            for chunk in chunks:
+                start = time.clock()
+                data = compressor.compress(chunk)
+                cpu_time += time.clock() - start
+                bytes_in += len(chunk)
+                if data:
+                    bytes_out += len(data)
+                    if output is not None:
+                        output.append(data)
+                        if bytes_out > self.cache_entry_size:
+                            output = None
+                    yield data
+            start = time.clock()
+            data = compressor.flush()
+            cpu_time += time.clock() - start
+            bytes_out += len(data)
+            if output is not None:
+                output.append(data)
+                self.cache.put(cache_key, "".join(output))
+            self.stats.record_compressed(bytes_in, bytes_out, cpu_time)
+            yield data
+        finally:
+            close = getattr(app_iter, "close", None)
+            if close is not None:
+                close()
+
+def write_not_supported(data):
+    '''write() callable given to the application: the body must be returned by it to be compressed.'''
+    raise NotImplementedError("CompressionMiddleware does not support the write() callable of start_response")
+
+class ClosingIterator(object):
+    '''
+    Iterator over chunks which closes the original application iterable when it is closed.
+    '''
+    def __init__(self, chunks, app_iter):
+        self._chunks = chunks
+        self._app_iter = app_iter
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        return next(self._chunks)
+
+    def close(self):
+        close = getattr(self._app_iter, "close", None)
+        if close is not None:
+            close()
@@ -1,11 +1,140 @@
 '''
 Provides the database API to access the friendsNet persistent data.
 '''
-import time, sqlite3, os
+import time, sqlite3, os, re, threading, collections, operator, functools, contextlib
 
 DEFAULT_DB_PATH = "db/friendsNet.db"
 DEFAULT_SCHEMA = "db/friendsNet_schema_db.sql"
 DEFAULT_DATA_DUMP = "db/friendsNet_data_db.sql"
+#Schema upgrades: files named NNNN_description.sql, applied in order of version number NNNN
+DEFAULT_MIGRATIONS_FOLDER = "db/migrations"
+
+DEFAULT_POOL_SIZE = 10                  #Maximum number of connections (idle + checked out) kept by an Engine
+DEFAULT_POOL_TIMEOUT = 30               #Seconds a checkout waits for a free connection before giving up
+DEFAULT_POOL_IDLE_TIMEOUT = 300         #Seconds an idle connection can stay in the pool before being closed
+DEFAULT_POOL_CHECK_INTERVAL = 30        #Seconds a connection can stay idle before its health is checked again at checkout
+
+MAX_BATCH_PARAMETERS = 500             #Ids bound to a single "IN (...)" query, well under the sqlite limit of host parameters
+
+#Settings applied once, through PRAGMA statements, to every new connection. A None value leaves the sqlite default.
+DEFAULT_CONNECTION_PROFILE = {
+    "journal_mode" : "WAL",             #Readers don't block the writer and viceversa
+    "synchronous" : "NORMAL",           #Safe with WAL: a power loss can lose only the last commits, never corrupt
+    "foreign_keys" : "ON",
+    "cache_size" : -16000,              #Negative values are KiB: 16MB of page cache per connection
+    "mmap_size" : 134217728,            #128MB of the database file read through memory mapping
+    "temp_store" : "MEMORY",
+    "busy_timeout" : 5000               #Milliseconds a statement waits for a lock held by another connection
+}
+#Order in which the profile settings are applied (journal_mode must come before synchronous)
+PROFILE_PRAGMAS = ("journal_mode", "synchronous", "foreign_keys", "cache_size", "mmap_size", "temp_store", "busy_timeout")
+
+class PoolTimeoutError(Exception):
+    '''
+    Raised when no connection can be checked out from a :py:class:`ConnectionPool`
+    within the configured timeout.
+    '''
+    pass
+
+class NestedTransactionError(Exception):
+    '''
+    Raised when a :py:meth:`Connection.transaction` block is opened inside
+    another one on the same connection: only the outermost block commits, so
+    the inner one could not tell whether its writes are committed.
+    '''
+    pass
+
+class Record(tuple):
+    '''
+    Immutable row returned by a :py:class:`Connection` opened in records mode,
+    instead of the dictionaries built by the ``_create_*_object`` methods.
+
+    Values are read by column name, either as attributes (``status.content``)
+    or as keys (``status["content"]``), or by position as in any tuple. A
+    record keeps just the row values (there is no per instance dictionary), so
+    it takes less memory than the equivalent dictionary and it is built without
+    reading the columns one by one.
+
+    Record classes are created by :py:func:`record_type`, one for every list
+    of column names.
+    '''
+    __slots__ = ()
+    _fields = ()
+
+    _index = {}                 #Position of every column name
+
+    def __getitem__(self, key):
+        if isinstance(key, basestring):
+            return tuple.__getitem__(self, self._index[key])
+        return tuple.__getitem__(self, key)
+
+    def __repr__(self):
+        return "%s(%s)" % (self.__class__.__name__, ", ".join("%s=%r" % item for item in zip(self._fields, self)))
+
+    def get(self, key, default=None):
+        '''
+        :return: the value of the column, or default if there is no such column.
+        '''
+        if key in self._index:
+            return tuple.__getitem__(self, self._index[key])
+        return default
+
+    def keys(self):
+        '''
+        :return: list of the column names, in the order of the query.
+        '''
+        return list(self._fields)
+
+    def as_dict(self):
+        '''
+        :return: a new dictionary with the column names as keys.
+        '''
+        return dict(zip(self._fields, self))
+
+_record_types = {}
+_record_types_lock = threading.Lock()
+
+def record_type(fields):
+    '''
+    Get the :py:class:`Record` subclass for the given column names. Classes are
+    created once and then reused by all the connections.
+
+    :param fields: column names (tuple of str).
+    :return: the Record subclass, or None if the names are not unique or they
+        are not valid attribute names (e.g. ``COUNT(*)``).
+    '''
+    record_class = _record_types.get(fields)
+    if record_class is None:
+        if len(set(fields)) != len(fields) or not all(re.match(r"^[A-Za-z_]\w*$", field) for field in fields):
+            return None
+        attributes = dict((field, property(operator.itemgetter(i))) for i, field in enumerate(fields))
+        attributes["__slots__"] = ()
+        attributes["_fields"] = fields
+        attributes["_index"] = dict((field, i) for i, field in enumerate(fields))
+        with _record_types_lock:
+            record_class = _record_types.setdefault(fields, type("Record", (Record,), attributes))
+    return record_class
+
+class RecordFactory(object):
+    '''
+    sqlite3 row factory building :py:class:`Record` objects straight from the
+    row tuples. The record class is looked up once per statement: rows of the
+    same statement share the same cursor description.
+
+    Rows whose column names can't be attributes are returned as :py:class:`sqlite3.Row`.
+    '''
+    def __init__(self):
+        self._description = None
+        self._record_class = None
+
+    def __call__(self, cursor, row):
+        description = cursor.description
+        if description is not self._description:
+            self._description = description
+            self._record_class = record_type(tuple(column[0] for column in description))
+        if self._record_class is None:
+            return sqlite3.Row(cursor, row)
+        return tuple.__new__(self._record_class, row)
 
 class Engine(object):
     '''
@@ -16,6 +145,10 @@ class Engine(object):
     instance, and hence, to the database interface itself using the method
     :py:meth:`connection`.
 
+    Connections are kept in a bounded :py:class:`ConnectionPool`, so
+    :py:meth:`connect` just checks out an already opened connection whenever
+    one is available and :py:meth:`Connection.close` gives it back to the pool.
+
     :Example:
 
     engine = Engine()
@@ -24,31 +157,69 @@ class Engine(object):
     :param db_path: The path of the database file (always with respect to the
         calling script. If not specified, the Engine will use the file located
         at "db/friendsNet.db"
+    :param pool_size: Maximum number of connections opened at the same time.
+    :param pool_timeout: Seconds to wait for a free connection when all of them
+        are checked out.
+    :param pool_idle_timeout: Seconds after which an idle connection is closed.
+    :param pool_check_interval: Seconds after which an idle connection is checked
+        (see :py:meth:`Connection.is_healthy`) before being checked out again.
+    :param profile: dictionary overriding some of the settings of
+        :py:data:`DEFAULT_CONNECTION_PROFILE` applied to every new connection
+        (e.g. ``{"synchronous" : "FULL"}``). A None value disables a setting.
+    :param migrations_folder: folder containing the schema migrations. If
+        None, then "db/migrations" is utilized.
+    :param records: if True the connections return :py:class:`Record` objects
+        instead of dictionaries (see :py:class:`Connection`).
+    :raises ValueError: if the profile contains a setting not in :py:data:`PROFILE_PRAGMAS`.
     '''
-    def __init__(self, db_path=None):
+    def __init__(self, db_path=None, pool_size=DEFAULT_POOL_SIZE, pool_timeout=DEFAULT_POOL_TIMEOUT, pool_idle_timeout=DEFAULT_POOL_IDLE_TIMEOUT, pool_check_interval=DEFAULT_POOL_CHECK_INTERVAL, profile=None, migrations_folder=None, records=False):
         super(Engine, self).__init__()
         if db_path is not None:
             self.db_path = db_path
         else:
             self.db_path = DEFAULT_DB_PATH
+        if migrations_folder is not None:
+            self.migrations_folder = migrations_folder
+        else:
+            self.migrations_folder = DEFAULT_MIGRATIONS_FOLDER
+        self.profile = dict(DEFAULT_CONNECTION_PROFILE)
+        if profile is not None:
+            for name in profile:
+                if name not in PROFILE_PRAGMAS:
+                    raise ValueError("Unknown connection profile setting: %s" % name)
+            self.profile.update(profile)
+        self.pool = ConnectionPool(self.db_path, max_size = pool_size, timeout = pool_timeout, idle_timeout = pool_idle_timeout, check_interval = pool_check_interval, profile = self.profile, records = records)
             
     def connect(self):
         '''
-        Creates a connection to the database.
+        Checks out a connection to the database from the pool.
     
         :return: A Connection instance
         :rtype: Connection
+        :raises PoolTimeoutError: if all the connections are in use for longer
+            than the pool timeout.
     
         '''
-        return Connection(self.db_path)
+        return self.pool.checkout()
+
+    def dispose(self):
+        '''
+        Closes all the pooled connections. Connections currently checked out
+        are closed as soon as they are given back.
+
+        '''
+        self.pool.dispose()
     
     def remove_database(self):
         '''
         Removes the database file from the filesystem.
     
         '''
-        if os.path.exists(self.db_path):
-            os.remove(self.db_path)
+        self.dispose()          #Pooled connections would keep pointing to the removed file
+        #Write-ahead log and shared memory index are left behind if some connection was not closed
+        for path in (self.db_path, self.db_path + "-wal", self.db_path + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
             
     def clear(self):
         '''
@@ -65,6 +236,10 @@ class Engine(object):
             cur.execute(keys_on)
             cur.execute("DELETE FROM users_credentials")
             cur.execute("DELETE FROM media_items")
+            cur.execute("DELETE FROM media_uploads")
+            cur.execute("DELETE FROM revoked_tokens")
+            cur.execute("DELETE FROM media_derivatives")
+            cur.execute("DELETE FROM media_blobs")
             cur.execute("DELETE FROM groups")
             cur.execute("DELETE FROM conversations")
             cur.execute("UPDATE sqlite_sequence SET seq = (SELECT MAX(user_id) FROM users_credentials) WHERE name='users_credentials'")
@@ -84,14 +259,82 @@ class Engine(object):
         :param schema: path to the .sql schema file. If this parmeter is
             None, then "db/friendsNet_schema_db.sql" is utilized.
 
+        The schema file describes the version 0 of the database, so all the
+        migrations are applied afterwards (see :py:meth:`migrate`).
+
         '''
         if schema is None:
             schema = DEFAULT_SCHEMA
-            with open(schema) as f:
-                sql = f.read()
-                con = sqlite3.connect(self.db_path)
-                cur = con.cursor()
-                cur.executescript(sql)
+        with open(schema) as f:
+            sql = f.read()
+        con = sqlite3.connect(self.db_path)
+        try:
+            cur = con.cursor()
+            cur.executescript(sql)
+        finally:
+            con.close()
+        self.migrate()
+
+    def get_migrations(self):
+        '''
+        List the migrations available in the migrations folder.
+
+        :return: list of tuples (version, path) ordered by version (int, str).
+        '''
+        migrations = []
+        if os.path.isdir(self.migrations_folder):
+            for filename in os.listdir(self.migrations_folder):
+                version = filename.split("_", 1)[0]
+                if filename.endswith(".sql") and version.isdigit():
+                    migrations.append((int(version), os.path.join(self.migrations_folder, filename)))
+        migrations.sort()
+        return migrations
+
+    def get_schema_version(self):
+        '''
+        Get the version of the database schema, stored in the user_version field of the database header.
+
+        :return: the number of the last migration applied (0 if none) (int).
+        '''
+        con = sqlite3.connect(self.db_path)
+        try:
+            return con.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            con.close()
+
+    def migrate(self, target=None):
+        '''
+        Upgrade the database applying, in order, all the migrations with a version
+        greater than the current schema version. Every migration runs in its own
+        transaction together with the update of the schema version, so a failing
+        migration leaves the database at the previous version.
+
+        :param target: last version to apply. If None all the available migrations are applied (int).
+
+        :return: list of versions applied (empty if the database was already up to date).
+        :raises sqlite3.Error: when a migration fails. The migrations before it stay applied.
+        '''
+        applied = []
+        current = self.get_schema_version()
+        con = sqlite3.connect(self.db_path)
+        try:
+            for version, path in self.get_migrations():
+                if version <= current or (target is not None and version > target):
+                    continue
+                with open(path) as f:
+                    sql = f.read()
+                try:
+                    con.executescript("BEGIN;\n%s\nPRAGMA user_version = %d;\nCOMMIT;" % (sql, version))
+                except sqlite3.Error:
+                    try:
+                        con.execute("ROLLBACK")
+                    except sqlite3.Error:
+                        pass            #Transaction already closed by sqlite
+                    raise
+                applied.append(version)
+        finally:
+            con.close()
+        return applied
                 
     def populate_tables(self, dump=None):
         ''''       
@@ -115,6 +358,243 @@ class Engine(object):
                 cur.executescript(sql)
 
 
+class ConnectionPool(object):
+    '''
+    Bounded pool of long-lived :py:class:`Connection` instances for one database file.
+
+    Connections are opened lazily up to ``max_size``. :py:meth:`checkout` reuses the most
+    recently returned connection (its page cache is the warmest one), checking first that
+    it is still usable if it has been idle for more than ``check_interval`` seconds;
+    :py:meth:`checkin` puts it back. Connections idle for more than ``idle_timeout``
+    seconds are closed the next time the pool is accessed.
+
+    The pool is thread safe, so a connection can be checked out by a thread different from
+    the one which opened it; a connection is never used by two threads at the same time.
+
+    An instance of this class should not be instantiated directly. Use the :py:attr:`Engine.pool`.
+
+    :param db_path: Location of the database file.
+    :param max_size: maximum number of connections (idle and checked out) (int)
+    :param timeout: seconds a checkout waits for a connection to be given back (float)
+    :param idle_timeout: seconds after which an idle connection is closed (float)
+    :param check_interval: seconds after which an idle connection is checked before being reused (float)
+    :param profile: settings applied to every new connection, see :py:data:`DEFAULT_CONNECTION_PROFILE`
+    :param records: if True the connections return :py:class:`Record` objects instead of dictionaries.
+    '''
+    def __init__(self, db_path, max_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_POOL_TIMEOUT, idle_timeout=DEFAULT_POOL_IDLE_TIMEOUT, check_interval=DEFAULT_POOL_CHECK_INTERVAL, profile=None, records=False):
+        super(ConnectionPool, self).__init__()
+        self.db_path = db_path
+        self.profile = profile
+        self.records = records
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.check_interval = check_interval
+        self._idle = collections.deque()            #(connection, time of checkin), most recent on the right
+        self._size = 0                              #Connections opened by the pool and not closed yet
+        self._generation = 0                        #Increased by dispose(): older connections are not reused
+        self._condition = threading.Condition()
+
+    def size(self):
+        '''
+        :return: the number of connections currently opened by the pool (int)
+        '''
+        with self._condition:
+            return self._size
+
+    def idle(self):
+        '''
+        :return: the number of connections waiting in the pool to be checked out (int)
+        '''
+        with self._condition:
+            return len(self._idle)
+
+    def checkout(self):
+        '''
+        Get a connection from the pool, opening a new one if none is idle and the
+        maximum size has not been reached yet.
+
+        :return: A Connection instance
+        :rtype: Connection
+        :raises PoolTimeoutError: if no connection is given back within the pool timeout.
+        '''
+        deadline = time.time() + self.timeout
+        while True:
+            connection = None
+            with self._condition:
+                while True:
+                    self._evict_idle()
+                    if len(self._idle) > 0:
+                        connection, last_used = self._idle.pop()
+                        connection.checked_out = True
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        generation = self._generation
+                        break
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise PoolTimeoutError("No database connection available after %s seconds." % self.timeout)
+                    self._condition.wait(remaining)
+            if connection is None:
+                break
+            #Out of the lock, and only when the connection has been idle for a while: the check runs a statement
+            if time.time() - last_used <= self.check_interval or connection.is_healthy():
+                return connection
+            with self._condition:
+                self._discard(connection)
+                self._condition.notify()
+        #Open the new connection outside the lock: it does not need it and it can take some time
+        try:
+            connection = Connection(self.db_path, pool = self, profile = self.profile, records = self.records)
+        except:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        connection.generation = generation
+        connection.checked_out = True
+        return connection
+
+    def checkin(self, connection):
+        '''
+        Give a connection back to the pool. Connections opened before the last
+        :py:meth:`dispose` or already closed are closed instead. The health of
+        the connection is checked when it is checked out again.
+
+        :param connection: the Connection previously obtained from :py:meth:`checkout`
+        :raises ValueError: if the connection is not checked out, e.g. it has already been given back.
+        '''
+        with self._condition:
+            if not connection.checked_out:
+                raise ValueError("The connection has already been given back to the pool.")
+            connection.checked_out = False
+            if connection.generation != self._generation or connection.con is None:
+                self._discard(connection)
+            else:
+                self._idle.append((connection, time.time()))
+            self._condition.notify()
+
+    def dispose(self):
+        '''
+        Close all the idle connections and mark the checked out ones so that they
+        are closed when given back.
+        '''
+        with self._condition:
+            self._generation += 1
+            while len(self._idle) > 0:
+                connection, last_used = self._idle.popleft()
+                self._discard(connection)
+            self._condition.notify_all()
+
+    def _evict_idle(self):
+        '''
+        Close the connections idle for more than the idle timeout. The lock must be held.
+        '''
+        expiration = time.time() - self.idle_timeout
+        while len(self._idle) > 0 and self._idle[0][1] < expiration:
+            connection, last_used = self._idle.popleft()
+            self._discard(connection)
+
+    def _discard(self, connection):
+        '''
+        Close a connection owned by the pool. The lock must be held.
+        '''
+        self._size -= 1
+        connection.dispose()
+
+
+class DeferredCommitConnection(object):
+    '''
+    Proxy of a sqlite3 connection whose :py:meth:`commit` does nothing, used by
+    :py:meth:`Connection.transaction` so that the writes of several methods end
+    up in the same transaction. Everything else, rollback included, goes to the
+    proxied connection.
+
+    :param con: the sqlite3 connection.
+    :type con: sqlite3.Connection
+    '''
+    def __init__(self, con):
+        super(DeferredCommitConnection, self).__init__()
+        self.__dict__["con"] = con
+
+    def commit(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self.con, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.con, name, value)
+
+
+class IdentityMap(object):
+    '''
+    Request scoped cache in front of a :py:class:`Connection`: the point lookups
+    listed in :py:attr:`POINT_LOOKUPS` run once for the same arguments, and the
+    next calls get the same object back (None included, so checks of rows
+    which don't exist are cached too). Every other attribute is the one of the
+    connection.
+
+    Calling any method which can write (i.e. whose name doesn't start with one
+    of :py:attr:`READ_PREFIXES`) empties the map, and so does the end of a
+    :py:meth:`transaction` block, whose writes might have been rolled back.
+
+    The objects returned are shared by all the callers: they must not be modified.
+
+    :param connection: the connection of the request.
+    :type connection: Connection
+    '''
+    POINT_LOOKUPS = frozenset(["get_user_information", "get_comment", "get_rate", "get_status", "get_friendship", "get_media_item",
+                               "get_conversation", "get_information_for_group", "is_user_tagged"])
+    READ_PREFIXES = ("get_", "is_", "search_", "check_", "explain_")
+
+    def __init__(self, connection):
+        super(IdentityMap, self).__init__()
+        self.connection = connection
+        self.objects = {}               #(method name, arguments) -> returned object
+        self.queries = 0                #Lookups run on the connection
+        self.saved_queries = 0          #Lookups answered by the map
+
+    def lookup(self, name, *args):
+        '''
+        Call the point lookup name of the connection, unless it has already been
+        called with the same arguments.
+        '''
+        key = (name, args)
+        try:
+            result = self.objects[key]
+            self.saved_queries += 1
+        except KeyError:
+            result = self.objects[key] = getattr(self.connection, name)(*args)
+            self.queries += 1
+        return result
+
+    def clear(self):
+        '''
+        Forget all the objects looked up.
+        '''
+        self.objects.clear()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        '''
+        :py:meth:`Connection.transaction` emptying the map at the end of the block.
+        '''
+        try:
+            with self.connection.transaction():
+                yield self
+        finally:
+            self.clear()
+
+    def __getattr__(self, name):
+        if name in self.POINT_LOOKUPS:
+            return functools.partial(self.lookup, name)
+        if not name.startswith(self.READ_PREFIXES):
+            self.clear()
+        return getattr(self.connection, name)
+
+
 class Connection(object):
     '''
     API to access the friendsNet database.
@@ -127,25 +607,178 @@ class Connection(object):
 
     Use the method :py:meth:`close` in order to close a connection.
     A :py:class:`Connection` **MUST** always be closed once when it is not going to be
-    utilized anymore in order to release internal locks.
+    utilized anymore in order to release internal locks. When the connection belongs to
+    a :py:class:`ConnectionPool`, closing it gives it back to the pool.
 
     :param db_path: Location of the database file.
     :type dbpath: str
+    :param pool: pool the connection is given back to when closed, if any.
+    :type pool: ConnectionPool
+    :param profile: settings applied once to the new connection. If None
+        :py:data:`DEFAULT_CONNECTION_PROFILE` is used.
+    :type profile: dict
+    :param records: if True the get methods return :py:class:`Record` objects
+        (read only, with the same keys) instead of dictionaries. Much less
+        memory and time is spent on big lists, but the results can't be modified.
+    :type records: bool
 
     '''
-    def __init__(self, db_path):
+    def __init__(self, db_path, pool=None, profile=None, records=False):
         super(Connection, self).__init__()
-        self.con = sqlite3.connect(db_path)
+        #Pooled connections can be checked out by different threads (never at the same time)
+        self.con = sqlite3.connect(db_path, check_same_thread = False)
+        self.pool = pool
+        self.generation = 0
+        self.checked_out = False            #Set by the pool while the connection is in use
+        self.records = records
+        #Row and text conversion are the same for all the methods, so they are set just once
+        self.con.row_factory = RecordFactory() if records else sqlite3.Row
+        self.con.text_factory = str
+        self._after_commit = None           #Callbacks of the open transaction block, None outside of any
+        self.apply_profile(profile if profile is not None else DEFAULT_CONNECTION_PROFILE)
+
+    def apply_profile(self, profile):
+        '''
+        Apply the connection settings running the corresponding PRAGMA statements,
+        in the order given by :py:data:`PROFILE_PRAGMAS`.
+
+        :param profile: dictionary with the settings to apply. Settings missing or
+            with a None value are skipped.
+        :raises sqlite3.Error: when a sqlite3 error happen.
+        '''
+        cur = self.con.cursor()
+        try:
+            for name in PROFILE_PRAGMAS:
+                value = profile.get(name, None)
+                if value is not None:
+                    cur.execute("PRAGMA %s = %s" % (name, value))
+                    cur.fetchall()          #Some pragmas (e.g. journal_mode) return the new value
+        finally:
+            cur.close()
         
     def close(self):
         '''
-        Closes the database connection, commiting all changes.
+        Commits all changes and then gives the connection back to its pool or,
+        if it doesn't belong to any pool, closes it. Closing it again does nothing:
+        once given back, the connection may already be used by someone else.
 
         '''
+        if self.pool is not None and not self.checked_out:
+            return
         if self.con:
-            self.con.commit()
-            self.con.close()
+            try:
+                self.con.commit()
+            except sqlite3.Error, excp:
+                print "Error %s:" % excp.args[0]
+                self.con.rollback()
+            if self.pool is not None:
+                self.pool.checkin(self)
+            else:
+                self.dispose()
+
+    def dispose(self):
+        '''
+        Closes the underlying sqlite3 connection without giving it back to any pool.
+
+        '''
+        if self.con:
+            try:
+                self.con.close()
+            except sqlite3.Error, excp:
+                print "Error %s:" % excp.args[0]
+            self.con = None
+
+    @contextlib.contextmanager
+    def transaction(self):
+        '''
+        Context manager running all the methods called in the block in a single
+        transaction: their commits are deferred to the end of the block, and
+        everything is rolled back if the block raises an exception.
+
+        :Example:
+
+        with connection.transaction():
+            connection.create_status(...)
+            connection.create_comment(...)
+
+        A method failing inside the block rolls back what the block had written
+        until then. Effects which can't be rolled back (e.g. removing files) are
+        registered with :py:meth:`after_commit` and run once the block has
+        committed.
+
+        :raises NestedTransactionError: if a block is already open on the
+            connection. Code which can run either inside a block of its caller
+            or on its own checks :py:meth:`is_in_transaction` first.
+        '''
+        if self._after_commit is not None:
+            raise NestedTransactionError("A transaction block is already open on the connection")
+        con = self.con
+        self.con = DeferredCommitConnection(con)
+        self._after_commit = []
+        try:
+            yield self
+        except:
+            con.rollback()
+            raise
+        else:
+            con.commit()
+        finally:
+            self.con = con
+            callbacks, self._after_commit = self._after_commit, None
+        for callback in callbacks:
+            callback()
+
+    def is_in_transaction(self):
+        '''
+        :return: True inside a :py:meth:`transaction` block.
+        '''
+        return self._after_commit is not None
+
+    def after_commit(self, callback):
+        '''
+        Call a function once the open :py:meth:`transaction` block has committed,
+        outside of it. Nothing is called if the block is rolled back. Outside of
+        any block the function is called immediately, since every method commits
+        on its own.
+
+        :param callback: function without arguments.
+        '''
+        if self._after_commit is None:
+            callback()
+        else:
+            self._after_commit.append(callback)
+
+    def is_healthy(self):
+        '''
+        Check that the connection is still open and able to run statements.
+
+        :return: ``True`` if the connection can be used and ``False`` otherwise.
+        '''
+        if self.con is None:
+            return False
+        try:
+            self.con.execute("SELECT 1").fetchone()
+        except sqlite3.Error:
+            return False
+        return True
             
+    def explain_query_plan(self, query, query_parameters=()):
+        '''
+        Get the plan chosen by sqlite to run a query, without running it.
+
+        :param query: the SQL statement (str).
+        :param query_parameters: the values bound to the statement (tuple).
+
+        :return: array with the detail of every step of the plan (e.g.
+            "SEARCH statuses USING INDEX statuses_creator_time_idx (creator_id=?)").
+        '''
+        cur = self.con.cursor()
+        try:
+            cur.execute("EXPLAIN QUERY PLAN " + query, query_parameters)
+            return [row[3] for row in cur.fetchall()]
+        finally:
+            cur.close()
+
     def check_foreign_keys_status(self):
         '''
         Check if the foreign keys has been activated.
@@ -264,6 +897,8 @@ class Connection(object):
         Note that all values in the returned dictionary are string unless otherwise stated.
 
         '''
+        if isinstance(row, Record):           #Records mode: the row has already the keys of the dictionary
+            return row
         user_id = row["user_id"]
         first_name = row["first_name"]
         middle_name = row["middle_name"]
@@ -291,6 +926,8 @@ class Connection(object):
         Note that all values in the returned dictionary are string unless otherwise stated.
 
         '''
+        if isinstance(row, Record):           #Records mode: the row has already the keys of the dictionary
+            return row
         status_id = row["status_id"]
         creator_id = row["creator_id"]
         content = row["content"]
@@ -315,6 +952,8 @@ class Connection(object):
         Note that all values in the returned dictionary are string unless otherwise stated.
 
         '''
+        if isinstance(row, Record):           #Records mode: the row has already the keys of the dictionary
+            return row
         rate_id = row["rate_id"]
         status_id = row["status_id"]
         user_id = row["user_id"]
@@ -340,6 +979,8 @@ class Connection(object):
         Note that all values in the returned dictionary are string unless otherwise stated.
 
         '''
+        if isinstance(row, Record):           #Records mode: the row has already the keys of the dictionary
+            return row
         message_id = row["message_id"]
         conversation_id = row["conversation_id"]
         sender_id = row["sender_id"]
@@ -365,6 +1006,8 @@ class Connection(object):
         Note that all values in the returned dictionary are string unless otherwise stated.
 
         '''
+        if isinstance(row, Record):           #Records mode: the row has already the keys of the dictionary
+            return row
         media_item_id = row["media_item_id"]
         media_item_type = row["media_item_type"]
         url = row["url"]
@@ -372,6 +1015,60 @@ class Connection(object):
         
         media_item_object = {"media_item_id" : media_item_id, "media_item_type" : media_item_type, "url" : url, "description" : description}
         return media_item_object
+
+    def _create_media_blob_object(self, row):
+        '''
+        It takes a :py:class:`sqlite3.Row` and transform it into a dictionary.
+
+        :param row: The row obtained from the database.
+        :type row: sqlite3.Row
+        :return: a dictionary containing the following keys:
+
+            * ``content_hash``: SHA-256 hex digest of the content, naming its file
+            * ``size``: size of the content in bytes (int)
+            * ``references_count``: media items using the blob (int)
+
+        '''
+        if isinstance(row, Record):           #Records mode: the row has already the keys of the dictionary
+            return row
+        return {"content_hash" : row["content_hash"], "size" : row["size"], "references_count" : row["references_count"]}
+
+    def _create_media_derivative_object(self, row):
+        '''
+        It takes a :py:class:`sqlite3.Row` and transform it into a dictionary.
+
+        :param row: The row obtained from the database.
+        :type row: sqlite3.Row
+        :return: a dictionary containing the following keys:
+
+            * ``content_hash``: hash of the blob the variant has been generated from
+            * ``variant``: name of the variant (see :py:data:`friendsNet.derivatives.VARIANTS`)
+            * ``width``: width of the variant in pixels (int)
+            * ``height``: height of the variant in pixels (int)
+            * ``size``: size of the variant in bytes (int)
+
+        '''
+        if isinstance(row, Record):           #Records mode: the row has already the keys of the dictionary
+            return row
+        return {"content_hash" : row["content_hash"], "variant" : row["variant"], "width" : row["width"], "height" : row["height"], "size" : row["size"]}
+
+    def _create_media_upload_object(self, row):
+        '''
+        It takes a :py:class:`sqlite3.Row` and transform it into a dictionary.
+
+        :param row: The row obtained from the database.
+        :type row: sqlite3.Row
+        :return: a dictionary containing the following keys:
+
+            * ``upload_id``: id of the resumable upload, naming its file in the blob storage
+            * ``file_extension``: extension of the file being uploaded
+            * ``size``: size of the complete file in bytes (int)
+            * ``creation_time``: time in which the upload has been started (long)
+
+        '''
+        if isinstance(row, Record):           #Records mode: the row has already the keys of the dictionary
+            return row
+        return {"upload_id" : row["upload_id"], "file_extension" : row["file_extension"], "size" : row["size"], "creation_time" : row["creation_time"]}
     
     def _create_group_object(self, row):
     	'''
@@ -390,6 +1087,8 @@ class Connection(object):
         Note that all values in the returned dictionary are string unless otherwise stated.
 
         '''
+        if isinstance(row, Record):           #Records mode: the row has already the keys of the dictionary
+            return row
         group_id = row["group_id"]
         name = row["name"]
         prof_picture_id = row["prof_picture_id"]
@@ -414,6 +1113,8 @@ class Connection(object):
         Note that all values in the returned dictionary are string unless otherwise stated.
 
         '''
+        if isinstance(row, Record):           #Records mode: the row has already the keys of the dictionary
+            return row
         group_id = row["group_id"]
         user_id = row["user_id"]
         user_type = row["administrator"]
@@ -435,6 +1136,8 @@ class Connection(object):
         Note that all values in the returned dictionary are string unless otherwise stated.
         
         '''
+        if isinstance(row, Record):           #Records mode: the row has already the keys of the dictionary
+            return row
         group_id = row["group_id"]
         user_id = row["user_id"]
         
@@ -458,6 +1161,8 @@ class Connection(object):
         Note that all values in the returned dictionary are string unless otherwise stated.
 
         '''
+        if isinstance(row, Record):           #Records mode: the row has already the keys of the dictionary
+            return row
         friendship_id = row["friendship_id"]
         user1_id = row["user1_id"]
         user2_id = row["user2_id"]
@@ -483,6 +1188,8 @@ class Connection(object):
         Note that all values in the returned dictionary are string unless otherwise stated.
 
         '''
+        if isinstance(row, Record):           #Records mode: the row has already the keys of the dictionary
+            return row
         conversation_id = row["conversation_id"]
         user1_id = row["user1_id"]
         user2_id = row["user2_id"]
@@ -508,6 +1215,8 @@ class Connection(object):
         Note that all values in the returned dictionary are string unless otherwise stated.
 
         '''
+        if isinstance(row, Record):           #Records mode: the row has already the keys of the dictionary
+            return row
         comment_id = row["comment_id"]
         status_id = row["status_id"]
         user_id = row["user_id"]
@@ -519,6 +1228,163 @@ class Connection(object):
     
     
     #API
+    def _create_search_expression(self, text, column=None):
+        '''
+        Transform a text in a full text query (USERS_SEARCH table) matching the
+        rows having a word beginning with each of the words of the text.
+
+        :param text: words to search (str).
+        :param column: if not None, the words are searched only in this column (str).
+
+        :return: the query (str) or None if the text contains no word.
+        '''
+        if isinstance(text, str):
+            text = text.decode("utf-8", "ignore")
+        words = re.findall(r"\w+", text or u"", re.UNICODE)
+        if len(words) == 0:
+            return None
+        expression = " AND ".join(u'"%s"*' % word for word in words)      #Words contain no quotes, so they can't break the query
+        if column is not None:
+            expression = u"%s : (%s)" % (column, expression)
+        return expression
+
+    def _fetch_by_ids(self, table, id_column, ids, create_object):
+        '''
+        Get many rows of a table given their ids. Ids are bound in chunks of
+        :py:data:`MAX_BATCH_PARAMETERS` to "IN (...)" queries.
+
+        :param table: name of the table (str).
+        :param id_column: name of the primary key column (str).
+        :param ids: ids of the searched rows (iterable of int). Duplicates are fetched once.
+        :param create_object: method transforming a row in a dictionary.
+
+        :return: dictionary having as keys the ids found and as values the rows in dictionary format.
+        '''
+        ids = list(set(ids))
+        objects = {}
+
+        cur = self.con.cursor()
+        try:
+            for start in xrange(0, len(ids), MAX_BATCH_PARAMETERS):
+                chunk = ids[start:start + MAX_BATCH_PARAMETERS]
+                query = "SELECT * FROM %s WHERE %s IN (%s)" % (table, id_column, ", ".join("?" * len(chunk)))
+                cur.execute(query, chunk)
+                for row in cur.fetchall():
+                    objects[row[id_column]] = create_object(row)
+        finally:
+            cur.close()
+        return objects
+
+    def _fetch_grouped(self, query, ids, create_object, query_parameters=()):
+        '''
+        Run a query for many ids and group the rows by their first column. Ids
+        are bound in chunks of :py:data:`MAX_BATCH_PARAMETERS`.
+
+        :param query: SELECT statement whose first column is the key of the group, with a "%s" where the
+            placeholders of the ids go, e.g. "SELECT status_id AS group_id, ... IN (%s) ..." (str).
+        :param ids: ids bound to the query (iterable of int). Duplicates are bound once.
+        :param create_object: method transforming a row in a dictionary. Not used in records mode.
+        :param query_parameters: values bound after the ids (tuple).
+
+        :return: dictionary having as keys the values of the first column and as values the arrays of
+            the objects of the group (the first column excluded), in the order of the query.
+        '''
+        ids = list(set(ids))
+        groups = {}
+
+        cur = self.con.cursor()
+        if self.records:
+            cur.row_factory = None          #Plain tuples: the records are built without the key column
+        try:
+            for start in xrange(0, len(ids), MAX_BATCH_PARAMETERS):
+                chunk = ids[start:start + MAX_BATCH_PARAMETERS]
+                cur.execute(query % ", ".join("?" * len(chunk)), tuple(chunk) + tuple(query_parameters))
+                rows = cur.fetchall()
+                if self.records:
+                    record_class = record_type(tuple(column[0] for column in cur.description[1:]))
+                    for row in rows:
+                        groups.setdefault(row[0], []).append(tuple.__new__(record_class, row[1:]))
+                else:
+                    for row in rows:
+                        groups.setdefault(row[0], []).append(create_object(row))
+        finally:
+            cur.close()
+        return groups
+
+    def _fetch_page(self, query, query_parameters, sort_columns, descending, create_object, limit_to=None, after=None, before=None, stream=False):
+        '''
+        Run a list query returning the whole list or just one page of it. Pages
+        are found seeking the sort key of the rows (keyset pagination), so any
+        page costs the same as the first one when the sort columns are indexed.
+
+        :param query: SELECT statement with a WHERE clause and without ORDER BY (str).
+        :param query_parameters: values bound to the query (tuple).
+        :param sort_columns: columns defining the order of the list. The last one must be unique (tuple).
+        :param descending: True if the list is ordered from the greatest to the lowest key.
+        :param create_object: method transforming a row in a dictionary. Not used in records mode.
+        :param limit_to: maximum number of rows returned. If None all the rows are returned (int).
+        :param after: sort key of the row after which the page starts (tuple).
+        :param before: sort key of the row before which the page ends (tuple). Ignored if after is given.
+        :param stream: if True the rows are read from the database one at a time, while the returned generator is consumed.
+
+        :return: array of dictionaries in the order of the list or None if nothing is found.
+            If stream is True a generator of the dictionaries, which yields nothing if nothing is found.
+        :raises ValueError: if the sort key has not a value for every sort column.
+        '''
+        key = after if after is not None else before
+        backwards = after is None and before is not None                #Rows preceding the key are read in reverse order
+        if key is not None:
+            if len(key) != len(sort_columns):
+                raise ValueError("Sort key must have %d values" % len(sort_columns))
+            comparison = "<" if descending != backwards else ">"
+            query += " AND (%s) %s (%s)" % (", ".join(sort_columns), comparison, ", ".join("?" * len(key)))
+            query_parameters += tuple(key)
+        direction = "DESC" if descending != backwards else "ASC"
+        query += " ORDER BY " + ", ".join("%s %s" % (column, direction) for column in sort_columns)
+        if limit_to is not None:
+            query += " LIMIT ?"
+            query_parameters += (limit_to,)
+
+        if stream:
+            cur = self.con.cursor()
+            cur.execute(query, query_parameters)
+            return self._stream_rows(cur, create_object, backwards)
+
+        objects = None
+
+        cur = self.con.cursor()
+        if self.records:
+            cur.row_factory = None          #Plain tuples: all the records are then built at once by map()
+        cur.execute(query, query_parameters)
+        rows = cur.fetchall()
+        if rows is not None and len(rows) > 0:
+            if backwards:
+                rows.reverse()
+            if self.records:
+                record_class = record_type(tuple(column[0] for column in cur.description))
+                objects = map(functools.partial(tuple.__new__, record_class), rows)
+            else:
+                objects = [create_object(row) for row in rows]
+        cur.close()
+        return objects
+
+    def _stream_rows(self, cur, create_object, backwards=False):
+        '''
+        Generator of the rows of an executed statement, read from the cursor one at a time.
+        The cursor is closed once all the rows have been read (or the generator is discarded).
+
+        :param cur: cursor on which the statement has been executed.
+        :param create_object: method transforming a row in a dictionary.
+        :param backwards: True if the rows must be returned in reverse order. All of
+            them are read first (pages read backwards are at most one page long).
+        '''
+        try:
+            rows = reversed(cur.fetchall()) if backwards else cur
+            for row in rows:
+                yield create_object(row)
+        finally:
+            cur.close()
+
     def create_user(self, values):
     	'''
         Insert a new user in the database.
@@ -552,11 +1418,6 @@ class Connection(object):
         
         user_id = None        
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         try:
             cur.execute(query1, query1_parameters)
@@ -582,39 +1443,127 @@ class Connection(object):
         -media_item_type must be either 0 or 1;
         -url must be unique;
 
-        :return: id of just created media (int).
+        It can contain also the "content_hash" and the "size" of the content of the media
+        (see :py:_create_media_blob_object): the blob is added if it's not there yet, and
+        the new media item becomes one of its references, in the same transaction.
 
-        :raises IntegrityError: if one of conditions above is not respected
+        In place of the url it can contain an "url_format" with one "%s": the url is then
+        built from the id of the new media item (url_format % media_id), in the same
+        transaction. Ids are never reused, so concurrent uploads, from any process, never
+        get the same url.
+
+        :return: id of just created media (int), or None if one of conditions above is not respected.
 
         Note that all values in the returned dictionary are string unless otherwise stated.
 
         '''
         media_type = values["media_type"]
-        url = values["url"]
+        url_format = values.get("url_format", None)
+        url = values["url"] if url_format is None else url_format % "new"       #Placeholder replaced below, before any other writer can insert
         description = values.get("description", None)
+        content_hash = values.get("content_hash", None)
         
         query = "INSERT INTO MEDIA_ITEMS VALUES (NULL, ?, ?, ?)"
         query_parameters = (media_type, url, description)
         
         media_id = None
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         try:
+            if content_hash is not None:
+                cur.execute("INSERT OR IGNORE INTO MEDIA_BLOBS (content_hash, size) VALUES (?, ?)", (content_hash, values["size"]))
             cur.execute(query, query_parameters)
             if cur.lastrowid >= 1:
                 media_id = cur.lastrowid
+                if url_format is not None:
+                    cur.execute("UPDATE MEDIA_ITEMS SET url = ? WHERE media_item_id = ?", (url_format % media_id, media_id))
+                if content_hash is not None:
+                    cur.execute("INSERT INTO MEDIA_ITEMS_BLOBS VALUES (?, ?)", (media_id, content_hash))
                 self.con.commit()
         except sqlite3.IntegrityError, err:          #There could be a check error, for the url if it's not unique
             print "Error %s:" % err.args[0]
+            media_id = None
+            self.con.rollback()
         finally:
             cur.close()
         return media_id
     
+    def create_media_derivatives(self, content_hash, derivatives):
+        '''
+        Record the variants generated from a blob, replacing the ones with the same name.
+
+        :param content_hash: hash of the blob (str)
+        :param derivatives: list of dictionaries with the "variant", "width", "height" and "size"
+            of the variants, as in :py:_create_media_derivative_object.
+
+        :return: True if the variants have been recorded, False if the blob doesn't exist (anymore).
+        '''
+        query = "INSERT OR REPLACE INTO MEDIA_DERIVATIVES VALUES (?, ?, ?, ?, ?)"
+        query_parameters = [(content_hash, derivative["variant"], derivative["width"], derivative["height"], derivative["size"]) for derivative in derivatives]
+
+        result = False
+
+        cur = self.con.cursor()
+        try:
+            cur.executemany(query, query_parameters)
+            self.con.commit()
+            result = True
+        except sqlite3.IntegrityError, err:          #The blob has been deleted while its variants were generated
+            print "Error %s:" % err.args[0]
+            self.con.rollback()
+        finally:
+            cur.close()
+        return result
+    
+    def create_media_upload(self, values, max_uploads = None):
+        '''
+        Insert a new resumable upload in the database.
+
+        :param values: dictionary containing the "upload_id", the "file_extension" and the
+            "size" of the upload, as in :py:_create_media_upload_object. The size must be positive.
+        :param max_uploads: if not None, the upload is inserted only if fewer uploads are in
+            progress. Counting and inserting are one statement, so concurrent requests can't exceed it.
+
+        :return: True if the upload has been inserted, False if one of conditions above is not
+            respected or there are already max_uploads uploads.
+        '''
+        creation_time = long(round(time.time() * 1000))
+
+        query = "INSERT INTO MEDIA_UPLOADS SELECT ?, ?, ?, ? WHERE ? IS NULL OR (SELECT COUNT(*) FROM MEDIA_UPLOADS) < ?"
+        query_parameters = (values["upload_id"], values["file_extension"], values["size"], creation_time, max_uploads, max_uploads)
+
+        result = False
+
+        cur = self.con.cursor()
+        try:
+            cur.execute(query, query_parameters)
+            result = cur.rowcount >= 1
+            self.con.commit()
+        except sqlite3.IntegrityError, err:
+            print "Error %s:" % err.args[0]
+            self.con.rollback()
+        finally:
+            cur.close()
+        return result
+    
+    def create_revoked_token(self, token_hash, expiration):
+        '''
+        Record that an authentication token has been revoked. Revoking it again is not an error.
+
+        :param token_hash: SHA-256 digest of the token (str)
+        :param expiration: time (long, seconds since the epoch) when the token expires anyway.
+
+        :return: True if the revocation is recorded.
+        '''
+        query = "INSERT OR IGNORE INTO REVOKED_TOKENS VALUES(?, ?)"
+        query_parameters = (token_hash, expiration)
+
+        cur = self.con.cursor()
+        cur.execute(query, query_parameters)
+        self.con.commit()
+        cur.close()
+        return True
+
     def create_group(self, values):
         '''
         Insert a new group in the database.
@@ -643,11 +1592,6 @@ class Connection(object):
         
         group_id = None
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         try:
             cur.execute(query, query_parameters)
@@ -684,11 +1628,6 @@ class Connection(object):
         
         result = False
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         try:
             cur.execute(query, query_parameters)
@@ -728,11 +1667,6 @@ class Connection(object):
         
         conversation_id = None
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query1, query1_parameters)
         if cur.fetchone() is None:                  #If there is no conversation between the same users in the opposite way
@@ -768,11 +1702,6 @@ class Connection(object):
 
         result = False
 
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query1, query1_parameters)
         if cur.fetchone() is None:
@@ -816,11 +1745,6 @@ class Connection(object):
         
         friendship_id = None
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query1, query1_parameters)
         if cur.fetchone() is None:
@@ -839,17 +1763,23 @@ class Connection(object):
                 cur.close()
         return friendship_id         
   
-    def create_status(self, values, group_id=None):
+    def create_status(self, values, group_id=None, media_ids=None, tagged_user_ids=None):
         '''
         Insert a new status in the database. It can be posted by the member of a group.
+        Media and tags of the status are inserted with it, in the same transaction:
+        if any of them can't be inserted, the status is not created.
 
         :param values: dictionary containing values specified in py:_create_status_object:
         :param group_id: id of the group in which the status is posted.
+        :param media_ids: ids of the media attached to the status (list of int). Repeated ids are attached once.
+        :param tagged_user_ids: ids of the users tagged in the status (list of int). Repeated ids are tagged once.
 
         -status_id must be null;
         -creation_time must be null;
         -creator_id must exist;
         -group_id can be null;
+        -media_ids must exist;
+        -tagged_user_ids must exist;
 
         :return: id of just created status (int).
 
@@ -867,11 +1797,6 @@ class Connection(object):
         query1 = "INSERT INTO STATUSES VALUES (NULL, ?, ?, ?)"
         query1_parameters = (creator_id, content, creation_time)
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         try:
             cur.execute(query1, query1_parameters)
@@ -882,6 +1807,12 @@ class Connection(object):
                     query2 = "INSERT INTO GROUPS_STATUSES_LISTS VALUES (?, ?)"
                     query2_parameters = (group_id, stat_id)
                     cur.execute(query2, query2_parameters)
+                if media_ids:
+                    query3 = "INSERT INTO STATUSES_MEDIA_LISTS VALUES (?, ?)"
+                    cur.executemany(query3, ((stat_id, media_id) for media_id in collections.OrderedDict.fromkeys(media_ids)))
+                if tagged_user_ids:
+                    query4 = "INSERT INTO STATUSES_TAGS_LISTS VALUES (?, ?)"
+                    cur.executemany(query4, ((stat_id, user_id) for user_id in collections.OrderedDict.fromkeys(tagged_user_ids)))
                 self.con.commit()
                 status_id = stat_id
         except sqlite3.IntegrityError, err:
@@ -914,11 +1845,6 @@ class Connection(object):
         
         result = False
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         try:
             cur.execute(query, query_parameters)
@@ -954,11 +1880,6 @@ class Connection(object):
         
         result = False
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         try:
             cur.execute(query, query_parameters)
@@ -999,11 +1920,6 @@ class Connection(object):
         query = "INSERT INTO COMMENTS VALUES (NULL, ?, ?, ?, ?)"
         query_parameters = (status_id, commentor_id, content, creation_time)
 	
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()	
         try:
             cur.execute(query, query_parameters)
@@ -1039,11 +1955,6 @@ class Connection(object):
 	
         rate_id = None
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()        
         query = "INSERT INTO RATES VALUES (NULL, ?, ?, ?)"
         query_parameters = (status_id, rater_id, rate)
@@ -1085,11 +1996,6 @@ class Connection(object):
         
         message_id = None
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         query = "INSERT INTO MESSAGES VALUES (NULL, ?, ?, ?, ?)"
         query_parameters = (conversation_id, sender_id, content, time_creation)
@@ -1123,11 +2029,6 @@ class Connection(object):
         
         user_id = None        
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         row = cur.fetchone()
@@ -1149,11 +2050,6 @@ class Connection(object):
 
         result = False
 
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         row = cur.fetchone()
@@ -1161,24 +2057,72 @@ class Connection(object):
         cur.close()
         return result
 
+    def is_token_revoked(self, token_hash):
+        '''
+        Returns true if an authentication token has been revoked.
+
+        :param token_hash: SHA-256 digest of the token (str)
+
+        :return: true if the token has been revoked, false otherwise
+        '''
+        query = "SELECT token_hash FROM REVOKED_TOKENS WHERE token_hash = ?"
+        query_parameters = (token_hash,)
+
+        cur = self.con.cursor()
+        cur.execute(query, query_parameters)
+        row = cur.fetchone()
+        result = (row is not None)
+        cur.close()
+        return result
+
+    def is_user_tagged(self, status_id, user_id):
+        '''
+        Returns true if the user is tagged in the status.
+
+        :param status_id: id of the status (int)
+        :param user_id: id of the user (int)
+
+        :return: true if the user is tagged in the status, false otherwise
+        '''
+        query = "SELECT 1 FROM STATUSES_TAGS_LISTS WHERE status_id = ? AND user_id = ?"
+        query_parameters = (status_id, user_id)
+
+        cur = self.con.cursor()
+        cur.execute(query, query_parameters)
+        result = (cur.fetchone() is not None)
+        cur.close()
+        return result
+
     def search_user(self, name, surname):
         '''
         Get the users that match the search parameters.
         :param name: the name of the user
         :param surname: the surname of the user
 
-        :return: array of users in dictionary format as declared in :py:_create_user_profile_object or None if nothing is found
-        '''
-        query = "SELECT * FROM USERS_PROFILES WHERE first_name LIKE ? AND surname LIKE ?"
-        query_parameters = ('%'+name+'%', '%'+surname+'%')
+        Every word of the parameters has to be the beginning of a word of the
+        corresponding field (e.g. "Anto" matches "Antonio"). Empty parameters
+        match every user, parameters without any word (e.g. "?!") match none.
+
+        :return: array of users in dictionary format as declared in :py:_create_user_profile_object or None if nothing is found.
+        They're ordered from the most to the least relevant one.
+        '''
+        conditions = []
+        for text, column in ((name, "first_name"), (surname, "surname")):
+            if not text:
+                continue
+            expression = self._create_search_expression(text, column)
+            if expression is None:
+                return None
+            conditions.append(expression)
+        if len(conditions) == 0:
+            query = "SELECT * FROM USERS_PROFILES ORDER BY user_id"
+            query_parameters = ()
+        else:
+            query = "SELECT users_profiles.* FROM USERS_SEARCH JOIN USERS_PROFILES ON USERS_PROFILES.user_id = USERS_SEARCH.rowid WHERE users_search MATCH ? ORDER BY users_search.rank"
+            query_parameters = (" AND ".join(conditions),)
 
         users = None
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         rows = cur.fetchall()
@@ -1191,7 +2135,35 @@ class Connection(object):
         cur.close()
         return users
 
-    
+    def search_users(self, text, limit_to=None):
+        '''
+        Get the users whose first name, middle name or surname match a free text search.
+
+        :param text: words to search. Every word has to be the beginning of a word of the user names (str).
+        :param limit_to: maximum number of users returned. If None all of them are returned (int).
+
+        :return: array of users in dictionary format as declared in :py:_create_user_profile_object or None if nothing is found.
+        They're ordered from the most to the least relevant one (bm25 ranking).
+        '''
+        expression = self._create_search_expression(text)
+        if expression is None:
+            return None
+        query = "SELECT users_profiles.* FROM USERS_SEARCH JOIN USERS_PROFILES ON USERS_PROFILES.user_id = USERS_SEARCH.rowid WHERE users_search MATCH ? ORDER BY users_search.rank"
+        query_parameters = (expression,)
+        if limit_to is not None:
+            query += " LIMIT ?"
+            query_parameters += (limit_to,)
+
+        users = None
+
+        cur = self.con.cursor()
+        cur.execute(query, query_parameters)
+        rows = cur.fetchall()
+        if rows is not None and len(rows) > 0:
+            users = [self._create_user_profile_object(row) for row in rows]
+        cur.close()
+        return users
+
     def get_user_information(self, user_id):                       #Get all user profile information given user's id
         '''
         Get the user information given his id
@@ -1207,11 +2179,6 @@ class Connection(object):
         
         user = None
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         row = cur.fetchone()
@@ -1220,6 +2187,19 @@ class Connection(object):
         cur.close()
         return user
 
+    def get_users_information(self, user_ids):
+        '''
+        Get the information of many users with a single query (one every MAX_BATCH_PARAMETERS ids).
+
+        :param user_ids: ids of the searched users (iterable of int)
+
+        :return: dictionary having as keys the ids found and as values the users in dictionary format as declared in :py:_create_user_profile_object.
+        Ids not found are not in the dictionary.
+
+        Note that all values in the returned dictionary are string unless otherwise stated.
+        '''
+        return self._fetch_by_ids("USERS_PROFILES", "user_id", user_ids, self._create_user_profile_object)
+
     def get_comment(self, comment_id):
         '''
         Get all information about a comment
@@ -1235,11 +2215,6 @@ class Connection(object):
     
         comment = None
     
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         row = cur.fetchone()
@@ -1263,11 +2238,6 @@ class Connection(object):
         
         rate = None
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         row = cur.fetchone()
@@ -1291,11 +2261,6 @@ class Connection(object):
     
         status = None
     
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         row = cur.fetchone()
@@ -1304,6 +2269,19 @@ class Connection(object):
         cur.close()
         return status
             
+    def get_statuses(self, status_ids):
+        '''
+        Get the data of many statuses with a single query (one every MAX_BATCH_PARAMETERS ids).
+
+        :param status_ids: ids of the searched statuses (iterable of int)
+
+        :return: dictionary having as keys the ids found and as values the statuses in dictionary format as declared in :py:_create_status_object.
+        Ids not found are not in the dictionary.
+
+        Note that all values in the returned dictionary are string unless otherwise stated.
+        '''
+        return self._fetch_by_ids("STATUSES", "status_id", status_ids, self._create_status_object)
+
     def get_friendship(self, friendship_id):
         '''
         Get all information about a friendship
@@ -1319,11 +2297,6 @@ class Connection(object):
         
         friendship = None
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         row = cur.fetchone()
@@ -1347,11 +2320,6 @@ class Connection(object):
         
         media = None
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         row = cur.fetchone()
@@ -1360,6 +2328,100 @@ class Connection(object):
         cur.close()
         return media
 
+    def get_blob_for_media_item(self, media_id):
+        '''
+        Get the blob with the content of a media item.
+
+        :param media_id: searched media id (int)
+
+        :return: blob in dictionary format as declared in :py:_create_media_blob_object, or None if the
+            media item doesn't exist or it was uploaded before the blobs (its file is named as its url).
+        '''
+        query = "SELECT MEDIA_BLOBS.* FROM MEDIA_ITEMS_BLOBS JOIN MEDIA_BLOBS ON MEDIA_BLOBS.content_hash = MEDIA_ITEMS_BLOBS.content_hash WHERE MEDIA_ITEMS_BLOBS.media_item_id = ?"
+        cur = self.con.cursor()
+        cur.execute(query, (media_id,))
+        row = cur.fetchone()
+        cur.close()
+        return self._create_media_blob_object(row) if row is not None else None
+
+    def get_blob_for_media_url(self, url):
+        '''
+        Get the blob with the content of the media item having the given url.
+
+        :param url: url of the media item (str)
+
+        :return: blob in dictionary format as declared in :py:_create_media_blob_object, or None if there
+            is no media item with the url or it was uploaded before the blobs.
+        '''
+        query = "SELECT MEDIA_BLOBS.* FROM MEDIA_ITEMS JOIN MEDIA_ITEMS_BLOBS ON MEDIA_ITEMS_BLOBS.media_item_id = MEDIA_ITEMS.media_item_id " \
+                "JOIN MEDIA_BLOBS ON MEDIA_BLOBS.content_hash = MEDIA_ITEMS_BLOBS.content_hash WHERE MEDIA_ITEMS.url = ?"
+        cur = self.con.cursor()
+        cur.execute(query, (url,))
+        row = cur.fetchone()
+        cur.close()
+        return self._create_media_blob_object(row) if row is not None else None
+
+    def get_media_blob(self, content_hash):
+        '''
+        Get a blob.
+
+        :param content_hash: hash of the blob (str)
+
+        :return: blob in dictionary format as declared in :py:_create_media_blob_object, or None if it doesn't exist.
+        '''
+        query = "SELECT * FROM MEDIA_BLOBS WHERE content_hash = ?"
+        cur = self.con.cursor()
+        cur.execute(query, (content_hash,))
+        row = cur.fetchone()
+        cur.close()
+        return self._create_media_blob_object(row) if row is not None else None
+
+    def get_media_derivative(self, content_hash, variant):
+        '''
+        Get a variant generated from a blob.
+
+        :param content_hash: hash of the blob (str)
+        :param variant: name of the variant (str)
+
+        :return: variant in dictionary format as declared in :py:_create_media_derivative_object, or None
+            if it has not been generated (yet).
+        '''
+        query = "SELECT * FROM MEDIA_DERIVATIVES WHERE content_hash = ? AND variant = ?"
+        cur = self.con.cursor()
+        cur.execute(query, (content_hash, variant))
+        row = cur.fetchone()
+        cur.close()
+        return self._create_media_derivative_object(row) if row is not None else None
+
+    def get_media_upload(self, upload_id):
+        '''
+        Get a resumable upload in progress.
+
+        :param upload_id: id of the upload (str)
+
+        :return: upload in dictionary format as declared in :py:_create_media_upload_object, or None
+            if it doesn't exist or it has already been completed.
+        '''
+        query = "SELECT * FROM MEDIA_UPLOADS WHERE upload_id = ?"
+        cur = self.con.cursor()
+        cur.execute(query, (upload_id,))
+        row = cur.fetchone()
+        cur.close()
+        return self._create_media_upload_object(row) if row is not None else None
+
+    def get_media_items(self, media_ids):
+        '''
+        Get the data of many media items with a single query (one every MAX_BATCH_PARAMETERS ids).
+
+        :param media_ids: ids of the searched media items (iterable of int)
+
+        :return: dictionary having as keys the ids found and as values the media items in dictionary format as declared in :py:_create_media_item_object.
+        Ids not found are not in the dictionary.
+
+        Note that all values in the returned dictionary are string unless otherwise stated.
+        '''
+        return self._fetch_by_ids("MEDIA_ITEMS", "media_item_id", media_ids, self._create_media_item_object)
+
     def get_last_media_item_id(self):
         '''
         Get id of last media uploaded onto the system
@@ -1368,20 +2430,39 @@ class Connection(object):
         '''
         last_media_id = 0
 
-        query = "SELECT media_item_id FROM MEDIA_ITEMS ORDER BY media_item_id DESC LIMIT 1"
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
+        query = "SELECT MAX(media_item_id) AS media_item_id FROM MEDIA_ITEMS"
         cur = self.con.cursor()
         cur.execute(query)
         row = cur.fetchone()
 
-        if row is not None:
-            last_media_id = row["media_item_id"]
+        if row is not None and row["media_item_id"] is not None:
+            last_media_id = row["media_item_id"]
+        cur.close()
+        return last_media_id
+
+    def get_table_versions(self, tables):
+        '''
+        Get the version counters of some tables. A counter is increased every
+        time a row of its table is inserted, updated or deleted.
+
+        :param tables: names of the tables, in lower case (iterable of str)
+
+        :return: dictionary having as keys the table names and as values their versions (int).
+        Tables without a counter are not in the dictionary.
+        '''
+        tables = list(tables)
+        versions = {}
+        if len(tables) == 0:
+            return versions
+
+        query = "SELECT table_name, version FROM TABLE_VERSIONS WHERE table_name IN (%s)" % ", ".join("?" * len(tables))
+        cur = self.con.cursor()
+        cur.execute(query, tables)
+        for row in cur.fetchall():
+            versions[row["table_name"]] = row["version"]
         cur.close()
-        return last_media_id
+        return versions
+
     def get_conversation(self, conversation_id):
         '''
         Get all information about a conversation
@@ -1397,11 +2478,6 @@ class Connection(object):
         
         conversation = None
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         row = cur.fetchone()
@@ -1425,11 +2501,6 @@ class Connection(object):
         
         group = None
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         row = cur.fetchone()
@@ -1438,37 +2509,37 @@ class Connection(object):
         cur.close()
         return group
     
-    def get_members_for_group(self, group_id):
+    def get_groups_information(self, group_ids):
+        '''
+        Get the information of many groups with a single query (one every MAX_BATCH_PARAMETERS ids).
+
+        :param group_ids: ids of the searched groups (iterable of int)
+
+        :return: dictionary having as keys the ids found and as values the groups in dictionary format as declared in :py:_create_group_object.
+        Ids not found are not in the dictionary.
+
+        Note that all values in the returned dictionary are string unless otherwise stated.
+        '''
+        return self._fetch_by_ids("GROUPS", "group_id", group_ids, self._create_group_object)
+
+    def get_members_for_group(self, group_id, limit_to=None, after=None, before=None):
         '''
         Get the member of the searched group
 
         :param group_id: searched group id (int)
+        :param limit_to: maximum number of memberships returned. If None all of them are returned (int).
+        :param after: sort key (user_id,) of the last item of the previous page: only the memberships following it are returned (tuple).
+        :param before: sort key of the first item of the next page: only the memberships preceding it are returned (tuple).
+            Ignored if after is given.
 
-        :return: array of memberships in dictionary format as declared in :py:_create_members_list_object or None if nothing is found
+        :return: array of memberships in dictionary format as declared in :py:_create_members_list_object or None if nothing is found.
+        They're ordered by user_id.
 
         Note that all values in the returned dictionary are string unless otherwise stated.
         '''
         query = "SELECT * FROM GROUPS_MEMBERS_LISTS WHERE group_id = ?"
         query_parameters = (group_id,)
-        
-        users = None
-        
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
-        cur = self.con.cursor()
-        cur.execute(query, query_parameters)
-        rows = cur.fetchall()
-        if rows is not None:
-            for row in rows:
-                if users is None:
-                    users = []
-                members_list_object = self._create_members_list_object(row)
-                users.append(members_list_object)
-        cur.close()
-        return users
+        return self._fetch_page(query, query_parameters, ("user_id",), False, self._create_members_list_object, limit_to, after, before)
     
     def get_requests_for_group(self, group_id):
         '''
@@ -1485,11 +2556,6 @@ class Connection(object):
         
         requests = None
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         rows = cur.fetchall()
@@ -1502,38 +2568,25 @@ class Connection(object):
         cur.close()
         return requests
     
-    def get_messages_for_conversation(self, conversation_id):
+    def get_messages_for_conversation(self, conversation_id, limit_to=None, after=None, before=None, stream=False):
         '''
         Get the messages of the searched conversation.
 
         :param conversation_id: searched conversation id (int)
+        :param limit_to: maximum number of messages returned. If None all of them are returned (int).
+        :param after: sort key (time_sent, message_id) of the last item of the previous page: only the messages following it are returned (tuple).
+        :param before: sort key of the first item of the next page: only the messages preceding it are returned (tuple).
+            Ignored if after is given.
+        :param stream: if True a generator of the messages is returned, reading them from the database one at a time.
 
         :return: array of messages in dictionary format as declared in :py:_create_message_object or None if nothing is found.
         They're ordered from the most recent to the least recent one.
 
         Note that all values in the returned dictionary are string unless otherwise stated.
         '''
-        query = "SELECT * FROM MESSAGES WHERE conversation_id = ? ORDER BY time_sent DESC"
+        query = "SELECT * FROM MESSAGES WHERE conversation_id = ?"
         query_parameters = (conversation_id,)
-        
-        messages = None
-        
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
-        cur = self.con.cursor()
-        cur.execute(query, query_parameters)
-        rows = cur.fetchall()
-        if rows is not None:
-            for row in rows:
-                if messages is None:
-                    messages = []
-                message_object = self._create_message_object(row)
-                messages.append(message_object)
-        cur.close()
-        return messages
+        return self._fetch_page(query, query_parameters, ("time_sent", "message_id"), True, self._create_message_object, limit_to, after, before, stream)
     
     def get_friendships_for_user(self, user_id):
         '''
@@ -1551,11 +2604,6 @@ class Connection(object):
         
         friendships = None
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         rows = cur.fetchall()        
@@ -1568,84 +2616,46 @@ class Connection(object):
         cur.close()
         return friendships
     
-    def get_statuses_for_user(self, user_id):
+    def get_statuses_for_user(self, user_id, limit_to=None, after=None, before=None, stream=False):
         '''
         Get the statuses of the searched user
 
         :param user_id: searched user id (int)
+        :param limit_to: maximum number of statuses returned. If None all of them are returned (int).
+        :param after: sort key (creation_time, status_id) of the last item of the previous page: only the statuses following it are returned (tuple).
+        :param before: sort key of the first item of the next page: only the statuses preceding it are returned (tuple).
+            Ignored if after is given.
+        :param stream: if True a generator of the statuses is returned, reading them from the database one at a time.
 
         :return: array of statuses in dictionary format as declared in :py:_create_status_object or None if nothing is found.
         They're ordered from the most recent to the least recent one.
 
         Note that all values in the returned dictionary are string unless otherwise stated.
         '''
-        query = "SELECT * FROM STATUSES WHERE creator_id = ? ORDER BY creation_time DESC"
+        query = "SELECT * FROM STATUSES WHERE creator_id = ?"
         query_parameters = (user_id,)
-        
-        statuses = None
-        
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
-        cur = self.con.cursor()
-        cur.execute(query, query_parameters)
-        rows = cur.fetchall()
-        if rows is not None:
-            for row in rows:
-                if statuses is None:
-                    statuses = []
-                status_object = self._create_status_object(row)
-                statuses.append(status_object)
-        cur.close()
-        return statuses
+        return self._fetch_page(query, query_parameters, ("creation_time", "status_id"), True, self._create_status_object, limit_to, after, before, stream)
     
-    def get_statuses_for_group(self, group_id):
+    def get_statuses_for_group(self, group_id, limit_to=None, after=None, before=None, stream=False):
         '''
         Get the statuses of the searched group
 
         :param group_id: searched group id (int)
+        :param limit_to: maximum number of statuses returned. If None all of them are returned (int).
+        :param after: sort key (status_id,) of the last item of the previous page: only the statuses following it are returned (tuple).
+        :param before: sort key of the first item of the next page: only the statuses preceding it are returned (tuple).
+            Ignored if after is given.
+        :param stream: if True a generator of the statuses is returned, reading them from the database one at a time.
 
         :return: array of statuses in dictionary format as declared in :py:_create_status_object or None if nothing is found.
-        They're ordered from the most recent to the least recent one.
+        They're ordered from the most recent to the least recent one (by id).
 
         Note that all values in the returned dictionary are string unless otherwise stated.
         '''
-        query1 = "SELECT status_id FROM GROUPS_STATUSES_LISTS WHERE group_id = ?"
-        query1_parameters = (group_id,)
-        
-        statuses = None
-        
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
-        cur = self.con.cursor()
-        cur.execute(query1, query1_parameters)
-        rows = cur.fetchall()
-        if rows is not None and len(rows) > 0:
-            query2 = "SELECT * FROM STATUSES "
-            query2_parameters = ()
-            for i in range(0, len(rows)):
-                if i == 0:
-                    query2 += "WHERE "
-                status_id = rows[i]["status_id"]
-                query2 += "status_id = ? OR "
-                query2_parameters += (status_id,)
-                query2 = query2[:-3] + "ORDER BY status_id DESC"
-                cur.execute(query2, query2_parameters)
-                results = cur.fetchall()
-                if results is not None:
-                    for result in results:
-                        if statuses is None:
-                            statuses = []
-                    status_object = self._create_status_object(result)
-                    statuses.append(status_object)
-        cur.close()
-        return statuses
-
+        query = "SELECT statuses.status_id, statuses.creator_id, statuses.content, statuses.creation_time FROM GROUPS_STATUSES_LISTS JOIN STATUSES ON STATUSES.status_id = GROUPS_STATUSES_LISTS.status_id WHERE groups_statuses_lists.group_id = ?"
+        query_parameters = (group_id,)
+        return self._fetch_page(query, query_parameters, ("groups_statuses_lists.status_id",), True, self._create_status_object, limit_to, after, before, stream)
+    
     def get_media_for_status(self, status_id):
         '''
         Get the media attached to the searched status.
@@ -1653,42 +2663,13 @@ class Connection(object):
         :param status_id: searched status id (int)
 
         :return: array of media in dictionary format as declared in :py:_create_media_item_object or None if nothing is found.
+        They're ordered by id.
 
         Note that all values in the returned dictionary are string unless otherwise stated.
         '''
-        query1 = "SELECT media_item_id FROM STATUSES_MEDIA_LISTS WHERE status_id = ?"
-        query1_parameters = (status_id,)
-        
-        media = None
-        
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
-        cur = self.con.cursor()
-        cur.execute(query1, query1_parameters)
-        rows = cur.fetchall()
-        if rows is not None and len(rows) > 0:
-            query2 = "SELECT * FROM MEDIA_ITEMS "
-            query2_parameters = ()
-            for i in range(0, len(rows)):
-                if i == 0:
-                    query2 += "WHERE "
-                media_id = rows[i]["media_item_id"]
-                query2 += "media_item_id = ? OR "
-                query2_parameters += (media_id,)
-                query2 = query2[:-3]
-                cur.execute(query2, query2_parameters)
-                results = cur.fetchall()
-                if results is not None:
-                    for result in results:
-                        if media is None:
-                            media = []
-                    media_object = self._create_media_item_object(result)
-                    media.append(media_object)
-        cur.close()
-        return media
+        query = "SELECT media_items.* FROM STATUSES_MEDIA_LISTS JOIN MEDIA_ITEMS ON MEDIA_ITEMS.media_item_id = STATUSES_MEDIA_LISTS.media_item_id WHERE statuses_media_lists.status_id = ?"
+        query_parameters = (status_id,)
+        return self._fetch_page(query, query_parameters, ("statuses_media_lists.media_item_id",), False, self._create_media_item_object)
     
     def get_tagged_users_for_status(self, status_id):
         '''
@@ -1697,75 +2678,32 @@ class Connection(object):
         :param status_id: searched user id (int)
 
         :return: array of users in dictionary format as declared in :py:_create_user_profile_object or None if nothing is found.
+        They're ordered by id.
 
         Note that all values in the returned dictionary are string unless otherwise stated.
         '''
-        query1 = "SELECT user_id FROM STATUSES_TAGS_LISTS WHERE status_id = ?"
-        query1_parameters = (status_id,)
-        
-        tags = None
-        
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
-        cur = self.con.cursor()
-        cur.execute(query1, query1_parameters)
-        rows = cur.fetchall()
-        if rows is not None and len(rows) > 0:
-            query2 = "SELECT * FROM USERS_PROFILES "
-            query2_parameters = ()
-            for i in range(0, len(rows)):
-                if i == 0:
-                    query2 += "WHERE "
-                user_id = rows[i]["user_id"]
-                query2 += "user_id = ? OR "
-                query2_parameters += (user_id,)
-            query2 = query2[:-3]
-            cur.execute(query2, query2_parameters)
-            results = cur.fetchall()
-            if results is not None:
-                for result in results:
-                    if tags is None:
-                        tags = []
-                    user_object = self._create_user_profile_object(result)
-                    tags.append(user_object)
-        cur.close()
-        return tags
+        query = "SELECT users_profiles.* FROM STATUSES_TAGS_LISTS JOIN USERS_PROFILES ON USERS_PROFILES.user_id = STATUSES_TAGS_LISTS.user_id WHERE statuses_tags_lists.status_id = ?"
+        query_parameters = (status_id,)
+        return self._fetch_page(query, query_parameters, ("statuses_tags_lists.user_id",), False, self._create_user_profile_object)
     
-    def get_comments_for_status(self, status_id):
+    def get_comments_for_status(self, status_id, limit_to=None, after=None, before=None):
         '''
         Get the comments for the searched status
 
         :param status_id: searched status id (int)
+        :param limit_to: maximum number of comments returned. If None all of them are returned (int).
+        :param after: sort key (creation_time, comment_id) of the last item of the previous page: only the comments following it are returned (tuple).
+        :param before: sort key of the first item of the next page: only the comments preceding it are returned (tuple).
+            Ignored if after is given.
 
         :return: array of comments in dictionary format as declared in :py:_create_comment_object or None if nothing is found.
         They're ordered from the most recent to the least recent one.
 
         Note that all values in the returned dictionary are string unless otherwise stated.
         '''
-        query = "SELECT * FROM COMMENTS WHERE status_id = ? ORDER BY creation_time DESC"
+        query = "SELECT * FROM COMMENTS WHERE status_id = ?"
         query_parameters = (status_id,)
-	
-        comments = None
-	
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
-        cur = self.con.cursor()	
-        cur.execute(query, query_parameters)
-        rows = cur.fetchall()
-        if rows is not None and len(rows) > 0:
-            for row in rows:
-                if comments is None:
-                    comments = []
-                comment_object = self._create_comment_object(row)
-                comments.append(comment_object)
-        cur.close()
-        return comments
+        return self._fetch_page(query, query_parameters, ("creation_time", "comment_id"), True, self._create_comment_object, limit_to, after, before)
     
     def get_rates_for_status(self, status_id):
         '''
@@ -1782,11 +2720,6 @@ class Connection(object):
 	
         rates = None
 	
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
         cur = self.con.cursor()	
         cur.execute(query, query_parameters)
         rows = cur.fetchall()
@@ -1799,6 +2732,72 @@ class Connection(object):
         cur.close()
         return rates	
     
+    def get_media_for_statuses(self, status_ids):
+        '''
+        Get the media attached to many statuses with one query (every :py:data:`MAX_BATCH_PARAMETERS` statuses).
+
+        :param status_ids: searched status ids (iterable of int)
+
+        :return: dictionary having as keys the ids of the statuses with media and as values the arrays of
+        their media in dictionary format as declared in :py:_create_media_item_object, ordered by id.
+
+        Note that all values in the returned dictionary are string unless otherwise stated.
+        '''
+        query = "SELECT statuses_media_lists.status_id AS group_id, media_items.* FROM STATUSES_MEDIA_LISTS JOIN MEDIA_ITEMS ON MEDIA_ITEMS.media_item_id = STATUSES_MEDIA_LISTS.media_item_id WHERE statuses_media_lists.status_id IN (%s) ORDER BY statuses_media_lists.status_id, statuses_media_lists.media_item_id"
+        return self._fetch_grouped(query, status_ids, self._create_media_item_object)
+
+    def get_tagged_users_for_statuses(self, status_ids):
+        '''
+        Get the users tagged in many statuses with one query (every :py:data:`MAX_BATCH_PARAMETERS` statuses).
+
+        :param status_ids: searched status ids (iterable of int)
+
+        :return: dictionary having as keys the ids of the statuses with tags and as values the arrays of
+        the tagged users in dictionary format as declared in :py:_create_user_profile_object, ordered by id.
+
+        Note that all values in the returned dictionary are string unless otherwise stated.
+        '''
+        query = "SELECT statuses_tags_lists.status_id AS group_id, users_profiles.* FROM STATUSES_TAGS_LISTS JOIN USERS_PROFILES ON USERS_PROFILES.user_id = STATUSES_TAGS_LISTS.user_id WHERE statuses_tags_lists.status_id IN (%s) ORDER BY statuses_tags_lists.status_id, statuses_tags_lists.user_id"
+        return self._fetch_grouped(query, status_ids, self._create_user_profile_object)
+
+    def get_comments_for_statuses(self, status_ids, limit_per_status=None):
+        '''
+        Get the comments of many statuses with one query (every :py:data:`MAX_BATCH_PARAMETERS` statuses).
+
+        :param status_ids: searched status ids (iterable of int)
+        :param limit_per_status: maximum number of comments returned for each status, the most recent ones.
+            If None all of them are returned (int).
+
+        :return: dictionary having as keys the ids of the statuses with comments and as values the arrays of
+        their comments in dictionary format as declared in :py:_create_comment_object, from the most recent one.
+
+        Note that all values in the returned dictionary are string unless otherwise stated.
+        '''
+        if limit_per_status is None:
+            query = "SELECT status_id AS group_id, * FROM COMMENTS WHERE status_id IN (%s) ORDER BY status_id, creation_time DESC, comment_id DESC"
+            query_parameters = ()
+        else:
+            #The latest comments of every status are read from the comments_status_time_idx index
+            query = "SELECT status_id AS group_id, * FROM COMMENTS WHERE status_id IN (%s) AND comment_id IN (SELECT latest.comment_id FROM COMMENTS AS latest WHERE latest.status_id = comments.status_id ORDER BY latest.creation_time DESC, latest.comment_id DESC LIMIT ?) ORDER BY status_id, creation_time DESC, comment_id DESC"
+            query_parameters = (limit_per_status,)
+        return self._fetch_grouped(query, status_ids, self._create_comment_object, query_parameters)
+
+    def get_rates_summary_for_statuses(self, status_ids):
+        '''
+        Get the number and the average value of the rates of many statuses with one query
+        (every :py:data:`MAX_BATCH_PARAMETERS` statuses).
+
+        :param status_ids: searched status ids (iterable of int)
+
+        :return: dictionary having as keys the ids of the rated statuses and as values dictionaries with the keys:
+
+            * ``count``: number of rates of the status (int)
+            * ``average``: average value of the rates (float)
+        '''
+        query = "SELECT status_id AS group_id, COUNT(*) AS count, AVG(rate) AS average FROM RATES WHERE status_id IN (%s) GROUP BY status_id"
+        summaries = self._fetch_grouped(query, status_ids, lambda row: {"count" : row["count"], "average" : row["average"]})
+        return dict((status_id, summary[0]) for status_id, summary in summaries.items())
+
     def get_groups_for_user(self, user_id):
         '''
         Get the groups for which the search user is member
@@ -1814,11 +2813,6 @@ class Connection(object):
         
         memberships = None
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         rows = cur.fetchall()
@@ -1831,38 +2825,24 @@ class Connection(object):
         cur.close()
         return memberships
     
-    def get_conversations_for_user(self, user_id):
+    def get_conversations_for_user(self, user_id, limit_to=None, after=None, before=None):
         '''
         Get the conversations for the searched user
 
         :param user_id: searched user id (int)
+        :param limit_to: maximum number of conversations returned. If None all of them are returned (int).
+        :param after: sort key (time_last_message, conversation_id) of the last item of the previous page: only the conversations following it are returned (tuple).
+        :param before: sort key of the first item of the next page: only the conversations preceding it are returned (tuple).
+            Ignored if after is given.
 
         :return: array of conversations in dictionary format as declared in :py:_create_conversation_object or None if nothing is found.
         They're ordered from the most recent to the least recent one.
 
         Note that all values in the returned dictionary are string unless otherwise stated.
         '''
-        query = "SELECT * FROM CONVERSATIONS WHERE user1_id = ? OR user2_id = ? ORDER BY time_last_message DESC"
+        query = "SELECT * FROM CONVERSATIONS WHERE (user1_id = ? OR user2_id = ?)"
         query_parameters = (user_id, user_id)
-        
-        conversations = None
-        
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
-        cur = self.con.cursor()
-        cur.execute(query, query_parameters)
-        rows = cur.fetchall()
-        if rows is not None:
-            for row in rows:
-                if conversations is None:
-                    conversations = []
-                conversation_object = self._create_conversation_object(row)
-                conversations.append(conversation_object)
-        cur.close()
-        return conversations    
+        return self._fetch_page(query, query_parameters, ("time_last_message", "conversation_id"), True, self._create_conversation_object, limit_to, after, before)
     
     def get_tagged_statuses_for_user(self, user_id):
         '''
@@ -1871,110 +2851,53 @@ class Connection(object):
         :param user_id: searched user id (int)
 
         :return: array of statuses in dictionary format as declared in :py:_create_status_object or None if nothing is found.
-        They're ordered from the most recent to the least recent one.
+        They're ordered from the most recent to the least recent one (by id).
 
         Note that all values in the returned dictionary are string unless otherwise stated.
         '''
-        query1 = "SELECT status_id FROM STATUSES_TAGS_LISTS WHERE user_id = ?"
-        query1_parameters = (user_id,)
-        
-        statuses = None
-        
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
-        cur = self.con.cursor()
-        cur.execute(query1, query1_parameters)
-        rows = cur.fetchall()
-        if rows is not None and len(rows) > 0:
-            query2 = "SELECT * FROM STATUSES "
-            query2_parameters = ()
-            for i in range(0, len(rows)):
-                if i == 0:
-                    query2 += "WHERE "
-                status_id = rows[i]["status_id"]
-                query2 += "status_id = ? OR "
-                query2_parameters += (status_id,)
-            query2 = query2[:-3] + "ORDER BY status_id DESC"
-            cur.execute(query2, query2_parameters)
-            results = cur.fetchall()
-            if results is not None:
-                for result in results:
-                    if statuses is None:
-                        statuses = []
-                    status_object = self._create_status_object(result)
-                    statuses.append(status_object)
-        cur.close()
-        return statuses
+        query = "SELECT statuses.* FROM STATUSES_TAGS_LISTS JOIN STATUSES ON STATUSES.status_id = STATUSES_TAGS_LISTS.status_id WHERE statuses_tags_lists.user_id = ?"
+        query_parameters = (user_id,)
+        return self._fetch_page(query, query_parameters, ("statuses_tags_lists.status_id",), True, self._create_status_object)
     
-    def get_comments_for_user(self, user_id):
+    def get_comments_for_user(self, user_id, limit_to=None, after=None, before=None):
         '''
         Get the comments the searched user has posted
 
         :param user_id: searched user id (int)
+        :param limit_to: maximum number of comments returned. If None all of them are returned (int).
+        :param after: sort key (creation_time, comment_id) of the last item of the previous page: only the comments following it are returned (tuple).
+        :param before: sort key of the first item of the next page: only the comments preceding it are returned (tuple).
+            Ignored if after is given.
 
         :return: array of comments in dictionary format as declared in :py:_create_comment_object or None if nothing is found.
         They're ordered from the most recent to the least recent one.
 
         Note that all values in the returned dictionary are string unless otherwise stated.
         '''
-        query = "SELECT * FROM COMMENTS WHERE user_id = ? ORDER BY creation_time DESC"
+        query = "SELECT * FROM COMMENTS WHERE user_id = ?"
         query_parameters = (user_id,)
-        
-        comments = None
-        
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
-        cur = self.con.cursor()
-        cur.execute(query, query_parameters)
-        rows = cur.fetchall()
-        if rows is not None:
-            for row in rows:
-                if comments is None:
-                    comments = []
-                comment_object = self._create_comment_object(row)
-                comments.append(comment_object)
-        cur.close()
-        return comments
+        return self._fetch_page(query, query_parameters, ("creation_time", "comment_id"), True, self._create_comment_object, limit_to, after, before)
     
-    def get_rates_for_user(self, user_id):
+    def get_rates_for_user(self, user_id, limit_to=None, after=None, before=None):
         '''
         Get the rates the searched user has given
 
         :param user_id: searched user id (int)
+        :param limit_to: maximum number of rates returned. If None all of them are returned (int).
+        :param after: sort key (rate_id,) of the last item of the previous page: only the rates following it are returned (tuple).
+        :param before: sort key of the first item of the next page: only the rates preceding it are returned (tuple).
+            Ignored if after is given.
 
         :return: array of rates in dictionary format as declared in :py:_create_rate_object or None if nothing is found.
+        They're ordered by rate_id.
 
         Note that all values in the returned dictionary are string unless otherwise stated.
         '''
         query = "SELECT * FROM RATES WHERE user_id = ?"
         query_parameters = (user_id,)
-                
-        rates = None
-        
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
-        cur = self.con.cursor()
-        cur.execute(query, query_parameters)
-        rows = cur.fetchall()
-        if rows is not None:
-            for row in rows:
-                if rates is None:
-                    rates = []
-                rate_object = self._create_rate_object(row)
-                rates.append(rate_object)
-        cur.close()
-        return rates        
+        return self._fetch_page(query, query_parameters, ("rate_id",), False, self._create_rate_object, limit_to, after, before)
     
-    def get_friends_statuses_for_user(self, user_id, limit_to = 100):
+    def get_friends_statuses_for_user(self, user_id, limit_to = 100, after=None, before=None, stream=False):
         '''
         Get (at most) the most 1000 recent statuses (from most to least recent) posted by a user's friends on his own profile (not in a group).
         
@@ -1983,53 +2906,24 @@ class Connection(object):
         :param limit_to: The maximum number of statuses that can be returned. Default value is 100.  (int).
         
         -limit_to, if negative, means no limit
+
+        :param after: sort key (creation_time, status_id) of the last item of the previous page: only the statuses following it are returned (tuple).
+        :param before: sort key of the first item of the next page: only the statuses preceding it are returned (tuple).
+            Ignored if after is given.
+        :param stream: if True a generator of the statuses is returned, reading them from the database one at a time.
         
         :return: array of statuses in dictionary format as declared in :py:_create_status_object or None if nothing is found.
         
+        Statuses are read from the feed inbox of the user (FEED_ENTRIES table), which is kept up to date by
+        triggers when statuses are posted or deleted and when friendships are accepted or deleted.
+
         Note that all values in the returned dictionary are string unless otherwise stated.
         '''
-        user_friendships = self.get_friendships_for_user(user_id)	    #Get all the user's friends
-        
-        statuses = None
-        
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str	    
-        cur = self.con.cursor()	
-        
-        if user_friendships is not None and len(user_friendships) > 0:	    #If user has at least one friend or has sent/received a friendship request not yet accepted
-            
-            user_friendships = [friendship for friendship in user_friendships if friendship["friendship_status"] == 1] #Filter the result taking only the existing (accepted) friendships
-            query = "SELECT statuses.status_id, statuses.creator_id, statuses.content, statuses.creation_time FROM STATUSES LEFT JOIN GROUPS_STATUSES_LISTS ON STATUSES.status_id = GROUPS_STATUSES_LISTS.status_id WHERE "
-            query_parameters = ()
-            for i in range(0, len(user_friendships)):
-                if i == 0:
-                    query += "("			#Add round parentesis in order to avoid logical operators problems since AND (later in query) has higher priority than OR, if any
-                friendship = user_friendships[i]
-                user1_id = friendship["user1_id"]
-                user2_id = friendship["user2_id"]
-                friend_id = user1_id if user2_id == user_id else user2_id	    #Take the id of the other user (not the user passed as parameter) in the friendship
-                query += "statuses.creator_id = ? OR "
-                query_parameters += (friend_id,)
-                if i == len(user_friendships) -	1:	    #If it's the last loop iteration, then finalize the query (removing the "OR" put at every loop step)
-                    query = query[:-4] + ") "
-            if len(user_friendships) > 0:		    #If at least one condition has been added to the query
-                query += "AND "
-            query += "groups_statuses_lists.group_id IS NULL ORDER BY statuses.creation_time DESC LIMIT ?"	    #We exclude the statuses that have been posted in groups and set the upper limit to the number of results and the inverse order so that first ones are the most recent ones
-            query_parameters += (limit_to,)
-            cur.execute(query, query_parameters)
-            rows = cur.fetchall()
-            if rows is not None:
-                for row in rows:
-                    if statuses is None:
-                        statuses = []
-                    status_object = self._create_status_object(row)
-                    statuses.append(status_object)
-        cur.close()
-        return statuses  
-	 
+        query = "SELECT statuses.status_id, statuses.creator_id, statuses.content, statuses.creation_time FROM FEED_ENTRIES JOIN STATUSES ON STATUSES.status_id = FEED_ENTRIES.status_id WHERE feed_entries.user_id = ?"
+        query_parameters = (user_id,)
+        if limit_to is not None and limit_to < 0:
+            limit_to = None
+        return self._fetch_page(query, query_parameters, ("feed_entries.creation_time", "feed_entries.status_id"), True, self._create_status_object, limit_to, after, before, stream)
     
     def update_user(self, user_id, values):                        #Update user's values (only the ones allowed)
         '''
@@ -2052,11 +2946,6 @@ class Connection(object):
 	
         :return: True if element has been updated correctly, False otherwise.
         '''
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         
         result = self.get_user_information(user_id) is not None
@@ -2111,11 +3000,6 @@ class Connection(object):
         
         result = False        
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         if cur.rowcount >= 1:
@@ -2140,11 +3024,6 @@ class Connection(object):
 	
 	:return: True if element has been updated correctly, False otherwise.
 	'''
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         
         result = False
@@ -2193,11 +3072,6 @@ class Connection(object):
         
         result = False
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query1, query1_parameters)
         row = cur.fetchone()
@@ -2231,11 +3105,6 @@ class Connection(object):
         
         result = False
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         if cur.rowcount >= 1:
@@ -2259,11 +3128,6 @@ class Connection(object):
         
         result = False
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         if cur.rowcount >= 1:
@@ -2287,11 +3151,6 @@ class Connection(object):
         
         result = False
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         if cur.rowcount >= 1:
@@ -2315,11 +3174,6 @@ class Connection(object):
         
         result = False
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         try:
             cur.execute(query, query_parameters)
@@ -2347,11 +3201,6 @@ class Connection(object):
         
         result = False
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         if cur.rowcount >= 1:
@@ -2374,11 +3223,6 @@ class Connection(object):
 
         result = False
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         if cur.rowcount >= 1:
@@ -2400,11 +3244,6 @@ class Connection(object):
         
         result = False
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         if cur.rowcount >= 1:
@@ -2413,6 +3252,91 @@ class Connection(object):
         cur.close()
         return result        
     
+    def delete_unreferenced_media_blob(self, content_hash):
+        '''
+        Delete a blob if no media item uses it anymore. Its file has to be removed
+        by the caller, before committing if the call is in a :py:meth:`transaction`,
+        so that no new reference can be added in between.
+
+        :param content_hash: hash of the blob (str)
+
+        :return: True if the blob has been deleted, False if it is still referenced or doesn't exist.
+        '''
+        query = "DELETE FROM MEDIA_BLOBS WHERE content_hash = ? AND references_count <= 0"
+        query_parameters = (content_hash,)
+
+        result = False
+
+        cur = self.con.cursor()
+        cur.execute(query, query_parameters)
+        if cur.rowcount >= 1:
+            result = True
+            self.con.commit()
+        cur.close()
+        return result
+
+    def delete_media_upload(self, upload_id):
+        '''
+        Delete a resumable upload, when it is completed or given up. Its file has to be
+        removed by the caller.
+
+        :param upload_id: id of the upload (str)
+
+        :return: True if the upload has been deleted, False if it doesn't exist (anymore).
+        '''
+        query = "DELETE FROM MEDIA_UPLOADS WHERE upload_id = ?"
+        query_parameters = (upload_id,)
+
+        result = False
+
+        cur = self.con.cursor()
+        cur.execute(query, query_parameters)
+        if cur.rowcount >= 1:
+            result = True
+            self.con.commit()
+        cur.close()
+        return result
+
+    def delete_expired_media_uploads(self, creation_time):
+        '''
+        Delete the resumable uploads started before a given time. Their files have to be
+        removed by the caller.
+
+        :param creation_time: time (long, milliseconds) before which the uploads have expired.
+
+        :return: list with the ids of the uploads deleted.
+        '''
+        query = "SELECT upload_id FROM MEDIA_UPLOADS WHERE creation_time < ?"
+        query_parameters = (creation_time,)
+
+        cur = self.con.cursor()
+        cur.execute(query, query_parameters)
+        upload_ids = [row["upload_id"] for row in cur.fetchall()]
+        if upload_ids:
+            cur.execute("DELETE FROM MEDIA_UPLOADS WHERE creation_time < ?", query_parameters)
+            self.con.commit()
+        cur.close()
+        return upload_ids
+
+    def delete_expired_revoked_tokens(self, expiration):
+        '''
+        Forget the revocations of the tokens which have expired: they are refused anyway.
+
+        :param expiration: time (long, seconds since the epoch) before which the tokens have expired.
+
+        :return: number of revocations deleted.
+        '''
+        query = "DELETE FROM REVOKED_TOKENS WHERE expiration < ?"
+        query_parameters = (expiration,)
+
+        cur = self.con.cursor()
+        cur.execute(query, query_parameters)
+        result = cur.rowcount
+        if result > 0:
+            self.con.commit()
+        cur.close()
+        return result
+
     def delete_group(self, group_id):
 	'''
 	Delete a group.
@@ -2426,11 +3350,6 @@ class Connection(object):
         
         result = False
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         if cur.rowcount >= 1:
@@ -2454,11 +3373,6 @@ class Connection(object):
         
         result = False
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         if cur.rowcount >= 1:
@@ -2482,11 +3396,6 @@ class Connection(object):
         
         result = False
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         if cur.rowcount >= 1:
@@ -2510,11 +3419,6 @@ class Connection(object):
         
         result = False
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         if cur.rowcount >= 1:
@@ -2537,11 +3441,6 @@ class Connection(object):
         
         result = False
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         if cur.rowcount >= 1:
@@ -2563,11 +3462,6 @@ class Connection(object):
         
         result = False
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         if cur.rowcount >= 1:
@@ -2591,11 +3485,6 @@ class Connection(object):
         
         result = False
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         if cur.rowcount >= 1:
@@ -2617,11 +3506,6 @@ class Connection(object):
         
         result = False
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         if cur.rowcount >= 1:
@@ -2645,11 +3529,6 @@ class Connection(object):
         
         result = False
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         if cur.rowcount >= 1:
@@ -2671,11 +3550,6 @@ class Connection(object):
         
         result = False
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         if cur.rowcount >= 1:
@@ -2697,15 +3571,27 @@ class Connection(object):
         
         result = False
         
-        #Activate foreign key support
-        self.set_foreign_keys_support()
-        #Cursor and row initialization
-        self.con.row_factory = sqlite3.Row 
-        self.con.text_factory = str
         cur = self.con.cursor()
         cur.execute(query, query_parameters)
         if cur.rowcount >= 1:
             result = True
             self.con.commit()
         cur.close()
-        return result
\ No newline at end of file
+        return result
+
+if __name__ == "__main__":
+    #Command line tool to upgrade an existing database file:
+    #python -m friendsNet.database migrate [database path]
+    #python -m friendsNet.database version [database path]
+    import sys
+    if len(sys.argv) < 2 or sys.argv[1] not in ("migrate", "version"):
+        print "Usage: python -m friendsNet.database migrate|version [database path]"
+        sys.exit(2)
+    engine = Engine(sys.argv[2] if len(sys.argv) > 2 else None)
+    if sys.argv[1] == "migrate":
+        applied = engine.migrate()
+        if applied:
+            print "Applied migrations: %s" % ", ".join(str(version) for version in applied)
+        else:
+            print "Database already up to date"
+    print "Schema version of %s: %s" % (engine.db_path, engine.get_schema_version())
@@ -0,0 +1,119 @@
+'''
+Downscaled variants of the uploaded images.
+
+Clients showing an image in a list (a profile picture in the users search, a
+thumbnail in the feed) don't need the original. :py:class:`DerivativePipeline`
+generates, once per distinct content, the JPEG variants listed in
+:py:data:`VARIANTS` on a pool of worker processes, so that neither the
+decoding nor the resizing run in the request threads.
+
+Pillow is optional: without it the pipeline is disabled and the original is
+always served.
+'''
+import os
+import functools
+import threading
+import traceback
+import multiprocessing
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+VARIANTS = (("thumb", 64), ("medium", 640))     #Name and longest side in pixels of the variants
+JPEG_QUALITY = 85
+DEFAULT_PROCESSES = 2                           #Worker processes of a pipeline
+
+def is_available():
+    '''
+    :return: True if the variants can be generated (Pillow is installed).
+    '''
+    return Image is not None
+
+def generate_variants(source_path, targets):
+    '''
+    Write the JPEG variants of an image. It runs in the worker processes.
+
+    Variants whose longest side is not smaller than the one of the original
+    are not written: the original is served in their place.
+
+    :param source_path: file of the original image.
+    :param targets: list of (variant name, longest side in pixels, path of the variant).
+    :return: list of dictionaries {"variant", "width", "height", "size"} of the variants written.
+    '''
+    image = Image.open(source_path)
+    image.load()
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    variants = []
+    for name, longest_side, path in targets:
+        if max(image.size) <= longest_side:
+            continue
+        variant = image.copy()
+        variant.thumbnail((longest_side, longest_side), Image.ANTIALIAS)
+        temporary_path = path + ".tmp"
+        variant.save(temporary_path, "JPEG", quality = JPEG_QUALITY, optimize = True)
+        os.rename(temporary_path, path)         #Never served half written
+        variants.append({"variant" : name, "width" : variant.size[0], "height" : variant.size[1], "size" : os.path.getsize(path)})
+    return variants
+
+class DerivativePipeline(object):
+    '''
+    Pool of worker processes generating the variants of the uploaded images.
+
+    :Example:
+
+    pipeline = DerivativePipeline(record)
+    pipeline.submit(content_hash, source_path, targets)    #record(content_hash, variants) is called when they are ready
+
+    :param record: function called with (content hash, list of variants as
+        returned by :py:func:`generate_variants`) once the variants of an image
+        have been written. It runs in a thread of the calling process, not in
+        the request threads.
+    :type record: function
+    :param processes: number of worker processes, started with the first
+        image submitted. With 0 the pipeline is disabled.
+    :type processes: int
+    '''
+    def __init__(self, record, processes = DEFAULT_PROCESSES):
+        super(DerivativePipeline, self).__init__()
+        self.record = record
+        self.processes = processes
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.processes > 0 and is_available()
+
+    def submit(self, content_hash, source_path, targets):
+        '''
+        Queue the generation of the variants of an image.
+
+        :return: the :py:class:`multiprocessing.pool.AsyncResult` of the
+            generation, or None if the pipeline is disabled.
+        '''
+        if not self.enabled:
+            return None
+        with self._lock:
+            if self._pool is None:
+                self._pool = multiprocessing.Pool(self.processes)
+            pool = self._pool
+        return pool.apply_async(generate_variants, (source_path, targets), callback = functools.partial(self._generated, content_hash))
+
+    def _generated(self, content_hash, variants):
+        try:
+            self.record(content_hash, variants)
+        except Exception:
+            traceback.print_exc()               #An exception would stop the thread delivering the results of the pool
+
+    def close(self):
+        '''
+        Wait for the images already submitted and stop the worker processes.
+        '''
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+            pool.join()
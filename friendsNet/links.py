@@ -0,0 +1,94 @@
+'''
+Builds the urls of the links contained in the friendsNet representations.
+
+:py:func:`flask.url_for` runs the whole Werkzeug url building for every link,
+while collections have several links for each item. :py:class:`LinkBuilder`
+compiles once the route of every endpoint into a format template which is
+then filled with the ids of the link.
+'''
+from flask import has_request_context, request
+from werkzeug.routing import parse_rule
+from werkzeug.urls import url_quote
+
+class LinkBuilder(object):
+    '''
+    Fast replacement of :py:meth:`flask_restful.Api.url_for` for the links of
+    the representations.
+
+    Routes whose variables are all ``int`` are compiled by :py:meth:`compile`
+    into templates; urls of those endpoints are then built with a single string
+    formatting when all the values are integers. Any other url (other
+    converters, values which are not integers, query parameters, urls built
+    outside of a request) is built by :py:meth:`flask_restful.Api.url_for`, so
+    the result is always the same.
+
+    :Example:
+
+    link_builder = LinkBuilder(api)
+    #... api.add_resource(...) ...
+    link_builder.compile()
+    link_builder.url_for(Status, status_id = 1)       #"/friendsNet/api/statuses/1/"
+
+    :param api: the API whose resources are linked.
+    :type api: flask_restful.Api
+    '''
+    def __init__(self, api):
+        super(LinkBuilder, self).__init__()
+        self.api = api
+        self._templates = {}            #endpoint -> (template, names of the variables in order)
+
+    def compile(self):
+        '''
+        Compile the routes of all the endpoints of the application. It has to be
+        called once all the resources have been added to the API.
+        '''
+        rules = {}
+        for rule in self.api.app.url_map.iter_rules():
+            rules.setdefault(rule.endpoint, []).append(rule)
+        templates = {}
+        for endpoint, endpoint_rules in rules.items():
+            if len(endpoint_rules) == 1:                #With more routes url_for chooses among them depending on the values
+                template = self._compile_rule(endpoint_rules[0])
+                if template is not None:
+                    templates[endpoint] = template
+        self._templates = templates
+
+    def _compile_rule(self, rule):
+        '''
+        :return: (template, names of the variables) of the rule, or None if it
+            can't be built just formatting integers.
+        '''
+        if rule.defaults or rule.build_only or rule.subdomain or rule.host:
+            return None
+        parts = []
+        variables = []
+        for converter, arguments, variable in parse_rule(rule.rule):
+            if converter is None:
+                if url_quote(variable, safe = "/:") != variable:
+                    return None
+                parts.append(variable.replace("%", "%%"))
+            elif converter == "int" and not arguments:
+                parts.append("%d")
+                variables.append(variable)
+            else:
+                return None
+        return "".join(parts), tuple(variables)
+
+    def url_for(self, resource, **values):
+        '''
+        Build the url of a resource, as :py:meth:`flask_restful.Api.url_for` does.
+
+        :param resource: class of the linked resource.
+        :param values: values of the variables of the route.
+        :return: the url (str).
+        '''
+        template = self._templates.get(resource.endpoint, None)
+        if template is not None and len(values) == len(template[1]) and has_request_context():
+            path, variables = template
+            try:
+                ids = tuple(values[name] for name in variables)
+            except KeyError:
+                ids = None
+            if ids is not None and all(type(value) in (int, long) for value in ids):
+                return request.script_root + path % ids
+        return self.api.url_for(resource, **values)
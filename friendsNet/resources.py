@@ -1,12 +1,31 @@
 import json
-
-from flask import Flask, request, Response, g, jsonify, _request_ctx_stack, redirect, send_from_directory
+import base64
+import hashlib
+import functools
+import itertools
+import contextlib
+import zlib
+import uuid
+import time
+import threading
+import datetime
+
+from flask import Flask, request, Response, g, _request_ctx_stack, redirect, safe_join, stream_with_context
 from itsdangerous import (TimedJSONWebSignatureSerializer as Serializer, BadSignature)
 from flask.ext.restful import Resource, Api
 from werkzeug.utils import secure_filename
+from werkzeug.wsgi import wrap_file
+from werkzeug.exceptions import NotFound
+from werkzeug.http import is_resource_modified, parse_content_range_header
 import os
 
 import database
+from links import LinkBuilder
+from compact import CompactEncoder
+from compression import CompressionMiddleware
+from tokens import TokenCache, DEFAULT_SIZE as DEFAULT_TOKEN_CACHE_SIZE
+from storage import BlobStorage, UploadOffsetError, remove as remove_file
+from derivatives import DerivativePipeline, VARIANTS as DERIVATIVE_VARIANTS, DEFAULT_PROCESSES as DEFAULT_DERIVATIVE_PROCESSES
 
 ################################################### CONSTANTS ###################################################
 
@@ -14,6 +33,7 @@ COLLECTION_JSON = "application/vnd.collection+json"
 HAL_JSON = "application/hal+json"
 MULTI_PART = "multipart/form-data"
 JSON = "application/json"
+COMPACT_VIEW = "view=compact"       #Media type parameter asking (and marking) the compact representation of the collections
 
 API_VERSION = "1.0"
 
@@ -36,14 +56,79 @@ ALLOWED_EXTENSIONS = {"jpg", "mp4"}
 ALLOWED_RETURNED_TYPES = {"jpg" : "image/jpg", "mp4" : "video/mp4"}
 
 MULTIPART_FILE_KEY = "new media item"
+OCTET_STREAM = "application/octet-stream"       #Content type of the chunks of a resumable upload
+UPLOAD_OFFSET_HEADER = "Upload-Offset"          #Bytes of a resumable upload received so far, in the responses about it
+MAX_MEDIA_UPLOAD_SIZE = 1024 * 1024 * 1024      #Greatest size of a file sent with a resumable upload
+MEDIA_UPLOAD_LIFETIME = 24 * 3600               #Seconds a resumable upload can take, before it is swept away with its file
+MAX_MEDIA_UPLOADS = 100                         #Resumable uploads which can be in progress at the same time
+MEDIA_BLOBS_FOLDER = "blobs"    #Subfolder of the uploads folder with the content-addressed files (see storage.BlobStorage)
+MEDIA_CACHE_MAX_AGE = 365 * 24 * 3600      #Seconds clients can keep the data of a media item: it never changes under the same url
+MEDIA_FALLBACK_MAX_AGE = 60                 #Seconds clients can keep the original sent in place of a variant not generated yet
+MEDIA_RANGE_CHUNK_SIZE = 64 * 1024          #Bytes read at a time from a file when sending part of it
+FULL_MEDIA_SIZE = "full"                    #Size of the original file, the other ones are its variants (see derivatives.VARIANTS)
+MEDIA_SIZES = [name for name, longest_side in DERIVATIVE_VARIANTS] + [FULL_MEDIA_SIZE]
+
+DEFAULT_PAGE_SIZE = 50          #Items in a page of a collection when the client doesn't ask for a limit
+MAX_PAGE_SIZE = 100             #Greatest limit a client can ask for
+DEFAULT_EMBEDDED_COMMENTS = 3   #Comments embedded in each status for "?embed=comments" without a count
+MIN_SORT_KEY_VALUE = -2 ** 63  #Values of a cursor must be integers which sqlite can store
+MAX_SORT_KEY_VALUE = 2 ** 63 - 1
+COMPACT_BATCH_SIZE = 25         #Items of a streamed collection encoded together in the compact representation
+MAX_BATCH_REQUESTS = 50         #Sub-requests a client can send in one batch request
+AUTH_TOKEN_LIFETIME = 30 * 24 * 3600      #Seconds an authentication token is valid, also for tokens signed with a longer one
+
+API_PATH_PREFIX = "/friendsNet/api/"
+BATCH_METHODS = {"GET", "POST", "PUT", "DELETE"}
+BATCH_ENVIRON_KEY = "friendsNet.batch"      #Marks the environ of the sub-requests of a batch, which share the connection of the batch request
+################################################### JSON SERIALIZATION ###################################################
+
+# Encoders which can serialize the responses, fastest first. Each entry is (name, loader): the loader returns the
+# encoding function or raises ImportError if the package is not installed.
+def load_ujson():
+    import ujson
+    return lambda obj: ujson.dumps(obj, escape_forward_slashes = False)
+
+def load_simplejson():
+    import simplejson
+    if not simplejson._import_c_make_encoder():            #Without its C extension simplejson is slower than json
+        raise ImportError("simplejson C speedups not available")
+    return simplejson.dumps
+
+def load_json():
+    return json.dumps
+
+JSON_BACKENDS = [("ujson", load_ujson), ("simplejson", load_simplejson), ("json", load_json)]
+
+# Return (name, encoding function) of the first backend which can be loaded, among the given names if any
+def select_json_backend(names = None):
+    for name, loader in JSON_BACKENDS:
+        if names is not None and name not in names:
+            continue
+        try:
+            return name, loader()
+        except ImportError:
+            pass
+    raise ValueError("No JSON backend available among %s" % (names,))
+
+#All the response bodies are serialized by dumps(). Cursors are not: they must be the same with any backend.
+JSON_BACKEND, dumps = select_json_backend()
+compact_encoder = CompactEncoder(dumps)
+
 ################################################### SETTINGS ###################################################
 
 #Define the application and the api
 app = Flask(__name__, static_folder = MEDIA_SAVING_FOLDER, static_url_path = "/friendsNet/")
+#The objects configured below (the database Engine, the compression of the responses, the token serializer and cache, the
+#derivative pipeline) are built from app.config the first time they are needed (see built_once): the settings can be changed
+#after importing this module, until the first request.
 # Set the database Engine. In order to modify the database file (e.g. for
 # testing) provide the database path app.config to modify the
-#database to be used (for instance for testing)
-app.config.update({"Engine": database.Engine()})
+#database to be used (for instance for testing). With None it is built from DATABASE_PROFILE and DATABASE_RECORDS (see get_engine)
+#DATABASE_PROFILE overrides the PRAGMA settings applied to every pooled connection (see database.DEFAULT_CONNECTION_PROFILE)
+app.config.update({"DATABASE_PROFILE" : {}})
+#DATABASE_RECORDS makes the connections return read only records instead of dictionaries (see database.Record)
+app.config.update({"DATABASE_RECORDS" : False})
+app.config.update({"Engine": None})
 
 #Set allowed extensions for uploaded media
 app.config.update({"ALLOWED_EXTENSIONS" : ALLOWED_EXTENSIONS})
@@ -51,9 +136,68 @@ app.config.update({"ALLOWED_EXTENSIONS" : ALLOWED_EXTENSIONS})
 #Set secret key to generate tokens
 app.config.update({"SECRET_KEY" : "?mIsunderSt@ndings!"})
 
-app.config.update({"LAST_MEDIA_ITEM_ID" : -1})
+#Verified authentication tokens kept in memory (see tokens.TokenCache)
+app.config.update({"AUTH_TOKEN_CACHE_SIZE" : DEFAULT_TOKEN_CACHE_SIZE})
+
+#Folder of the files of the uploaded media, one for each distinct content
+app.config.update({"MEDIA_BLOBS_FOLDER" : os.path.join(app.static_folder, MEDIA_BLOBS_FOLDER)})
+
+#Greatest size of a file sent with a resumable upload, lifetime of the uploads and how many can be in progress (see Media_uploads)
+app.config.update({"MAX_MEDIA_UPLOAD_SIZE" : MAX_MEDIA_UPLOAD_SIZE, "MEDIA_UPLOAD_LIFETIME" : MEDIA_UPLOAD_LIFETIME, "MAX_MEDIA_UPLOADS" : MAX_MEDIA_UPLOADS})
+
+#Worker processes generating the variants of the uploaded images (see derivatives.DerivativePipeline), 0 disables them
+app.config.update({"DERIVATIVE_PROCESSES" : DEFAULT_DERIVATIVE_PROCESSES})
+
+#Name of the JSON encoder serializing the responses (see JSON_BACKENDS)
+app.config.update({"JSON_BACKEND" : JSON_BACKEND})
+
+#Set pagination of collections
+app.config.update({"DEFAULT_PAGE_SIZE" : DEFAULT_PAGE_SIZE, "MAX_PAGE_SIZE" : MAX_PAGE_SIZE})
+
+#When True, responses tell in a header how many queries the identity map of the request saved
+app.config.update({"IDENTITY_MAP_DEBUG" : False})
+
+#Compression of the responses (see compression.CompressionMiddleware). Its counters are in get_compression().stats
+app.config.update({"COMPRESSION_MIN_SIZE" : 1024, "COMPRESSION_LEVEL" : 6, "COMPRESSION_CACHE_SIZE" : 8 * 1024 * 1024})
+
+setup_lock = threading.RLock()
+
+# Decorator of the functions building an object from app.config: the object is built the first time the function is called, and
+# the same object is returned afterwards. setup_lock makes sure that concurrent first requests build it only once
+def built_once(build):
+    built = []
+    @functools.wraps(build)
+    def wrapper():
+        if not built:
+            with setup_lock:
+                if not built:
+                    built.append(build())
+        return built[0]
+    return wrapper
+
+# The Engine set in app.config, built from DATABASE_PROFILE and DATABASE_RECORDS if none has been set
+def get_engine():
+    if app.config["Engine"] is None:
+        with setup_lock:
+            if app.config["Engine"] is None:
+                app.config["Engine"] = database.Engine(profile = app.config["DATABASE_PROFILE"], records = app.config["DATABASE_RECORDS"])
+    return app.config["Engine"]
+
+flask_wsgi_app = app.wsgi_app
+
+@built_once
+def get_compression():
+    return CompressionMiddleware(flask_wsgi_app, min_size = app.config["COMPRESSION_MIN_SIZE"], level = app.config["COMPRESSION_LEVEL"],
+                                 cache_size = app.config["COMPRESSION_CACHE_SIZE"])
+
+def compress_responses(environ, start_response):
+    return get_compression()(environ, start_response)
+
+app.wsgi_app = compress_responses
 #Start the RESTful API.
 api = Api(app)
+#Urls of the links in the representations (routes are compiled once all the resources are added)
+link_builder = LinkBuilder(api)
 
 #Redirect profile
 @app.route('/profiles/<profile_name>/')
@@ -84,18 +228,14 @@ def create_error_response(status_code, title, message, resp_type = COLLECTION_JS
                     "error" : {"code" : status_code, "title" : title, "message" : message}
                 }
             }
-            resp = jsonify(resp)
-            resp.status_code = status_code
-            resp.content_type = COLLECTION_JSON
+            resp = Response(dumps(resp), status_code, mimetype = COLLECTION_JSON)
         elif resp_type == HAL_JSON:
             resp = {"code" : status_code,
                     "title" : title,
                     "message" : message,
                     "resource_url" : href
                     }
-            resp = jsonify(resp)
-            resp.status_code = status_code
-            resp.content_type = HAL_JSON
+            resp = Response(dumps(resp), status_code, mimetype = HAL_JSON)
     return resp
 
 def bad_request(parameter_name = "Parameter"):
@@ -113,6 +253,14 @@ def resource_not_found(parameter_name = "Parameter", resp_type = COLLECTION_JSON
 def double_resource_attribute(parameter_name = "Resource"):
     return create_error_response(status_code = 409, title = parameter_name + " double.", message = parameter_name + " already present in the system.")
 
+def upload_offset_conflict(offset):
+    resp = create_error_response(status_code = 409, title = "Wrong upload offset.", message = "The upload has received " + str(offset) + " bytes. Please continue from there.")
+    resp.headers[UPLOAD_OFFSET_HEADER] = str(offset)
+    return resp
+
+def too_many_uploads():
+    return create_error_response(status_code = 503, title = "Too many uploads.", message = "Too many uploads are in progress. Please try again later.")
+
 def unsupported_media_type():
     ERROR_415 = {"code" : 415, "title" : "Error in request body format.", "message" : "Server cannot understand format of request body."}
     return create_error_response(status_code = ERROR_415["code"], title = ERROR_415["title"], message = ERROR_415["message"])
@@ -154,47 +302,571 @@ def get_file_name(url):
     name = parts[len(parts) - 1]
     return name
 
+def get_blob_storage():
+    return BlobStorage(app.config["MEDIA_BLOBS_FOLDER"])
+
+# Block of writes committed together: the transaction already open (e.g. the one of an atomic batch) if the request runs in one,
+# a new one otherwise. Effects on the files which can't be rolled back go to g.con.after_commit, so that they follow the outermost commit
+@contextlib.contextmanager
+def atomic():
+    if g.con.is_in_transaction():
+        yield
+    else:
+        with g.con.transaction():
+            yield
+
+# Remove the file of a blob once the deletion of its last reference has been committed. It runs in a transaction of its own, which
+# takes the write lock with its first statement, so that an upload adding the same content back can't run in between
+def remove_blob_file(con, content_hash):
+    with con.transaction():
+        con.delete_unreferenced_media_blob(content_hash)
+        if con.get_media_blob(content_hash) is None:
+            get_blob_storage().remove(content_hash)
+
+# Called by the derivative pipeline once the variants of an image have been written, out of any request: it uses its own
+# connection. If the blob has been deleted in the meanwhile, the files of the variants are removed too
+def record_derivatives(content_hash, variants):
+    con = get_engine().connect()
+    try:
+        if not con.create_media_derivatives(content_hash, variants):
+            get_blob_storage().remove_derivatives(content_hash)
+    finally:
+        con.close()
+
+@built_once
+def get_derivative_pipeline():
+    return DerivativePipeline(record_derivatives, app.config["DERIVATIVE_PROCESSES"])
+
+# Queue the generation of the variants of the image stored in a blob. Return the AsyncResult, or None if the pipeline is disabled
+def generate_derivatives(content_hash):
+    storage = get_blob_storage()
+    targets = [(name, longest_side, storage.derivative_path_for(content_hash, name)) for name, longest_side in DERIVATIVE_VARIANTS]
+    return get_derivative_pipeline().submit(content_hash, storage.path_for(content_hash), targets)
+
+# Url of the new media items, with %s where the database puts the id of the item (see create_media)
+def get_media_url_format(file_extension):
+    file_complete_url = os.path.join(app.static_folder, "media%%s.%s" % file_extension)      #Get complete absolute path for the new resource
+    return file_complete_url[file_complete_url.find("/friendsNet"):]
+
+# Create the media item of a file written by the storage, moving the file to its blob. The upload of a resumable upload is
+# deleted in the same transaction as the creation, and its file only once that is committed, so that it can be completed again
+# if the media item can't be created or the writes are rolled back. Return the id of the new media item, or None if it can't be
+# created or the upload has already been completed
+def create_stored_media(storage, temporary_path, content_hash, size, file_extension, upload_id = None):
+    file_type = get_file_type(file_extension)       #We are sure extension is one of the allowed extensions, so file_type will be either 0 or 1
+    new_media_item = {"media_type" : file_type, "url_format" : get_media_url_format(file_extension), "content_hash" : content_hash, "size" : size}
+    new_media_id = None
+    stored = False
+    try:
+        #The file is stored holding the write lock, so that removing the file of the same content can't run in
+        #between (see remove_blob_file). If the writes are rolled back the file stays, unused, until uploaded again
+        with atomic():
+            if upload_id is None or g.con.delete_media_upload(upload_id):
+                new_media_id = g.con.create_media(new_media_item)
+                if new_media_id is not None:
+                    stored = storage.store(temporary_path, content_hash, keep = upload_id is not None)    #Dropped if the same content is already there
+                    if upload_id is not None:
+                        g.con.after_commit(functools.partial(storage.discard, temporary_path))
+                    if stored and file_type == 0:           #Variants are generated once per content, in background
+                        g.con.after_commit(functools.partial(generate_derivatives, content_hash))
+    finally:
+        if upload_id is None:
+            storage.discard(temporary_path)
+    return new_media_id
+
+# Creation time (milliseconds, as in the database) before which the resumable uploads have expired
+def get_media_upload_expiration_time():
+    return long(round((time.time() - app.config["MEDIA_UPLOAD_LIFETIME"]) * 1000))
+
+# Resumable upload in progress, or None if it doesn't exist or has expired (expired ones are swept by Media_uploads.post)
+def get_media_upload(upload_id):
+    upload = g.con.get_media_upload(upload_id)
+    if upload is not None and upload["creation_time"] < get_media_upload_expiration_time():
+        upload = None
+    return upload
+
+# Return the (start, stop) bytes asked by the Range header, or None if the whole file has to be sent: no Range, several ranges
+# (allowed by the HTTP specification) or an If-Range validator which doesn't match any more. Raise ValueError if the range is not satisfiable
+def get_byte_range(size, etag, last_modified):
+    byte_range = request.range
+    if byte_range is None or byte_range.units != "bytes" or len(byte_range.ranges) != 1:
+        return None
+    if_range = request.if_range
+    if (if_range.etag is not None and if_range.etag != etag) or (if_range.date is not None and if_range.date != last_modified):
+        return None
+    start, stop = byte_range.ranges[0]
+    if start < 0:                                   #Last bytes: "bytes=-500"
+        start, stop = max(size + start, 0), size
+    else:
+        stop = size if stop is None else min(stop, size)
+    if start >= stop:
+        raise ValueError("Range not satisfiable")
+    return start, stop
+
+# Generator of the bytes of an open file from its current position, until length bytes have been read
+def read_file_part(f, length):
+    try:
+        while length > 0:
+            chunk = f.read(min(length, MEDIA_RANGE_CHUNK_SIZE))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+# Response with the content of the file of a media item (or part of it, for a Range request), validated by the ETag and the
+# modification time of the file. The whole file is sent through the file wrapper of the WSGI server, which can use sendfile.
+# Clients can keep it for max_age seconds
+def send_media_file(path, file_name, etag = None, max_age = MEDIA_CACHE_MAX_AGE):
+    stat = os.stat(path)
+    size = stat.st_size
+    last_modified = datetime.datetime.utcfromtimestamp(int(stat.st_mtime))
+    if etag is None:
+        etag = "%s-%s-%s" % (int(stat.st_mtime), size, zlib.adler32(path) & 0xffffffff)
+
+    resp = Response(mimetype = get_file_mimetype(get_file_extension(file_name)) or "application/octet-stream")
+    resp.set_etag(etag)
+    resp.last_modified = last_modified
+    resp.cache_control.public = True
+    resp.cache_control.max_age = max_age
+    resp.headers["Accept-Ranges"] = "bytes"
+    resp.headers.add("Content-Disposition", "attachment", filename = file_name)
+
+    if not is_resource_modified(request.environ, etag = etag, last_modified = last_modified):
+        resp.status_code = 304
+        return resp
+    try:
+        byte_range = get_byte_range(size, etag, last_modified)
+    except ValueError:
+        resp.status_code = 416
+        resp.headers["Content-Range"] = "bytes */%d" % size
+        return resp
+
+    f = open(path, "rb")
+    if byte_range is None:
+        resp.response = wrap_file(request.environ, f)
+        resp.content_length = size
+    else:
+        start, stop = byte_range
+        f.seek(start)
+        resp.response = read_file_part(f, stop - start)
+        resp.status_code = 206
+        resp.content_length = stop - start
+        resp.headers["Content-Range"] = "bytes %d-%d/%d" % (start, stop - 1, size)
+    resp.direct_passthrough = True
+    return resp
+
+# Cursors are opaque to clients: base64 of the direction and of the sort key of the item where the page starts
+def encode_cursor(direction, key):
+    return base64.urlsafe_b64encode(json.dumps([direction, list(key)]))
+
+# Return (direction, key) of the cursor, whose key must have key_length values. Raise ValueError if it hasn't been created by
+# encode_cursor for the same collection, or if its values don't fit the integers of the database
+def decode_cursor(cursor, key_length):
+    try:
+        direction, key = json.loads(base64.urlsafe_b64decode(str(cursor)))
+    except (TypeError, ValueError, UnicodeEncodeError):
+        raise ValueError("Cursor in bad format")
+    if direction not in ("after", "before") or not isinstance(key, list) or len(key) != key_length or \
+            not all(isinstance(value, (int, long)) and not isinstance(value, bool) and MIN_SORT_KEY_VALUE <= value <= MAX_SORT_KEY_VALUE for value in key):
+        raise ValueError("Cursor in bad format")
+    return direction, tuple(key)
+
+# Return (limit, after, before) from "limit" and "cursor" query parameters of a collection sorted by sort_key. Limit is capped to MAX_PAGE_SIZE
+def get_page_parameters(sort_key):
+    limit = int(request.args.get("limit", app.config["DEFAULT_PAGE_SIZE"]))
+    if limit < 1:
+        raise ValueError("Limit must be positive")
+    limit = min(limit, app.config["MAX_PAGE_SIZE"])
+    after = None
+    before = None
+    cursor = request.args.get("cursor", None)
+    if cursor is not None:
+        direction, key = decode_cursor(cursor, SORT_KEY_LENGTHS[sort_key])
+        if direction == "after":
+            after = key
+        else:
+            before = key
+    return limit, after, before
+
+# Call a paginated database method asking one more item than the page size, to know if there are more pages.
+# Return (items of the page, has next page, has previous page)
+def fetch_page(method, args, page):
+    limit, after, before = page
+    items = method(*args, limit_to = limit + 1, after = after, before = before) or []
+    more = len(items) > limit
+    if after is None and before is not None:                #Page read backwards: the additional item is the first one
+        if more:
+            items = items[1:]
+        return items, True, more
+    if more:
+        items = items[:limit]
+    return items, more, after is not None
+
+# Sort keys of the items of the paginated collections (see database.Connection._fetch_page)
+def status_sort_key(status):
+    return (status["creation_time"], status["status_id"])
+
+def group_status_sort_key(status):
+    return (status["status_id"],)
+
+def comment_sort_key(comment):
+    return (comment["creation_time"], comment["comment_id"])
+
+def rate_sort_key(rate):
+    return (rate["rate_id"],)
+
+def membership_sort_key(membership):
+    return (membership["user_id"],)
+
+def message_sort_key(message):
+    return (message["time_sent"], message["message_id"])
+
+def conversation_sort_key(conversation):
+    return (conversation["time_last_message"], conversation["conversation_id"])
+
+# Values in each sort key, checked on the cursors sent back by the clients
+SORT_KEY_LENGTHS = {status_sort_key : 2, group_status_sort_key : 1, comment_sort_key : 2, rate_sort_key : 1,
+                    membership_sort_key : 1, message_sort_key : 2, conversation_sort_key : 2}
+
+# Append "prev" and "next" links of a page to the collection links
+def add_page_links(links, href, items, sort_key, limit, has_next, has_prev):
+    if len(items) > 0:
+        if has_prev:
+            links.append({"href" : "%s?limit=%d&cursor=%s" % (href, limit, encode_cursor("before", sort_key(items[0]))), "rel" : "prev", "prompt" : "Previous page"})
+        if has_next:
+            links.append({"href" : "%s?limit=%d&cursor=%s" % (href, limit, encode_cursor("after", sort_key(items[-1]))), "rel" : "next", "prompt" : "Next page"})
+
+# Streaming version of fetch_page: the items are read from the database while they are written in the response.
+# Return (generator of the items of the page, page state). The state has "has_next", "has_prev" and "bounds"
+# (first and last item of the page, as needed by add_page_links) and it is complete once the generator is exhausted.
+def stream_page(method, args, page):
+    limit, after, before = page
+    state = {"has_next" : False, "has_prev" : after is not None, "bounds" : []}
+    rows = method(*args, limit_to = limit + 1, after = after, before = before, stream = True)
+    if after is None and before is not None:                #Page read backwards: the database reads all its rows anyway to reverse them
+        items = list(rows)
+        state["has_next"] = True
+        state["has_prev"] = len(items) > limit
+        if state["has_prev"]:
+            items = items[1:]
+        state["bounds"] = items[:1] + items[-1:]
+        return iter(items), state
+    def generate():
+        count = 0
+        for item in rows:
+            count += 1
+            if count > limit:                               #One more item than the page size: there is a next page
+                state["has_next"] = True
+                break
+            if count == 1:
+                state["bounds"] = [item, item]
+            state["bounds"][1] = item
+            yield item
+        rows.close()
+    return generate(), state
+
+# Return (compact, fields) for the representation of the collections asked by the client. The compact representation
+# is asked with "?fields=id,content" (only those data of the items) or with the COMPACT_VIEW parameter of the
+# Collection+JSON media type in Accept (all the data). Fields is None when all the data are returned
+def get_representation():
+    if "fields" in request.args:
+        return True, frozenset(name for name in request.args["fields"].split(",") if name != "") or None
+    for media_range in request.headers.get("Accept", "").split(","):
+        parameters = [parameter.replace(" ", "") for parameter in media_range.split(";")]
+        if parameters[0] == COLLECTION_JSON and COMPACT_VIEW in parameters[1:]:
+            return True, None
+    return False, None
+
+# 200 response with a whole Collection+JSON envelope, in the representation asked by the client
+def collection_response(envelope, mimetype):
+    compact, fields = get_representation()
+    if compact:
+        resp = Response(compact_encoder.encode_collection(envelope, fields), 200, mimetype = mimetype + ";" + COMPACT_VIEW)
+    else:
+        resp = Response(dumps(envelope), 200, mimetype = mimetype)
+    resp.vary.add("Accept")
+    return resp
+
+# Compact JSON of the items, encoded COMPACT_BATCH_SIZE items at a time
+def compact_items(items, fields):
+    items = iter(items)
+    while True:
+        batch = list(itertools.islice(items, COMPACT_BATCH_SIZE))
+        if not batch:
+            break
+        for item in compact_encoder.encode_items(batch, fields):
+            yield item
+
+# Response writing a Collection+JSON envelope while its items are produced, so the whole collection is never in
+# memory. The members of collection are written first, then the items one at a time and then the members returned
+# by trailer(), which is called after the last item (e.g. the links to the other pages, which depend on it).
+def stream_collection(collection, items, trailer, mimetype):
+    compact, fields = get_representation()
+    if compact:
+        collection = compact_encoder.collection_members(collection)
+        encoded_items = compact_items(items, fields)
+        encode_trailer = lambda: compact_encoder.collection_members(trailer())
+        mimetype += ";" + COMPACT_VIEW
+    else:
+        encoded_items = itertools.imap(dumps, items)
+        encode_trailer = trailer
+    def generate():
+        yield '{"collection": {' + "".join("%s: %s, " % (dumps(key), dumps(value)) for key, value in collection.items()) + '"items": ['
+        separator = ""
+        for item in encoded_items:
+            yield separator + item
+            separator = ", "
+        yield "]" + "".join(", %s: %s" % (dumps(key), dumps(value)) for key, value in encode_trailer().items()) + "}}"
+    resp = Response(stream_with_context(generate()), 200, mimetype = mimetype)
+    resp.vary.add("Accept")
+    return resp
+
+# Return the sub-resources asked with the "embed" query parameter of the status collections as a dictionary
+# {name : option}, e.g. "?embed=author,comments:3" gives {"author" : None, "comments" : 3}. Only comments take
+# an option: the number of most recent comments of each status, at most MAX_PAGE_SIZE.
+# Raise ValueError if a name is unknown or an option is not valid
+EMBEDDABLE = ("author", "media", "tags", "comments", "rates_summary")
+
+def get_embed_parameters():
+    embed = {}
+    value = request.args.get("embed", "")
+    for token in value.split(","):
+        if token == "":
+            continue
+        name, _, option = token.partition(":")
+        if name not in EMBEDDABLE or (option != "" and name != "comments"):
+            raise ValueError("Unknown embedded sub-resource")
+        if name == "comments":
+            count = int(option) if option != "" else DEFAULT_EMBEDDED_COMMENTS
+            if count < 1:
+                raise ValueError("Number of embedded comments must be positive")
+            option = min(count, app.config["MAX_PAGE_SIZE"])
+        else:
+            option = None
+        embed[name] = option
+    return embed
+
+# Return the ids in the value (a list) of the template data with the given name, [] if the data is missing or empty.
+# Raise ValueError or TypeError if the value is not a list of integers
+def get_template_ids(template_data, name):
+    values_array = list(data["value"] for data in template_data if data["name"] == name)
+    if len(values_array) == 0 or values_array[0] in (None, ""):
+        return []
+    if not isinstance(values_array[0], list):
+        raise TypeError("Ids must be in a list")
+    return [int(value) for value in values_array[0]]
+
+# Return the error response if some media or tagged user of a new status doesn't exist (one query each), None otherwise
+def check_status_attachments(media_ids, tagged_user_ids):
+    resp = None
+    if media_ids and len(g.con.get_media_items(media_ids)) != len(set(media_ids)):
+        resp = resource_not_found(parameter_name = "Media item")
+    elif tagged_user_ids and len(g.con.get_users_information(tagged_user_ids)) != len(set(tagged_user_ids)):
+        resp = resource_not_found(parameter_name = "Tagged user")
+    return resp
+
+# Template data of the optional media and tags of a new status
+STATUS_ATTACHMENTS_TEMPLATE_DATA = [{"name" : "media_ids", "value" : [], "prompt" : "Ids of the media items attached to the status", "required" : "false"},
+                                    {"name" : "tagged_user_ids", "value" : [], "prompt" : "Ids of the users tagged in the status", "required" : "false"}]
+
+# Load with one query for each embedded sub-resource (not one for each status) the sub-resources of a page of
+# statuses. Return (statuses of the page, {status id : "embedded" member of the item}). The page is read entirely
+# before being written, its size is bounded by MAX_PAGE_SIZE
+def embed_statuses(statuses, embed):
+    statuses = list(statuses)
+    status_ids = [status["status_id"] for status in statuses]
+    embedded = dict((status_id, {}) for status_id in status_ids)
+
+    if "author" in embed:
+        authors = g.con.get_users_information(set(status["creator_id"] for status in statuses))
+        for status in statuses:
+            author = authors.get(status["creator_id"], None)
+            embedded[status["status_id"]]["author"] = user_profile_item(author) if author is not None else None
+    if "media" in embed:
+        media = g.con.get_media_for_statuses(status_ids)
+        for status_id in status_ids:
+            embedded[status_id]["media"] = [media_item_item(media_item) for media_item in media.get(status_id, [])]
+    if "tags" in embed:
+        tags = g.con.get_tagged_users_for_statuses(status_ids)
+        for status_id in status_ids:
+            embedded[status_id]["tags"] = [user_profile_item(user) for user in tags.get(status_id, [])]
+    if "comments" in embed:
+        comments = g.con.get_comments_for_statuses(status_ids, limit_per_status = embed["comments"])
+        for status_id in status_ids:
+            embedded[status_id]["comments"] = [comment_item(comment) for comment in comments.get(status_id, [])]
+    if "rates_summary" in embed:
+        summaries = g.con.get_rates_summary_for_statuses(status_ids)
+        for status_id in status_ids:
+            summary = summaries.get(status_id, {"count" : 0, "average" : None})
+            embedded[status_id]["rates_summary"] = {"count" : summary["count"], "average" : summary["average"]}
+    return statuses, embedded
+
+# Collection+JSON items of the embedded sub-resources, with the same data of the items of their own collections
+def user_profile_item(user):
+    user_id = user["user_id"]
+    data = [{"name" : "id", "value" : user_id, "prompt" : "User id"},
+            {"name" : "firstName", "value" : user["first_name"], "prompt" : "User first name"},
+            {"name" : "middleName", "value" : user["middle_name"], "prompt" : "User middle name"},
+            {"name" : "surname", "value" : user["surname"], "prompt" : "User surname"},
+            {"name" : "age", "value" : user["age"], "prompt" : "User age"},
+            {"name" : "gender", "value" : user["gender"], "prompt" : "User gender"}]
+    if user["prof_picture_id"] is not None:
+        data.append({"name" : "prof_picture_id", "value" : user["prof_picture_id"], "prompt" : "User profile picture id"})
+    return {"href" : link_builder.url_for(User_profile, user_id = user_id), "data" : data}
+
+def media_item_item(media_item):
+    media_item_id = media_item["media_item_id"]
+    return {"href" : link_builder.url_for(Media_item, media_id = media_item_id),
+            "data" : [{"name" : "id", "value" : media_item_id, "prompt" : "Media item id"},
+                      {"name" : "media_item_type", "value" : media_item["media_item_type"], "prompt" : "Media item type"},
+                      {"name" : "url", "value" : media_item["url"], "prompt" : "Media item URL"},
+                      {"name" : "description", "value" : media_item["description"], "prompt" : "Media item description"}]}
+
+def comment_item(comment):
+    comment_id = comment["comment_id"]
+    return {"href" : link_builder.url_for(Comment, comment_id = comment_id),
+            "data" : [{"name" : "id", "value" : comment_id, "prompt" : "Comment id"},
+                      {"name" : "status_id", "value" : comment["status_id"], "prompt" : "Status id"},
+                      {"name" : "user_id", "value" : comment["user_id"], "prompt" : "User id"},
+                      {"name" : "content", "value" : comment["content"], "prompt" : "Comment content"},
+                      {"name" : "creation_time", "value" : comment["creation_time"], "prompt" : "Comment creation time"}],
+            "links" : [{"href" : link_builder.url_for(User_profile, user_id = comment["user_id"]), "rel" : "author", "prompt" : "User profile"}]}
+
+def conditional_get(*tables):
+    '''
+    Decorator of the get methods adding a strong ETag to the 200 responses and answering 304 Not Modified
+    when the ETag is in the If-None-Match header, without building the representation.
+
+    The ETag is a SHA-1 of the path of the request with its query string, of its Authorization header, of
+    whether the compact view has been asked for and of the versions of the tables (see
+    database.Connection.get_table_versions): any write to one of them changes it.
+
+    :param tables: names, in lower case, of all the tables the representation is read from (str).
+    '''
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            #Versions are read before the representation: a concurrent write can only make the ETag older than the body
+            versions = g.con.get_table_versions(tables)
+            validator = "%s|%s|%s|%s" % (request.full_path, request.headers.get("Authorization", ""), "compact" if get_representation()[0] else "",
+                                         ",".join("%s=%s" % (table, versions.get(table)) for table in tables))
+            etag = hashlib.sha1(validator.encode("utf-8")).hexdigest()
+            if request.if_none_match.contains(etag):
+                resp = Response(status = 304)
+                resp.set_etag(etag)
+                return resp
+            resp = method(*args, **kwargs)
+            if resp.status_code == 200:
+                resp.set_etag(etag)
+            return resp
+        return wrapper
+    return decorator
+
 ################################################### SETUP/TEARDOWN REQUEST DEFINITION ###################################################
 
 @app.before_request
 def connect_db():
-    '''Creates a database connection before the request is proccessed.
+    '''Checks out a database connection from the Engine pool before the request is proccessed.
 
         The connection is stored in the application context variable flask.g .
         Hence it is accessible from the request object.'''
 
-    g.con = app.config["Engine"].connect()
+    g.con = database.IdentityMap(get_engine().connect())        #Point lookups repeated by the handlers are read once per request
 
-    if app.config["LAST_MEDIA_ITEM_ID"] == -1:              #Since it's not possible to catch event in which the app is launched, before every request
-        last_id = g.con.get_last_media_item_id()            #the system checks that the value for naming the new images has been updated
-        app.config["LAST_MEDIA_ITEM_ID"] = last_id
+@app.after_request
+def report_saved_queries(resp):
+    '''Adds the X-Saved-Queries header, with the queries saved by the identity map, when IDENTITY_MAP_DEBUG is set.'''
+    if app.config["IDENTITY_MAP_DEBUG"] and hasattr(g, "con"):
+        resp.headers["X-Saved-Queries"] = str(g.con.saved_queries)
+    return resp
 
 @app.teardown_request
 def close_connection(exc):
-    ''' Closes the database connection
+    ''' Closes the database connection, giving it back to the Engine pool
         Check if the connection is created. It migth be exception appear before
         the connection is created.'''
-    if hasattr(g, "con"):
+    if hasattr(g, "con") and not request.environ.get(BATCH_ENVIRON_KEY, False):     #Sub-requests of a batch leave it to the batch request
         g.con.close()
 
 #METHOD UTILIZED FOR GET IS ALWAYS THE SAME: BUILD THE RESPONSE OBJECT BASED ON THE DOCUMENTATION WRITTEN (commented, informally, just first get method).
 #FOR POST AND PUT METHOD, IT'S SLIGHTLY DIFFERENT SINCE FOR BOTH SOME CHECKS HAVE TO BE MADE.
 #DELETE METHOD IS THE SIMPLEST ONE SINCE IT JUST CHECKS THE RETURN VALUE FROM DATABASE TO RETURN RESPONSE TO USER.
 
+#Tokens are signed and verified by the same serializer, built once with the SECRET_KEY of the application
+@built_once
+def get_token_serializer():
+    return Serializer(app.config["SECRET_KEY"], expires_in = AUTH_TOKEN_LIFETIME)
+
 def generate_auth_token(user_id):
-    s = Serializer(app.config["SECRET_KEY"], expires_in = 99999999999999999999999999999)
-    return s.dumps({"id" : user_id})
+    return get_token_serializer().dumps({"id" : user_id, "jti" : uuid.uuid4().hex})      #Unique, so revoking a token spares the other sessions
 
-def verify_auth_token(token):
-    authenticated_user_id = None
+def get_auth_token_hash(token):
+    return hashlib.sha256(token).hexdigest()
+
+def decode_auth_token(token):
+    '''
+    Check the signature and the expiration of the token, and that it has not been revoked.
 
-    s = Serializer(app.config["SECRET_KEY"])
+    :return: (user id, expiration time) of the token or None if it is not valid.
+    '''
     try:
-        data = s.loads(token)
-        authenticated_user_id = data["id"]
-    except BadSignature:
-        pass
-    return authenticated_user_id
+        data, header = get_token_serializer().loads(token, return_header = True)
+        user_id = data["id"]
+        expiration = min(header["exp"], header["iat"] + AUTH_TOKEN_LIFETIME)
+    except (BadSignature, KeyError, TypeError, ValueError):
+        return None
+    if expiration <= time.time() or g.con.is_token_revoked(get_auth_token_hash(token)):
+        return None
+    return user_id, expiration
+
+#Tokens already verified: the signature of a token is checked only the first time it is used, revocations
+#made by the other processes are seen once the token is verified again (see tokens.TokenCache)
+@built_once
+def get_token_cache():
+    return TokenCache(decode_auth_token, app.config["AUTH_TOKEN_CACHE_SIZE"])
+
+def verify_auth_token(token):
+    return get_token_cache().get_user_id(token)
+
+def revoke_auth_token(token):
+    '''
+    Refuse the token from now on, in every process: the revocation is stored in the database until the
+    token expires. The revocations of the tokens which have expired are deleted at the same time.
+
+    :return: True if the token has been revoked, False if it was not valid.
+    '''
+    decoded = decode_auth_token(token)
+    if decoded is None:
+        return False
+    g.con.delete_expired_revoked_tokens(long(time.time()))
+    g.con.create_revoked_token(get_auth_token_hash(token), decoded[1])
+    g.con.after_commit(lambda: get_token_cache().revoke(token))
+    return True
+
+def get_auth_token():
+    '''
+    :return: the token of the Authorization header ("Bearer <token>" or just the token), None if there is none.
+    '''
+    authorization = request.headers.get("Authorization", "").split()
+    if len(authorization) == 2 and authorization[0].lower() == "bearer":
+        return authorization[1]
+    return authorization[0] if len(authorization) == 1 else None
+
+# Decorator of the methods of the resources which need an authenticated user. The token of the Authorization header
+# is verified (see get_token_cache) and the id of its user is stored in g.user_id; 401 is answered otherwise.
+# It must be above conditional_get, so that a representation can't be validated with 304 before the check.
+def auth_required(method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        token = get_auth_token()
+        user_id = verify_auth_token(token) if token is not None else None
+        if user_id is None:
+            return unauthenticated_user(parameter_name = "authorization token")
+        g.user_id = user_id
+        return method(*args, **kwargs)
+    return wrapper
 
 ################################################### USER METHODS DEFINITION ###################################################
 
@@ -202,13 +874,21 @@ def verify_auth_token(token):
 
 class User_comments(Resource):
 
+    @conditional_get("users_profiles", "comments")
     def get(self, user_id):
         resp = None
 
-        if g.con.get_user_information(user_id) is None:                     #If user is not in the db then error
+        try:
+            page = get_page_parameters(comment_sort_key)
+        except ValueError:
+            page = None
+
+        if page is None:
+            resp = bad_request(parameter_name = "Page limit or cursor")
+        elif g.con.get_user_information(user_id) is None:                     #If user is not in the db then error
             resp = resource_not_found(parameter_name = "User")
         else:
-            user_comments = g.con.get_comments_for_user(user_id)            #Get all comments from db
+            user_comments, has_next, has_prev = fetch_page(g.con.get_comments_for_user, (user_id,), page)     #Get a page of comments from db
 
             items = []
 
@@ -221,7 +901,7 @@ class User_comments(Resource):
 
                     item = {}
 
-                    item["href"] = api.url_for(Comment, comment_id = comment_id)
+                    item["href"] = link_builder.url_for(Comment, comment_id = comment_id)
 
                     item["data"] = [{"name" : "id", "value" : comment_id, "prompt" : "Comment id"},
                                     {"name" : "status_id", "value" : status_id, "prompt" : "Status id"},
@@ -229,35 +909,44 @@ class User_comments(Resource):
                                     {"name" : "content", "value" : content, "prompt" : "Content"},
                                     {"name" : "creation_time", "value" : creation_time, "prompt" : "Creation time"}]
 
-                    item["links"] = [{"href" : api.url_for(Status, status_id = status_id), "rel" : "status", "prompt" : "Status commented"}]
+                    item["links"] = [{"href" : link_builder.url_for(Status, status_id = status_id), "rel" : "status", "prompt" : "Status commented"}]
 
                     items.append(item)
 
-            links = [{"href" : api.url_for(User_profile, user_id = user_id), "rel" : "author", "prompt" : "User profile"}]
+            links = [{"href" : link_builder.url_for(User_profile, user_id = user_id), "rel" : "author", "prompt" : "User profile"}]
+            add_page_links(links, link_builder.url_for(User_comments, user_id = user_id), user_comments, comment_sort_key, page[0], has_next, has_prev)
 
             collection = {
                 "version" : API_VERSION,
-                "href" : api.url_for(User_comments, user_id = user_id),
+                "href" : link_builder.url_for(User_comments, user_id = user_id),
                 "links" : links,
                 "items" : items
             }
 
             envelope = {"collection" : collection}
 
-            resp = Response(json.dumps(envelope), 200, mimetype = COLLECTION_JSON + ";profile=" + COMMENT_PROFILE)
+            resp = collection_response(envelope, COLLECTION_JSON + ";profile=" + COMMENT_PROFILE)
         return resp
 
 ##################### USER RATES #####################
 
 class User_rates(Resource):
 
+    @conditional_get("users_profiles", "rates")
     def get(self, user_id):
         resp = None
 
-        if g.con.get_user_information(user_id) is None:                 #If no user in db, then error
+        try:
+            page = get_page_parameters(rate_sort_key)
+        except ValueError:
+            page = None
+
+        if page is None:
+            resp = bad_request(parameter_name = "Page limit or cursor")
+        elif g.con.get_user_information(user_id) is None:                 #If no user in db, then error
             resp = resource_not_found(parameter_name = "User")
         else:
-            user_rates = g.con.get_rates_for_user(user_id)
+            user_rates, has_next, has_prev = fetch_page(g.con.get_rates_for_user, (user_id,), page)
 
             items = []                                                  #If no rates for the user, than empty array is returned
 
@@ -269,42 +958,51 @@ class User_rates(Resource):
 
                     item = {}
 
-                    item["href"] = api.url_for(Rate, rate_id = rate_id)
+                    item["href"] = link_builder.url_for(Rate, rate_id = rate_id)
 
                     item["data"] = [{"name" : "id", "value" : rate_id, "prompt" : "Rate id"},
                                     {"name" : "status_id", "value" : status_id, "prompt" : "Status id"},
                                     {"name" : "user_id", "value" : user_id, "prompt" : "User id"},
                                     {"name" : "rate", "value" : rate, "prompt" : "Rate value"}]
 
-                    item["links"] = [{"href" : api.url_for(Status, status_id = status_id), "rel" : "status", "prompt" : "Status rated"}]
+                    item["links"] = [{"href" : link_builder.url_for(Status, status_id = status_id), "rel" : "status", "prompt" : "Status rated"}]
 
                     items.append(item)
 
-            links = [{"href" : api.url_for(User_profile, user_id = user_id), "rel" : "author", "prompt" : "User profile"}]
+            links = [{"href" : link_builder.url_for(User_profile, user_id = user_id), "rel" : "author", "prompt" : "User profile"}]
+            add_page_links(links, link_builder.url_for(User_rates, user_id = user_id), user_rates, rate_sort_key, page[0], has_next, has_prev)
 
             collection = {
                 "version" : API_VERSION,
-                "href" : api.url_for(User_rates, user_id = user_id),
+                "href" : link_builder.url_for(User_rates, user_id = user_id),
                 "links" : links,
                 "items" : items
             }
 
             envelope = {"collection" : collection}
 
-            resp = Response(json.dumps(envelope), 200, mimetype = COLLECTION_JSON + ";profile=" + RATE_PROFILE)
+            resp = collection_response(envelope, COLLECTION_JSON + ";profile=" + RATE_PROFILE)
         return resp
 
 ##################### USER CONVERSATIONS #####################
 
 class User_conversations(Resource):
 
+    @conditional_get("users_profiles", "conversations")
     def get(self, user_id):
         resp = None
 
-        if g.con.get_user_information(user_id) is None:             #If no user in db, then error
+        try:
+            page = get_page_parameters(conversation_sort_key)
+        except ValueError:
+            page = None
+
+        if page is None:
+            resp = bad_request(parameter_name = "Page limit or cursor")
+        elif g.con.get_user_information(user_id) is None:             #If no user in db, then error
             resp = resource_not_found(parameter_name = "User")
         else:
-            user_conversations = g.con.get_conversations_for_user(user_id)
+            user_conversations, has_next, has_prev = fetch_page(g.con.get_conversations_for_user, (user_id,), page)
 
             items = []
 
@@ -317,25 +1015,26 @@ class User_conversations(Resource):
 
                     item = {}
 
-                    item["href"] = api.url_for(Conversation, conversation_id = conversation_id)
+                    item["href"] = link_builder.url_for(Conversation, conversation_id = conversation_id)
 
                     item["data"] = [{"name" : "id", "value" : conversation_id, "prompt" : "Conversation id"},
                                     {"name" : "user1_id", "value" : user1_id, "prompt" : "User_1 id"},
                                     {"name" : "user2_id", "value" : user2_id, "prompt" : "User_2 id"},
                                     {"name" : "time_last_message", "value" : time_last_message, "prompt" : "Time last message"}]
 
-                    item["links"] = [{"href" : api.url_for(User_profile, user_id = user2_id), "rel" : "user contacted profile", "prompt" : "User contacted profile"},
-                                     {"href" : api.url_for(Conversation_messages, conversation_id = conversation_id), "rel" : "conversation messages", "prompt" : "Conversation messages"}]
+                    item["links"] = [{"href" : link_builder.url_for(User_profile, user_id = user2_id), "rel" : "user contacted profile", "prompt" : "User contacted profile"},
+                                     {"href" : link_builder.url_for(Conversation_messages, conversation_id = conversation_id), "rel" : "conversation messages", "prompt" : "Conversation messages"}]
 
                     items.append(item)
 
-            links = [{"href" : api.url_for(User_profile, user_id = user_id), "rel" : "user profile", "prompt" : "User profile"}]
+            links = [{"href" : link_builder.url_for(User_profile, user_id = user_id), "rel" : "user profile", "prompt" : "User profile"}]
+            add_page_links(links, link_builder.url_for(User_conversations, user_id = user_id), user_conversations, conversation_sort_key, page[0], has_next, has_prev)
 
             template = {"data" : [{"name" : "user2_id", "value" : "", "prompt" : "User_2 id", "required" : "true"}]}
 
             collection = {
                 "version" : API_VERSION,
-                "href" : api.url_for(User_conversations, user_id = user_id),
+                "href" : link_builder.url_for(User_conversations, user_id = user_id),
                 "links" : links,
                 "items" : items,
                 "template" : template
@@ -343,7 +1042,7 @@ class User_conversations(Resource):
 
             envelope = {"collection" : collection}
 
-            resp = Response(json.dumps(envelope), 200, mimetype = COLLECTION_JSON + ";profile=" + CONVERSATION_PROFILE)
+            resp = collection_response(envelope, COLLECTION_JSON + ";profile=" + CONVERSATION_PROFILE)
         return resp
 
     def post(self, user_id):
@@ -378,7 +1077,7 @@ class User_conversations(Resource):
                         if new_conversation_id is None:                     #If impossible to create new conversation, then error
                             resp = internal_server_error()
                         else:
-                            new_url = api.url_for(Conversation, conversation_id = new_conversation_id)
+                            new_url = link_builder.url_for(Conversation, conversation_id = new_conversation_id)
                             resp = Response(status = 201, headers = {"Location" : new_url})
             except:
                 resp = bad_request(parameter_name = "User id")                            #If anything wrong (due to bad request format), then error
@@ -404,7 +1103,7 @@ class User_authentication(Resource):
                     resp = unauthenticated_user(parameter_name = "authorization token")
                 else:
                     result = {"user_id" : user_id, "auth_token" : token}
-                    resp = Response(json.dumps(result), 201, mimetype = JSON)
+                    resp = Response(dumps(result), 201, mimetype = JSON)
             else:                                               #If user sends email (and password)
                 password = request_body.get("password", "")
 
@@ -415,13 +1114,22 @@ class User_authentication(Resource):
                 else:
                     generated_token = generate_auth_token(found_user_id)
                     result = {"user_id" : found_user_id, "auth_token" : generated_token}
-                    resp = Response(json.dumps(result), 201, mimetype = JSON)
+                    resp = Response(dumps(result), 201, mimetype = JSON)
         return resp
 
+    @auth_required
+    def delete(self):
+        '''
+        Revoke the token of the Authorization header: it is refused from now on.
+        '''
+        revoke_auth_token(get_auth_token())
+        return Response(status = 204)
+
 ##################### USER FRIENDSHIPS #####################
 
 class User_friendships(Resource):
 
+    @conditional_get("users_profiles", "friendships")
     def get(self, user_id):
         resp = None
 
@@ -442,7 +1150,7 @@ class User_friendships(Resource):
 
                     item = {}
 
-                    item["href"] = api.url_for(Friendship, friendship_id = friendship_id)
+                    item["href"] = link_builder.url_for(Friendship, friendship_id = friendship_id)
 
                     item["data"] = [{"name" : "id", "value" : friendship_id, "prompt" : "Friendship id"},
                                     {"name" : "user1_id", "value" : user1_id, "prompt" : "User_1 id"},
@@ -450,17 +1158,17 @@ class User_friendships(Resource):
                                     {"name" : "friendship_status", "value" : status, "prompt" : "Friendship status"},
                                     {"name" : "friendship_start", "value" : start, "prompt" : "Friendship start"}]
 
-                    item["links"] = [{"href" : api.url_for(User_profile, user_id = user2_id), "rel" : "friend", "prompt" : "Friend profile"}]
+                    item["links"] = [{"href" : link_builder.url_for(User_profile, user_id = user2_id), "rel" : "friend", "prompt" : "Friend profile"}]
 
                     items.append(item)
 
-            links = [{"href" : api.url_for(User_profile, user_id = user_id), "rel" : "user profile", "prompt" : "User profile"}]
+            links = [{"href" : link_builder.url_for(User_profile, user_id = user_id), "rel" : "user profile", "prompt" : "User profile"}]
 
             template = {"data" : [{"name" : "user2_id", "value" : "", "prompt" : "User_2 id", "required" : "true"}]}
 
             collection = {
                 "version" : API_VERSION,
-                "href" : api.url_for(User_friendships, user_id = user_id),
+                "href" : link_builder.url_for(User_friendships, user_id = user_id),
                 "links" : links,
                 "items" : items,
                 "template" : template
@@ -468,7 +1176,7 @@ class User_friendships(Resource):
 
             envelope = {"collection" : collection}
 
-            resp = Response(json.dumps(envelope), 200, mimetype = COLLECTION_JSON + ";profile=" + FRIENDSHIP_PROFILE)
+            resp = collection_response(envelope, COLLECTION_JSON + ";profile=" + FRIENDSHIP_PROFILE)
         return resp
 
     def post(self, user_id):
@@ -500,7 +1208,7 @@ class User_friendships(Resource):
                         if new_friendship_id is None:
                             resp = internal_server_error()
                         else:
-                            new_url = api.url_for(Friendship, friendship_id = new_friendship_id)
+                            new_url = link_builder.url_for(Friendship, friendship_id = new_friendship_id)
                             resp = Response(status = 201, headers = {"Location" : new_url})
             except:
                 resp = bad_request(parameter_name = "User id")
@@ -510,6 +1218,7 @@ class User_friendships(Resource):
 
 class User_memberships(Resource):
 
+    @conditional_get("users_profiles", "groups_members_lists")
     def get(self, user_id):
         resp = None
 
@@ -527,23 +1236,23 @@ class User_memberships(Resource):
 
                     item = {}
 
-                    item["href"] = api.url_for(User_membership, user_id = user_id, group_id = group_id)
+                    item["href"] = link_builder.url_for(User_membership, user_id = user_id, group_id = group_id)
 
                     item["data"] = [{"name" : "id", "value" : user_id, "prompt" : "User id"},
                                     {"name" : "group_id", "value" : group_id, "prompt" : "Group id"},
                                     {"name" : "administrator", "value" : user_type, "prompt" : "Membership type"}]
 
-                    item["links"] = [{"href" : api.url_for(Group, group_id = group_id), "rel" : "group", "prompt" : "Group"}]
+                    item["links"] = [{"href" : link_builder.url_for(Group, group_id = group_id), "rel" : "group", "prompt" : "Group"}]
 
                     items.append(item)
 
-            links = [{"href" : api.url_for(User_profile, user_id = user_id), "rel" : "user profile", "prompt" : "User profile"}]
+            links = [{"href" : link_builder.url_for(User_profile, user_id = user_id), "rel" : "user profile", "prompt" : "User profile"}]
 
             template = {"data" : [{"name" : "group_id", "value" : "", "prompt" : "Group id", "required" : "true"}]}
 
             collection = {
                 "version" : API_VERSION,
-                "href" : api.url_for(User_memberships, user_id = user_id),
+                "href" : link_builder.url_for(User_memberships, user_id = user_id),
                 "links" : links,
                 "items" : items,
                 "template" : template
@@ -551,7 +1260,7 @@ class User_memberships(Resource):
 
             envelope = {"collection" : collection}
 
-            resp = Response(json.dumps(envelope), 200, mimetype = COLLECTION_JSON + ";profile=" + GROUP_MEMBERSHIP_PROFILE)
+            resp = collection_response(envelope, COLLECTION_JSON + ";profile=" + GROUP_MEMBERSHIP_PROFILE)
         return resp
 
     def post(self, user_id):
@@ -581,7 +1290,7 @@ class User_memberships(Resource):
                         if not g.con.add_member_to_group(group_id, user_id):
                             resp = internal_server_error()
                         else:
-                            new_url = api.url_for(User_membership, user_id = user_id, group_id = group_id)
+                            new_url = link_builder.url_for(User_membership, user_id = user_id, group_id = group_id)
                             resp = Response(status = 201, headers = {"Location" : new_url})
             except:
                 resp = bad_request(parameter_name = "Group id")
@@ -591,6 +1300,7 @@ class User_memberships(Resource):
 
 class User_membership(Resource):
 
+    @conditional_get("users_profiles", "groups", "groups_members_lists")
     def get(self, user_id, group_id):
         resp = None
 
@@ -606,10 +1316,10 @@ class User_membership(Resource):
                 group_id = user_membership["group_id"]
                 administrator = user_membership["administrator"]
 
-                _links = {"self" : {"href" : api.url_for(User_membership, user_id = user_id, group_id = group_id), "profile" : GROUP_MEMBERSHIP_PROFILE},
-                         "group members" : {"href" : api.url_for(Group_members, group_id = group_id)},
-                         "user memberships" : {"href" : api.url_for(User_memberships, user_id = user_id)},
-                         "user profile" : {"href" : api.url_for(User_profile, user_id = user_id)}
+                _links = {"self" : {"href" : link_builder.url_for(User_membership, user_id = user_id, group_id = group_id), "profile" : GROUP_MEMBERSHIP_PROFILE},
+                         "group members" : {"href" : link_builder.url_for(Group_members, group_id = group_id)},
+                         "user memberships" : {"href" : link_builder.url_for(User_memberships, user_id = user_id)},
+                         "user profile" : {"href" : link_builder.url_for(User_profile, user_id = user_id)}
                 }
 
                 template = {
@@ -626,7 +1336,7 @@ class User_membership(Resource):
                     "template" : template
                 }
 
-                resp = Response(json.dumps(hal), 200, mimetype = HAL_JSON)
+                resp = Response(dumps(hal), 200, mimetype = HAL_JSON)
             else:
                 resp = resource_not_found(parameter_name = "Membership", resp_type = HAL_JSON)
 
@@ -681,6 +1391,7 @@ class User_membership(Resource):
 ##################### USER TAGS #####################
 class User_tags(Resource):
 
+    @conditional_get("users_profiles", "statuses_tags_lists", "statuses")
     def get(self, user_id):
         resp = None
 
@@ -700,44 +1411,49 @@ class User_tags(Resource):
 
                     item = {}
 
-                    item["href"] = api.url_for(Status, status_id = status_id)
+                    item["href"] = link_builder.url_for(Status, status_id = status_id)
 
                     item["data"] = [{"name" : "id", "value" : status_id, "prompt" : "Status id"},
                                     {"name" : "user_id", "value" : creator_id, "prompt" : "Creator id"},
                                     {"name" : "content", "value" : content, "prompt" : "Status content"},
                                     {"name" : "creation_time", "value" : creation_time, "prompt" : "Status creation time"}]
 
-                    item["links"] = [{"href" : api.url_for(Status_comments, status_id = status_id), "rel" : "status comments", "prompt" : "Status comments"},
-                                     {"href" : api.url_for(Status_rates, status_id = status_id), "rel" : "status rates", "prompt" : "Status rates"},
-                                     {"href" : api.url_for(Status_tags, status_id = status_id), "rel" : "status tags", "prompt" : "Status tags"},
-                                     {"href" : api.url_for(Status_media, status_id = status_id), "rel" : "media list", "prompt" : "Status media items"}]
+                    item["links"] = [{"href" : link_builder.url_for(Status_comments, status_id = status_id), "rel" : "status comments", "prompt" : "Status comments"},
+                                     {"href" : link_builder.url_for(Status_rates, status_id = status_id), "rel" : "status rates", "prompt" : "Status rates"},
+                                     {"href" : link_builder.url_for(Status_tags, status_id = status_id), "rel" : "status tags", "prompt" : "Status tags"},
+                                     {"href" : link_builder.url_for(Status_media, status_id = status_id), "rel" : "media list", "prompt" : "Status media items"}]
 
                     items.append(item)
 
-            links = [{"href" : api.url_for(User_profile, user_id = user_id), "rel" : "tag", "prompt" : "User profile"}]
+            links = [{"href" : link_builder.url_for(User_profile, user_id = user_id), "rel" : "tag", "prompt" : "User profile"}]
 
             collection = {
                 "version" : API_VERSION,
-                "href" : api.url_for(User_tags, user_id = user_id),
+                "href" : link_builder.url_for(User_tags, user_id = user_id),
                 "links" : links,
                 "items" : items
             }
 
             envelope = {"collection" : collection}
 
-            resp = Response(json.dumps(envelope), 200, mimetype = COLLECTION_JSON + ";profile=" + STATUS_PROFILE)
+            resp = collection_response(envelope, COLLECTION_JSON + ";profile=" + STATUS_PROFILE)
         return resp
 
 ##################### USER PROFILES #####################
 
 class User_profiles(Resource):
 
+    @conditional_get("users_profiles")
     def get(self):
         resp = None
 
-        name = request.args.get("name", "")
-        surname = request.args.get("surname", "")
-        user_profiles = g.con.search_user(name, surname)
+        text = request.args.get("q", "")
+        if text != "":                                                  #Free text search on all the names, most relevant users first
+            user_profiles = g.con.search_users(text)
+        else:
+            name = request.args.get("name", "")
+            surname = request.args.get("surname", "")
+            user_profiles = g.con.search_user(name, surname)
 
         items = []
 
@@ -753,7 +1469,7 @@ class User_profiles(Resource):
 
                 item = {}
 
-                item["href"] = api.url_for(User_profile, user_id=user_id)
+                item["href"] = link_builder.url_for(User_profile, user_id=user_id)
 
                 item["data"] = [{"name": "id", "value": user_id, "prompt": "User id"},
                                 {"name": "firstName", "value": first_name, "prompt": "User first name"}]
@@ -770,17 +1486,17 @@ class User_profiles(Resource):
                 if prof_picture_id is not None:
                     item["data"].append({"prof_picture_id": prof_picture_id})
 
-                item["links"] = [{"href": api.url_for(User_memberships, user_id = user_id), "rel": "user memberships", "prompt": "User memberships"},
-                                 {"href": api.url_for(User_comments, user_id = user_id), "rel": "user comments", "prompt": "User comments"},
-                                 {"href": api.url_for(User_rates, user_id = user_id), "rel": "user rates", "prompt": "User rates"},
-                                 {"href": api.url_for(User_tags, user_id = user_id), "rel": "user tags", "prompt": "User tags"},
-                                 {"href": api.url_for(User_statuses, user_id = user_id), "rel": "user statuses", "prompt": "User statuses"},
-                                 {"href": api.url_for(User_friendships, user_id = user_id), "rel": "user friendships", "prompt": "User friendships"},
-                                 {"href": api.url_for(User_conversations, user_id = user_id), "rel": "user conversations", "prompt": "User conversations"},
-                                 {"href": api.url_for(User_feed, user_id = user_id), "rel": "user feed", "prompt": "User feed"}]
+                item["links"] = [{"href": link_builder.url_for(User_memberships, user_id = user_id), "rel": "user memberships", "prompt": "User memberships"},
+                                 {"href": link_builder.url_for(User_comments, user_id = user_id), "rel": "user comments", "prompt": "User comments"},
+                                 {"href": link_builder.url_for(User_rates, user_id = user_id), "rel": "user rates", "prompt": "User rates"},
+                                 {"href": link_builder.url_for(User_tags, user_id = user_id), "rel": "user tags", "prompt": "User tags"},
+                                 {"href": link_builder.url_for(User_statuses, user_id = user_id), "rel": "user statuses", "prompt": "User statuses"},
+                                 {"href": link_builder.url_for(User_friendships, user_id = user_id), "rel": "user friendships", "prompt": "User friendships"},
+                                 {"href": link_builder.url_for(User_conversations, user_id = user_id), "rel": "user conversations", "prompt": "User conversations"},
+                                 {"href": link_builder.url_for(User_feed, user_id = user_id), "rel": "user feed", "prompt": "User feed"}]
 
                 if prof_picture_id is not None:
-                    item["links"].append({"href" : api.url_for(Media_item, media_id = prof_picture_id), "rel" : "profile picture", "prompt" : "User profile picture"})
+                    item["links"].append({"href" : link_builder.url_for(Media_item, media_id = prof_picture_id), "rel" : "profile picture", "prompt" : "User profile picture"})
 
                 items.append(item)
 
@@ -793,15 +1509,19 @@ class User_profiles(Resource):
                              {"name": "age", "value": "", "prompt": "User age", "required": "true"},
                              {"name": "gender", "value": "", "prompt": "User gender", "required": "true"}]}
 
-        queries = [{"href": api.url_for(User_profiles),
+        queries = [{"href": link_builder.url_for(User_profiles),
                     "rel": "search",
                     "prompt": "Search user",
                     "data": [{"name": "name", "value": ""},
-                             {"name": "surname", "value": ""}]}]
+                             {"name": "surname", "value": ""}]},
+                   {"href": link_builder.url_for(User_profiles),
+                    "rel": "search",
+                    "prompt": "Search user by any name",
+                    "data": [{"name": "q", "value": ""}]}]
 
         collection = {
             "version": API_VERSION,
-            "href": api.url_for(User_profiles),
+            "href": link_builder.url_for(User_profiles),
             "items": items,
             "template": template,
             "queries": queries
@@ -809,7 +1529,7 @@ class User_profiles(Resource):
 
         envelope = {"collection": collection}
 
-        resp = Response(json.dumps(envelope), 200, mimetype = COLLECTION_JSON + ";profile=" + USER_PROFILE)
+        resp = collection_response(envelope, COLLECTION_JSON + ";profile=" + USER_PROFILE)
         return resp
 
     def post(self):
@@ -867,7 +1587,7 @@ class User_profiles(Resource):
                         if new_user_id is None:
                             resp = internal_server_error()
                         else:
-                            new_url = api.url_for(User_profile, user_id = new_user_id)
+                            new_url = link_builder.url_for(User_profile, user_id = new_user_id)
                             resp = Response(status = 201, headers = {"Location" : new_url})
             except Exception, e:
                 resp = bad_request(parameter_name = "Profile picture id, user age or user gender")
@@ -877,6 +1597,7 @@ class User_profiles(Resource):
 
 class User_profile(Resource):
 
+    @conditional_get("users_profiles")
     def get(self, user_id):
         resp = None
 
@@ -892,15 +1613,15 @@ class User_profile(Resource):
             age = user_profile["age"]
             gender = user_profile["gender"]
 
-            _links = {"self" : {"href" : api.url_for(User_profile, user_id = user_id), "profile" : USER_PROFILE},
-                      "user memberships" : {"href" : api.url_for(User_memberships, user_id = user_id)},
-                      "user comments" : {"href" : api.url_for(User_comments, user_id = user_id)},
-                      "user rates" : {"href" : api.url_for(User_rates, user_id = user_id)},
-                      "user tags" : {"href" : api.url_for(User_tags, user_id = user_id)},
-                      "user statuses" : {"href" : api.url_for(User_statuses, user_id = user_id)},
-                      "user friendships" : {"href" : api.url_for(User_friendships, user_id = user_id)},
-                      "user conversations" : {"href" : api.url_for(User_conversations, user_id = user_id)},
-                      "user feed" : {"href" : api.url_for(User_feed, user_id = user_id)}}
+            _links = {"self" : {"href" : link_builder.url_for(User_profile, user_id = user_id), "profile" : USER_PROFILE},
+                      "user memberships" : {"href" : link_builder.url_for(User_memberships, user_id = user_id)},
+                      "user comments" : {"href" : link_builder.url_for(User_comments, user_id = user_id)},
+                      "user rates" : {"href" : link_builder.url_for(User_rates, user_id = user_id)},
+                      "user tags" : {"href" : link_builder.url_for(User_tags, user_id = user_id)},
+                      "user statuses" : {"href" : link_builder.url_for(User_statuses, user_id = user_id)},
+                      "user friendships" : {"href" : link_builder.url_for(User_friendships, user_id = user_id)},
+                      "user conversations" : {"href" : link_builder.url_for(User_conversations, user_id = user_id)},
+                      "user feed" : {"href" : link_builder.url_for(User_feed, user_id = user_id)}}
 
             template = {"data" : [{"name" : "password", "value" : "", "prompt" : "User password", "required" : "false"},
                                   {"name" : "firstName", "value" : "", "prompt" : "User first name", "required" : "false"},
@@ -925,7 +1646,7 @@ class User_profile(Resource):
             if prof_picture_id is not None:
                 hal["prof_picture_id"] = prof_picture_id
 
-            resp = Response(json.dumps(hal), 200, mimetype = HAL_JSON)
+            resp = Response(dumps(hal), 200, mimetype = HAL_JSON)
         return resp
 
 
@@ -1019,59 +1740,75 @@ class User_profile(Resource):
 
 class User_statuses(Resource):
 
+    @conditional_get("users_profiles", "statuses", "statuses_media_lists", "media_items", "statuses_tags_lists", "comments", "rates")
     def get(self, user_id):
         resp = None
 
-        if g.con.get_user_information(user_id) is None:
+        try:
+            page = get_page_parameters(status_sort_key)
+        except ValueError:
+            page = None
+
+        try:
+            embed = get_embed_parameters()
+        except ValueError:
+            embed = None
+
+        if page is None:
+            resp = bad_request(parameter_name = "Page limit or cursor")
+        elif embed is None:
+            resp = bad_request(parameter_name = "Embed")
+        elif g.con.get_user_information(user_id) is None:
             resp = resource_not_found(parameter_name = "User")
         else:
-            user_statuses = g.con.get_statuses_for_user(user_id)
-
-            items = []
-
-            if user_statuses is not None:
-                for status in user_statuses:
-                    status_id = status["status_id"]
-                    content = status["content"]
-                    creation_time = status["creation_time"]
+            user_statuses, page_state = stream_page(g.con.get_statuses_for_user, (user_id,), page)
+            if embed:
+                user_statuses, embedded = embed_statuses(user_statuses, embed)
 
-                    item = {}
+            def render(status):
+                status_id = status["status_id"]
+                content = status["content"]
+                creation_time = status["creation_time"]
 
-                    item["href"] = api.url_for(Status, status_id = status_id)
+                item = {}
 
-                    item["data"] = [{"name" : "id", "value" : status_id, "prompt" : "Status id"},
-                                    {"name" : "user_id", "value" : user_id, "prompt" : "Creator id"},
-                                    {"name" : "content", "value" : content, "prompt" : "Status content"},
-                                    {"name" : "creation_time", "value" : creation_time, "prompt" : "Status creation time"}]
+                item["href"] = link_builder.url_for(Status, status_id = status_id)
 
-                    item["links"] = [{"href" : api.url_for(Status_comments, status_id = status_id), "rel" : "status comments", "prompt" : "Status comments"},
-                                     {"href" : api.url_for(Status_rates, status_id = status_id), "rel" : "status rates", "prompt" : "Status rates"},
-                                     {"href" : api.url_for(Status_tags, status_id = status_id), "rel" : "status tags", "prompt" : "Status tags"},
-                                     {"href" : api.url_for(Status_media, status_id = status_id), "rel" : "media list", "prompt" : "Status media items"}]
+                item["data"] = [{"name" : "id", "value" : status_id, "prompt" : "Status id"},
+                                {"name" : "user_id", "value" : user_id, "prompt" : "Creator id"},
+                                {"name" : "content", "value" : content, "prompt" : "Status content"},
+                                {"name" : "creation_time", "value" : creation_time, "prompt" : "Status creation time"}]
 
-                    items.append(item)
+                item["links"] = [{"href" : link_builder.url_for(Status_comments, status_id = status_id), "rel" : "status comments", "prompt" : "Status comments"},
+                                 {"href" : link_builder.url_for(Status_rates, status_id = status_id), "rel" : "status rates", "prompt" : "Status rates"},
+                                 {"href" : link_builder.url_for(Status_tags, status_id = status_id), "rel" : "status tags", "prompt" : "Status tags"},
+                                 {"href" : link_builder.url_for(Status_media, status_id = status_id), "rel" : "media list", "prompt" : "Status media items"}]
+                if embed:
+                    item["embedded"] = embedded[status_id]
+                return item
 
-            links = [{"href" : api.url_for(User_profile, user_id = user_id), "rel" : "author", "prompt" : "Author"}]
+            def trailer():          #Page links are known once all the statuses have been written
+                links = [{"href" : link_builder.url_for(User_profile, user_id = user_id), "rel" : "author", "prompt" : "Author"}]
+                add_page_links(links, link_builder.url_for(User_statuses, user_id = user_id), page_state["bounds"], status_sort_key, page[0], page_state["has_next"], page_state["has_prev"])
+                return {"links" : links}
 
-            template = {"data" : [{"name" : "content", "value" : "", "prompt" : "Status content", "required" : "true"}]}
+            template = {"data" : [{"name" : "content", "value" : "", "prompt" : "Status content", "required" : "true"}] + STATUS_ATTACHMENTS_TEMPLATE_DATA}
 
             collection = {
                 "version" : API_VERSION,
-                "href" : api.url_for(User_statuses, user_id = user_id),
-                "links" : links,
-                "items" : items,
+                "href" : link_builder.url_for(User_statuses, user_id = user_id),
                 "template" : template
             }
 
-            envelope = {"collection" : collection}
-
-            resp = Response(json.dumps(envelope), 200, mimetype = COLLECTION_JSON + ";profile=" + STATUS_PROFILE)
+            resp = stream_collection(collection, (render(status) for status in user_statuses), trailer, COLLECTION_JSON + ";profile=" + STATUS_PROFILE)
         return resp
 
     def post(self, user_id):
         resp = None
 
         CONTENT = "content"
+        MEDIA_IDS = "media_ids"
+        TAGGED_USER_IDS = "tagged_user_ids"
 
         if request.headers.get("Content-Type", "") != COLLECTION_JSON:
             resp = unsupported_media_type()
@@ -1083,15 +1820,19 @@ class User_statuses(Resource):
                 template_data = request_body["template"]["data"]                                #Get data element of template
                 values_array = list(data["value"] for data in template_data if data["name"] == CONTENT)
                 content = values_array[0]
+                media_ids = get_template_ids(template_data, MEDIA_IDS)
+                tagged_user_ids = get_template_ids(template_data, TAGGED_USER_IDS)
 
-                new_status = {"creator_id" : user_id, "content" : content}
-                new_status_id = g.con.create_status(new_status)
+                resp = check_status_attachments(media_ids, tagged_user_ids)
+                if resp is None:
+                    new_status = {"creator_id" : user_id, "content" : content}
+                    new_status_id = g.con.create_status(new_status, media_ids = media_ids, tagged_user_ids = tagged_user_ids)    #Status, media and tags in one transaction
 
-                if new_status_id is None:
-                    resp = internal_server_error()
-                else:
-                    new_url = api.url_for(Status, status_id = new_status_id)
-                    resp = Response(status=201, headers={"Location": new_url})
+                    if new_status_id is None:
+                        resp = internal_server_error()
+                    else:
+                        new_url = link_builder.url_for(Status, status_id = new_status_id)
+                        resp = Response(status=201, headers={"Location": new_url})
             except:
                 resp = bad_request()
         return resp
@@ -1100,61 +1841,71 @@ class User_statuses(Resource):
 
 class User_feed(Resource):
 
+    @conditional_get("users_profiles", "feed_entries", "statuses", "statuses_media_lists", "media_items", "statuses_tags_lists", "comments", "rates")
     def get(self, user_id):
         resp = None
-        try:
-            limit = int(request.args.get("limit", -1))
-
-            if g.con.get_user_information(user_id) is None:
-                resp = resource_not_found(parameter_name = "User")
-            else:
-                user_feed = g.con.get_friends_statuses_for_user(user_id, limit)
-
-                items = []
 
-                if user_feed is not None:
-                    for status in user_feed:
-                        status_id = status["status_id"]
-                        creator_id = status["creator_id"]
-                        content = status["content"]
-                        creation_time = status["creation_time"]
+        try:
+            embed = get_embed_parameters()
+        except ValueError:
+            embed = None
 
-                        item = {}
+        try:
+            page = get_page_parameters(status_sort_key)
+        except ValueError:
+            page = None
+
+        if page is None:
+            resp = bad_request(parameter_name = "Page limit or cursor")
+        elif embed is None:
+            resp = bad_request(parameter_name = "Embed")
+        elif g.con.get_user_information(user_id) is None:
+            resp = resource_not_found(parameter_name = "User")
+        else:
+            user_feed, page_state = stream_page(g.con.get_friends_statuses_for_user, (user_id,), page)
+            if embed:
+                user_feed, embedded = embed_statuses(user_feed, embed)
 
-                        item["href"] = api.url_for(Status, status_id = status_id)
+            def render(status):
+                status_id = status["status_id"]
+                creator_id = status["creator_id"]
+                content = status["content"]
+                creation_time = status["creation_time"]
 
-                        item["data"] = [{"name" : "id", "value" : status_id, "prompt" : "Status id"},
-                                        {"name" : "user_id", "value" : creator_id, "prompt" : "Creator id"},
-                                        {"name" : "content", "value" : content, "prompt" : "Status content"},
-                                        {"name" : "creation_time", "value" : creation_time, "prompt" : "Status creation time"}]
+                item = {}
 
-                        item["links"] = [{"href" : api.url_for(Status_comments, status_id = status_id), "rel" : "status comments", "prompt" : "Status comments"},
-                                         {"href" : api.url_for(Status_rates, status_id = status_id), "rel" : "status rates", "prompt" : "Status rates"},
-                                         {"href" : api.url_for(Status_tags, status_id = status_id), "rel" : "status tags", "prompt" : "Status tags"},
-                                         {"href" : api.url_for(Status_media, status_id = status_id), "rel" : "media list", "prompt" : "Status media items"},
-                                         {"href" : api.url_for(User_profile, user_id = creator_id), "rel" : "author", "prompt" : "Status creator profile"}]
+                item["href"] = link_builder.url_for(Status, status_id = status_id)
 
-                        items.append(item)
+                item["data"] = [{"name" : "id", "value" : status_id, "prompt" : "Status id"},
+                                {"name" : "user_id", "value" : creator_id, "prompt" : "Creator id"},
+                                {"name" : "content", "value" : content, "prompt" : "Status content"},
+                                {"name" : "creation_time", "value" : creation_time, "prompt" : "Status creation time"}]
 
-                links = [{"href" : api.url_for(User_profile, user_id = user_id), "rel" : "user profile", "prompt" : "User profile"}]
+                item["links"] = [{"href" : link_builder.url_for(Status_comments, status_id = status_id), "rel" : "status comments", "prompt" : "Status comments"},
+                                 {"href" : link_builder.url_for(Status_rates, status_id = status_id), "rel" : "status rates", "prompt" : "Status rates"},
+                                 {"href" : link_builder.url_for(Status_tags, status_id = status_id), "rel" : "status tags", "prompt" : "Status tags"},
+                                 {"href" : link_builder.url_for(Status_media, status_id = status_id), "rel" : "media list", "prompt" : "Status media items"},
+                                 {"href" : link_builder.url_for(User_profile, user_id = creator_id), "rel" : "author", "prompt" : "Status creator profile"}]
+                if embed:
+                    item["embedded"] = embedded[status_id]
+                return item
 
-                queries = [{"href" : api.url_for(User_feed, user_id = user_id),
-                            "rel" : "search",
-                            "prompt" : "Search", "data" : [{"name" : "limit", "value" : ""}]}]
+            def trailer():          #Page links are known once all the statuses have been written
+                links = [{"href" : link_builder.url_for(User_profile, user_id = user_id), "rel" : "user profile", "prompt" : "User profile"}]
+                add_page_links(links, link_builder.url_for(User_feed, user_id = user_id), page_state["bounds"], status_sort_key, page[0], page_state["has_next"], page_state["has_prev"])
+                return {"links" : links}
 
-                collection = {
-                    "version" : API_VERSION,
-                    "href" : api.url_for(User_feed, user_id = user_id),
-                    "links" : links,
-                    "items" : items,
-                    "queries": queries
-                }
+            queries = [{"href" : link_builder.url_for(User_feed, user_id = user_id),
+                        "rel" : "search",
+                        "prompt" : "Search", "data" : [{"name" : "limit", "value" : ""}]}]
 
-                envelope = {"collection" : collection}
+            collection = {
+                "version" : API_VERSION,
+                "href" : link_builder.url_for(User_feed, user_id = user_id),
+                "queries": queries
+            }
 
-                resp = Response(json.dumps(envelope), 200, mimetype = COLLECTION_JSON + ";profile=" + STATUS_PROFILE)
-        except:
-            resp = bad_request(parameter_name = "Feed limit")
+            resp = stream_collection(collection, (render(status) for status in user_feed), trailer, COLLECTION_JSON + ";profile=" + STATUS_PROFILE)
         return resp
 
 ################################################### COMMENT METHODS DEFINITION ###################################################
@@ -1162,6 +1913,7 @@ class User_feed(Resource):
 ##################### COMMENT #####################
 
 class Comment(Resource):
+    @conditional_get("comments")
     def get(self, comment_id):
         resp = None
 
@@ -1176,9 +1928,9 @@ class Comment(Resource):
             creation_time = comment["creation_time"]
 
             _links = {
-                "self" : {"href" : api.url_for(Comment, comment_id = comment_id), "profile" : COMMENT_PROFILE},
-                "status commented" : {"href" : api.url_for(Status, status_id = status_id)},
-                "author" : {"href" : api.url_for(User_profile, user_id = user_id)}
+                "self" : {"href" : link_builder.url_for(Comment, comment_id = comment_id), "profile" : COMMENT_PROFILE},
+                "status commented" : {"href" : link_builder.url_for(Status, status_id = status_id)},
+                "author" : {"href" : link_builder.url_for(User_profile, user_id = user_id)}
             }
 
             template = {"data": [{"name" : "content", "value" : "", "prompt" : "Comment content", "required" : "false"}]}
@@ -1193,7 +1945,7 @@ class Comment(Resource):
                 "template": template
             }
 
-            resp = Response(json.dumps(hal), 200, mimetype = HAL_JSON)
+            resp = Response(dumps(hal), 200, mimetype = HAL_JSON)
         return resp
 
     def patch(self, comment_id):
@@ -1236,6 +1988,7 @@ class Comment(Resource):
 ##################### RATE #####################
 
 class Rate(Resource):
+    @conditional_get("rates")
     def get(self, rate_id):
         resp = None
 
@@ -1249,9 +2002,9 @@ class Rate(Resource):
             value = rate["rate"]
 
             _links = {
-                "self" : {"href" : api.url_for(Rate, rate_id = rate_id), "profile" : RATE_PROFILE},
-                "status rated" : {"href" : api.url_for(Status, status_id = status_id)},
-                "author" : {"href" : api.url_for(User_profile, user_id = user_id)}
+                "self" : {"href" : link_builder.url_for(Rate, rate_id = rate_id), "profile" : RATE_PROFILE},
+                "status rated" : {"href" : link_builder.url_for(Status, status_id = status_id)},
+                "author" : {"href" : link_builder.url_for(User_profile, user_id = user_id)}
             }
 
             template = {"data": [{"name" : "value", "value" : "", "prompt" : "Rate value", "required" : "false"}]}
@@ -1265,7 +2018,7 @@ class Rate(Resource):
                 "template": template
             }
 
-            resp = Response(json.dumps(hal), 200, mimetype = HAL_JSON)
+            resp = Response(dumps(hal), 200, mimetype = HAL_JSON)
         return resp
 
     def patch(self, rate_id):
@@ -1315,6 +2068,7 @@ class Rate(Resource):
 ##################### STATUS #####################
 
 class Status(Resource):
+    @conditional_get("statuses")
     def get(self, status_id):
         resp = None
 
@@ -1328,12 +2082,12 @@ class Status(Resource):
             creation_time = status["creation_time"]
 
             _links = {
-                "self" : {"href" : api.url_for(Status, status_id = status_id), "profile" : STATUS_PROFILE},
-                "status comments" : {"href" : api.url_for(Status_comments, status_id = status_id)},
-                "status rates" : {"href" : api.url_for(Status_rates, status_id = status_id)},
-                "status tags" : {"href" : api.url_for(Status_tags, status_id = status_id)},
-                "status media list" : {"href" : api.url_for(Status_media, status_id = status_id)},
-                "author" : {"href" : api.url_for(User_profile, user_id = creator_id)}
+                "self" : {"href" : link_builder.url_for(Status, status_id = status_id), "profile" : STATUS_PROFILE},
+                "status comments" : {"href" : link_builder.url_for(Status_comments, status_id = status_id)},
+                "status rates" : {"href" : link_builder.url_for(Status_rates, status_id = status_id)},
+                "status tags" : {"href" : link_builder.url_for(Status_tags, status_id = status_id)},
+                "status media list" : {"href" : link_builder.url_for(Status_media, status_id = status_id)},
+                "author" : {"href" : link_builder.url_for(User_profile, user_id = creator_id)}
             }
 
             template = {"data": [{"name" : "content", "value" : "", "prompt" : "Status content", "required" : "false"}]}
@@ -1347,7 +2101,7 @@ class Status(Resource):
                 "template": template
             }
 
-            resp = Response(json.dumps(hal), 200, mimetype = HAL_JSON)
+            resp = Response(dumps(hal), 200, mimetype = HAL_JSON)
         return resp
 
     def patch(self, status_id):
@@ -1389,13 +2143,21 @@ class Status(Resource):
 
 class Status_comments(Resource):
 
+    @conditional_get("statuses", "comments")
     def get(self, status_id):
         resp = None
 
-        if g.con.get_status(status_id) is None:
+        try:
+            page = get_page_parameters(comment_sort_key)
+        except ValueError:
+            page = None
+
+        if page is None:
+            resp = bad_request(parameter_name = "Page limit or cursor")
+        elif g.con.get_status(status_id) is None:
             resp = resource_not_found(parameter_name = "Status")
         else:
-            comments = g.con.get_comments_for_status(status_id)
+            comments, has_next, has_prev = fetch_page(g.con.get_comments_for_status, (status_id,), page)
 
             items = []
 
@@ -1408,7 +2170,7 @@ class Status_comments(Resource):
 
                     item = {}
 
-                    item["href"] = api.url_for(Comment, comment_id = comment_id)
+                    item["href"] = link_builder.url_for(Comment, comment_id = comment_id)
 
                     item["data"] = [{"name" : "id", "value" : comment_id, "prompt" : "Comment id"},
                                     {"name" : "status_id", "value" : status_id, "prompt" : "Status id"},
@@ -1416,18 +2178,19 @@ class Status_comments(Resource):
                                     {"name" : "content", "value" : content, "prompt" : "Comment content"},
                                     {"name" : "creation_time", "value" : creation_time, "prompt" : "Comment creation time"}]
 
-                    item["links"] = [{"href" : api.url_for(User_profile, user_id = user_id), "rel" : "author", "prompt" : "User profile"}]
+                    item["links"] = [{"href" : link_builder.url_for(User_profile, user_id = user_id), "rel" : "author", "prompt" : "User profile"}]
 
                     items.append(item)
 
-            links = [{"href" : api.url_for(Status, status_id = status_id), "rel" : "status", "prompt" : "Status commented"}]
+            links = [{"href" : link_builder.url_for(Status, status_id = status_id), "rel" : "status", "prompt" : "Status commented"}]
+            add_page_links(links, link_builder.url_for(Status_comments, status_id = status_id), comments, comment_sort_key, page[0], has_next, has_prev)
 
             template = {"data": [{"name" : "author", "value" : "", "prompt" : "User id", "required" : "true"},
                                  {"name" : "content", "value" : "", "prompt" : "Content", "required" : "true"}]}
 
             collection = {
                 "version" : API_VERSION,
-                "href" : api.url_for(Status_comments, status_id = status_id),
+                "href" : link_builder.url_for(Status_comments, status_id = status_id),
                 "links" : links,
                 "items" : items,
                 "template" : template
@@ -1435,7 +2198,7 @@ class Status_comments(Resource):
 
             envelope = {"collection" : collection}
 
-            resp = Response(json.dumps(envelope), 200, mimetype = COLLECTION_JSON + ";profile=" + COMMENT_PROFILE)
+            resp = collection_response(envelope, COLLECTION_JSON + ";profile=" + COMMENT_PROFILE)
         return resp
 
     def post(self, status_id):
@@ -1463,7 +2226,7 @@ class Status_comments(Resource):
                 if new_comment_id is None:
                     resp = internal_server_error()
                 else:
-                    new_url = api.url_for(Comment, comment_id = new_comment_id)
+                    new_url = link_builder.url_for(Comment, comment_id = new_comment_id)
                     resp = Response(status = 201, headers = {"Location": new_url})
             except:
                 resp = bad_request(parameter_name = "Author id")
@@ -1473,6 +2236,7 @@ class Status_comments(Resource):
 
 class Status_rates(Resource):
 
+    @conditional_get("statuses", "rates")
     def get(self, status_id):
         resp = None
 
@@ -1491,25 +2255,25 @@ class Status_rates(Resource):
 
                     item = {}
 
-                    item["href"] = api.url_for(Rate, rate_id = rate_id)
+                    item["href"] = link_builder.url_for(Rate, rate_id = rate_id)
 
                     item["data"] = [{"name" : "id", "value" : rate_id, "prompt" : "Rate id"},
                                     {"name" : "status_id", "value" : status_id, "prompt" : "Status id"},
                                     {"name" : "user_id", "value" : user_id, "prompt" : "User id"},
                                     {"name" : "rate", "value" : rate, "prompt" : "Rate value"}]
 
-                    item["links"] = [{"href" : api.url_for(User_profile, user_id = user_id), "rel" : "author", "prompt" : "User profile"}]
+                    item["links"] = [{"href" : link_builder.url_for(User_profile, user_id = user_id), "rel" : "author", "prompt" : "User profile"}]
 
                     items.append(item)
 
-            links = [{"href" : api.url_for(Status, status_id = status_id), "rel" : "status", "prompt" : "Status rated"}]
+            links = [{"href" : link_builder.url_for(Status, status_id = status_id), "rel" : "status", "prompt" : "Status rated"}]
 
             template = {"data": [{"name" : "author", "value" : "", "prompt" : "User id", "required" : "true"},
                                  {"name" : "rate", "value" : "", "prompt" : "Rate", "required" : "true"}]}
 
             collection = {
                 "version" : API_VERSION,
-                "href" : api.url_for(Status_rates, status_id = status_id),
+                "href" : link_builder.url_for(Status_rates, status_id = status_id),
                 "links" : links,
                 "items" : items,
                 "template" : template
@@ -1517,7 +2281,7 @@ class Status_rates(Resource):
 
             envelope = {"collection" : collection}
 
-            resp = Response(json.dumps(envelope), 200, mimetype = COLLECTION_JSON + ";profile=" + RATE_PROFILE)
+            resp = collection_response(envelope, COLLECTION_JSON + ";profile=" + RATE_PROFILE)
         return resp
 
 
@@ -1551,7 +2315,7 @@ class Status_rates(Resource):
                     if new_rate_id is None:
                         resp = internal_server_error()
                     else:
-                        new_url = api.url_for(Rate, rate_id = new_rate_id)
+                        new_url = link_builder.url_for(Rate, rate_id = new_rate_id)
                         resp = Response(status = 201, headers = {"Location" : new_url})
             except:
                 resp = bad_request(parameter_name = "Rate or author id")
@@ -1561,6 +2325,7 @@ class Status_rates(Resource):
 
 class Status_tags(Resource):
 
+    @conditional_get("statuses", "statuses_tags_lists", "users_profiles")
     def get(self, status_id):
         resp = None
 
@@ -1583,7 +2348,7 @@ class Status_tags(Resource):
 
                     item = {}
 
-                    item["href"] = api.url_for(User_profile, user_id = user_id)
+                    item["href"] = link_builder.url_for(User_profile, user_id = user_id)
 
                     item["data"] = [{"name" : "id", "value" : user_id, "prompt" : "User id"},
                                     {"name" : "firstName", "value" : first_name, "prompt" : "User first name"}]
@@ -1595,18 +2360,18 @@ class Status_tags(Resource):
                     if prof_picture_id is not None:
                         item["data"].append({"prof_picture_id" : prof_picture_id})
 
-                    item["links"] = [{"href" : api.url_for(Status_tag, status_id = status_id, user_id = user_id), "rel" : "status tag", "prompt" : "Status tag"},
-                                     {"href" : api.url_for(User_tags, user_id = user_id), "rel" : "user tags", "prompt" : "User tags"}]
+                    item["links"] = [{"href" : link_builder.url_for(Status_tag, status_id = status_id, user_id = user_id), "rel" : "status tag", "prompt" : "Status tag"},
+                                     {"href" : link_builder.url_for(User_tags, user_id = user_id), "rel" : "user tags", "prompt" : "User tags"}]
 
                     items.append(item)
 
-            links = [{"href" : api.url_for(Status, status_id = status_id), "rel" : "status", "prompt" : "Status"}]
+            links = [{"href" : link_builder.url_for(Status, status_id = status_id), "rel" : "status", "prompt" : "Status"}]
 
             template = {"data": [{"name" : "user_id", "value" : "", "prompt" : "User tagged", "required" : "true"}]}
 
             collection = {
                 "version" : API_VERSION,
-                "href" : api.url_for(Status_tags, status_id = status_id),
+                "href" : link_builder.url_for(Status_tags, status_id = status_id),
                 "links" : links,
                 "items" : items,
                 "template" : template
@@ -1614,7 +2379,7 @@ class Status_tags(Resource):
 
             envelope = {"collection" : collection}
 
-            resp = Response(json.dumps(envelope), 200, mimetype = COLLECTION_JSON + ";profile=" + USER_PROFILE)
+            resp = collection_response(envelope, COLLECTION_JSON + ";profile=" + USER_PROFILE)
         return resp
 
     def post(self, status_id):
@@ -1641,7 +2406,7 @@ class Status_tags(Resource):
                     if not g.con.add_tag_to_status(status_id, user_id):
                         resp = internal_server_error()
                     else:
-                        new_url = api.url_for(Status_tag, status_id = status_id, user_id = user_id)
+                        new_url = link_builder.url_for(Status_tag, status_id = status_id, user_id = user_id)
                         resp = Response(status = 201, headers = {"Location" : new_url})
             except:
                 resp = bad_request(parameter_name = "Tagged user id")
@@ -1651,6 +2416,7 @@ class Status_tags(Resource):
 
 class Status_tag(Resource):
 
+    @conditional_get("users_profiles", "statuses", "statuses_tags_lists")
     def get(self, status_id, user_id):
         resp = None
 
@@ -1659,9 +2425,8 @@ class Status_tag(Resource):
         elif g.con.get_status(status_id) is None:
             resp = resource_not_found(parameter_name = "Status", resp_type = HAL_JSON)
         else:
-            tags = g.con.get_tagged_users_for_status(status_id)
-            filtered_status_tags = list(tag for tag in tags if tag["user_id"] == user_id) if tags is not None else []
-            status_tag = filtered_status_tags[0] if len(filtered_status_tags) > 0 else None
+            #The profile checked above comes from the identity map: just the tag is looked up
+            status_tag = g.con.get_user_information(user_id) if g.con.is_user_tagged(status_id, user_id) else None
 
             if status_tag is not None:
                 first_name = status_tag["first_name"]
@@ -1671,10 +2436,10 @@ class Status_tag(Resource):
                 age = status_tag["age"]
                 gender = status_tag["gender"]
 
-                _links = {"self" : {"href" : api.url_for(Status_tag, status_id = status_id, user_id = user_id), "profile" : USER_PROFILE},
-                          "status tags" : {"href" : api.url_for(Status_tags, status_id = status_id)},
-                          "status tagged" : {"href" : api.url_for(Status, status_id = status_id)},
-                          "tag" : {"href" : api.url_for(User_profile, user_id = user_id)}}
+                _links = {"self" : {"href" : link_builder.url_for(Status_tag, status_id = status_id, user_id = user_id), "profile" : USER_PROFILE},
+                          "status tags" : {"href" : link_builder.url_for(Status_tags, status_id = status_id)},
+                          "status tagged" : {"href" : link_builder.url_for(Status, status_id = status_id)},
+                          "tag" : {"href" : link_builder.url_for(User_profile, user_id = user_id)}}
 
                 hal = {
                     "id" : user_id,
@@ -1690,7 +2455,7 @@ class Status_tag(Resource):
                 if prof_picture_id is not None:
                     hal["prof_picture_id"] = prof_picture_id
 
-                resp = Response(json.dumps(hal), 200, mimetype = HAL_JSON)
+                resp = Response(dumps(hal), 200, mimetype = HAL_JSON)
             else:
                 resp = resource_not_found(parameter_name = "Tag", resp_type = HAL_JSON)
         return resp
@@ -1708,6 +2473,7 @@ class Status_tag(Resource):
 
 class Status_media(Resource):
 
+    @conditional_get("statuses", "statuses_media_lists", "media_items")
     def get(self, status_id):
         resp = None
 
@@ -1727,7 +2493,7 @@ class Status_media(Resource):
 
                     item = {}
 
-                    item["href"] = api.url_for(Media_item, media_id = media_item_id)
+                    item["href"] = link_builder.url_for(Media_item, media_id = media_item_id)
 
                     item["data"] = [{"name" : "id", "value" : media_item_id, "prompt" : "Media item id"},
                                     {"name" : "media_item_type", "value" : media_item_type, "prompt" : "Media item type"},
@@ -1736,14 +2502,14 @@ class Status_media(Resource):
 
                     items.append(item)
 
-            links = [{"href" : api.url_for(Status, status_id = status_id), "rel" : "status", "prompt" : "Status"}]
+            links = [{"href" : link_builder.url_for(Status, status_id = status_id), "rel" : "status", "prompt" : "Status"}]
 
             template = {"data": ["---BOUNDARY Content-Disposition: form-data; name = ''; filename = '' Content-Type : image/jpg Content-Transfer-Encoding: base64" +
                                 "RAW DATA ---BOUNDARY"]}
 
             collection = {
                 "version" : API_VERSION,
-                "href" : api.url_for(Status_media, status_id = status_id),
+                "href" : link_builder.url_for(Status_media, status_id = status_id),
                 "links" : links,
                 "items" : items,
                 "template" : template
@@ -1751,7 +2517,7 @@ class Status_media(Resource):
 
             envelope = {"collection" : collection}
 
-            resp = Response(json.dumps(envelope), 200, mimetype = COLLECTION_JSON + ";profile=" + MEDIA_ITEM_PROFILE)
+            resp = collection_response(envelope, COLLECTION_JSON + ";profile=" + MEDIA_ITEM_PROFILE)
         return resp
 
 
@@ -1786,7 +2552,7 @@ class Status_media(Resource):
                                 resp = internal_server_error()
                             else:
                                 file.save(file_relative_url)
-                                new_url = api.url_for(Media_item, media_item_id = new_media_id)
+                                new_url = link_builder.url_for(Media_item, media_item_id = new_media_id)
                                 resp = Response(status = 201, headers = {"Location" : new_url})
             except:
                 resp = bad_request(parameter_name = "Media item")
@@ -1798,6 +2564,7 @@ class Status_media(Resource):
 
 class Friendship(Resource):
 
+    @conditional_get("friendships")
     def get(self, friendship_id):
         resp = None
 
@@ -1812,9 +2579,9 @@ class Friendship(Resource):
             friendship_start = friendship.get("friendship_start", None)
 
             _links = {
-                "self" : {"href" : api.url_for(Friendship, friendship_id = friendship_id), "profile" : FRIENDSHIP_PROFILE},
-                "user profile" : {"href" : api.url_for(User_profile, user_id = user1_id)},
-                "friend" : {"href" : api.url_for(User_profile, user_id = user2_id)}
+                "self" : {"href" : link_builder.url_for(Friendship, friendship_id = friendship_id), "profile" : FRIENDSHIP_PROFILE},
+                "user profile" : {"href" : link_builder.url_for(User_profile, user_id = user1_id)},
+                "friend" : {"href" : link_builder.url_for(User_profile, user_id = user2_id)}
             }
 
             template = {"data": [{"name" : "friendship_status", "value" : "", "prompt" : "Friendship status", "required" : "false"}]}
@@ -1831,7 +2598,7 @@ class Friendship(Resource):
             if friendship_start is not None:
                 hal["friendship_start"] = friendship_start
 
-            resp = Response(json.dumps(hal), 200, mimetype = HAL_JSON)
+            resp = Response(dumps(hal), 200, mimetype = HAL_JSON)
         return resp
 
     def patch(self, friendship_id):
@@ -1895,31 +2662,163 @@ class Media_list(Resource):
                     if file_extension not in ALLOWED_EXTENSIONS:
                         resp = unsupported_media_type()
                     else:
-                        filename = "media%s.%s" % (app.config["LAST_MEDIA_ITEM_ID"] + 1, file_extension)        #Name handled by server, so there is no possibility of two equal names
-
-                        file_complete_url = os.path.join(app.static_folder, filename) #Get complete absolute path for the new resource
-                        file_relative_url = file_complete_url[file_complete_url.find("/friendsNet"):]
-
-                        file_type = get_file_type(file_extension)   #We are sure extension is one of the allowed extensions, so file_type will be either 0 or 1
-
-                        new_media_item = {"media_type" : file_type, "url" : file_relative_url}
-                        new_media_id = g.con.create_media(new_media_item)
+                        storage = get_blob_storage()
+                        content_hash, size, temporary_path = storage.write(file.stream)         #Hashed while it is copied
+                        new_media_id = create_stored_media(storage, temporary_path, content_hash, size, file_extension)     #Named after its id
 
                         if new_media_id is None:
                             resp = double_resource_attribute(parameter_name = "Media element with this name")
                         else:
-                            app.config["LAST_MEDIA_ITEM_ID"] = app.config["LAST_MEDIA_ITEM_ID"] + 1
-                            file.save(file_complete_url)        #Save file only if everything is correct
-                            new_url = api.url_for(Media_item, media_id = new_media_id)
+                            new_url = link_builder.url_for(Media_item, media_id = new_media_id)
                             resp = Response(status = 201, headers = {"Location" : new_url})
             except Exception, e:
                 resp = bad_request(parameter_name = "Media item")
         return resp
 
+##################### MEDIA UPLOADS #####################
+
+# Resumable uploads, for files too large to be sent in one request: a client starts an upload declaring name and size of the file,
+# sends it in chunks with PUT to the upload (resuming from the offset in the Upload-Offset header when a chunk fails), then
+# completes it with POST, which creates the media item. The chunks are written straight to a file of the blob storage
+class Media_uploads(Resource):
+    def post(self):
+        resp = None
+
+        FILE_NAME = "file_name"
+        SIZE = "size"
+
+        if request.headers.get("Content-Type", "") != COLLECTION_JSON:
+            resp = unsupported_media_type()
+        else:
+            try:
+                request_body = request.get_json(force = True)                                   #Get and transform request body in JSON
+                template_data = request_body["template"]["data"]                                #Get data element of template
+                values_array = list(data["value"] for data in template_data if data["name"] == FILE_NAME)
+                file_extension = get_file_extension(secure_filename(values_array[0]))
+                values_array = list(data["value"] for data in template_data if data["name"] == SIZE)
+                size = int(values_array[0])
+
+                if file_extension not in ALLOWED_EXTENSIONS:
+                    resp = unsupported_media_type()
+                elif size < 1 or size > app.config["MAX_MEDIA_UPLOAD_SIZE"]:
+                    resp = bad_request(parameter_name = "Size")
+                else:
+                    upload_id = uuid.uuid4().hex                    #Not guessable: whoever knows it can write the upload
+                    storage = get_blob_storage()
+                    with atomic():                                  #Expired uploads are swept before counting the ones in progress
+                        for expired_upload_id in g.con.delete_expired_media_uploads(get_media_upload_expiration_time()):
+                            g.con.after_commit(functools.partial(storage.discard, storage.upload_path_for(expired_upload_id)))
+                    storage.start_upload(upload_id)
+                    new_upload = {"upload_id" : upload_id, "file_extension" : file_extension, "size" : size}
+                    if not g.con.create_media_upload(new_upload, max_uploads = app.config["MAX_MEDIA_UPLOADS"]):
+                        storage.discard(storage.upload_path_for(upload_id))
+                        resp = too_many_uploads()
+                    else:
+                        new_url = link_builder.url_for(Media_upload, upload_id = upload_id)
+                        resp = Response(status = 201, headers = {"Location" : new_url, UPLOAD_OFFSET_HEADER : "0"})
+            except:
+                resp = bad_request()
+        return resp
+
+##################### MEDIA UPLOAD #####################
+
+class Media_upload(Resource):
+    def get(self, upload_id):
+        resp = None
+
+        upload = get_media_upload(upload_id)
+        offset = get_blob_storage().upload_offset(upload_id) if upload is not None else None
+
+        if offset is None:
+            resp = resource_not_found(parameter_name = "Upload", resp_type = HAL_JSON)
+        else:
+            _links = {
+                "self" : {"href" : link_builder.url_for(Media_upload, upload_id = upload_id)},
+                "media list" : {"href" : link_builder.url_for(Media_list)}
+            }
+
+            hal = {
+                "id" : upload_id,
+                "size" : upload["size"],
+                "offset" : offset,
+                "_links" : _links
+            }
+
+            resp = Response(dumps(hal), 200, mimetype = HAL_JSON, headers = {UPLOAD_OFFSET_HEADER : str(offset)})
+        return resp
+
+    # Append a chunk. Its position is in the Content-Range header ("bytes 0-1048575/209715200"), and it must start where the upload has arrived
+    def put(self, upload_id):
+        resp = None
+
+        upload = get_media_upload(upload_id)
+        content_range = parse_content_range_header(request.headers.get("Content-Range", None))
+
+        if upload is None:
+            resp = resource_not_found(parameter_name = "Upload")
+        elif request.headers.get("Content-Type", "") != OCTET_STREAM:
+            resp = unsupported_media_type()
+        elif content_range is None or content_range.units != "bytes" or content_range.length != upload["size"]:
+            resp = bad_request(parameter_name = "Content-Range")
+        else:
+            try:
+                offset = get_blob_storage().append(upload_id, request.stream, content_range.start, content_range.stop)
+                resp = Response(status = 204, headers = {UPLOAD_OFFSET_HEADER : str(offset)})
+            except UploadOffsetError, e:
+                resp = upload_offset_conflict(e.offset)
+            except ValueError:                                  #Longer than its Content-Range
+                resp = bad_request(parameter_name = "Chunk")
+            except IOError:                                     #Completed or deleted in the meanwhile
+                resp = resource_not_found(parameter_name = "Upload")
+        return resp
+
+    # Complete the upload, creating the media item
+    def post(self, upload_id):
+        resp = None
+
+        upload = get_media_upload(upload_id)
+        storage = get_blob_storage()
+        offset = storage.upload_offset(upload_id) if upload is not None else None
+
+        if offset is None:
+            resp = resource_not_found(parameter_name = "Upload")
+        elif offset != upload["size"]:
+            resp = upload_offset_conflict(offset)
+        else:
+            try:
+                upload_path = storage.upload_path_for(upload_id)
+                content_hash, size = storage.hash_file(upload_path)
+                new_media_id = create_stored_media(storage, upload_path, content_hash, size, upload["file_extension"], upload_id = upload_id)
+                if new_media_id is None:
+                    resp = resource_not_found(parameter_name = "Upload")            #Completed by another request
+                else:
+                    new_url = link_builder.url_for(Media_item, media_id = new_media_id)
+                    resp = Response(status = 201, headers = {"Location" : new_url})
+            except:
+                resp = internal_server_error()
+        return resp
+
+    def delete(self, upload_id):
+        resp = None
+        deleted = False
+
+        with atomic():
+            if g.con.delete_media_upload(upload_id):
+                storage = get_blob_storage()
+                g.con.after_commit(functools.partial(storage.discard, storage.upload_path_for(upload_id)))
+                deleted = True
+
+        if deleted:
+            resp = Response(status = 204)
+        else:
+            resp = resource_not_found(parameter_name = "Upload")
+        return resp
+
 ##################### MEDIA ITEM #####################
 
 class Media_item(Resource):
 
+    @conditional_get("media_items")
     def get(self, media_id):
         resp = None
 
@@ -1933,8 +2832,8 @@ class Media_item(Resource):
             description = media_item["description"]
 
             _links = {
-                "self" : {"href" : api.url_for(Media_item, media_id = media_id), "profile" : MEDIA_ITEM_PROFILE},
-                "media list" : {"href" : api.url_for(Media_list)}
+                "self" : {"href" : link_builder.url_for(Media_item, media_id = media_id), "profile" : MEDIA_ITEM_PROFILE},
+                "media list" : {"href" : link_builder.url_for(Media_list)}
             }
 
             template = {"data": [{"name" : "description", "value" : "", "prompt" : "Media item description", "required" : "false"}]}
@@ -1948,7 +2847,7 @@ class Media_item(Resource):
                 "template" : template
             }
 
-            resp = Response(json.dumps(hal), 200, mimetype = HAL_JSON)
+            resp = Response(dumps(hal), 200, mimetype = HAL_JSON)
         return resp
 
     def patch(self, media_id):
@@ -1982,18 +2881,27 @@ class Media_item(Resource):
     def delete(self, media_id):
         resp = None
         media_item = g.con.get_media_item(media_id)
+        blob = g.con.get_blob_for_media_item(media_id)
 
-        if media_item is not None:
+        if media_item is not None and blob is not None:
+            try:
+                #The file is removed only with the last reference to its content, once that is committed (see create_stored_media)
+                with atomic():
+                    if g.con.delete_media_item(media_id) and g.con.delete_unreferenced_media_blob(blob["content_hash"]):
+                        g.con.after_commit(functools.partial(remove_blob_file, g.con, blob["content_hash"]))
+                resp = Response(status = 204)
+            except:
+                resp = internal_server_error()
+        elif media_item is not None:                                #Uploaded before the blobs: the file is named as the url
 
             file_complete_url = os.path.join(app.static_folder, get_file_name(media_item["url"]))
-            if g.con.delete_media_item(media_id):
-                try:
-                    os.remove(file_complete_url)                    #Delete the image from the filesystem
-                    if media_id == app.config["LAST_MEDIA_ITEM_ID"]:
-                        app.config["LAST_MEDIA_ITEM_ID"] = media_id - 1     #Decrement the id of the last item uploaded so that name can be reused
-                except:
-                    resp = internal_server_error()
+            try:
+                with atomic():
+                    if g.con.delete_media_item(media_id):
+                        g.con.after_commit(functools.partial(remove_file, file_complete_url))      #Delete the image from the filesystem
                 resp = Response(status = 204)
+            except:
+                resp = internal_server_error()
         else:
             resp = resource_not_found(parameter_name = "Media item")
         return resp
@@ -2003,9 +2911,23 @@ class Media_item_data(Resource):
 
     def get(self, file_name):
         resp = None
+        size = request.args.get("size", FULL_MEDIA_SIZE)
+        if size not in MEDIA_SIZES:
+            return bad_request(parameter_name = "Size")
         try:
-            resp = send_from_directory(app.static_folder, file_name, as_attachment = True)
-        except:
+            blob = g.con.get_blob_for_media_url(link_builder.url_for(Media_item_data, file_name = file_name))
+            derivative = None
+            if blob is not None and size != FULL_MEDIA_SIZE:
+                derivative = g.con.get_media_derivative(blob["content_hash"], size)
+            if derivative is not None:
+                resp = send_media_file(get_blob_storage().derivative_path_for(blob["content_hash"], size), file_name, etag = "%s-%s" % (blob["content_hash"], size))
+            elif blob is not None and size != FULL_MEDIA_SIZE:  #Variant not generated yet: the url will serve it soon, so the original is kept briefly
+                resp = send_media_file(get_blob_storage().path_for(blob["content_hash"]), file_name, etag = blob["content_hash"], max_age = MEDIA_FALLBACK_MAX_AGE)
+            elif blob is not None:                          #The hash of the content is the best ETag
+                resp = send_media_file(get_blob_storage().path_for(blob["content_hash"]), file_name, etag = blob["content_hash"])
+            else:
+                resp = send_media_file(safe_join(app.static_folder, file_name), file_name)
+        except (EnvironmentError, NotFound):                #File missing or name outside of the media folder
             resp = resource_not_found("Media item data", resp_type = HAL_JSON)
         return resp
 
@@ -2015,6 +2937,7 @@ class Media_item_data(Resource):
 
 class Group(Resource):
 
+    @conditional_get("groups")
     def get(self, group_id):
         resp = None
 
@@ -2029,11 +2952,11 @@ class Group(Resource):
             description = group["description"]
 
             _links = {
-                "self" : {"href" : api.url_for(Group, group_id = group_id), "profile" : GROUP_PROFILE},
-                "groups" : {"href" : api.url_for(Groups)},
-                "group statuses" : {"href" : api.url_for(Group_statuses, group_id = group_id)},
-                "group members" : {"href" : api.url_for(Group_members, group_id = group_id)},
-                "group requests" : {"href" : api.url_for(Group_requests, group_id = group_id)}
+                "self" : {"href" : link_builder.url_for(Group, group_id = group_id), "profile" : GROUP_PROFILE},
+                "groups" : {"href" : link_builder.url_for(Groups)},
+                "group statuses" : {"href" : link_builder.url_for(Group_statuses, group_id = group_id)},
+                "group members" : {"href" : link_builder.url_for(Group_members, group_id = group_id)},
+                "group requests" : {"href" : link_builder.url_for(Group_requests, group_id = group_id)}
             }
 
             template = {"data": [{"name" : "name", "value" : "", "prompt" : "Group name", "required" : "false"},
@@ -2053,7 +2976,7 @@ class Group(Resource):
             if prof_picture_id is not None:
                 hal["prof_picture_id"] = prof_picture_id
 
-            resp = Response(json.dumps(hal), 200, mimetype = HAL_JSON)
+            resp = Response(dumps(hal), 200, mimetype = HAL_JSON)
         return resp
 
     def patch(self, group_id):
@@ -2124,13 +3047,21 @@ class Group(Resource):
 
 class Group_members(Resource):
 
+    @conditional_get("groups", "groups_members_lists")
     def get(self, group_id):
         resp = None
 
-        if g.con.get_information_for_group(group_id) is None:
+        try:
+            page = get_page_parameters(membership_sort_key)
+        except ValueError:
+            page = None
+
+        if page is None:
+            resp = bad_request(parameter_name = "Page limit or cursor")
+        elif g.con.get_information_for_group(group_id) is None:
             resp = resource_not_found(parameter_name = "Group")
         else:
-            memberships = g.con.get_members_for_group(group_id)
+            memberships, has_next, has_prev = fetch_page(g.con.get_members_for_group, (group_id,), page)
 
             items = []
 
@@ -2141,7 +3072,7 @@ class Group_members(Resource):
 
                     item = {}
 
-                    item["href"] = api.url_for(User_membership, user_id = user_id, group_id = group_id)
+                    item["href"] = link_builder.url_for(User_membership, user_id = user_id, group_id = group_id)
 
                     item["data"] = [{"name" : "id", "value" : user_id, "prompt" : "User id"},
                                     {"name" : "group_id", "value" : group_id, "prompt" : "Group id"},
@@ -2149,27 +3080,29 @@ class Group_members(Resource):
 
                     items.append(item)
 
-            links = [{"href" : api.url_for(Groups), "rel" : "groups","prompt" : "Groups"},
-                     {"href" : api.url_for(Group, group_id = group_id), "rel" : "group", "prompt" : "Group"},
-                     {"href" : api.url_for(Group_requests, group_id = group_id), "group requests" : "group requests", "prompt" : "Group requests"},
-                     {"href" : api.url_for(Group_statuses, group_id = group_id), "rel" : "group statuses", "prompt" : "Group statuses"}]
+            links = [{"href" : link_builder.url_for(Groups), "rel" : "groups","prompt" : "Groups"},
+                     {"href" : link_builder.url_for(Group, group_id = group_id), "rel" : "group", "prompt" : "Group"},
+                     {"href" : link_builder.url_for(Group_requests, group_id = group_id), "group requests" : "group requests", "prompt" : "Group requests"},
+                     {"href" : link_builder.url_for(Group_statuses, group_id = group_id), "rel" : "group statuses", "prompt" : "Group statuses"}]
+            add_page_links(links, link_builder.url_for(Group_members, group_id = group_id), memberships, membership_sort_key, page[0], has_next, has_prev)
 
             collection = {
                 "version" : API_VERSION,
-                "href" : api.url_for(Group_members, group_id = group_id),
+                "href" : link_builder.url_for(Group_members, group_id = group_id),
                 "links" : links,
                 "items" : items,
             }
 
             envelope = {"collection" : collection}
 
-            resp = Response(json.dumps(envelope), 200, mimetype = COLLECTION_JSON + ";profile=" + GROUP_MEMBERSHIP_PROFILE)
+            resp = collection_response(envelope, COLLECTION_JSON + ";profile=" + GROUP_MEMBERSHIP_PROFILE)
         return resp
 
 ##################### GROUP REQUESTS #####################
 
 class Group_requests(Resource):
 
+    @conditional_get("groups", "groups_requests_lists")
     def get(self, group_id):
         resp = None
 
@@ -2186,26 +3119,26 @@ class Group_requests(Resource):
 
                     item = {}
 
-                    item["href"] = api.url_for(Group_request, group_id = group_id, user_id = user_id)
+                    item["href"] = link_builder.url_for(Group_request, group_id = group_id, user_id = user_id)
 
                     item["data"] = [{"name" : "id", "value" : group_id, "prompt" : "Group id"},
                                     {"name" : "user_id", "value" : user_id, "prompt" : "User id"}]
 
-                    item["links"] = [{"href" : api.url_for(User_profile, user_id = user_id), "rel" : "user profile", "prompt" : "User profile",},
-                                     {"href" : api.url_for(User_memberships, user_id = user_id), "rel" : "user memberships", "prompt" : "User memberships"}]
+                    item["links"] = [{"href" : link_builder.url_for(User_profile, user_id = user_id), "rel" : "user profile", "prompt" : "User profile",},
+                                     {"href" : link_builder.url_for(User_memberships, user_id = user_id), "rel" : "user memberships", "prompt" : "User memberships"}]
 
                     items.append(item)
 
-            links = [{"href" : api.url_for(Groups), "rel" : "groups", "prompt" : "Groups"},
-                     {"href" : api.url_for(Group, group_id = group_id), "rel" : "group", "prompt" : "Group"},
-                     {"href" : api.url_for(Group_members, group_id = group_id), "group members" : "group members", "prompt" : "Group members"},
-                     {"href" : api.url_for(Group_statuses, group_id = group_id), "rel" : "group statuses", "prompt" : "Group statuses"}]
+            links = [{"href" : link_builder.url_for(Groups), "rel" : "groups", "prompt" : "Groups"},
+                     {"href" : link_builder.url_for(Group, group_id = group_id), "rel" : "group", "prompt" : "Group"},
+                     {"href" : link_builder.url_for(Group_members, group_id = group_id), "group members" : "group members", "prompt" : "Group members"},
+                     {"href" : link_builder.url_for(Group_statuses, group_id = group_id), "rel" : "group statuses", "prompt" : "Group statuses"}]
 
             template = {"data" : [{"name" : "user_id", "value" : "", "prompt" : "User requesting id", "required" : "true"}]}
 
             collection = {
                 "version" : API_VERSION,
-                "href" : api.url_for(Group_requests, group_id = group_id),
+                "href" : link_builder.url_for(Group_requests, group_id = group_id),
                 "links" : links,
                 "items" : items,
                 "template" : template
@@ -2213,7 +3146,7 @@ class Group_requests(Resource):
 
             envelope = {"collection" : collection}
 
-            resp = Response(json.dumps(envelope), 200, mimetype = COLLECTION_JSON + ";profile=" + GROUP_MEMBERSHIP_REQUEST_PROFILE)
+            resp = collection_response(envelope, COLLECTION_JSON + ";profile=" + GROUP_MEMBERSHIP_REQUEST_PROFILE)
         return resp
 
     def post(self, group_id):
@@ -2248,7 +3181,7 @@ class Group_requests(Resource):
                     if not g.con.add_request_to_group(group_id, user_id):
                         resp = internal_server_error()
                     else:
-                        new_url = api.url_for(Group_request, group_id = group_id, user_id = user_id)
+                        new_url = link_builder.url_for(Group_request, group_id = group_id, user_id = user_id)
                         resp = Response(status = 201, headers = {"Location" : new_url})
             except:
                 resp = bad_request(parameter_name = "User id")
@@ -2258,6 +3191,7 @@ class Group_requests(Resource):
 
 class Group_request(Resource):
 
+    @conditional_get("groups", "groups_requests_lists")
     def get(self, group_id, user_id):
         resp = None
 
@@ -2272,13 +3206,13 @@ class Group_request(Resource):
                 resp = resource_not_found(parameter_name = "Membership", resp_type = HAL_JSON)
             else:
                 _links = {
-                    "self" : {"href" : api.url_for(Group_request, group_id = group_id, user_id = user_id), "profile" : GROUP_MEMBERSHIP_REQUEST_PROFILE},
-                    "groups" : {"href" : api.url_for(Groups)},
-                    "group" : {"href" : api.url_for(Group, group_id = group_id)},
-                    "group members" : {"href" : api.url_for(Group_members, group_id = group_id)},
-                    "group statuses" : {"href" : api.url_for(Group_statuses, group_id = group_id)},
-                    "user profile" : {"href" : api.url_for(User_profile, user_id = user_id)},
-                    "user memberships" : {"href" : api.url_for(User_memberships, user_id = user_id)}
+                    "self" : {"href" : link_builder.url_for(Group_request, group_id = group_id, user_id = user_id), "profile" : GROUP_MEMBERSHIP_REQUEST_PROFILE},
+                    "groups" : {"href" : link_builder.url_for(Groups)},
+                    "group" : {"href" : link_builder.url_for(Group, group_id = group_id)},
+                    "group members" : {"href" : link_builder.url_for(Group_members, group_id = group_id)},
+                    "group statuses" : {"href" : link_builder.url_for(Group_statuses, group_id = group_id)},
+                    "user profile" : {"href" : link_builder.url_for(User_profile, user_id = user_id)},
+                    "user memberships" : {"href" : link_builder.url_for(User_memberships, user_id = user_id)}
                 }
 
                 template = {"data": [{"name" : "status", "value" : "", "prompt" : "Request status", "required" : "false"}]}
@@ -2290,7 +3224,7 @@ class Group_request(Resource):
                     "template" : template
                 }
 
-                resp = Response(json.dumps(hal), 200, mimetype = HAL_JSON)
+                resp = Response(dumps(hal), 200, mimetype = HAL_JSON)
         return resp
 
     def patch(self, group_id, user_id):
@@ -2326,7 +3260,7 @@ class Group_request(Resource):
                     if not g.con.accept_group_request(group_id, user_id):
                         resp = internal_server_error()
                     else:
-                        new_url = api.url_for(User_membership, user_id = user_id, group_id = group_id)
+                        new_url = link_builder.url_for(User_membership, user_id = user_id, group_id = group_id)
                         resp = Response(status = 201, headers = {"Location" : new_url})
                 elif status == None:
                     resp = Response(status = 201)
@@ -2340,58 +3274,72 @@ class Group_request(Resource):
 
 class Group_statuses(Resource):
 
+    @conditional_get("groups", "groups_statuses_lists", "statuses", "users_profiles", "statuses_media_lists", "media_items", "statuses_tags_lists", "comments", "rates")
     def get(self, group_id):
         resp = None
 
-        if g.con.get_information_for_group(group_id) is None:
+        try:
+            page = get_page_parameters(group_status_sort_key)
+        except ValueError:
+            page = None
+
+        try:
+            embed = get_embed_parameters()
+        except ValueError:
+            embed = None
+
+        if page is None:
+            resp = bad_request(parameter_name = "Page limit or cursor")
+        elif embed is None:
+            resp = bad_request(parameter_name = "Embed")
+        elif g.con.get_information_for_group(group_id) is None:
             resp = resource_not_found(parameter_name = "Group")
         else:
-            group_statuses = g.con.get_statuses_for_group(group_id)
-
-            items = []
-
-            if group_statuses is not None:
-                for status in group_statuses:
-                    status_id = status["status_id"]
-                    creator_id = status["creator_id"]
-                    content = status["content"]
-                    creation_time = status["creation_time"]
-
-                    item = {}
-
-                    item["href"] = api.url_for(Status, status_id = status_id)
-
-                    item["data"] = [{"name" : "id", "value" : status_id, "prompt" : "Status id"},
-                                    {"name" : "user_id", "value" : creator_id, "prompt" : "Creator id"},
-                                    {"name" : "content", "value" : content, "prompt" : "Status content"},
-                                    {"name" : "creation_time", "value" : creation_time, "prompt" : "Status creation time"}]
+            group_statuses, page_state = stream_page(g.con.get_statuses_for_group, (group_id,), page)
+            if embed:
+                group_statuses, embedded = embed_statuses(group_statuses, embed)
 
-                    item["links"] = [{"href" : api.url_for(Status_comments, status_id = status_id), "rel" : "status comments", "prompt" : "Status comments"},
-                                     {"href" : api.url_for(Status_rates, status_id = status_id), "rel" : "status rates", "prompt" : "Status rates"},
-                                     {"href" : api.url_for(Status_tags, status_id = status_id), "rel" : "status tags", "prompt" : "Status tags"},
-                                     {"href" : api.url_for(Status_media, status_id = status_id), "rel" : "status media list", "prompt" : "Status media items"}]
+            def render(status):
+                status_id = status["status_id"]
+                creator_id = status["creator_id"]
+                content = status["content"]
+                creation_time = status["creation_time"]
 
-                    items.append(item)
+                item = {}
 
-            links = [{"href" : api.url_for(Groups), "rel" : "groups", "prompt" : "Groups"},
-                     {"href" : api.url_for(Group, group_id = group_id), "rel" : "group", "prompt" : "Group"},
-                     {"href" : api.url_for(Group_members, group_id = group_id), "group members" : "group members", "prompt" : "Group members"},
-                     {"href" : api.url_for(Group_requests, group_id = group_id), "rel" : "group requests", "prompt" : "Group requests"}]
+                item["href"] = link_builder.url_for(Status, status_id = status_id)
+
+                item["data"] = [{"name" : "id", "value" : status_id, "prompt" : "Status id"},
+                                {"name" : "user_id", "value" : creator_id, "prompt" : "Creator id"},
+                                {"name" : "content", "value" : content, "prompt" : "Status content"},
+                                {"name" : "creation_time", "value" : creation_time, "prompt" : "Status creation time"}]
+
+                item["links"] = [{"href" : link_builder.url_for(Status_comments, status_id = status_id), "rel" : "status comments", "prompt" : "Status comments"},
+                                 {"href" : link_builder.url_for(Status_rates, status_id = status_id), "rel" : "status rates", "prompt" : "Status rates"},
+                                 {"href" : link_builder.url_for(Status_tags, status_id = status_id), "rel" : "status tags", "prompt" : "Status tags"},
+                                 {"href" : link_builder.url_for(Status_media, status_id = status_id), "rel" : "status media list", "prompt" : "Status media items"}]
+                if embed:
+                    item["embedded"] = embedded[status_id]
+                return item
+
+            def trailer():          #Page links are known once all the statuses have been written
+                links = [{"href" : link_builder.url_for(Groups), "rel" : "groups", "prompt" : "Groups"},
+                         {"href" : link_builder.url_for(Group, group_id = group_id), "rel" : "group", "prompt" : "Group"},
+                         {"href" : link_builder.url_for(Group_members, group_id = group_id), "group members" : "group members", "prompt" : "Group members"},
+                         {"href" : link_builder.url_for(Group_requests, group_id = group_id), "rel" : "group requests", "prompt" : "Group requests"}]
+                add_page_links(links, link_builder.url_for(Group_statuses, group_id = group_id), page_state["bounds"], group_status_sort_key, page[0], page_state["has_next"], page_state["has_prev"])
+                return {"links" : links}
 
             template = {"data" : [{"name" : "author", "value" : "", "prompt" : "Status creator id", "required" : "true"},
-                                  {"name" : "content", "value" : "", "prompt" : "Status content", "required" : "true"}]}
+                                  {"name" : "content", "value" : "", "prompt" : "Status content", "required" : "true"}] + STATUS_ATTACHMENTS_TEMPLATE_DATA}
 
             collection = {
                 "version" : API_VERSION,
-                "href" : api.url_for(Group_statuses, group_id = group_id),
-                "links" : links,
-                "items" : items,
+                "href" : link_builder.url_for(Group_statuses, group_id = group_id),
                 "template" : template
             }
 
-            envelope = {"collection" : collection}
-
-            resp = Response(json.dumps(envelope), 200, mimetype = COLLECTION_JSON + ";profile=" + STATUS_PROFILE)
+            resp = stream_collection(collection, (render(status) for status in group_statuses), trailer, COLLECTION_JSON + ";profile=" + STATUS_PROFILE)
         return resp
 
     def post(self, group_id):
@@ -2399,6 +3347,8 @@ class Group_statuses(Resource):
 
         AUTHOR = "author"
         CONTENT = "content"
+        MEDIA_IDS = "media_ids"
+        TAGGED_USER_IDS = "tagged_user_ids"
 
         UNAUTHORIZED_ERROR_TITLE = "User not member of group."
         UNAUTHORIZED_ERROR_MESSAGE = "User doesn't belong to the group so he cannot post any statuses."
@@ -2415,6 +3365,8 @@ class Group_statuses(Resource):
                 author_id = int(values_array[0])
                 values_array = list(data["value"] for data in template_data if data["name"] == CONTENT)
                 content = values_array[0]
+                media_ids = get_template_ids(template_data, MEDIA_IDS)
+                tagged_user_ids = get_template_ids(template_data, TAGGED_USER_IDS)
 
                 memberships = g.con.get_members_for_group(group_id)
                 filtered_memberships_list = list(membership for membership in memberships if membership["user_id"] == author_id) if memberships is not None else []
@@ -2423,14 +3375,16 @@ class Group_statuses(Resource):
                 elif len(filtered_memberships_list) == 0:
                     resp = unauthorized_action(title = UNAUTHORIZED_ERROR_TITLE, message = UNAUTHORIZED_ERROR_MESSAGE)
                 else:
-                    new_status = {"creator_id" : author_id, "content" : content}
-                    new_status_id = g.con.create_status(new_status, group_id = group_id)
+                    resp = check_status_attachments(media_ids, tagged_user_ids)
+                    if resp is None:
+                        new_status = {"creator_id" : author_id, "content" : content}
+                        new_status_id = g.con.create_status(new_status, group_id = group_id, media_ids = media_ids, tagged_user_ids = tagged_user_ids)
 
-                    if new_status_id is None:
-                        resp = internal_server_error()
-                    else:
-                        new_url = api.url_for(Status, status_id = new_status_id)
-                        resp = Response(status = 201, headers = {"Location": new_url})
+                        if new_status_id is None:
+                            resp = internal_server_error()
+                        else:
+                            new_url = link_builder.url_for(Status, status_id = new_status_id)
+                            resp = Response(status = 201, headers = {"Location": new_url})
             except:
                 resp = bad_request(parameter_name = "Membership")
         return resp
@@ -2477,7 +3431,7 @@ class Groups(Resource):
                     if new_group_id is None:
                             resp = internal_server_error()
                     else:
-                        new_url = api.url_for(Group, group_id = new_group_id)
+                        new_url = link_builder.url_for(Group, group_id = new_group_id)
                         resp = Response(status = 201, headers = {"Location": new_url})
             except:
                 resp = bad_request(parameter_name = "Privacy level")
@@ -2489,6 +3443,7 @@ class Groups(Resource):
 
 class Conversation(Resource):
 
+    @conditional_get("conversations")
     def get(self, conversation_id):
         resp = None
 
@@ -2502,12 +3457,12 @@ class Conversation(Resource):
             time_last_message = conversation["time_last_message"]
 
             _links = {
-                "self" : {"href" : api.url_for(Conversation,conversation_id = conversation_id), "profile" : CONVERSATION_PROFILE},
-                "user profile" : {"href" : api.url_for(User_profile, user_id = user1_id)},
-                "user contacted profile" : {"href" : api.url_for(User_profile, user_id = user2_id)},
-                "user1 conversations" : {"href" : api.url_for(User_conversations, user_id = user1_id)},
-                "user2 conversations" : {"href" : api.url_for(User_conversations, user_id = user2_id)},
-                "conversation messages" : {"href" : api.url_for(Conversation_messages, conversation_id = conversation_id)}
+                "self" : {"href" : link_builder.url_for(Conversation,conversation_id = conversation_id), "profile" : CONVERSATION_PROFILE},
+                "user profile" : {"href" : link_builder.url_for(User_profile, user_id = user1_id)},
+                "user contacted profile" : {"href" : link_builder.url_for(User_profile, user_id = user2_id)},
+                "user1 conversations" : {"href" : link_builder.url_for(User_conversations, user_id = user1_id)},
+                "user2 conversations" : {"href" : link_builder.url_for(User_conversations, user_id = user2_id)},
+                "conversation messages" : {"href" : link_builder.url_for(Conversation_messages, conversation_id = conversation_id)}
             }
 
             hal = {
@@ -2518,7 +3473,7 @@ class Conversation(Resource):
                 "_links" : _links
             }
 
-            resp = Response(json.dumps(hal), 200, mimetype = HAL_JSON)
+            resp = Response(dumps(hal), 200, mimetype = HAL_JSON)
         return resp
 
     def delete(self, conversation_id):
@@ -2534,53 +3489,56 @@ class Conversation(Resource):
 
 class Conversation_messages(Resource):
 
+    @conditional_get("conversations", "messages")
     def get(self, conversation_id):
         resp = None
 
-        if g.con.get_conversation(conversation_id) is None:
+        try:
+            page = get_page_parameters(message_sort_key)
+        except ValueError:
+            page = None
+
+        if page is None:
+            resp = bad_request(parameter_name = "Page limit or cursor")
+        elif g.con.get_conversation(conversation_id) is None:
             resp = resource_not_found(parameter_name = "Conversation")
         else:
-            messages = g.con.get_messages_for_conversation(conversation_id)
-
-            items = []
-
-            if messages is not None:
-                for message in messages:
-                    sender_id = message["sender_id"]
-                    content = message["content"]
-                    time_sent = message["time_sent"]
+            conversation = g.con.get_conversation(conversation_id)          #Get both members of conversation
+            user1_id = conversation["user1_id"]
+            user2_id = conversation["user2_id"]
 
-                    item = {}
+            messages, page_state = stream_page(g.con.get_messages_for_conversation, (conversation_id,), page)
 
-                    item["data"] = [{"name" : "conversation_id", "value" : conversation_id, "prompt" : "Conversation id"},
-                                    {"name" : "sender_id", "value" : sender_id, "prompt" : "Sender id"},
-                                    {"name" : "content", "value" : content, "prompt" : "Message content"},
-                                    {"name" : "time_sent", "value" : time_sent, "prompt" : "Time message sent"}]
+            def render(message):
+                sender_id = message["sender_id"]
+                content = message["content"]
+                time_sent = message["time_sent"]
 
-                    items.append(item)
+                item = {}
 
-            conversation = g.con.get_conversation(conversation_id)          #Get both members of conversation
-            user1_id = conversation["user1_id"]
-            user2_id = conversation["user2_id"]
+                item["data"] = [{"name" : "conversation_id", "value" : conversation_id, "prompt" : "Conversation id"},
+                                {"name" : "sender_id", "value" : sender_id, "prompt" : "Sender id"},
+                                {"name" : "content", "value" : content, "prompt" : "Message content"},
+                                {"name" : "time_sent", "value" : time_sent, "prompt" : "Time message sent"}]
+                return item
 
-            links = [{"href" : api.url_for(Conversation, conversation_id = conversation_id), "rel" : "conversation", "prompt" : "Conversation"},
-                     {"href" : api.url_for(User_conversations, user_id = user1_id), "rel" : "user conversations", "prompt" : "User1 conversations"},
-                     {"href" : api.url_for(User_conversations, user_id = user2_id), "rel" : "user conversations", "prompt" : "User2 conversations"}]
+            def trailer():          #Page links are known once all the messages have been written
+                links = [{"href" : link_builder.url_for(Conversation, conversation_id = conversation_id), "rel" : "conversation", "prompt" : "Conversation"},
+                         {"href" : link_builder.url_for(User_conversations, user_id = user1_id), "rel" : "user conversations", "prompt" : "User1 conversations"},
+                         {"href" : link_builder.url_for(User_conversations, user_id = user2_id), "rel" : "user conversations", "prompt" : "User2 conversations"}]
+                add_page_links(links, link_builder.url_for(Conversation_messages, conversation_id = conversation_id), page_state["bounds"], message_sort_key, page[0], page_state["has_next"], page_state["has_prev"])
+                return {"links" : links}
 
             template = {"data" : [{"name" : "sender_id", "value" : "", "prompt" : "Sender id", "required" : "true"},
                                   {"name" : "content", "value" : "", "prompt" : "Content", "required" : "true"}]}
 
             collection = {
                 "version" : API_VERSION,
-                "href" : api.url_for(Conversation_messages,conversation_id = conversation_id),
-                "links" : links,
-                "items" : items,
+                "href" : link_builder.url_for(Conversation_messages,conversation_id = conversation_id),
                 "template" : template
             }
 
-            envelope = {"collection" : collection}
-
-            resp = Response(json.dumps(envelope), 200, mimetype = COLLECTION_JSON + ";profile=" + MESSAGE_PROFILE)
+            resp = stream_collection(collection, (render(message) for message in messages), trailer, COLLECTION_JSON + ";profile=" + MESSAGE_PROFILE)
         return resp
 
     def post(self, conversation_id):
@@ -2622,6 +3580,101 @@ class Conversation_messages(Resource):
         return resp
 
 
+################################################### BATCH METHODS DEFINITION ###################################################
+
+##################### BATCH #####################
+
+# Raised to roll back an atomic batch when one of its sub-requests fails
+class BatchAborted(Exception):
+    pass
+
+# Check that the body of a batch request is an array of sub-requests {"method", "path", "body", "headers"} the API can run
+def check_sub_requests(sub_requests):
+    if not isinstance(sub_requests, list) or len(sub_requests) > MAX_BATCH_REQUESTS:
+        raise ValueError("A batch is an array of at most %s sub-requests" % MAX_BATCH_REQUESTS)
+    batch_path = link_builder.url_for(Batch)
+    for sub_request in sub_requests:
+        path = sub_request["path"]
+        if sub_request["method"].upper() not in BATCH_METHODS or not path.startswith(API_PATH_PREFIX) or path.startswith(batch_path):
+            raise ValueError("Sub-request not allowed in a batch")
+        if not isinstance(sub_request.get("headers", {}), dict):
+            raise ValueError("Headers of a sub-request must be an object")
+
+# Run a sub-request in-process through the resources of the API, with a nested request context.
+# The application context, hence g.con, is the one of the batch request: before_request and the connection checkout don't run again.
+# Return the response and its body, read before the context of the sub-request is gone (streamed collections need it)
+def dispatch_sub_request(sub_request):
+    headers = dict((name, request.headers[name]) for name in ("Authorization", "Accept") if name in request.headers)
+    body = sub_request.get("body", None)
+    if body is not None:
+        headers["Content-Type"] = COLLECTION_JSON
+        body = dumps(body)
+    headers.update(sub_request.get("headers", {}))
+    with app.test_request_context(sub_request["path"], base_url = request.url_root, method = sub_request["method"].upper(), data = body,
+                                  headers = headers, environ_overrides = {BATCH_ENVIRON_KEY : True}):
+        try:
+            try:
+                rv = app.dispatch_request()
+            except Exception, e:
+                rv = app.handle_user_exception(e)           #Not found, method not allowed...
+            resp = app.make_response(rv)
+            data = resp.get_data()
+        except Exception:
+            resp = internal_server_error()
+            data = resp.get_data()
+    return resp, data
+
+# Run the sub-requests in order. With stop_on_error the sub-requests after the first failing one are not run
+def run_sub_requests(sub_requests, stop_on_error = False):
+    responses = []
+    for sub_request in sub_requests:
+        resp, data = dispatch_sub_request(sub_request)
+        responses.append((resp, data))
+        if stop_on_error and resp.status_code >= 400:
+            break
+    return responses
+
+# JSON of the response to a sub-request. JSON bodies are copied as they are, without decoding them again
+def encode_sub_response(resp, data):
+    headers = dict((name, value) for name, value in resp.headers if name != "Content-Length")
+    body = data if data and resp.mimetype in (COLLECTION_JSON, HAL_JSON, JSON) else "null"
+    return '{"status": %d, "headers": %s, "body": %s}' % (resp.status_code, dumps(headers), body)
+
+class Batch(Resource):
+
+    def post(self):
+        '''
+        Run an array of sub-requests {"method", "path", "body", "headers"} in order, over the database connection of
+        the batch request, and return the array of their responses {"status", "headers", "body"}.
+        Authorization and Accept of the batch request are passed on to the sub-requests, unless they give their own;
+        the body of a sub-request is sent as Collection+JSON.
+
+        With ?atomic=true the sub-requests run in one transaction: the batch stops at the first sub-request failing,
+        everything is rolled back and 409 is returned with the responses up to the failing one.
+        '''
+        if request.headers.get("Content-Type", "") != JSON:
+            return unsupported_media_type()
+        try:
+            sub_requests = request.get_json(force = True)
+            check_sub_requests(sub_requests)
+        except:
+            return bad_request(parameter_name = "Batch")
+
+        status_code = 200
+        if request.args.get("atomic", "false").lower() == "true":
+            try:
+                with g.con.transaction():
+                    responses = run_sub_requests(sub_requests, stop_on_error = True)
+                    if responses and responses[-1][0].status_code >= 400:
+                        raise BatchAborted()
+            except BatchAborted:
+                status_code = 409
+        else:
+            responses = run_sub_requests(sub_requests)
+
+        body = "[" + ", ".join(encode_sub_response(resp, data) for resp, data in responses) + "]"
+        return Response(body, status_code, mimetype = JSON)
+
 ################################################### ROUTES DEFINITION ###################################################
 
 #User
@@ -2657,6 +3710,8 @@ api.add_resource(Friendship, "/friendsNet/api/friendships/<int:friendship_id>/",
 
 #Media item
 api.add_resource(Media_list, "/friendsNet/api/media/", endpoint = "media_list")
+api.add_resource(Media_uploads, "/friendsNet/api/media/uploads/", endpoint = "media_uploads")
+api.add_resource(Media_upload, "/friendsNet/api/media/uploads/<upload_id>/", endpoint = "media_upload")
 api.add_resource(Media_item, "/friendsNet/api/media/<int:media_id>/", endpoint = "media_item")
 api.add_resource(Media_item_data, "/friendsNet/" + MEDIA_SAVING_FOLDER + "<file_name>", endpoint = "media_item_data")
 
@@ -2672,6 +3727,11 @@ api.add_resource(Group_statuses, "/friendsNet/api/groups/<int:group_id>/statuses
 api.add_resource(Conversation, "/friendsNet/api/conversations/<int:conversation_id>/", endpoint = "conversation")
 api.add_resource(Conversation_messages, "/friendsNet/api/conversations/<int:conversation_id>/messages/", endpoint = "conversation_messages")
 
+#Batch
+api.add_resource(Batch, "/friendsNet/api/batch/", endpoint = "batch")
+
+link_builder.compile()
+
 
 ################################################### APPLICATION START ###################################################
 
@@ -0,0 +1,256 @@
+'''
+Content-addressed storage of the uploaded media.
+
+Every distinct content is stored once, in a file named after its SHA-256 hash
+inside a sharded directory tree (``ab/cd/abcd...``), so that no directory
+holds too many files. Uploads are hashed while they are copied to a temporary
+file, which is then moved to its place, or dropped when a file with the same
+content is already there.
+
+Large media can also be sent in chunks, appended to the file of a resumable
+upload (see :py:meth:`BlobStorage.append`) until it is complete and moved to
+its blob like any other upload.
+
+Which media items use a blob, and when it can be removed, is recorded in the
+database (see :py:meth:`friendsNet.database.Connection.create_media`).
+'''
+import os
+import errno
+import fcntl
+import hashlib
+import tempfile
+
+CHUNK_SIZE = 64 * 1024          #Bytes read at a time from an upload
+SHARD_LEVELS = 2                #Directories between the root and the blob
+SHARD_WIDTH = 2                 #Characters of the hash naming each of these directories
+TEMPORARY_FOLDER = "tmp"        #Subfolder of the uploads being written (same filesystem, so they can be renamed)
+UPLOADS_FOLDER = "uploads"      #Subfolder of the resumable uploads, named after their id
+
+class UploadOffsetError(Exception):
+    '''
+    A chunk doesn't start where the resumable upload has arrived, or another
+    chunk of the same upload is being written.
+
+    :param offset: bytes of the upload received so far.
+    '''
+    def __init__(self, offset):
+        super(UploadOffsetError, self).__init__("Upload has received %d bytes" % offset)
+        self.offset = offset
+
+class BlobStorage(object):
+    '''
+    Files of the blobs, under a root folder.
+
+    :Example:
+
+    storage = BlobStorage("media_uploads/blobs")
+    content_hash, size, temporary_path = storage.write(upload_stream)
+    storage.store(temporary_path, content_hash)
+    storage.path_for(content_hash)          #"media_uploads/blobs/ab/cd/abcd..."
+
+    :param root: folder containing the blobs. It is created when needed.
+    :type root: str
+    '''
+    def __init__(self, root):
+        super(BlobStorage, self).__init__()
+        self.root = root
+
+    def path_for(self, content_hash):
+        '''
+        :return: path of the file of the blob.
+        '''
+        shards = [content_hash[level * SHARD_WIDTH:(level + 1) * SHARD_WIDTH] for level in range(SHARD_LEVELS)]
+        return os.path.join(self.root, *(shards + [content_hash]))
+
+    def derivative_path_for(self, content_hash, variant):
+        '''
+        :return: path of the file of a variant of the blob (see :py:mod:`friendsNet.derivatives`),
+            next to the file of the blob.
+        '''
+        return "%s.%s" % (self.path_for(content_hash), variant)
+
+    def exists(self, content_hash):
+        return os.path.isfile(self.path_for(content_hash))
+
+    def write(self, stream):
+        '''
+        Copy a stream to a temporary file, hashing it at the same time.
+
+        :param stream: file-like object with the content.
+        :return: (SHA-256 hex digest, size in bytes, path of the temporary file).
+        '''
+        folder = os.path.join(self.root, TEMPORARY_FOLDER)
+        makedirs(folder)
+        descriptor, temporary_path = tempfile.mkstemp(dir = folder)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(descriptor, "wb") as f:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+        except:
+            self.discard(temporary_path)
+            raise
+        return digest.hexdigest(), size, temporary_path
+
+    def hash_file(self, path):
+        '''
+        Hash a file, reading it a chunk at a time.
+
+        :return: (SHA-256 hex digest, size in bytes).
+        '''
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                size += len(chunk)
+        return digest.hexdigest(), size
+
+    def upload_path_for(self, upload_id):
+        '''
+        :return: path of the file of a resumable upload. It can be moved to
+            its blob with :py:meth:`store` once complete.
+        '''
+        return os.path.join(self.root, UPLOADS_FOLDER, upload_id)
+
+    def start_upload(self, upload_id):
+        '''
+        Create the empty file of a resumable upload.
+        '''
+        folder = os.path.join(self.root, UPLOADS_FOLDER)
+        makedirs(folder)
+        open(os.path.join(folder, upload_id), "wb").close()
+
+    def upload_offset(self, upload_id):
+        '''
+        :return: bytes of a resumable upload received so far, or None if it doesn't exist.
+        '''
+        try:
+            return os.path.getsize(self.upload_path_for(upload_id))
+        except OSError, e:
+            if e.errno != errno.ENOENT:
+                raise
+            return None
+
+    def append(self, upload_id, stream, offset, limit):
+        '''
+        Append a chunk to a resumable upload, reading it a piece at a time. The
+        file is locked while the chunk is written, so that two chunks sent at the
+        same time (e.g. a client retrying) can't interleave. The part of a chunk
+        received before the stream broke is kept: the upload resumes from there.
+
+        :param stream: file-like object with the chunk.
+        :param offset: where the chunk starts: it must be the bytes received so far.
+        :param limit: size the upload can't exceed with this chunk.
+        :return: bytes of the upload received so far.
+        :raises UploadOffsetError: if the upload is not offset bytes long, or
+            another chunk is being written.
+        :raises ValueError: if the chunk goes beyond limit. Nothing of it is kept.
+        :raises IOError: if the upload doesn't exist.
+        '''
+        with open(self.upload_path_for(upload_id), "r+b") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except IOError, e:
+                if e.errno not in (errno.EAGAIN, errno.EACCES):
+                    raise
+                raise UploadOffsetError(size)
+            f.seek(0, os.SEEK_END)              #It could have grown while waiting for the lock
+            size = f.tell()
+            if size != offset:
+                raise UploadOffsetError(size)
+            try:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > limit:
+                        raise ValueError("Chunk goes beyond %d bytes" % limit)
+                    f.write(chunk)
+            except ValueError:
+                f.truncate(offset)
+                raise
+        return size
+
+    def store(self, temporary_path, content_hash, keep = False):
+        '''
+        Move a temporary file written by :py:meth:`write` to the place of its
+        blob. If the blob is already there the temporary file is removed.
+
+        :param keep: if True the temporary file stays where it is (the blob is
+            a hard link to it) and it has to be discarded by the caller, e.g.
+            once the media item using the blob has been committed.
+        :return: True if the file has been moved, False if the blob already existed.
+        '''
+        path = self.path_for(content_hash)
+        if os.path.isfile(path):
+            if not keep:
+                self.discard(temporary_path)
+            return False
+        makedirs(os.path.dirname(path))
+        if keep:
+            os.link(temporary_path, path)
+        else:
+            os.rename(temporary_path, path)
+        return True
+
+    def discard(self, temporary_path):
+        '''
+        Remove a temporary file, if it is still there.
+        '''
+        remove(temporary_path)
+
+    def remove(self, content_hash):
+        '''
+        Remove the file of a blob and the ones of its variants, if they exist.
+        '''
+        remove(self.path_for(content_hash))
+        self.remove_derivatives(content_hash)
+
+    def remove_derivatives(self, content_hash):
+        '''
+        Remove the files of the variants of a blob, if they exist.
+        '''
+        path = self.path_for(content_hash)
+        folder, prefix = os.path.dirname(path), os.path.basename(path) + "."
+        try:
+            names = os.listdir(folder)
+        except OSError, e:
+            if e.errno != errno.ENOENT:
+                raise
+            return
+        for name in names:
+            if name.startswith(prefix):
+                remove(os.path.join(folder, name))
+
+def makedirs(folder):
+    '''
+    Create a folder and its parents, unless it exists already.
+    '''
+    try:
+        os.makedirs(folder)
+    except OSError, e:
+        if e.errno != errno.EEXIST:
+            raise
+
+def remove(path):
+    '''
+    Remove a file, unless it doesn't exist.
+    '''
+    try:
+        os.remove(path)
+    except OSError, e:
+        if e.errno != errno.ENOENT:
+            raise
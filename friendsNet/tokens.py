@@ -0,0 +1,114 @@
+'''
+Cache of the verified authentication tokens of friendsNet.
+
+Verifying a token means computing again its HMAC signature and decoding its
+JSON header and payload. :py:class:`TokenCache` keeps the user id of the
+tokens already verified, in least recently used order and up to a maximum
+number of tokens, so that verifying again a token is a dictionary lookup.
+Tokens in the cache are verified again once they expire, and at least every
+``ttl`` seconds: revocations are persisted by the decode function (e.g. in the
+database), so a token revoked by another process is refused after ``ttl``
+seconds at most. Tokens revoked through the cache itself are refused at once.
+'''
+import time
+import threading
+import collections
+
+DEFAULT_SIZE = 10000            #Tokens kept by a TokenCache
+DEFAULT_TTL = 60                #Seconds a verified token is trusted before being verified (and looked for in the revocations) again
+
+class TokenCache(object):
+    '''
+    Bounded LRU cache of verified token -> user id, with expiration and revocation.
+
+    :Example:
+
+    cache = TokenCache(decode_auth_token)
+    cache.get_user_id(token)        #Decoded and verified
+    cache.get_user_id(token)        #Dictionary lookup
+    cache.revoke(token)
+    cache.get_user_id(token)        #None
+
+    :param decode: function verifying a token, including that it has not been
+        revoked. It returns (user id, expiration time in seconds since the epoch
+        or None if the token never expires), or None if the token is not valid.
+    :type decode: function
+    :param size: maximum number of tokens kept. With 0 nothing is cached.
+    :type size: int
+    :param ttl: seconds a verified token is kept before being decoded again.
+    :type ttl: int
+    '''
+    def __init__(self, decode, size = DEFAULT_SIZE, ttl = DEFAULT_TTL):
+        super(TokenCache, self).__init__()
+        self.decode = decode
+        self.size = size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._tokens = collections.OrderedDict()        #token -> (user id, time until which it is trusted), least recently used first
+        self._revoked = {}                              #token -> time until which it is refused here, afterwards decode refuses it
+        self._next_prune = 0                            #Time of the next removal of the old entries of _revoked
+        self._lock = threading.Lock()
+
+    def get_user_id(self, token):
+        '''
+        :return: the id of the user of the token, or None if the token is not
+            valid, has expired or has been revoked.
+        '''
+        now = time.time()
+        with self._lock:
+            if self._revoked.get(token, 0) > now:
+                return None
+            entry = self._tokens.pop(token, None)
+            if entry is not None and entry[1] > now:
+                self._tokens[token] = entry
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        decoded = self.decode(token)            #Out of the lock: the signature is the expensive part
+        if decoded is None:
+            return None
+        user_id, expiration = decoded
+        valid_until = now + self.ttl
+        if expiration is not None:
+            valid_until = min(valid_until, expiration)
+        with self._lock:
+            if self._revoked.get(token, 0) > now:       #Revoked while it was being verified
+                return None
+            if self.size > 0:
+                self._tokens[token] = (user_id, valid_until)
+                if len(self._tokens) > self.size:
+                    self._tokens.popitem(last = False)
+        return user_id
+
+    def revoke(self, token):
+        '''
+        Refuse the token from now on in this process. The revocation must also be
+        persisted where decode finds it: the cache refuses the token only for ttl
+        seconds, the time other caches may still trust it, and then forgets it.
+        Forgotten revocations are pruned at most once every ttl seconds, so
+        revoking is not slowed down by the number of revoked tokens.
+        '''
+        now = time.time()
+        with self._lock:
+            self._tokens.pop(token, None)
+            if now >= self._next_prune:
+                for revoked_token, refused_until in self._revoked.items():
+                    if refused_until <= now:
+                        del self._revoked[revoked_token]
+                self._next_prune = now + self.ttl
+            self._revoked[token] = now + self.ttl
+
+    def clear(self):
+        '''
+        Forget the tokens verified and the revoked ones.
+        '''
+        with self._lock:
+            self._tokens.clear()
+            self._revoked.clear()
+            self._next_prune = 0
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._tokens)
@@ -0,0 +1,42 @@
+'''
+Benchmark of the full representation of the collections against the compact
+one of :py:class:`friendsNet.compact.CompactEncoder` (all the fields, and
+only "id" and "content"), on the payloads of
+:py:mod:`test.benchmarks.json_backends`: bytes of each page and time to encode it.
+
+Run it from the project root with ``python -m test.benchmarks.compact``.
+'''
+import json
+import time
+import friendsNet.resources as resources
+from test.benchmarks.json_backends import feed_payload, search_payload
+
+ROUNDS = 200
+
+def encode_time(encode, payload):
+    '''
+    Encode :py:data:`ROUNDS` times the payload.
+
+    :return: (bytes of the payload, milliseconds per page)
+    '''
+    size = len(encode(payload))
+    start = time.time()
+    for _ in xrange(ROUNDS):
+        encode(payload)
+    return size, (time.time() - start) * 1000 / ROUNDS
+
+def main():
+    encoder = resources.compact_encoder
+    cases = [("Full", resources.dumps),
+             ("Compact", lambda payload: encoder.encode_collection(payload)),
+             ("Compact id,content", lambda payload: encoder.encode_collection(payload, frozenset(["id", "content"])))]
+    print "JSON backend: %s" % resources.JSON_BACKEND
+    for description, payload in [("Feed page", feed_payload()), ("Search page", search_payload())]:
+        json.loads(encoder.encode_collection(payload))          #The compact representation is valid JSON
+        full_size, full_time = encode_time(resources.dumps, payload)
+        for name, encode in cases:
+            size, elapsed = encode_time(encode, payload)
+            print "%-12s %-20s %7d bytes (%3.0f%%)   %6.2f ms/page (%3.0f%%)" % (description, name, size, 100.0 * size / full_size, elapsed, 100.0 * elapsed / full_time)
+
+if __name__ == '__main__':
+    main()
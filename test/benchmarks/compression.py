@@ -0,0 +1,59 @@
+'''
+Benchmark of :py:class:`friendsNet.compression.CompressionMiddleware` on the
+payloads of :py:mod:`test.benchmarks.json_backends` (one full page of the
+feed and of the users search), served by a WSGI application streaming them
+one item at a time as the collections do.
+
+For every zlib level it reports the compression ratio and the processor time
+counted by the middleware, then the time of a response sent from the cache.
+
+Run it from the project root with ``python -m test.benchmarks.compression``.
+'''
+import time
+import json
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+from friendsNet.compression import CompressionMiddleware
+from test.benchmarks.json_backends import feed_payload, search_payload
+
+ROUNDS = 200
+LEVELS = (1, 6, 9)
+
+def streaming_app(payload):
+    '''WSGI application writing the collection item by item, with an ETag.'''
+    items = payload["collection"]["items"]
+    def app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "application/vnd.collection+json"), ("ETag", '"benchmark"')])
+        yield '{"collection": {"items": ['
+        for position, item in enumerate(items):
+            yield (", " if position else "") + json.dumps(item)
+        yield ']}}'
+    return app
+
+def run(middleware):
+    '''
+    Send :py:data:`ROUNDS` requests accepting gzip.
+
+    :return: milliseconds per response.
+    '''
+    client = Client(middleware, Response)
+    start = time.time()
+    for _ in xrange(ROUNDS):
+        client.get("/", headers = {"Accept-Encoding" : "gzip"}).data
+    return (time.time() - start) * 1000 / ROUNDS
+
+def main():
+    for description, payload in [("Feed page", feed_payload()), ("Search page", search_payload())]:
+        for level in LEVELS:
+            middleware = CompressionMiddleware(streaming_app(payload), level = level, cache_size = 0)
+            elapsed = run(middleware)
+            stats = middleware.stats.snapshot()
+            print "%-12s level %d: %7d -> %6d bytes (ratio %.3f)   compressing %5.2f ms/response (%4.1f ms/MB)   response %5.2f ms" % (
+                description, level, stats["bytes_in"] / ROUNDS, stats["bytes_out"] / ROUNDS, stats["ratio"],
+                stats["cpu_time"] * 1000 / ROUNDS, stats["cpu_time_per_mb"] * 1000, elapsed)
+        middleware = CompressionMiddleware(streaming_app(payload))
+        elapsed = run(middleware)
+        print "%-12s cached:  %d hits of %d responses   response %5.2f ms" % (description, middleware.stats.snapshot()["cache_hits"], ROUNDS, elapsed)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+'''
+Benchmark of the read methods of :py:class:`friendsNet.database.Connection`
+with the connection profile applied once per connection against the previous
+behaviour, in which every method activated the foreign keys support and set
+the row and text factories before running its query.
+
+Run it from the project root with ``python -m test.benchmarks.connection_profile``.
+'''
+import sqlite3
+import time
+from friendsNet import database
+
+LEGACY_DB_PATH = "db/benchmark_legacy_profile.db"
+PROFILE_DB_PATH = "db/benchmark_default_profile.db"
+
+#Previous behaviour: rollback journal and no settings applied when the connection is opened
+LEGACY_PROFILE = dict((name, None) for name in database.PROFILE_PRAGMAS)
+LEGACY_PROFILE["journal_mode"] = "DELETE"
+
+ROUNDS = 2000
+
+#Read methods called (with their arguments) in every round
+CALLS = [
+    ("get_user_information", (1,)),
+    ("get_status", (1,)),
+    ("get_statuses_for_user", (1,)),
+    ("get_friendships_for_user", (1,)),
+    ("get_comments_for_status", (1,)),
+    ("get_media_for_status", (1,)),
+    ("get_friends_statuses_for_user", (1,))
+]
+
+def legacy_setup(connection):
+    '''Per call statements run by every method before the connection profile was introduced.'''
+    connection.set_foreign_keys_support()
+    connection.con.row_factory = sqlite3.Row
+    connection.con.text_factory = str
+
+def run(engine, before_call=None):
+    '''
+    Run :py:data:`ROUNDS` times all the :py:data:`CALLS` on a single pooled connection.
+
+    :return: number of operations per second.
+    '''
+    connection = engine.connect()
+    try:
+        start = time.time()
+        for _ in xrange(ROUNDS):
+            for name, args in CALLS:
+                if before_call is not None:
+                    before_call(connection)
+                getattr(connection, name)(*args)
+        elapsed = time.time() - start
+    finally:
+        connection.close()
+    return ROUNDS * len(CALLS) / elapsed
+
+def prepare(engine):
+    engine.remove_database()
+    engine.create_tables()
+    engine.populate_tables()
+
+def main():
+    legacy_engine = database.Engine(LEGACY_DB_PATH, profile = LEGACY_PROFILE)
+    profile_engine = database.Engine(PROFILE_DB_PATH)
+    try:
+        prepare(legacy_engine)
+        prepare(profile_engine)
+        legacy = run(legacy_engine, legacy_setup)
+        profiled = run(profile_engine)
+        print "Per call setup (legacy):   %10.0f ops/sec" % legacy
+        print "Connection profile:        %10.0f ops/sec" % profiled
+        print "Speedup:                   %10.2fx" % (profiled / legacy)
+    finally:
+        legacy_engine.remove_database()
+        profile_engine.remove_database()
+
+if __name__ == '__main__':
+    main()
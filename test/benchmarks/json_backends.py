@@ -0,0 +1,81 @@
+'''
+Benchmark of the JSON encoders listed in :py:data:`friendsNet.resources.JSON_BACKENDS`
+on payloads shaped as the responses of the feed, of the users search and of
+the messages of a conversation (one full page of each).
+
+Backends which are not installed are reported as such. The output of every
+backend is checked to decode to the same payload before being timed.
+
+Run it from the project root with ``python -m test.benchmarks.json_backends``.
+'''
+import json
+import time
+import friendsNet.resources as resources
+
+PAGE = resources.MAX_PAGE_SIZE
+ROUNDS = 200
+
+def data(*values):
+    '''Collection+JSON "data" list of (name, value, prompt) triples.'''
+    return [{"name" : name, "value" : value, "prompt" : prompt} for name, value, prompt in values]
+
+def feed_payload():
+    items = []
+    for status_id in xrange(PAGE):
+        href = "/friendsNet/api/statuses/%d/" % status_id
+        items.append({"href" : href,
+                      "data" : data(("id", status_id, "Status id"), ("user_id", status_id % 50, "Creator id"),
+                                    ("content", u"Status number %d, caf\u00e9 :)" % status_id, "Status content"), ("creation_time", 1400000000 + status_id, "Status creation time")),
+                      "links" : [{"href" : href + rel + "/", "rel" : "status " + rel, "prompt" : "Status " + rel} for rel in ("comments", "rates", "tags", "media")]})
+    return {"collection" : {"version" : "1.0", "href" : "/friendsNet/api/users/1/feed/", "items" : items,
+                            "links" : [{"href" : "/friendsNet/api/users/1/profile/", "rel" : "user profile", "prompt" : "User profile"}]}}
+
+def search_payload():
+    items = []
+    for user_id in xrange(PAGE):
+        href = "/friendsNet/api/users/%d/" % user_id
+        items.append({"href" : href + "profile/",
+                      "data" : data(("id", user_id, "User id"), ("firstName", "Antonio", "User first name"), ("middleName", None, "User middle name"),
+                                    ("surname", "Antonino", "User surname"), ("age", 20 + user_id % 30, "User age"), ("gender", user_id % 2, "User gender")),
+                      "links" : [{"href" : href + rel + "/", "rel" : "user " + rel, "prompt" : "User " + rel}
+                                 for rel in ("groups", "comments", "rates", "tags", "statuses", "friendships", "conversations", "feed")]})
+    return {"collection" : {"version" : "1.0", "href" : "/friendsNet/api/users/", "items" : items,
+                            "queries" : [{"href" : "/friendsNet/api/users/", "rel" : "search", "prompt" : "Search user by any name", "data" : [{"name" : "q", "value" : ""}]}]}}
+
+def messages_payload():
+    items = [{"data" : data(("conversation_id", 1, "Conversation id"), ("sender_id", 1 + message_id % 2, "Sender id"),
+                            ("content", "Message number %d of a long conversation" % message_id, "Message content"), ("time_sent", 1400000000 + message_id, "Time message sent"))}
+             for message_id in xrange(PAGE)]
+    return {"collection" : {"version" : "1.0", "href" : "/friendsNet/api/conversations/1/messages/", "items" : items}}
+
+PAYLOADS = [("Feed page", feed_payload()), ("Search page", search_payload()), ("Messages page", messages_payload())]
+
+def bytes_per_second(dumps, payload):
+    '''
+    Serialize :py:data:`ROUNDS` times the payload.
+
+    :return: bytes of JSON produced per second.
+    '''
+    size = len(dumps(payload))
+    start = time.time()
+    for _ in xrange(ROUNDS):
+        dumps(payload)
+    return ROUNDS * size / (time.time() - start)
+
+def main():
+    print "Selected backend: %s" % resources.JSON_BACKEND
+    for name, loader in resources.JSON_BACKENDS:
+        try:
+            dumps = loader()
+        except ImportError:
+            print "%-12s not available" % name
+            continue
+        results = []
+        for description, payload in PAYLOADS:
+            if json.loads(dumps(payload)) != json.loads(json.dumps(payload)):
+                raise AssertionError("%s serializes %s differently" % (name, description))
+            results.append("%s: %6.1f MB/s" % (description, bytes_per_second(dumps, payload) / 1048576.0))
+        print "%-12s %s" % (name, "   ".join(results))
+
+if __name__ == '__main__':
+    main()
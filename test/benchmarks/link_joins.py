@@ -0,0 +1,111 @@
+'''
+Benchmark of the list methods of :py:class:`friendsNet.database.Connection`
+reading through a link table (group statuses, status media and tags) with a
+single join against the previous behaviour, in which the ids were read from
+the link table first and the rows were then fetched with a
+``WHERE x = ? OR x = ? ...`` query built in Python.
+
+The data set has :py:data:`GROUP_STATUSES` statuses in one group and
+:py:data:`STATUS_MEDIA` media items and tagged users on one status. At these
+sizes the OR chain goes over the maximum expression depth of sqlite (1000) and
+the legacy lookups are reported as failed.
+
+Run it from the project root with ``python -m test.benchmarks.link_joins``.
+'''
+import time
+from friendsNet import database
+
+DB_PATH = "db/benchmark_link_joins.db"
+
+GROUP_STATUSES = 10000
+STATUS_MEDIA = 1000
+ROUNDS = 20
+
+GROUP_ID = 1
+STATUS_ID = 1
+
+def legacy_fetch(connection, query1, query1_parameters, id_column, table, create_object, order_by=""):
+    '''Two steps lookup used before the joins: ids from the link table, then an OR chain on the rows table.'''
+    objects = None
+    cur = connection.con.cursor()
+    cur.execute(query1, query1_parameters)
+    rows = cur.fetchall()
+    if len(rows) > 0:
+        query2 = "SELECT * FROM %s WHERE " % table + " OR ".join("%s = ?" % id_column for row in rows) + order_by
+        cur.execute(query2, tuple(row[id_column] for row in rows))
+        objects = [create_object(row) for row in cur.fetchall()]
+    cur.close()
+    return objects
+
+def legacy_statuses_for_group(connection):
+    return legacy_fetch(connection, "SELECT status_id FROM GROUPS_STATUSES_LISTS WHERE group_id = ?", (GROUP_ID,),
+                        "status_id", "STATUSES", connection._create_status_object, " ORDER BY status_id DESC")
+
+def legacy_media_for_status(connection):
+    return legacy_fetch(connection, "SELECT media_item_id FROM STATUSES_MEDIA_LISTS WHERE status_id = ?", (STATUS_ID,),
+                        "media_item_id", "MEDIA_ITEMS", connection._create_media_item_object)
+
+def legacy_tagged_users_for_status(connection):
+    return legacy_fetch(connection, "SELECT user_id FROM STATUSES_TAGS_LISTS WHERE status_id = ?", (STATUS_ID,),
+                        "user_id", "USERS_PROFILES", connection._create_user_profile_object)
+
+#(description, legacy implementation, join based method with its arguments)
+CASES = [
+    ("Statuses of a group (%d)" % GROUP_STATUSES, legacy_statuses_for_group, ("get_statuses_for_group", (GROUP_ID,))),
+    ("Media of a status (%d)" % STATUS_MEDIA, legacy_media_for_status, ("get_media_for_status", (STATUS_ID,))),
+    ("Tags of a status (%d)" % STATUS_MEDIA, legacy_tagged_users_for_status, ("get_tagged_users_for_status", (STATUS_ID,)))
+]
+
+def prepare(engine):
+    '''Create a database holding a big group and a status with many media items and tags.'''
+    engine.remove_database()
+    engine.create_tables()
+    connection = engine.connect()
+    try:
+        con = connection.con
+        con.execute("INSERT INTO USERS_CREDENTIALS VALUES (1, 'bench@friendsnet.com', 'benchmarkpassword', 0)")
+        con.execute("INSERT INTO USERS_PROFILES VALUES (1, 'Bench', NULL, 'Mark', NULL, 20, 0)")
+        con.execute("INSERT INTO GROUPS VALUES (?, 'Benchmark', NULL, 0, NULL)", (GROUP_ID,))
+        con.executemany("INSERT INTO STATUSES VALUES (?, 1, 'Status', ?)", ((i, i) for i in xrange(1, GROUP_STATUSES + 1)))
+        con.executemany("INSERT INTO GROUPS_STATUSES_LISTS VALUES (?, ?)", ((GROUP_ID, i) for i in xrange(1, GROUP_STATUSES + 1)))
+        con.executemany("INSERT INTO MEDIA_ITEMS VALUES (?, 0, ?, NULL)", ((i, "http://media%d.com" % i) for i in xrange(1, STATUS_MEDIA + 1)))
+        con.executemany("INSERT INTO STATUSES_MEDIA_LISTS VALUES (?, ?)", ((STATUS_ID, i) for i in xrange(1, STATUS_MEDIA + 1)))
+        con.executemany("INSERT INTO USERS_CREDENTIALS VALUES (?, ?, 'benchmarkpassword', 0)", ((i, "bench%d@friendsnet.com" % i) for i in xrange(2, STATUS_MEDIA + 2)))
+        con.executemany("INSERT INTO USERS_PROFILES VALUES (?, 'Bench', NULL, 'Mark', NULL, 20, 0)", ((i,) for i in xrange(2, STATUS_MEDIA + 2)))
+        con.executemany("INSERT INTO STATUSES_TAGS_LISTS VALUES (?, ?)", ((STATUS_ID, i) for i in xrange(2, STATUS_MEDIA + 2)))
+        con.commit()
+    finally:
+        connection.close()
+
+def timed(call):
+    '''
+    Run :py:data:`ROUNDS` times the call.
+
+    :return: milliseconds per call, or None if the call fails.
+    '''
+    start = time.time()
+    try:
+        for _ in xrange(ROUNDS):
+            call()
+    except database.sqlite3.OperationalError:
+        return None
+    return (time.time() - start) * 1000 / ROUNDS
+
+def main():
+    engine = database.Engine(DB_PATH)
+    try:
+        prepare(engine)
+        connection = engine.connect()
+        try:
+            for description, legacy, (name, args) in CASES:
+                legacy_ms = timed(lambda: legacy(connection))
+                join_ms = timed(lambda: getattr(connection, name)(*args))
+                legacy_text = "%8.2f ms" % legacy_ms if legacy_ms is not None else "  failed   "
+                print "%-28s legacy: %s   join: %8.2f ms" % (description, legacy_text, join_ms)
+        finally:
+            connection.close()
+    finally:
+        engine.remove_database()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+'''
+Benchmark of the links of the items of the feed and of the users search built
+with :py:meth:`flask_restful.Api.url_for` against the compiled routes of
+:py:class:`friendsNet.links.LinkBuilder`.
+
+Every item gets the same links built by the collection resources
+(6 for a status of the feed, 9 for a user found by the search).
+
+Run it from the project root with ``python -m test.benchmarks.links``.
+'''
+import time
+import friendsNet.resources as resources
+
+ITEMS = 20000
+
+def feed_item_links(url_for, status_id, creator_id):
+    '''Links of a status of User_feed.'''
+    return [url_for(resources.Status, status_id = status_id),
+            url_for(resources.Status_comments, status_id = status_id),
+            url_for(resources.Status_rates, status_id = status_id),
+            url_for(resources.Status_tags, status_id = status_id),
+            url_for(resources.Status_media, status_id = status_id),
+            url_for(resources.User_profile, user_id = creator_id)]
+
+def search_item_links(url_for, user_id):
+    '''Links of a user of User_profiles.'''
+    return [url_for(resources.User_profile, user_id = user_id),
+            url_for(resources.User_memberships, user_id = user_id),
+            url_for(resources.User_comments, user_id = user_id),
+            url_for(resources.User_rates, user_id = user_id),
+            url_for(resources.User_tags, user_id = user_id),
+            url_for(resources.User_statuses, user_id = user_id),
+            url_for(resources.User_friendships, user_id = user_id),
+            url_for(resources.User_conversations, user_id = user_id),
+            url_for(resources.User_feed, user_id = user_id)]
+
+def per_item(links, url_for):
+    '''
+    Build the links of :py:data:`ITEMS` items.
+
+    :return: microseconds per item.
+    '''
+    start = time.time()
+    for i in xrange(ITEMS):
+        links(url_for, i)
+    return (time.time() - start) * 1000000 / ITEMS
+
+def main():
+    cases = [("Feed status (6 links)", lambda url_for, i: feed_item_links(url_for, i, i % 100)),
+             ("Search user (9 links)", search_item_links)]
+    with resources.app.test_request_context("/friendsNet/api/users/"):
+        for description, links in cases:
+            before = per_item(links, resources.api.url_for)
+            after = per_item(links, resources.link_builder.url_for)
+            print "%-24s Api.url_for: %7.1f us/item   LinkBuilder: %7.1f us/item   speedup: %5.1fx" % (description, before, after, before / after)
+
+if __name__ == '__main__':
+    main()
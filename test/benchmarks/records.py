@@ -0,0 +1,67 @@
+'''
+Benchmark of :py:meth:`friendsNet.database.Connection.get_statuses_for_user`
+on a user with :py:data:`STATUSES` statuses, returning dictionaries (default)
+against returning :py:class:`friendsNet.database.Record` objects (records mode).
+
+Memory is the size of the returned objects themselves (list excluded): the
+values are the same in both modes.
+
+Run it from the project root with ``python -m test.benchmarks.records``.
+'''
+import sys
+import time
+from friendsNet import database
+
+DB_PATH = "db/benchmark_records.db"
+
+STATUSES = 100000
+ROUNDS = 5
+USER_ID = 1
+
+def prepare(engine):
+    '''Create a database holding a user with many statuses.'''
+    engine.remove_database()
+    engine.create_tables()
+    connection = engine.connect()
+    try:
+        con = connection.con
+        con.execute("INSERT INTO USERS_CREDENTIALS VALUES (?, 'bench@friendsnet.com', 'benchmarkpassword', 0)", (USER_ID,))
+        con.execute("INSERT INTO USERS_PROFILES VALUES (?, 'Bench', NULL, 'Mark', NULL, 20, 0)", (USER_ID,))
+        con.executemany("INSERT INTO STATUSES VALUES (?, ?, 'Status content', ?)", ((i, USER_ID, i) for i in xrange(1, STATUSES + 1)))
+        con.commit()
+    finally:
+        connection.close()
+
+def run(engine):
+    '''
+    Read :py:data:`ROUNDS` times all the statuses of the user.
+
+    :return: (rows per second, bytes taken by the returned objects)
+    '''
+    connection = engine.connect()
+    try:
+        start = time.time()
+        for _ in xrange(ROUNDS):
+            statuses = connection.get_statuses_for_user(USER_ID)
+        elapsed = time.time() - start
+    finally:
+        connection.close()
+    size = sum(sys.getsizeof(status) for status in statuses)
+    return ROUNDS * len(statuses) / elapsed, size
+
+def main():
+    engine = database.Engine(DB_PATH)
+    records_engine = database.Engine(DB_PATH, records = True)
+    try:
+        prepare(engine)
+        dict_rate, dict_size = run(engine)
+        record_rate, record_size = run(records_engine)
+        print "Dictionaries: %10.0f rows/sec %8.1f MB" % (dict_rate, dict_size / 1048576.0)
+        print "Records:      %10.0f rows/sec %8.1f MB" % (record_rate, record_size / 1048576.0)
+        print "Speedup:      %10.2fx    memory: %.2fx less" % (record_rate / dict_rate, float(dict_size) / record_size)
+    finally:
+        records_engine.dispose()
+        engine.remove_database()
+
+if __name__ == '__main__':
+    main()
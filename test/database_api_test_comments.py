@@ -35,6 +35,10 @@ com14 = {"user_id" : 5}
 res14 = None
 com15 = {"user_id" : 100}
 res15 = None
+com16 = {"status_ids" : [1, 2, 5, 999], "limit_per_status" : 2}
+res16 = {1 : [3, 2], 5 : [10, 9]}
+com17 = {"status_ids" : [1, 3]}
+res17 = {1 : [3, 2, 1], 3 : [5, 4]}
 
 class UserDBAPITestCase(unittest.TestCase):
     '''
@@ -146,7 +150,17 @@ class UserDBAPITestCase(unittest.TestCase):
         print "#15.READ comments for not existing user"
         resp = self.connection.get_comments_for_user(com15["user_id"])
         result = self.assertEqual(resp, res15)
-            
+
+    def test_case16(self):
+        print "#16.READ latest comments of many statuses at once"
+        resp = self.connection.get_comments_for_statuses(com16["status_ids"], limit_per_status = com16["limit_per_status"])
+        result = self.assertEqual(dict((status_id, [comment["comment_id"] for comment in comments]) for status_id, comments in resp.items()), res16)
+
+    def test_case17(self):
+        print "#17.READ all comments of many statuses at once"
+        resp = self.connection.get_comments_for_statuses(com17["status_ids"])
+        result = self.assertEqual(dict((status_id, [comment["comment_id"] for comment in comments]) for status_id, comments in resp.items()), res17)
+
 if __name__ == '__main__':
     print 'Start running user tests'
     unittest.main()        
\ No newline at end of file
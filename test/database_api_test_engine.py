@@ -0,0 +1,175 @@
+import unittest
+import time
+from friendsNet import database
+
+DB_PATH = "db/dump_database_test.db"
+ENGINE = database.Engine(DB_PATH, pool_size = 2, pool_timeout = 0.1)
+
+class EngineDBAPITestCase(unittest.TestCase):
+    '''
+    Test cases for the connection pool of the Engine.
+    '''
+    #INITIATION AND TEARDOWN METHODS
+    @classmethod
+    def setUpClass(cls):
+        ''' Creates the database structure. Removes first any preexisting
+            database file
+        '''
+        print "Testing ", cls.__name__
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        '''Remove the testing database'''
+        print "Testing ENDED for ", cls.__name__
+        ENGINE.remove_database()
+
+    def setUp(self):
+        '''
+        Populates the database
+        '''
+        #This method load the initial values from friendsNet_data_db.sql
+        ENGINE.populate_tables()
+
+    def tearDown(self):
+        '''
+        Close all pooled connections and remove all records from database
+        '''
+        ENGINE.dispose()
+        ENGINE.clear()
+
+    def test_case1(self):
+        print "#1. CHECKOUT connection, close it and checkout again: same connection is reused"
+        con1 = ENGINE.connect()
+        con1.close()
+        con2 = ENGINE.connect()
+        self.assertIs(con1, con2)
+        self.assertEqual(ENGINE.pool.size(), 1)
+        con2.close()
+        self.assertEqual(ENGINE.pool.idle(), 1)
+
+    def test_case2(self):
+        print "#2. CHECKOUT more connections than the pool size"
+        con1 = ENGINE.connect()
+        con2 = ENGINE.connect()
+        self.assertIsNot(con1, con2)
+        self.assertRaises(database.PoolTimeoutError, ENGINE.connect)
+        con1.close()
+        con3 = ENGINE.connect()
+        self.assertIs(con1, con3)
+        con2.close()
+        con3.close()
+
+    def test_case3(self):
+        print "#3. CHECKOUT connection which has been idle for too long"
+        ENGINE.pool.idle_timeout = 0.01
+        try:
+            con1 = ENGINE.connect()
+            con1.close()
+            time.sleep(0.05)
+            con2 = ENGINE.connect()
+            self.assertIsNot(con1, con2)
+            self.assertIsNone(con1.con)
+            self.assertEqual(ENGINE.pool.size(), 1)
+            con2.close()
+        finally:
+            ENGINE.pool.idle_timeout = database.DEFAULT_POOL_IDLE_TIMEOUT
+
+    def test_case4(self):
+        print "#4. CHECKOUT connection when the pooled one is not usable anymore"
+        ENGINE.pool.check_interval = 0
+        try:
+            con1 = ENGINE.connect()
+            con1.close()
+            con1.con.close()
+            time.sleep(0.01)
+            con2 = ENGINE.connect()
+            self.assertIsNot(con1, con2)
+            self.assertTrue(con2.is_healthy())
+            self.assertEqual(ENGINE.pool.size(), 1)
+            con2.close()
+        finally:
+            ENGINE.pool.check_interval = database.DEFAULT_POOL_CHECK_INTERVAL
+
+    def test_case5(self):
+        print "#5. DISPOSE engine while a connection is checked out"
+        con1 = ENGINE.connect()
+        con2 = ENGINE.connect()
+        con1.close()
+        ENGINE.dispose()
+        self.assertEqual(ENGINE.pool.idle(), 0)
+        con2.close()
+        self.assertIsNone(con2.con)
+        self.assertEqual(ENGINE.pool.size(), 0)
+
+    def test_case6(self):
+        print "#6. READ data through a reused connection"
+        con1 = ENGINE.connect()
+        self.assertEqual(con1.get_user_information(1)["first_name"], "Antonio")
+        con1.close()
+        con2 = ENGINE.connect()
+        self.assertEqual(con2.get_user_information(2)["first_name"], "Eugenio")
+        con2.close()
+
+    def test_case7(self):
+        print "#7. CONNECTION profile is applied once to every new connection"
+        con = ENGINE.connect()
+        cur = con.con.cursor()
+        cur.execute("PRAGMA journal_mode")
+        self.assertEqual(cur.fetchone()[0].lower(), "wal")
+        cur.execute("PRAGMA foreign_keys")
+        self.assertEqual(cur.fetchone()[0], 1)
+        cur.execute("PRAGMA synchronous")
+        self.assertEqual(cur.fetchone()[0], 1)      #NORMAL
+        cur.execute("PRAGMA busy_timeout")
+        self.assertEqual(cur.fetchone()[0], database.DEFAULT_CONNECTION_PROFILE["busy_timeout"])
+        con.close()
+
+    def test_case8(self):
+        print "#8. CREATE engine with an unknown profile setting"
+        self.assertRaises(ValueError, database.Engine, DB_PATH, profile = {"not_a_pragma" : 1})
+
+    def test_case9(self):
+        print "#9. CLOSE connection twice: it is given back to the pool only once"
+        con1 = ENGINE.connect()
+        con1.close()
+        con1.close()
+        self.assertEqual(ENGINE.pool.idle(), 1)
+        con2 = ENGINE.connect()
+        con3 = ENGINE.connect()
+        self.assertIsNot(con2, con3)
+        self.assertEqual(ENGINE.pool.size(), 2)
+        con2.close()
+        con3.close()
+
+    def test_case10(self):
+        print "#10. CHECKIN connection which is already idle"
+        con1 = ENGINE.connect()
+        con1.close()
+        self.assertRaises(ValueError, ENGINE.pool.checkin, con1)
+        self.assertEqual(ENGINE.pool.idle(), 1)
+
+    def test_case11(self):
+        print "#11. CHECKOUT connection idle for less than the check interval: its health is not checked"
+        con1 = ENGINE.connect()
+        con1.close()
+        checked = []
+        con1.is_healthy = lambda: checked.append(con1) or True
+        con2 = ENGINE.connect()
+        self.assertIs(con1, con2)
+        self.assertEqual(checked, [])
+        con2.close()
+        ENGINE.pool.check_interval = 0
+        try:
+            time.sleep(0.01)
+            con3 = ENGINE.connect()
+            self.assertIs(con1, con3)
+            self.assertEqual(checked, [con1])
+            con3.close()
+        finally:
+            ENGINE.pool.check_interval = database.DEFAULT_POOL_CHECK_INTERVAL
+
+if __name__ == '__main__':
+    print 'Start running engine tests'
+    unittest.main()
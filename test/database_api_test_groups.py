@@ -74,6 +74,8 @@ group34 = {"group_id" : 3}
 res34 = None
 group35 = {"group_id" : 99}
 res35 = None
+group36 = {"group_ids" : [2, 1, 99]}
+res36 = [1, 2]
 
 
 
@@ -287,6 +289,12 @@ class UserDBAPITestCase(unittest.TestCase):
         resp = self.connection.get_statuses_for_group(group35["group_id"])
         result = self.assertEqual(resp, res35)
 
+    def test_case36(self):
+        print "#36.GET information of many groups at once"
+        resp = self.connection.get_groups_information(group36["group_ids"])
+        self.assertEqual(sorted(resp.keys()), res36)
+        self.assertEqual(resp[1], self.connection.get_information_for_group(1))
+
 if __name__ == '__main__':
     print 'Start running user tests'
     unittest.main()
\ No newline at end of file
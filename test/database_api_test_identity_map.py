@@ -0,0 +1,93 @@
+import unittest
+from friendsNet import database
+
+DB_PATH = "db/dump_database_test.db"
+ENGINE = database.Engine(DB_PATH)
+
+map1 = {"status_id" : 1, "lookups" : 3}
+res1 = {"queries" : 1, "saved_queries" : 2}
+map2 = {"user_id" : 999}
+res2 = {"queries" : 1, "saved_queries" : 1}
+map3 = {"status_id" : 1, "content" : "Changed content"}
+res3 = "Changed content"
+map4 = {"status" : {"creator_id" : 1, "content" : "Rolled back"}}
+res4 = None
+map5 = {"status_ids" : [1, 2]}
+res5 = {"queries" : 2, "saved_queries" : 0}
+
+class IdentityMapDBAPITestCase(unittest.TestCase):
+    '''
+    Test cases for the identity map in front of the connection.
+    '''
+    #INITIATION AND TEARDOWN METHODS
+    @classmethod
+    def setUpClass(cls):
+        ''' Creates the database structure. Removes first any preexisting
+            database file
+        '''
+        print "Testing ", cls.__name__
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        '''Remove the testing database'''
+        print "Testing ENDED for ", cls.__name__
+        ENGINE.remove_database()
+
+    def setUp(self):
+        '''
+        Populates the database
+        '''
+        #This method load the initial values from friendsNet_data_db.sql
+        ENGINE.populate_tables()
+        #Creates an identity map in front of a Connection instance to use the API
+        self.connection = database.IdentityMap(ENGINE.connect())
+
+    def tearDown(self):
+        '''
+        Close underlying connection and remove all records from database
+        '''
+        self.connection.close()
+        ENGINE.clear()
+
+    def test_case1(self):
+        print "#1.READ the same status many times: one query"
+        resp = [self.connection.get_status(map1["status_id"]) for _ in range(map1["lookups"])]
+        self.assertIs(resp[0], resp[-1])
+        self.assertEqual(resp[0], self.connection.connection.get_status(map1["status_id"]))
+        result = self.assertEqual({"queries" : self.connection.queries, "saved_queries" : self.connection.saved_queries}, res1)
+
+    def test_case2(self):
+        print "#2.READ twice a user which doesn't exist: one query"
+        self.assertEqual(self.connection.get_user_information(map2["user_id"]), None)
+        self.assertEqual(self.connection.get_user_information(map2["user_id"]), None)
+        result = self.assertEqual({"queries" : self.connection.queries, "saved_queries" : self.connection.saved_queries}, res2)
+
+    def test_case3(self):
+        print "#3.READ a status after modifying it: the map has been emptied"
+        self.connection.get_status(map3["status_id"])
+        self.connection.update_status_content(map3["status_id"], map3["content"])
+        resp = self.connection.get_status(map3["status_id"])
+        result = self.assertEqual(resp["content"], res3)
+
+    def test_case4(self):
+        print "#4.READ a status created in a transaction rolled back: the map has been emptied"
+        try:
+            with self.connection.transaction():
+                status_id = self.connection.create_status(map4["status"])
+                self.assertNotEqual(self.connection.get_status(status_id), None)
+                raise ValueError("Rollback")
+        except ValueError:
+            pass
+        result = self.assertEqual(self.connection.get_status(status_id), res4)
+
+    def test_case5(self):
+        print "#5.READ different statuses: a query each"
+        for status_id in map5["status_ids"]:
+            self.connection.get_status(status_id)
+        result = self.assertEqual({"queries" : self.connection.queries, "saved_queries" : self.connection.saved_queries}, res5)
+
+if __name__ == '__main__':
+    print 'Start running identity map tests'
+    unittest.main()
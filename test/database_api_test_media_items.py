@@ -24,6 +24,26 @@ res8 = True
 media9 = {"media_id" : 1000}
 res9 = False
 res10 = 10
+media11 = {"media_ids" : [2, 10, 1000]}
+res11 = [2, 10]
+media12 = [{"media_type" : 0, "url" : "/friendsNet/media_uploads/media11.jpg", "content_hash" : "ab" * 32, "size" : 100},
+           {"media_type" : 0, "url" : "/friendsNet/media_uploads/media12.jpg", "content_hash" : "ab" * 32, "size" : 100}]
+res12 = {"content_hash" : "ab" * 32, "size" : 100, "references_count" : 2}
+media13 = {"media_type" : 0, "url" : "/friendsNet/media_uploads/media1.jpg", "content_hash" : "cd" * 32, "size" : 10}
+res13 = None
+res14 = [False, True, False]
+media15 = [{"variant" : "thumb", "width" : 64, "height" : 48, "size" : 1500}, {"variant" : "medium", "width" : 640, "height" : 480, "size" : 40000}]
+res15 = [True, {"content_hash" : "ab" * 32, "variant" : "thumb", "width" : 64, "height" : 48, "size" : 1500}, None]
+res16 = [False, None]
+media17 = {"media_type" : 0, "url_format" : "/friendsNet/media_uploads/media%s.jpg", "content_hash" : "ef" * 32, "size" : 10}
+media18 = {"upload_id" : "0123abcd", "file_extension" : "mp4", "size" : 1000}
+res18 = [True, False, {"upload_id" : "0123abcd", "file_extension" : "mp4", "size" : 1000}]
+media19 = {"upload_id" : "0123abcd", "file_extension" : "mp4", "size" : 0}
+res19 = [False, True, False, None]
+res21 = [True, False, True]
+res22 = [["0123abcd"], [], None]
+res20 = [{"content_hash" : "ab" * 32, "size" : 100, "references_count" : 1}, None]
+res17 = [(11, "/friendsNet/media_uploads/media11.jpg"), (12, "/friendsNet/media_uploads/media12.jpg")]
 
 class UserDBAPITestCase(unittest.TestCase):
     '''
@@ -110,7 +130,104 @@ class UserDBAPITestCase(unittest.TestCase):
         print "#10.GET last media item id"
         resp = self.connection.get_last_media_item_id()
         result = self.assertEqual(resp, res10)
-        
+
+    def test_case11(self):
+        print "#11.GET many media items at once"
+        resp = self.connection.get_media_items(media11["media_ids"])
+        self.assertEqual(sorted(resp.keys()), res11)
+        self.assertEqual(resp[2], self.connection.get_media_item(2))
+
+    def test_case12(self):
+        print "#12.CREATE media with the same content: one blob with two references"
+        media_ids = [self.connection.create_media(media) for media in media12]
+        self.assertEqual(self.connection.get_blob_for_media_item(media_ids[0]), res12)
+        self.assertEqual(self.connection.get_blob_for_media_url(media12[1]["url"]), res12)
+        result = self.assertEqual(self.connection.get_blob_for_media_item(1), None)
+
+    def test_case13(self):
+        print "#13.CREATE media with content and existing url: neither the media nor the blob are added"
+        resp = self.connection.create_media(media13)
+        self.assertEqual(resp, res13)
+        result = self.assertEqual(self.connection.con.execute("SELECT COUNT(*) FROM MEDIA_BLOBS").fetchone()[0], 0)
+
+    def test_case14(self):
+        print "#14.DELETE blob only when its last media item is deleted"
+        media_ids = [self.connection.create_media(media) for media in media12]
+        content_hash = media12[0]["content_hash"]
+        resp = [self.connection.delete_unreferenced_media_blob(content_hash)]
+        self.connection.delete_media_item(media_ids[0])
+        self.connection.delete_media_item(media_ids[1])
+        resp.append(self.connection.delete_unreferenced_media_blob(content_hash))
+        resp.append(self.connection.delete_unreferenced_media_blob(content_hash))
+        result = self.assertEqual(resp, res14)
+
+    def test_case15(self):
+        print "#15.CREATE derivatives of a blob"
+        self.connection.create_media(media12[0])
+        content_hash = media12[0]["content_hash"]
+        resp = [self.connection.create_media_derivatives(content_hash, media15)]
+        resp.append(self.connection.get_media_derivative(content_hash, "thumb"))
+        resp.append(self.connection.get_media_derivative(content_hash, "large"))
+        result = self.assertEqual(resp, res15)
+
+    def test_case16(self):
+        print "#16.CREATE derivatives of a blob which doesn't exist, and DELETE them with their blob"
+        resp = [self.connection.create_media_derivatives("cd" * 32, media15)]
+        media_id = self.connection.create_media(media12[0])
+        content_hash = media12[0]["content_hash"]
+        self.connection.create_media_derivatives(content_hash, media15)
+        self.connection.delete_media_item(media_id)
+        self.connection.delete_unreferenced_media_blob(content_hash)
+        resp.append(self.connection.get_media_derivative(content_hash, "thumb"))
+        result = self.assertEqual(resp, res16)
+
+    def test_case17(self):
+        print "#17.CREATE media with the url built from its id"
+        resp = []
+        for _ in range(2):
+            media_id = self.connection.create_media(media17)
+            resp.append((media_id, self.connection.get_media_item(media_id)["url"]))
+        result = self.assertEqual(resp, res17)
+
+    def test_case18(self):
+        print "#18.CREATE and GET resumable upload"
+        resp = [self.connection.create_media_upload(media18), self.connection.create_media_upload(media18)]
+        upload = self.connection.get_media_upload(media18["upload_id"])
+        self.assertTrue(upload.pop("creation_time") > 0)
+        resp.append(upload)
+        result = self.assertEqual(resp, res18)
+
+    def test_case19(self):
+        print "#19.CREATE upload with wrong size and DELETE upload"
+        resp = [self.connection.create_media_upload(media19)]
+        self.connection.create_media_upload(media18)
+        resp.append(self.connection.delete_media_upload(media18["upload_id"]))
+        resp.append(self.connection.delete_media_upload(media18["upload_id"]))
+        resp.append(self.connection.get_media_upload(media18["upload_id"]))
+        result = self.assertEqual(resp, res19)
+
+    def test_case20(self):
+        print "#20.GET blob by its hash"
+        self.connection.create_media(media12[0])
+        resp = [self.connection.get_media_blob(media12[0]["content_hash"]), self.connection.get_media_blob("cd" * 32)]
+        result = self.assertEqual(resp, res20)
+
+    def test_case21(self):
+        print "#21.CREATE uploads up to a maximum number in progress"
+        resp = [self.connection.create_media_upload(media18, max_uploads = 1)]
+        resp.append(self.connection.create_media_upload(dict(media18, upload_id = "4567ef"), max_uploads = 1))
+        resp.append(self.connection.create_media_upload(dict(media18, upload_id = "4567ef"), max_uploads = 2))
+        result = self.assertEqual(resp, res21)
+
+    def test_case22(self):
+        print "#22.DELETE expired uploads"
+        self.connection.create_media_upload(media18)
+        creation_time = self.connection.get_media_upload(media18["upload_id"])["creation_time"]
+        resp = [self.connection.delete_expired_media_uploads(creation_time + 1)]
+        resp.append(self.connection.delete_expired_media_uploads(creation_time + 1))
+        resp.append(self.connection.get_media_upload(media18["upload_id"]))
+        result = self.assertEqual(resp, res22)
+
 if __name__ == '__main__':
     print 'Start running user tests'
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,221 @@
+import unittest
+from friendsNet import database
+
+DB_PATH = "db/dump_database_test.db"
+ENGINE = database.Engine(DB_PATH)
+
+#Queries that are allowed to scan a whole table, with the reason
+ALLOWED_SCANS = {
+    "SELECT * FROM USERS_PROFILES ORDER BY user_id" : "search without parameters lists all the users"
+}
+
+new_user = {"email" : "plans@friendsnet.com", "password" : "cbadasjdhaskdjhaskdha", "first_name" : "Query", "middle_name" : None, "surname" : "Plan", "age" : 20, "gender" : 0}
+
+#Connection methods (with their arguments) that together run every query of the API
+READS = [
+    ("get_user_id", ("anto95umast@live.it", "cbadasjdhaskdjhaskdha")),
+    ("is_email_existing", ("anto95umast@live.it",)),
+    ("search_user", ("Anto", "Anto")),
+    ("search_users", ("Anto",)),
+    ("get_user_information", (1,)),
+    ("get_users_information", ([1, 2, 3],)),
+    ("get_statuses", ([1, 2],)),
+    ("get_media_items", ([1, 2],)),
+    ("get_groups_information", ([1, 2],)),
+    ("get_comment", (1,)),
+    ("get_rate", (1,)),
+    ("get_status", (1,)),
+    ("get_friendship", (1,)),
+    ("get_media_item", (1,)),
+    ("get_last_media_item_id", ()),
+    ("get_table_versions", (["statuses", "comments"],)),
+    ("get_conversation", (1,)),
+    ("get_information_for_group", (1,)),
+    ("get_members_for_group", (1,)),
+    ("get_requests_for_group", (2,)),
+    ("get_messages_for_conversation", (1,)),
+    ("get_friendships_for_user", (1,)),
+    ("get_statuses_for_user", (1,)),
+    ("get_statuses_for_group", (2,)),
+    ("get_media_for_status", (1,)),
+    ("get_tagged_users_for_status", (1,)),
+    ("get_comments_for_status", (1,)),
+    ("get_rates_for_status", (1,)),
+    ("get_media_for_statuses", ([1, 2],)),
+    ("get_tagged_users_for_statuses", ([1, 2],)),
+    ("get_comments_for_statuses", ([1, 2],)),
+    ("get_comments_for_statuses", ([1, 2], 3)),
+    ("get_rates_summary_for_statuses", ([1, 2],)),
+    ("get_groups_for_user", (1,)),
+    ("get_conversations_for_user", (1,)),
+    ("get_tagged_statuses_for_user", (2,)),
+    ("get_comments_for_user", (2,)),
+    ("get_rates_for_user", (2,)),
+    ("get_friends_statuses_for_user", (1,))
+]
+
+WRITES = [
+    ("create_user", (new_user,)),
+    ("create_media", ({"media_type" : 0, "url" : "http://plans.com", "description" : None},)),
+    ("create_group", ({"name" : "Plans", "privacy_level" : 1, "description" : None},)),
+    ("add_member_to_group", (1, 5)),
+    ("create_conversation", ({"user1_id" : 5, "user2_id" : 6},)),
+    ("add_request_to_group", (2, 6)),
+    ("create_friendship", (2, 5)),
+    ("create_status", ({"creator_id" : 1, "content" : "Plans"}, 2)),
+    ("add_media_to_status", (2, 3)),
+    ("add_tag_to_status", (2, 5)),
+    ("add_comment_to_status", (1, {"user_id" : 5, "content" : "Plans"})),
+    ("add_rate_to_status", (1, {"user_id" : 6, "rate" : 3})),
+    ("create_message", ({"conversation_id" : 1, "sender_id" : 1, "content" : "Plans"},)),
+    ("update_user", (1, {"password" : "newpassword", "first_name" : "Plan"})),
+    ("update_media_description", (1, "Plans")),
+    ("update_group", (1, {"description" : "Plans"})),
+    ("update_group_member", (1, {"user_id" : 3, "administrator" : 1})),
+    ("update_conversation", (1, 3000)),
+    ("update_status_content", (1, "Plans")),
+    ("update_comment_content", (1, "Plans")),
+    ("update_rate_value", (1, 1)),
+    ("accept_friendship", (3,))
+]
+
+DELETES = [
+    ("accept_group_request", (2, 6)),
+    ("delete_group_request", (2, 6)),
+    ("delete_member", (1, 5)),
+    ("delete_media_from_status", (1, 1)),
+    ("delete_tag", (2, 5)),
+    ("delete_comment", (1,)),
+    ("delete_rate", (1,)),
+    ("delete_friendship", (1,)),
+    ("delete_conversation", (1,)),
+    ("delete_status", (2,)),
+    ("delete_group", (1,)),
+    ("delete_media_item", (1,)),
+    ("delete_user", (4,))
+]
+
+class RecordingCursor(object):
+    '''
+    Cursor wrapper which records every statement executed through it.
+    '''
+    def __init__(self, cursor, statements):
+        self._cursor = cursor
+        self._statements = statements
+
+    def execute(self, query, query_parameters=()):
+        self._statements.append((query, tuple(query_parameters)))
+        return self._cursor.execute(query, query_parameters)
+
+    def executemany(self, query, query_parameters_list):
+        query_parameters_list = list(query_parameters_list)
+        if query_parameters_list:
+            self._statements.append((query, tuple(query_parameters_list[0])))
+        return self._cursor.executemany(query, query_parameters_list)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+class RecordingConnection(object):
+    '''
+    sqlite3 connection wrapper which gives out :py:class:`RecordingCursor` objects.
+    '''
+    def __init__(self, con):
+        self.__dict__["_con"] = con
+        self.__dict__["statements"] = []
+
+    def cursor(self, *args):
+        return RecordingCursor(self._con.cursor(*args), self.statements)
+
+    def execute(self, query, query_parameters=()):
+        self.statements.append((query, tuple(query_parameters)))
+        return self._con.execute(query, query_parameters)
+
+    def __getattr__(self, name):
+        return getattr(self._con, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._con, name, value)
+
+class QueryPlansDBAPITestCase(unittest.TestCase):
+    '''
+    Checks, through EXPLAIN QUERY PLAN, that no query of the API scans a whole table.
+    '''
+    #INITIATION AND TEARDOWN METHODS
+    @classmethod
+    def setUpClass(cls):
+        ''' Creates the database structure. Removes first any preexisting
+            database file
+        '''
+        print "Testing ", cls.__name__
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        '''Remove the testing database'''
+        print "Testing ENDED for ", cls.__name__
+        ENGINE.remove_database()
+
+    def setUp(self):
+        '''
+        Populates the database
+        '''
+        #This method load the initial values from friendsNet_data_db.sql
+        ENGINE.populate_tables()
+        #Creates a Connection instance to use the API, recording all the statements
+        self.connection = ENGINE.connect()
+        self.recorder = RecordingConnection(self.connection.con)
+        self.connection.con = self.recorder
+
+    def tearDown(self):
+        '''
+        Close underlying connection and remove all records from database
+        '''
+        self.connection.con = self.recorder._con
+        self.connection.close()
+        ENGINE.clear()
+
+    def _check_plans(self, calls):
+        '''
+        Run the calls and fail for every statement whose plan contains a full table scan.
+        '''
+        for name, args in calls:
+            getattr(self.connection, name)(*args)
+        self.connection.con = self.recorder._con        #The plans themselves are not recorded
+        self.assertTrue(len(self.recorder.statements) > 0)
+        scans = []
+        for query, query_parameters in self.recorder.statements:
+            if query.startswith("PRAGMA") or query in ALLOWED_SCANS:
+                continue
+            for detail in self.connection.explain_query_plan(query, query_parameters):
+                #Full text searches are reported as "SCAN <table> VIRTUAL TABLE INDEX <n>:M" but use the full text index
+                if detail.startswith("SCAN") and detail != "SCAN CONSTANT ROW" and "VIRTUAL TABLE INDEX" not in detail:
+                    scans.append("%s -> %s" % (query, detail))
+        self.assertEqual(scans, [], "Full table scans:\n" + "\n".join(scans))
+
+    def test_case1(self):
+        print "#1. EXPLAIN query plan of a lookup on an indexed column"
+        plan = self.connection.explain_query_plan("SELECT * FROM STATUSES WHERE creator_id = ?", (1,))
+        self.assertEqual(len(plan), 1)
+        self.assertTrue(plan[0].startswith("SEARCH"))
+        self.assertIn("statuses_creator_time_idx", plan[0])
+
+    def test_case2(self):
+        print "#2. CHECK that no query run by the get methods scans a whole table"
+        self._check_plans(READS)
+
+    def test_case3(self):
+        print "#3. CHECK that no query run by the create, add and update methods scans a whole table"
+        self._check_plans(WRITES)
+
+    def test_case4(self):
+        print "#4. CHECK that no query run by the delete methods scans a whole table"
+        self._check_plans(DELETES)
+
+if __name__ == '__main__':
+    print 'Start running query plans tests'
+    unittest.main()
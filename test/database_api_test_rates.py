@@ -42,6 +42,8 @@ rate17 = {"user_id" : 5}
 res17 = None
 rate18 = {"user_id" : 100}
 res18 = None
+rate19 = {"status_ids" : [1, 4, 3, 999]}
+res19 = {1 : {"count" : 1, "average" : 4.0}, 4 : {"count" : 3, "average" : 4.0}}
 
 class UserDBAPITestCase(unittest.TestCase):
     '''
@@ -168,7 +170,12 @@ class UserDBAPITestCase(unittest.TestCase):
         print "#18.READ rates for not existing user"
         resp = self.connection.get_rates_for_user(rate18["user_id"])
         result = self.assertEqual(resp, res18)
-        
+
+    def test_case19(self):
+        print "#19.READ rates summary of many statuses at once"
+        resp = self.connection.get_rates_summary_for_statuses(rate19["status_ids"])
+        result = self.assertEqual(resp, res19)
+
 if __name__ == '__main__':
     print 'Start running user tests'
     unittest.main()        
\ No newline at end of file
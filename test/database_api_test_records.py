@@ -0,0 +1,95 @@
+import unittest
+from friendsNet import database
+from test.database_api_test_query_plans import READS
+
+DB_PATH = "db/dump_database_test.db"
+ENGINE = database.Engine(DB_PATH)
+RECORDS_ENGINE = database.Engine(DB_PATH, records = True)
+
+res1 = {"status_id" : 1, "creator_id" : 1, "content" : "Good morning!", "creation_time" : 50}
+res2 = ("status_id", "creator_id", "content", "creation_time")
+
+def as_dicts(value):
+    '''Replace the records (also inside lists and dictionaries) with dictionaries.'''
+    if isinstance(value, database.Record):
+        return value.as_dict()
+    if isinstance(value, list):
+        return [as_dicts(item) for item in value]
+    if isinstance(value, dict):
+        return dict((key, as_dicts(item)) for key, item in value.items())
+    return value
+
+class RecordsDBAPITestCase(unittest.TestCase):
+    '''
+    Test cases for the connections returning records instead of dictionaries.
+    '''
+    #INITIATION AND TEARDOWN METHODS
+    @classmethod
+    def setUpClass(cls):
+        ''' Creates the database structure. Removes first any preexisting
+            database file
+        '''
+        print "Testing ", cls.__name__
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        '''Remove the testing database'''
+        print "Testing ENDED for ", cls.__name__
+        RECORDS_ENGINE.dispose()
+        ENGINE.remove_database()
+
+    def setUp(self):
+        '''
+        Populates the database
+        '''
+        #This method load the initial values from friendsNet_data_db.sql
+        ENGINE.populate_tables()
+        #Creates a Connection instance for each result mode
+        self.connection = ENGINE.connect()
+        self.records_connection = RECORDS_ENGINE.connect()
+
+    def tearDown(self):
+        '''
+        Close underlying connections and remove all records from database
+        '''
+        self.connection.close()
+        self.records_connection.close()
+        ENGINE.clear()
+
+    def test_case1(self):
+        print "#1.READ status as record: access by key, attribute and position"
+        resp = self.records_connection.get_status(1)
+        self.assertIsInstance(resp, database.Record)
+        self.assertEqual(resp.as_dict(), res1)
+        self.assertEqual(resp["content"], res1["content"])
+        self.assertEqual(resp.content, res1["content"])
+        self.assertEqual(resp[0], res1["status_id"])
+        self.assertEqual(resp.get("not_a_column", 5), 5)
+        self.assertRaises(KeyError, resp.__getitem__, "not_a_column")
+
+    def test_case2(self):
+        print "#2.READ statuses as records: one record class for the same columns, read only"
+        resp = self.records_connection.get_statuses_for_user(1)
+        self.assertIs(type(resp[0]), type(resp[1]))
+        self.assertEqual(tuple(resp[0].keys()), res2)
+        self.assertRaises(AttributeError, setattr, resp[0], "content", "Changed")
+
+    def test_case3(self):
+        print "#3.READ with every get method: records have the same values as the dictionaries"
+        for name, args in READS:
+            resp = getattr(self.records_connection, name)(*args)
+            expected = getattr(self.connection, name)(*args)
+            self.assertEqual(as_dicts(resp), expected, name)
+
+    def test_case4(self):
+        print "#4.READ a column which is not a valid attribute name"
+        cur = self.records_connection.con.cursor()
+        cur.execute("SELECT COUNT(*) FROM STATUSES")
+        result = self.assertEqual(cur.fetchone()[0], 9)
+        cur.close()
+
+if __name__ == '__main__':
+    print 'Start running records tests'
+    unittest.main()
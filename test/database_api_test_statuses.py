@@ -50,6 +50,35 @@ stat22 = {"status" : {"creator_id" : 1, "content" : "Hi :)"}, "group_id" : 3}
 res22 = 10
 stat23 = {"status" : {"creator_id" : 1, "content" : "Hi :)"}, "group_id" : 99}
 res23 = None
+stat24 = {"user_id" : 3, "limit_to" : 2}
+res24 = [9, 6]
+stat25 = {"user_id" : 3, "limit_to" : 2, "after" : (170, 6)}
+res25 = [5, 4]
+stat26 = {"user_id" : 3, "limit_to" : 2, "before" : (150, 5)}
+res26 = [9, 6]
+stat27 = {"user_id" : 3, "limit_to" : 2, "after" : (100, 4)}
+res27 = None
+stat28 = {"status_ids" : [9, 1, 999]}
+res28 = [1, 9]
+stat29 = {"status_id" : 1, "media_ids" : [3, 2]}
+res29 = [1, 2, 3]
+stat30 = {"tables" : ["statuses", "comments", "not_a_table"], "values" : {"creator_id" : 1, "content" : "Versioned"}}
+res30 = ["comments", "statuses"]
+stat31 = {"user_id" : 3, "limit_to" : 3}
+res31 = [9, 6, 5]
+stat32 = {"status_ids" : [1, 2, 6, 999]}
+res32 = {1 : [1], 2 : [2]}
+stat33 = {"status_ids" : [1, 3, 6, 999]}
+res33 = {1 : [2, 4], 3 : [3]}
+stat34 = {"status" : {"creator_id" : 1, "content" : "Holidays!"}, "media_ids" : [4, 2, 4], "tagged_user_ids" : [3, 2]}
+res34 = {"status_id" : 10, "media_ids" : [2, 4], "tagged_user_ids" : [2, 3]}
+stat35 = {"status" : {"creator_id" : 1, "content" : "Holidays!"}, "media_ids" : [2, 999], "tagged_user_ids" : [3]}
+res35 = None
+
+stat36 = {"statuses" : [{"creator_id" : 1, "content" : "First"}, {"creator_id" : 2, "content" : "Second"}]}
+res36 = [10, 11]
+
+stat37 = {"statuses" : [{"creator_id" : 1, "content" : "First"}, {"creator_id" : 2, "content" : "Second"}]}
 
 class UserDBAPITestCase(unittest.TestCase):
     '''
@@ -202,6 +231,127 @@ class UserDBAPITestCase(unittest.TestCase):
         resp = self.connection.create_status(stat23["status"], stat23["group_id"])
         result = self.assertEqual(resp, res23)
 
+    def test_case24(self):
+        print "#24. GET first page of statuses of a user"
+        resp = self.connection.get_statuses_for_user(stat24["user_id"], limit_to = stat24["limit_to"])
+        self.assertEqual([status["status_id"] for status in resp], res24)
+
+    def test_case25(self):
+        print "#25. GET page of statuses of a user after a given status"
+        resp = self.connection.get_statuses_for_user(stat25["user_id"], limit_to = stat25["limit_to"], after = stat25["after"])
+        self.assertEqual([status["status_id"] for status in resp], res25)
+
+    def test_case26(self):
+        print "#26. GET page of statuses of a user before a given status"
+        resp = self.connection.get_statuses_for_user(stat26["user_id"], limit_to = stat26["limit_to"], before = stat26["before"])
+        self.assertEqual([status["status_id"] for status in resp], res26)
+
+    def test_case27(self):
+        print "#27. GET page of statuses of a user after the last status"
+        resp = self.connection.get_statuses_for_user(stat27["user_id"], limit_to = stat27["limit_to"], after = stat27["after"])
+        self.assertEqual(resp, res27)
+
+    def test_case28(self):
+        print "#28.GET many statuses at once"
+        resp = self.connection.get_statuses(stat28["status_ids"])
+        self.assertEqual(sorted(resp.keys()), res28)
+        self.assertEqual(resp[9], self.connection.get_status(9))
+
+    def test_case29(self):
+        print "#29.READ many media attached to a status"
+        for media_id in stat29["media_ids"]:
+            self.connection.add_media_to_status(stat29["status_id"], media_id)
+        resp = self.connection.get_media_for_status(stat29["status_id"])
+        result = self.assertEqual([media["media_item_id"] for media in resp], res29)
+
+    def test_case30(self):
+        print "#30.GET table versions before and after creating a status"
+        versions = self.connection.get_table_versions(stat30["tables"])
+        self.assertEqual(sorted(versions.keys()), res30)
+        self.connection.create_status(stat30["values"])
+        resp = self.connection.get_table_versions(stat30["tables"])
+        self.assertEqual(resp["statuses"], versions["statuses"] + 1)
+        self.assertEqual(resp["comments"], versions["comments"])
+
+    def test_case31(self):
+        print "#31.GET statuses of a user streamed from the database"
+        resp = self.connection.get_statuses_for_user(stat31["user_id"], limit_to = stat31["limit_to"], stream = True)
+        self.assertNotIsInstance(resp, list)
+        result = self.assertEqual([status["status_id"] for status in resp], res31)
+
+    def test_case32(self):
+        print "#32.READ media of many statuses at once"
+        resp = self.connection.get_media_for_statuses(stat32["status_ids"])
+        result = self.assertEqual(dict((status_id, [media["media_item_id"] for media in media_list]) for status_id, media_list in resp.items()), res32)
+
+    def test_case33(self):
+        print "#33.READ users tagged in many statuses at once"
+        resp = self.connection.get_tagged_users_for_statuses(stat33["status_ids"])
+        result = self.assertEqual(dict((status_id, [user["user_id"] for user in users]) for status_id, users in resp.items()), res33)
+
+    def test_case34(self):
+        print "#34.CREATE status with media and tags"
+        resp = self.connection.create_status(stat34["status"], media_ids = stat34["media_ids"], tagged_user_ids = stat34["tagged_user_ids"])
+        self.assertEqual(resp, res34["status_id"])
+        self.assertEqual([media["media_item_id"] for media in self.connection.get_media_for_status(resp)], res34["media_ids"])
+        result = self.assertEqual([user["user_id"] for user in self.connection.get_tagged_users_for_status(resp)], res34["tagged_user_ids"])
+
+    def test_case35(self):
+        print "#35.CREATE status with a media which doesn't exist: nothing is inserted"
+        count_query = "SELECT (SELECT COUNT(*) FROM STATUSES), (SELECT COUNT(*) FROM STATUSES_MEDIA_LISTS), (SELECT COUNT(*) FROM STATUSES_TAGS_LISTS)"
+        counts = tuple(self.connection.con.execute(count_query).fetchone())
+        resp = self.connection.create_status(stat35["status"], media_ids = stat35["media_ids"], tagged_user_ids = stat35["tagged_user_ids"])
+        self.assertEqual(resp, res35)
+        result = self.assertEqual(tuple(self.connection.con.execute(count_query).fetchone()), counts)
+
+    def test_case36(self):
+        print "#36.CREATE many statuses in one transaction: committed at the end of the block"
+        other = ENGINE.connect()
+        with self.connection.transaction():
+            resp = [self.connection.create_status(status) for status in stat36["statuses"]]
+            self.assertEqual(other.get_status(resp[0]), None)
+        other.close()
+        self.assertEqual(resp, res36)
+        result = self.assertEqual([self.connection.get_status(status_id)["content"] for status_id in resp], [status["content"] for status in stat36["statuses"]])
+
+    def test_case37(self):
+        print "#37.CREATE many statuses in a transaction which fails: nothing is written"
+        count = self.connection.con.execute("SELECT COUNT(*) FROM STATUSES").fetchone()[0]
+        try:
+            with self.connection.transaction():
+                for status in stat37["statuses"]:
+                    self.connection.create_status(status)
+                raise ValueError("Rollback")
+        except ValueError:
+            pass
+        result = self.assertEqual(self.connection.con.execute("SELECT COUNT(*) FROM STATUSES").fetchone()[0], count)
+
+    def test_case38(self):
+        print "#38.CREATE statuses in nested transactions: the inner block is refused"
+        count = self.connection.con.execute("SELECT COUNT(*) FROM STATUSES").fetchone()[0]
+        with self.assertRaises(database.NestedTransactionError):
+            with self.connection.transaction():
+                self.connection.create_status(stat37["statuses"][0])
+                with self.connection.transaction():
+                    pass
+        self.assertFalse(self.connection.is_in_transaction())
+        result = self.assertEqual(self.connection.con.execute("SELECT COUNT(*) FROM STATUSES").fetchone()[0], count)
+
+    def test_case39(self):
+        print "#39.Effects after the commit run only if the transaction commits"
+        calls = []
+        with self.connection.transaction():
+            self.connection.after_commit(lambda: calls.append(self.connection.is_in_transaction()))
+            self.assertEqual(calls, [])
+        try:
+            with self.connection.transaction():
+                self.connection.after_commit(lambda: calls.append("rolled back"))
+                raise ValueError("Rollback")
+        except ValueError:
+            pass
+        self.connection.after_commit(lambda: calls.append("no transaction"))
+        result = self.assertEqual(calls, [False, "no transaction"])
+
 if __name__ == '__main__':
     print 'Start running user tests'
     unittest.main()        
\ No newline at end of file
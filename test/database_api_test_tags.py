@@ -31,6 +31,10 @@ tag12 = {"user_id" : 5}
 res12 = None
 tag13 = {"user_id" : 100}
 res13 = None
+tag14 = {"status_id" : 1}
+res14 = [2, 4]
+tag15 = [{"status_id" : 1, "user_id" : 2}, {"status_id" : 1, "user_id" : 3}, {"status_id" : 900, "user_id" : 2}]
+res15 = [True, False, False]
 
 class UserDBAPITestCase(unittest.TestCase):
     '''
@@ -133,6 +137,16 @@ class UserDBAPITestCase(unittest.TestCase):
         resp = self.connection.get_tagged_statuses_for_user(tag13["user_id"])
         result = self.assertEqual(resp,res13)
 
+    def test_case14(self):
+        print "#14.READ many tags for existing status"
+        resp = self.connection.get_tagged_users_for_status(tag14["status_id"])
+        result = self.assertEqual([user["user_id"] for user in resp], res14)
+
+    def test_case15(self):
+        print "#15.READ if users are tagged in statuses"
+        resp = [self.connection.is_user_tagged(tag["status_id"], tag["user_id"]) for tag in tag15]
+        result = self.assertEqual(resp, res15)
+
 if __name__ == '__main__':
     print 'Start running user tests'
     unittest.main()
\ No newline at end of file
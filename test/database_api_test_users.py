@@ -57,6 +57,31 @@ user25 = {"user_id" : 6}
 res25 = None
 user26 = {"user_id" : 99}
 res26 = None
+user27 = {"user_id" : 2, "status" : {"creator_id" : 1, "content" : "Fresh news"}}
+user28 = {"user_id" : 1, "status" : {"creator_id" : 3, "content" : "Only for the group"}, "group_id" : 2}
+res28 = [6, 5, 4, 3]
+user29 = {"user_id" : 1, "friendship_id" : 4}
+res29 = [8, 7, 6, 5, 4, 3]
+user30 = {"user_id" : 1, "friendship_id" : 2}
+res30 = [3]
+user31 = {"user_id" : 1, "status_id" : 6}
+res31 = [5, 4, 3]
+user32 = {"user_id" : 1, "group_id" : 2}
+res32 = [9, 6, 5, 4, 3]
+user33 = {"text" : "smi kat"}
+res33 = [4]
+user34 = {"user_id" : 1, "values" : {"first_name" : "Zorro"}, "text" : "zorr"}
+res34 = [1]
+user35 = {"user_id" : 4, "text" : "smith"}
+res35 = None
+user36 = {"user_ids" : [1, 3, 3, 99]}
+res36 = [1, 3]
+user37 = {"user_ids" : range(1, 1200)}
+res37 = [1, 2, 3, 4, 5, 6, 7]
+user38 = {"token_hash" : "a" * 64, "expiration" : 2000, "now" : 1000, "later" : 3000}
+res38 = [False, True, True, 0, True, 1, False]
+user39 = {"first_name" : "?!", "surname" : ""}
+res39 = None
 	  
 class UserDBAPITestCase(unittest.TestCase):
     '''
@@ -225,6 +250,86 @@ class UserDBAPITestCase(unittest.TestCase):
         resp = self.connection.get_groups_for_user(user26["user_id"])
         result = self.assertEqual(resp, res26)
 
+    def test_case27(self):
+        print "#27.GET friends' statuses after a friend posted a new status"
+        status_id = self.connection.create_status(user27["status"])
+        resp = self.connection.get_friends_statuses_for_user(user27["user_id"])
+        result = self.assertEqual(resp[0]["status_id"], status_id)
+
+    def test_case28(self):
+        print "#28.GET friends' statuses after a friend posted a new status in a group"
+        self.connection.create_status(user28["status"], user28["group_id"])
+        resp = self.connection.get_friends_statuses_for_user(user28["user_id"])
+        result = self.assertEqual([status["status_id"] for status in resp], res28)
+
+    def test_case29(self):
+        print "#29.GET friends' statuses after accepting a friendship"
+        self.connection.accept_friendship(user29["friendship_id"])
+        resp = self.connection.get_friends_statuses_for_user(user29["user_id"])
+        result = self.assertEqual([status["status_id"] for status in resp], res29)
+
+    def test_case30(self):
+        print "#30.GET friends' statuses after deleting a friendship"
+        self.connection.delete_friendship(user30["friendship_id"])
+        resp = self.connection.get_friends_statuses_for_user(user30["user_id"])
+        result = self.assertEqual([status["status_id"] for status in resp], res30)
+
+    def test_case31(self):
+        print "#31.GET friends' statuses after a friend deleted a status"
+        self.connection.delete_status(user31["status_id"])
+        resp = self.connection.get_friends_statuses_for_user(user31["user_id"])
+        result = self.assertEqual([status["status_id"] for status in resp], res31)
+
+    def test_case32(self):
+        print "#32.GET friends' statuses after deleting the group in which a friend posted a status"
+        self.connection.delete_group(user32["group_id"])
+        resp = self.connection.get_friends_statuses_for_user(user32["user_id"])
+        result = self.assertEqual([status["status_id"] for status in resp], res32)
+
+    def test_case33(self):
+        print "#33.SEARCH users with words beginning first name, middle name or surname"
+        resp = self.connection.search_users(user33["text"])
+        result = self.assertEqual([user["user_id"] for user in resp], res33)
+
+    def test_case34(self):
+        print "#34.SEARCH users after updating a name"
+        self.connection.update_user(user34["user_id"], user34["values"])
+        resp = self.connection.search_users(user34["text"])
+        result = self.assertEqual([user["user_id"] for user in resp], res34)
+
+    def test_case35(self):
+        print "#35.SEARCH users after deleting a user"
+        self.connection.delete_user(user35["user_id"])
+        resp = self.connection.search_users(user35["text"])
+        result = self.assertEqual(resp, res35)
+
+    def test_case36(self):
+        print "#36.GET information of many users at once"
+        resp = self.connection.get_users_information(user36["user_ids"])
+        self.assertEqual(sorted(resp.keys()), res36)
+        self.assertEqual(resp[1], self.connection.get_user_information(1))
+
+    def test_case37(self):
+        print "#37.GET information of more users than the ids bound to a single query"
+        resp = self.connection.get_users_information(user37["user_ids"])
+        result = self.assertEqual(sorted(resp.keys()), res37)
+
+    def test_case38(self):
+        print "#38.REVOKE a token, revoke it again and forget it once expired"
+        resp = [self.connection.is_token_revoked(user38["token_hash"])]
+        resp.append(self.connection.create_revoked_token(user38["token_hash"], user38["expiration"]))
+        resp.append(self.connection.is_token_revoked(user38["token_hash"]))
+        resp.append(self.connection.delete_expired_revoked_tokens(user38["now"]))
+        resp.append(self.connection.create_revoked_token(user38["token_hash"], user38["expiration"]))
+        resp.append(self.connection.delete_expired_revoked_tokens(user38["later"]))
+        resp.append(self.connection.is_token_revoked(user38["token_hash"]))
+        result = self.assertEqual(resp, res38)
+
+    def test_case39(self):
+        print "#39.SEARCH user with a name without any word"
+        resp = self.connection.search_user(user39["first_name"], user39["surname"])
+        result = self.assertEqual(resp, res39)
+
 if __name__ == '__main__':
     print 'Start running user tests'
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,154 @@
+import unittest
+import json
+import flask
+import friendsNet.resources as resources
+import friendsNet.database as database
+
+DB_PATH = 'db/friendsNet_test.db'
+ENGINE = database.Engine(DB_PATH)
+
+COLLECTION_JSON = "application/vnd.collection+json"
+HAL_JSON = "application/hal+json"
+JSON = "application/json"
+
+#Tell Flask that I am running it in testing mode.
+resources.app.config['TESTING'] = True
+#Necessary for correct translation in url_for
+resources.app.config['SERVER_NAME'] = 'localhost:5000'
+
+#Database Engine utilized in our testing
+resources.app.config.update({'Engine': ENGINE})
+
+class ResourcesAPITestCase(unittest.TestCase):
+    #INITIATION AND TEARDOWN METHODS
+    @classmethod
+    def setUpClass(cls):
+        ''' Creates the database structure. Removes first any preexisting database file.'''
+        print "Testing ", cls.__name__
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        '''Remove the testing database.'''
+        print "Testing ENDED for ", cls.__name__
+        ENGINE.remove_database()
+
+    def setUp(self):
+        '''Populates the database.'''
+        #This method loads the initial values from friendsNet_data_db.sql
+        ENGINE.populate_tables()
+        #Activate app_context for using url_for
+        self.app_context = resources.app.app_context()
+        self.app_context.push()
+        #Create a test client
+        self.client = resources.app.test_client()
+
+    def tearDown(self):
+        '''
+        Remove all records from database.
+        '''
+        ENGINE.clear()
+        self.app_context.pop()
+
+class BatchTestCase(ResourcesAPITestCase):
+
+    batch_post_correct = [
+        {"method" : "GET", "path" : "/friendsNet/api/statuses/1/", "headers" : {"Accept" : HAL_JSON}},
+        {"method" : "GET", "path" : "/friendsNet/api/users/3/feed/?limit=2"},
+        {"method" : "POST", "path" : "/friendsNet/api/users/2/statuses/", "body" : {"template" : {"data" : [{"name" : "content", "value" : "Hello!"}]}}},
+        {"method" : "GET", "path" : "/friendsNet/api/statuses/999/", "headers" : {"Accept" : HAL_JSON}}
+    ]
+
+    batch_post_failing = [
+        {"method" : "POST", "path" : "/friendsNet/api/users/2/statuses/", "body" : {"template" : {"data" : [{"name" : "content", "value" : "Hello!"}]}}},
+        {"method" : "POST", "path" : "/friendsNet/api/users/999/statuses/", "body" : {"template" : {"data" : [{"name" : "content", "value" : "Hello!"}]}}},
+        {"method" : "GET", "path" : "/friendsNet/api/statuses/1/"}
+    ]
+
+    def setUp(self):
+        super(BatchTestCase, self).setUp()
+        self.url = resources.api.url_for(resources.Batch, _external = False)
+        self.statuses_url = resources.api.url_for(resources.User_statuses, user_id = 2, _external = False)
+
+    def statuses_count(self):
+        return len(json.loads(self.client.get(self.statuses_url, headers = {"Accept" : COLLECTION_JSON}).data)["collection"]["items"])
+
+    def test_url(self):
+        #Checks that the URL points to the right resource
+        _url = '/friendsNet/api/batch/'
+        print '('+self.test_url.__name__+')', self.test_url.__doc__
+        with resources.app.test_request_context(_url, method = "POST"):       #Only POST is routed
+            rule = flask.request.url_rule
+            view_point = resources.app.view_functions[rule.endpoint].view_class
+            self.assertEquals(view_point, resources.Batch)
+
+#TEST POST
+#200
+    def test_post_batch(self):
+        '''Sub-requests run in order, each response as if it was requested alone'''
+        print '('+self.test_post_batch.__name__+')', self.test_post_batch.__doc__
+        count = self.statuses_count()
+        status = self.client.get(self.batch_post_correct[0]["path"], headers = {"Accept" : HAL_JSON})
+        status_body = json.loads(status.data)
+        feed_body = json.loads(self.client.get(self.batch_post_correct[1]["path"], headers = {"Accept" : COLLECTION_JSON}).data)
+
+        resp = self.client.post(self.url, data = json.dumps(self.batch_post_correct), headers = {"Content-Type" : JSON, "Accept" : COLLECTION_JSON})
+        self.assertEquals(resp.status_code, 200)
+        self.assertEquals(resp.headers.get("Content-Type", None), JSON)
+        responses = json.loads(resp.data)
+        self.assertEquals([response["status"] for response in responses], [200, 200, 201, 404])
+
+        self.assertEquals(responses[0]["body"], status_body)
+        self.assertEquals(responses[0]["headers"]["ETag"], status.headers["ETag"])
+        self.assertEquals(responses[1]["body"], feed_body)
+
+        self.assertIn("Location", responses[2]["headers"])
+        self.assertEquals(responses[2]["body"], None)
+        self.assertEquals(self.statuses_count(), count + 1)
+        self.assertEquals(responses[3]["body"]["code"], 404)
+
+    def test_post_batch_atomic(self):
+        '''Atomic batch stops at the first failing sub-request and rolls everything back'''
+        print '('+self.test_post_batch_atomic.__name__+')', self.test_post_batch_atomic.__doc__
+        count = self.statuses_count()
+        resp = self.client.post(self.url + "?atomic=true", data = json.dumps(self.batch_post_failing), headers = {"Content-Type" : JSON})
+        self.assertEquals(resp.status_code, 409)
+        self.assertEquals([response["status"] for response in json.loads(resp.data)], [201, 404])
+        self.assertEquals(self.statuses_count(), count)
+
+        resp = self.client.post(self.url + "?atomic=true", data = json.dumps(self.batch_post_failing[:1] * 2), headers = {"Content-Type" : JSON})
+        self.assertEquals(resp.status_code, 200)
+        self.assertEquals([response["status"] for response in json.loads(resp.data)], [201, 201])
+        self.assertEquals(self.statuses_count(), count + 2)
+
+    def test_post_batch_not_atomic(self):
+        '''Sub-requests of a batch which is not atomic are committed even if a later one fails'''
+        print '('+self.test_post_batch_not_atomic.__name__+')', self.test_post_batch_not_atomic.__doc__
+        count = self.statuses_count()
+        resp = self.client.post(self.url, data = json.dumps(self.batch_post_failing), headers = {"Content-Type" : JSON})
+        self.assertEquals(resp.status_code, 200)
+        self.assertEquals([response["status"] for response in json.loads(resp.data)], [201, 404, 200])
+        self.assertEquals(self.statuses_count(), count + 1)
+
+#400
+    def test_post_wrong_batch(self):
+        print '('+self.test_post_wrong_batch.__name__+')', self.test_post_wrong_batch.__doc__
+        for batch in [{"method" : "GET", "path" : "/friendsNet/api/statuses/1/"},
+                      [{"method" : "GET", "path" : "/profiles/status-profile/"}],
+                      [{"method" : "POST", "path" : self.url, "body" : []}],
+                      [{"method" : "PATCH", "path" : "/friendsNet/api/statuses/1/"}],
+                      [{"path" : "/friendsNet/api/statuses/1/"}],
+                      [{"method" : "GET", "path" : "/friendsNet/api/statuses/1/"}] * (resources.MAX_BATCH_REQUESTS + 1)]:
+            resp = self.client.post(self.url, data = json.dumps(batch), headers = {"Content-Type" : JSON})
+            self.assertEquals(resp.status_code, 400)
+
+#415
+    def test_post_wrong_header_batch(self):
+        print '('+self.test_post_wrong_header_batch.__name__+')', self.test_post_wrong_header_batch.__doc__
+        resp = self.client.post(self.url, data = json.dumps(self.batch_post_correct))
+        self.assertEquals(resp.status_code, 415)
+
+if __name__ == '__main__':
+    print 'Start running batch tests'
+    unittest.main()
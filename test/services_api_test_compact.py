@@ -0,0 +1,123 @@
+import unittest
+import json
+import flask
+import friendsNet.resources as resources
+import friendsNet.database as database
+from friendsNet.compact import CompactEncoder
+
+DB_PATH = 'db/friendsNet_test.db'
+ENGINE = database.Engine(DB_PATH)
+
+COLLECTION_JSON = "application/vnd.collection+json"
+COMPACT_COLLECTION_JSON = COLLECTION_JSON + ";view=compact"
+
+#Tell Flask that I am running it in testing mode.
+resources.app.config['TESTING'] = True
+#Necessary for correct translation in url_for
+resources.app.config['SERVER_NAME'] = 'localhost:5000'
+
+#Database Engine utilized in our testing
+resources.app.config.update({'Engine': ENGINE})
+
+def without_prompts(value):
+    '''Expected compact version of a full representation.'''
+    if isinstance(value, dict):
+        return dict((key, without_prompts(member)) for key, member in value.items() if key not in ("prompt", "template", "queries"))
+    if isinstance(value, list):
+        return [without_prompts(member) for member in value]
+    return value
+
+class ResourcesAPITestCase(unittest.TestCase):
+    #INITIATION AND TEARDOWN METHODS
+    @classmethod
+    def setUpClass(cls):
+        ''' Creates the database structure. Removes first any preexisting database file.'''
+        print "Testing ", cls.__name__
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        '''Remove the testing database.'''
+        print "Testing ENDED for ", cls.__name__
+        ENGINE.remove_database()
+
+    def setUp(self):
+        '''Populates the database.'''
+        #This method loads the initial values from friendsNet_data_db.sql
+        ENGINE.populate_tables()
+        #Activate app_context for using url_for
+        self.app_context = resources.app.app_context()
+        self.app_context.push()
+        #Create a test client
+        self.client = resources.app.test_client()
+
+    def tearDown(self):
+        '''
+        Remove all records from database.
+        '''
+        ENGINE.clear()
+        self.app_context.pop()
+
+class CompactTestCase(ResourcesAPITestCase):
+
+    def test_get_compact_feed(self):
+        '''Compact streamed collection asked in Accept: the full one without prompts, template and queries'''
+        print '('+self.test_get_compact_feed.__name__+')', self.test_get_compact_feed.__doc__
+        url = resources.api.url_for(resources.User_feed, user_id = 3, _external = False)
+        full = json.loads(self.client.get(url, headers = {"Accept" : COLLECTION_JSON}).data)
+
+        resp = self.client.get(url, headers = {"Accept" : COMPACT_COLLECTION_JSON})
+        self.assertEquals(resp.status_code, 200)
+        self.assertTrue(resp.headers.get("Content-Type", "").endswith(";view=compact"))
+        self.assertIn("Accept", resp.headers.get("Vary", ""))
+        compact = json.loads(resp.data)
+        self.assertNotIn("queries", compact["collection"])
+        self.assertEquals(compact, without_prompts(full))
+
+    def test_get_compact_irregular_items(self):
+        '''Compact collection whose items have data without name'''
+        print '('+self.test_get_compact_irregular_items.__name__+')', self.test_get_compact_irregular_items.__doc__
+        url = resources.api.url_for(resources.Status_tags, status_id = 1, _external = False)
+        full = json.loads(self.client.get(url, headers = {"Accept" : COLLECTION_JSON}).data)
+        resp = self.client.get(url, headers = {"Accept" : "text/html, " + COMPACT_COLLECTION_JSON + "; q=0.9"})
+        self.assertEquals(resp.status_code, 200)
+        self.assertEquals(json.loads(resp.data), without_prompts(full))
+
+    def test_get_fields(self):
+        '''Only the fields asked with ?fields= are in the data of the items'''
+        print '('+self.test_get_fields.__name__+')', self.test_get_fields.__doc__
+        url = resources.api.url_for(resources.User_statuses, user_id = 3, _external = False)
+        full = json.loads(self.client.get(url, headers = {"Accept" : COLLECTION_JSON}).data)
+
+        resp = self.client.get(url + "?fields=id,content", headers = {"Accept" : COLLECTION_JSON})
+        self.assertEquals(resp.status_code, 200)
+        self.assertTrue(resp.headers.get("Content-Type", "").endswith(";view=compact"))
+        items = json.loads(resp.data)["collection"]["items"]
+        self.assertEquals([item["data"] for item in items],
+                          [[{"name" : data["name"], "value" : data["value"]} for data in item["data"] if data["name"] in ("id", "content")] for item in full["collection"]["items"]])
+        self.assertEquals([item["links"] for item in items], [without_prompts(item["links"]) for item in full["collection"]["items"]])
+
+    def test_get_compact_not_modified(self):
+        '''Full and compact representations have different ETags'''
+        print '('+self.test_get_compact_not_modified.__name__+')', self.test_get_compact_not_modified.__doc__
+        url = resources.api.url_for(resources.Status_comments, status_id = 1, _external = False)
+        etag = self.client.get(url, headers = {"Accept" : COLLECTION_JSON}).headers["ETag"]
+        resp = self.client.get(url, headers = {"Accept" : COMPACT_COLLECTION_JSON, "If-None-Match" : etag})
+        self.assertEquals(resp.status_code, 200)
+        resp = self.client.get(url, headers = {"Accept" : COMPACT_COLLECTION_JSON, "If-None-Match" : resp.headers["ETag"]})
+        self.assertEquals(resp.status_code, 304)
+
+    def test_encode_items_not_scalar_values(self):
+        '''Items with values which are not strings, numbers, booleans or null are encoded as well'''
+        print '('+self.test_encode_items_not_scalar_values.__name__+')', self.test_encode_items_not_scalar_values.__doc__
+        encoder = CompactEncoder(json.dumps)
+        items = [{"href" : "/a/", "data" : [{"name" : "id", "value" : 1, "prompt" : "Id"}, {"name" : "tags", "value" : [1, 2], "prompt" : "Tags"}]},
+                 {"href" : "/b%s/", "data" : [{"name" : "id", "value" : u"café\x00", "prompt" : "Id"}, {"name" : "tags", "value" : {"a" : None, "b" : True}, "prompt" : "Tags"}]}]
+        self.assertEquals([json.loads(item) for item in encoder.encode_items(items)], without_prompts(items))
+        self.assertEquals([json.loads(item) for item in encoder.encode_items(items, frozenset(["id"]))],
+                          [{"href" : "/a/", "data" : [{"name" : "id", "value" : 1}]}, {"href" : "/b%s/", "data" : [{"name" : "id", "value" : u"café\x00"}]}])
+
+if __name__ == '__main__':
+    print 'Start running compact representation tests'
+    unittest.main()
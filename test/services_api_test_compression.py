@@ -0,0 +1,162 @@
+import unittest
+import json
+import zlib
+import gzip
+import StringIO
+import flask
+import werkzeug.test
+import friendsNet.resources as resources
+import friendsNet.database as database
+from friendsNet.compression import CompressionMiddleware, negotiate_coding
+
+DB_PATH = 'db/friendsNet_test.db'
+ENGINE = database.Engine(DB_PATH)
+
+COLLECTION_JSON = "application/vnd.collection+json"
+
+#Tell Flask that I am running it in testing mode.
+resources.app.config['TESTING'] = True
+#Necessary for correct translation in url_for
+resources.app.config['SERVER_NAME'] = 'localhost:5000'
+
+#Database Engine utilized in our testing
+resources.app.config.update({'Engine': ENGINE})
+
+def gunzip(data):
+    return gzip.GzipFile(fileobj = StringIO.StringIO(data)).read()
+
+class ResourcesAPITestCase(unittest.TestCase):
+    #INITIATION AND TEARDOWN METHODS
+    @classmethod
+    def setUpClass(cls):
+        ''' Creates the database structure. Removes first any preexisting database file.'''
+        print "Testing ", cls.__name__
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        '''Remove the testing database.'''
+        print "Testing ENDED for ", cls.__name__
+        ENGINE.remove_database()
+
+    def setUp(self):
+        '''Populates the database.'''
+        #This method loads the initial values from friendsNet_data_db.sql
+        ENGINE.populate_tables()
+        #Activate app_context for using url_for
+        self.app_context = resources.app.app_context()
+        self.app_context.push()
+        #Create a test client
+        self.client = resources.app.test_client()
+        self.compression = resources.get_compression()
+        self.compression.cache.clear()
+        self.compression.stats.reset()
+
+    def tearDown(self):
+        '''
+        Remove all records from database.
+        '''
+        ENGINE.clear()
+        self.app_context.pop()
+
+class CompressionTestCase(ResourcesAPITestCase):
+
+    def setUp(self):
+        super(CompressionTestCase, self).setUp()
+        self.url = resources.api.url_for(resources.User_feed, user_id = 3, _external = False)
+
+    def test_negotiate_coding(self):
+        '''Preferred coding of Accept-Encoding'''
+        print '('+self.test_negotiate_coding.__name__+')', self.test_negotiate_coding.__doc__
+        self.assertEquals(negotiate_coding("gzip, deflate"), "gzip")
+        self.assertEquals(negotiate_coding("gzip;q=0.5, deflate"), "deflate")
+        self.assertEquals(negotiate_coding("*"), "gzip")
+        self.assertEquals(negotiate_coding("gzip;q=0, br"), None)
+        self.assertEquals(negotiate_coding(""), None)
+
+    def test_get_gzip(self):
+        '''Streamed collection compressed with gzip'''
+        print '('+self.test_get_gzip.__name__+')', self.test_get_gzip.__doc__
+        plain = self.client.get(self.url)
+        self.assertEquals(plain.headers.get("Content-Encoding", None), None)
+        self.assertIn("Accept-Encoding", plain.headers.get("Vary", ""))
+
+        resp = self.client.get(self.url, headers = {"Accept-Encoding" : "gzip, deflate"})
+        self.assertEquals(resp.status_code, 200)
+        self.assertEquals(resp.headers["Content-Encoding"], "gzip")
+        self.assertEquals(gunzip(resp.data), plain.data)
+        self.assertTrue(len(resp.data) < len(plain.data))
+        self.assertEquals(resp.headers["ETag"], plain.headers["ETag"][:-1] + '-gzip"')
+
+        stats = self.compression.stats.snapshot()
+        self.assertEquals(stats["compressed"], 1)
+        self.assertEquals(stats["bytes_in"], len(plain.data))
+        self.assertEquals(stats["bytes_out"], len(resp.data))
+        self.assertTrue(0 < stats["ratio"] < 1)
+
+    def test_get_deflate(self):
+        '''Collection compressed with deflate'''
+        print '('+self.test_get_deflate.__name__+')', self.test_get_deflate.__doc__
+        plain = self.client.get(self.url)
+        resp = self.client.get(self.url, headers = {"Accept-Encoding" : "deflate"})
+        self.assertEquals(resp.headers["Content-Encoding"], "deflate")
+        self.assertEquals(zlib.decompress(resp.data), plain.data)
+
+    def test_get_not_compressed(self):
+        '''Small bodies and media are not compressed'''
+        print '('+self.test_get_not_compressed.__name__+')', self.test_get_not_compressed.__doc__
+        url = resources.api.url_for(resources.Comment, comment_id = 1, _external = False)
+        resp = self.client.get(url, headers = {"Accept-Encoding" : "gzip"})
+        self.assertEquals(resp.status_code, 200)
+        self.assertTrue(len(resp.data) < self.compression.min_size)
+        self.assertEquals(resp.headers.get("Content-Encoding", None), None)
+        json.loads(resp.data)
+
+        url = resources.api.url_for(resources.Media_item_data, file_name = "media2.jpg", _external = False)
+        resp = self.client.get(url, headers = {"Accept-Encoding" : "gzip"})
+        self.assertEquals(resp.status_code, 200)
+        self.assertEquals(resp.headers.get("Content-Encoding", None), None)
+        resp.close()
+        self.assertEquals(self.compression.stats.snapshot()["compressed"], 0)
+
+    def test_get_cached(self):
+        '''Compressed body of an unchanged representation comes from the cache'''
+        print '('+self.test_get_cached.__name__+')', self.test_get_cached.__doc__
+        first = self.client.get(self.url, headers = {"Accept-Encoding" : "gzip"})
+        body = first.data                           #The body is cached once it has been sent entirely
+        second = self.client.get(self.url, headers = {"Accept-Encoding" : "gzip"})
+        self.assertEquals(second.data, body)
+        self.assertEquals(second.headers["Content-Length"], str(len(body)))
+        stats = self.compression.stats.snapshot()
+        self.assertEquals((stats["compressed"], stats["cache_hits"]), (1, 1))
+
+        #A new status changes the ETag: the body is compressed again
+        ENGINE.connect().create_status({"creator_id" : 4, "content" : "New status"})
+        third = self.client.get(self.url, headers = {"Accept-Encoding" : "gzip"})
+        self.assertNotEquals(third.headers["ETag"], first.headers["ETag"])
+        third.data
+        self.assertEquals(self.compression.stats.snapshot()["compressed"], 2)
+
+    def test_get_not_modified(self):
+        '''ETag of the compressed representation validates it'''
+        print '('+self.test_get_not_modified.__name__+')', self.test_get_not_modified.__doc__
+        etag = self.client.get(self.url, headers = {"Accept-Encoding" : "gzip"}).headers["ETag"]
+        resp = self.client.get(self.url, headers = {"Accept-Encoding" : "gzip", "If-None-Match" : etag})
+        self.assertEquals(resp.status_code, 304)
+        self.assertEquals(resp.headers["ETag"], etag)
+
+    def test_compression_disabled_cache(self):
+        '''Middleware without cache compresses every response'''
+        print '('+self.test_compression_disabled_cache.__name__+')', self.test_compression_disabled_cache.__doc__
+        middleware = CompressionMiddleware(self.compression.app, min_size = 10, cache_size = 0)
+        client = werkzeug.test.Client(middleware, flask.wrappers.Response)
+        for _ in range(2):
+            resp = client.get(self.url, base_url = "http://localhost:5000/", headers = {"Accept-Encoding" : "gzip"})
+            self.assertEquals(resp.headers["Content-Encoding"], "gzip")
+            json.loads(gunzip(resp.data))
+        self.assertEquals(middleware.stats.snapshot()["compressed"], 2)
+
+if __name__ == '__main__':
+    print 'Start running compression tests'
+    unittest.main()
@@ -147,6 +147,17 @@ class ConversationMessagesTestCase(ResourcesAPITestCase):
             self.assertEquals(self.resp_get, data)
             self.assertEqual(resp.headers.get("Content-Type", None), COLLECTION_JSON + ";profile=" + MESSAGE_PROFILE)
 
+    def test_get_messages_saved_queries(self):
+        '''Conversation read twice by the handler is queried once'''
+        print '('+self.test_get_messages_saved_queries.__name__+')', self.test_get_messages_saved_queries.__doc__
+        resources.app.config["IDENTITY_MAP_DEBUG"] = True
+        try:
+            resp = self.client.get(self.url, headers = {"Accept" : COLLECTION_JSON})
+            self.assertEquals(resp.status_code, 200)
+            self.assertEquals(resp.headers.get("X-Saved-Queries", None), "1")
+        finally:
+            resources.app.config["IDENTITY_MAP_DEBUG"] = False
+
 #404
     def test_get_not_existing_conversation(self):
         print '('+self.test_get_not_existing_conversation.__name__+')', self.test_get_not_existing_conversation.__doc__
@@ -132,6 +132,14 @@ class MembershipTestCase(ResourcesAPITestCase):
             self.assertEqual(resp.headers.get("Content-Type", None), COLLECTION_JSON + ";profile=" + GROUP_MEMBERSHIP_PROFILE)
 
 
+#400
+    def test_get_members_wrong_cursor_key(self):
+        '''Cursor with the key of another collection'''
+        print '('+self.test_get_members_wrong_cursor_key.__name__+')', self.test_get_members_wrong_cursor_key.__doc__
+        url = resources.api.url_for(resources.Group_members, group_id = 1, _external = False)
+        resp = resources.app.test_client().get(url + "?cursor=" + resources.encode_cursor("after", [1, 2, 3]), headers = {"Accept" : COLLECTION_JSON})
+        self.assertEquals(resp.status_code, 400)
+
 #404
     def test_get_not_existing_group(self):
         print '('+self.test_get_not_existing_group.__name__+')', self.test_get_not_existing_group.__doc__
@@ -84,7 +84,9 @@ class GroupStatusesTestCase(ResourcesAPITestCase):
             "template" : {
                 "data" : [
                     {"name" : "author", "value" : "", "prompt" : "Status creator id", "required" : "true"},
-                    {"name" : "content", "value" : "", "prompt" : "Status content", "required" : "true"}
+                    {"name" : "content", "value" : "", "prompt" : "Status content", "required" : "true"},
+                    {"name" : "media_ids", "value" : [], "prompt" : "Ids of the media items attached to the status", "required" : "false"},
+                    {"name" : "tagged_user_ids", "value" : [], "prompt" : "Ids of the users tagged in the status", "required" : "false"}
                 ]
             }
         }
@@ -104,7 +106,9 @@ class GroupStatusesTestCase(ResourcesAPITestCase):
             "template" : {
                 "data" : [
                     {"name" : "author", "value" : "", "prompt" : "Status creator id", "required" : "true"},
-                    {"name" : "content", "value" : "", "prompt" : "Status content", "required" : "true"}
+                    {"name" : "content", "value" : "", "prompt" : "Status content", "required" : "true"},
+                    {"name" : "media_ids", "value" : [], "prompt" : "Ids of the media items attached to the status", "required" : "false"},
+                    {"name" : "tagged_user_ids", "value" : [], "prompt" : "Ids of the users tagged in the status", "required" : "false"}
                 ]
             }
         }
@@ -119,6 +123,17 @@ class GroupStatusesTestCase(ResourcesAPITestCase):
         }
     }
 
+    status_post_attachments = {
+        "template" : {
+            "data" : [
+                {"name" : "author", "value" : 3},
+                {"name" : "content", "value" : "Hei!"},
+                {"name" : "media_ids", "value" : [4]},
+                {"name" : "tagged_user_ids", "value" : [2, 999]}
+            ]
+        }
+    }
+
     status_post_wrong_membership = {
         "template" : {
             "data" : [
@@ -189,6 +204,14 @@ class GroupStatusesTestCase(ResourcesAPITestCase):
             self.assertEquals(self.resp_get_empty, data)
             self.assertEqual(resp.headers.get("Content-Type", None), COLLECTION_JSON + ";profile=" + STATUS_PROFILE)
 
+#400
+    def test_get_statuses_wrong_cursor_key(self):
+        '''Cursor with the key of another collection'''
+        print '('+self.test_get_statuses_wrong_cursor_key.__name__+')', self.test_get_statuses_wrong_cursor_key.__doc__
+        url = resources.api.url_for(resources.Group_statuses, group_id = 1, _external = False)
+        resp = resources.app.test_client().get(url + "?cursor=" + resources.encode_cursor("after", [230, 8]), headers = {"Accept" : COLLECTION_JSON})
+        self.assertEquals(resp.status_code, 400)
+
 #404
     def test_get_not_existing_group(self):
         print '('+self.test_get_not_existing_group.__name__+')', self.test_get_not_existing_group.__doc__
@@ -220,6 +243,12 @@ class GroupStatusesTestCase(ResourcesAPITestCase):
         resp = self.client.post(self.url_wrong, data = json.dumps(self.status_post_wrong_membership), headers = {"Content-Type" : COLLECTION_JSON})
         self.assertEquals(resp.status_code, 404)
 
+#404 tagged user not existing
+    def test_post_not_existing_tagged_user(self):
+        print '('+self.test_post_not_existing_tagged_user.__name__+')', self.test_post_not_existing_tagged_user.__doc__
+        resp = self.client.post(self.url, data = json.dumps(self.status_post_attachments), headers = {"Content-Type" : COLLECTION_JSON})
+        self.assertEquals(resp.status_code, 404)
+
 #404 user not existing
     def test_post_not_existing_user(self):
         print '('+self.test_post_not_existing_user.__name__+')', self.test_post_not_existing_user.__doc__
@@ -0,0 +1,56 @@
+import unittest
+import flask
+import friendsNet.resources as resources
+
+#Tell Flask that I am running it in testing mode.
+resources.app.config['TESTING'] = True
+#Necessary for correct translation in url_for
+resources.app.config['SERVER_NAME'] = 'localhost:5000'
+
+URL = "/friendsNet/api/users/"
+
+class LinkBuilderTestCase(unittest.TestCase):
+    '''
+    Links built from the compiled routes must be the same built by Api.url_for.
+    '''
+    #INITIATION AND TEARDOWN METHODS
+    @classmethod
+    def setUpClass(cls):
+        print "Testing ", cls.__name__
+
+    @classmethod
+    def tearDownClass(cls):
+        print "Testing ENDED for ", cls.__name__
+
+    def _resources(self):
+        '''Resource classes added to the API, with the names of the variables of their route.'''
+        for rule in resources.app.url_map.iter_rules():
+            resource = getattr(resources, rule.endpoint.capitalize(), None)
+            if resource is not None and getattr(resource, "endpoint", None) == rule.endpoint:
+                yield resource, rule.arguments
+
+    def test_compiled_links(self):
+        '''Links with integer ids are the same of Api.url_for'''
+        print '('+self.test_compiled_links.__name__+')', self.test_compiled_links.__doc__
+        with resources.app.test_request_context(URL):
+            for resource, arguments in self._resources():
+                values = dict((name, 10 + i) for i, name in enumerate(sorted(arguments)))
+                self.assertEquals(resources.link_builder.url_for(resource, **values), resources.api.url_for(resource, **values))
+
+    def test_not_compiled_links(self):
+        '''Links with values which are not integers or with query parameters are built by Api.url_for'''
+        print '('+self.test_not_compiled_links.__name__+')', self.test_not_compiled_links.__doc__
+        with resources.app.test_request_context(URL):
+            self.assertEquals(resources.link_builder.url_for(resources.Media_item_data, file_name = "media 1.jpg"), resources.api.url_for(resources.Media_item_data, file_name = "media 1.jpg"))
+            self.assertEquals(resources.link_builder.url_for(resources.Status, status_id = 1, limit = 2), "/friendsNet/api/statuses/1/?limit=2")
+            self.assertEquals(resources.link_builder.url_for(resources.Status, status_id = "1"), "/friendsNet/api/statuses/1/")
+
+    def test_links_outside_request(self):
+        '''Links built outside of a request are absolute as the ones of Api.url_for'''
+        print '('+self.test_links_outside_request.__name__+')', self.test_links_outside_request.__doc__
+        with resources.app.app_context():
+            self.assertEquals(resources.link_builder.url_for(resources.Status, status_id = 1), "http://localhost:5000/friendsNet/api/statuses/1/")
+
+if __name__ == '__main__':
+    print 'Start running link builder tests'
+    unittest.main()
@@ -0,0 +1,183 @@
+import unittest
+import os
+import json
+import hashlib
+import shutil
+import tempfile
+import friendsNet.resources as resources
+import friendsNet.database as database
+import friendsNet.derivatives as derivatives
+from StringIO import StringIO
+
+DB_PATH = 'db/friendsNet_test.db'
+ENGINE = database.Engine(DB_PATH)
+
+HAL_JSON = "application/hal+json"
+MULTIPART = "multipart/form-data"
+
+#Tell Flask that I am running it in testing mode.
+resources.app.config['TESTING'] = True
+#Necessary for correct translation in url_for
+resources.app.config['SERVER_NAME'] = 'localhost:5000'
+
+#Database Engine utilized in our testing
+resources.app.config.update({'Engine': ENGINE})
+
+test_image_url = "test/trial_image.jpg"
+test_image_name = "trial_image.jpg"
+
+thumb = {"variant" : "thumb", "width" : 64, "height" : 48, "size" : 9}
+
+class ResourcesAPITestCase(unittest.TestCase):
+    #INITIATION AND TEARDOWN METHODS
+    @classmethod
+    def setUpClass(cls):
+        ''' Creates the database structure. Removes first any preexisting database file.'''
+        print "Testing ", cls.__name__
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        '''Remove the testing database.'''
+        print "Testing ENDED for ", cls.__name__
+        ENGINE.remove_database()
+
+    def setUp(self):
+        '''Populates the database and stores the uploads in a temporary folder, without generating their variants.'''
+        ENGINE.populate_tables()
+        self.blobs_folder = tempfile.mkdtemp()
+        self.default_blobs_folder = resources.app.config["MEDIA_BLOBS_FOLDER"]
+        resources.app.config.update({"MEDIA_BLOBS_FOLDER" : self.blobs_folder})
+        self.derivative_processes = resources.get_derivative_pipeline().processes
+        resources.get_derivative_pipeline().processes = 0
+        #Activate app_context for using url_for
+        self.app_context = resources.app.app_context()
+        self.app_context.push()
+        #Create a test client
+        self.client = resources.app.test_client()
+
+    def tearDown(self):
+        '''
+        Remove all records from database and the uploaded files.
+        '''
+        resources.get_derivative_pipeline().close()
+        resources.get_derivative_pipeline().processes = self.derivative_processes
+        ENGINE.clear()
+        self.app_context.pop()
+        resources.app.config.update({"MEDIA_BLOBS_FOLDER" : self.default_blobs_folder})
+        shutil.rmtree(self.blobs_folder)
+
+class MediaDerivativesTestCase(ResourcesAPITestCase):
+
+    def setUp(self):
+        super(MediaDerivativesTestCase, self).setUp()
+        self.url = resources.api.url_for(resources.Media_list, _external = False)
+        with open(test_image_url, 'rb') as img:
+            self.image = img.read()
+        self.content_hash = hashlib.sha256(self.image).hexdigest()
+        self.storage = resources.get_blob_storage()
+
+    def upload(self, content):
+        resp = self.client.post(self.url, headers = {"Content-Type" : MULTIPART}, data = {resources.MULTIPART_FILE_KEY : (StringIO(content), test_image_name)})
+        self.assertEquals(resp.status_code, 201)
+        return json.loads(self.client.get(resp.headers["Location"], headers = {"Accept" : HAL_JSON}).data)["url"]
+
+    def add_thumb(self):
+        '''Records a variant as the pipeline does once it has been written.'''
+        with open(self.storage.derivative_path_for(self.content_hash, "thumb"), "wb") as f:
+            f.write("thumbnail")
+        resources.record_derivatives(self.content_hash, [thumb])
+
+#TEST GET
+#200
+    def test_get_variant(self):
+        '''Variant asked with ?size= is served with its own ETag'''
+        print '('+self.test_get_variant.__name__+')', self.test_get_variant.__doc__
+        url = self.upload(self.image)
+        self.add_thumb()
+
+        resp = self.client.get(url + "?size=thumb")
+        self.assertEquals(resp.status_code, 200)
+        self.assertEquals(resp.data, "thumbnail")
+        self.assertEquals(resp.headers["Content-Type"], "image/jpg")
+        self.assertEquals(resp.headers["ETag"], '"%s-thumb"' % self.content_hash)
+        self.assertEquals(resp.cache_control.max_age, resources.MEDIA_CACHE_MAX_AGE)
+
+        resp = self.client.get(url + "?size=full")
+        self.assertEquals(resp.data, self.image)
+        self.assertEquals(resp.headers["ETag"], '"%s"' % self.content_hash)
+
+    def test_get_variant_not_generated(self):
+        '''Original is served in place of a variant not generated (yet)'''
+        print '('+self.test_get_variant_not_generated.__name__+')', self.test_get_variant_not_generated.__doc__
+        url = self.upload(self.image)
+        resp = self.client.get(url + "?size=medium")
+        self.assertEquals(resp.status_code, 200)
+        self.assertEquals(resp.data, self.image)
+        self.assertEquals(resp.headers["ETag"], '"%s"' % self.content_hash)
+        self.assertEquals(resp.cache_control.max_age, resources.MEDIA_FALLBACK_MAX_AGE)     #Not kept in place of the variant
+        self.assertEquals(self.client.get(url).cache_control.max_age, resources.MEDIA_CACHE_MAX_AGE)
+
+        #Media uploaded before the blobs have no variants
+        url = resources.api.url_for(resources.Media_item_data, file_name = "media2.jpg", _external = False)
+        resp = self.client.get(url + "?size=thumb")
+        self.assertEquals(resp.status_code, 200)
+        resp.close()
+
+    @unittest.skipIf(not derivatives.is_available(), "Pillow is not installed")
+    def test_get_variant_generated(self):
+        '''Variants of an uploaded image are generated in background'''
+        print '('+self.test_get_variant_generated.__name__+')', self.test_get_variant_generated.__doc__
+        image = StringIO()
+        derivatives.Image.new("RGB", (1000, 750), (200, 30, 30)).save(image, "JPEG")
+        resources.get_derivative_pipeline().processes = 1
+        url = self.upload(image.getvalue())
+        resources.get_derivative_pipeline().close()           #Waits for the variants
+
+        content_hash = hashlib.sha256(image.getvalue()).hexdigest()
+        medium = ENGINE.connect().get_media_derivative(content_hash, "medium")
+        self.assertEquals((medium["width"], medium["height"]), (640, 480))
+        resp = self.client.get(url + "?size=medium")
+        self.assertEquals(resp.headers["ETag"], '"%s-medium"' % content_hash)
+        self.assertEquals(derivatives.Image.open(StringIO(resp.data)).size, (640, 480))
+
+#400
+    def test_get_wrong_size(self):
+        '''Size which is not one of the variants'''
+        print '('+self.test_get_wrong_size.__name__+')', self.test_get_wrong_size.__doc__
+        url = self.upload(self.image)
+        resp = self.client.get(url + "?size=huge")
+        self.assertEquals(resp.status_code, 400)
+
+#TEST DELETE
+#204
+    def test_delete_variants(self):
+        '''Files of the variants are removed with the one of the blob'''
+        print '('+self.test_delete_variants.__name__+')', self.test_delete_variants.__doc__
+        self.upload(self.image)
+        self.add_thumb()
+        media_url = resources.api.url_for(resources.Media_item, media_id = 11, _external = False)
+        self.assertEquals(self.client.delete(media_url).status_code, 204)
+        self.assertFalse(os.path.exists(self.storage.derivative_path_for(self.content_hash, "thumb")))
+        self.assertEquals(ENGINE.connect().get_media_derivative(self.content_hash, "thumb"), None)
+
+    def test_record_deleted_blob(self):
+        '''Variants of a blob deleted while they were generated are removed'''
+        print '('+self.test_record_deleted_blob.__name__+')', self.test_record_deleted_blob.__doc__
+        folder = os.path.dirname(self.storage.path_for(self.content_hash))
+        os.makedirs(folder)
+        self.add_thumb()
+        self.assertEquals(os.listdir(folder), [])
+
+    def test_pipeline_disabled(self):
+        '''Disabled pipeline doesn't start any process'''
+        print '('+self.test_pipeline_disabled.__name__+')', self.test_pipeline_disabled.__doc__
+        pipeline = derivatives.DerivativePipeline(resources.record_derivatives, processes = 0)
+        self.assertFalse(pipeline.enabled)
+        self.assertEquals(pipeline.submit(self.content_hash, test_image_url, []), None)
+        self.assertEquals(pipeline._pool, None)
+
+if __name__ == '__main__':
+    print 'Start running media derivatives tests'
+    unittest.main()
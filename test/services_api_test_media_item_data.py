@@ -0,0 +1,130 @@
+import unittest
+import os
+import friendsNet.resources as resources
+import friendsNet.database as database
+
+DB_PATH = 'db/friendsNet_test.db'
+ENGINE = database.Engine(DB_PATH)
+
+#Tell Flask that I am running it in testing mode.
+resources.app.config['TESTING'] = True
+#Necessary for correct translation in url_for
+resources.app.config['SERVER_NAME'] = 'localhost:5000'
+
+#Database Engine utilized in our testing
+resources.app.config.update({'Engine': ENGINE})
+
+media_file_name = "media2.jpg"
+media_file_path = "friendsNet/media_uploads/media2.jpg"
+
+class ResourcesAPITestCase(unittest.TestCase):
+    #INITIATION AND TEARDOWN METHODS
+    @classmethod
+    def setUpClass(cls):
+        ''' Creates the database structure. Removes first any preexisting database file.'''
+        print "Testing ", cls.__name__
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        '''Remove the testing database.'''
+        print "Testing ENDED for ", cls.__name__
+        ENGINE.remove_database()
+
+    def setUp(self):
+        '''Populates the database.'''
+        #This method loads the initial values from friendsNet_data_db.sql
+        ENGINE.populate_tables()
+        #Activate app_context for using url_for
+        self.app_context = resources.app.app_context()
+        self.app_context.push()
+        #Create a test client
+        self.client = resources.app.test_client()
+
+    def tearDown(self):
+        '''
+        Remove all records from database.
+        '''
+        ENGINE.clear()
+        self.app_context.pop()
+
+class MediaItemDataTestCase(ResourcesAPITestCase):
+
+    def setUp(self):
+        super(MediaItemDataTestCase, self).setUp()
+        self.url = resources.api.url_for(resources.Media_item_data, file_name = media_file_name, _external = False)
+        self.url_wrong = resources.api.url_for(resources.Media_item_data, file_name = "media999.jpg", _external = False)
+        with open(media_file_path, "rb") as f:
+            self.content = f.read()
+
+#TEST GET
+#200
+    def test_get_data(self):
+        '''Whole file, with the headers for caching and ranges'''
+        print '('+self.test_get_data.__name__+')', self.test_get_data.__doc__
+        resp = self.client.get(self.url)
+        self.assertEquals(resp.status_code, 200)
+        self.assertEquals(resp.data, self.content)
+        self.assertEquals(resp.headers["Content-Length"], str(len(self.content)))
+        self.assertEquals(resp.headers["Content-Type"], "image/jpg")
+        self.assertEquals(resp.headers["Accept-Ranges"], "bytes")
+        self.assertIn("max-age=%d" % resources.MEDIA_CACHE_MAX_AGE, resp.headers["Cache-Control"])
+        self.assertIn("ETag", resp.headers)
+        self.assertIn("Last-Modified", resp.headers)
+        self.assertIn("attachment", resp.headers["Content-Disposition"])
+
+#206
+    def test_get_data_range(self):
+        '''Part of the file asked with Range'''
+        print '('+self.test_get_data_range.__name__+')', self.test_get_data_range.__doc__
+        size = len(self.content)
+        for header, start, stop in [("bytes=0-99", 0, 100), ("bytes=100-", 100, size), ("bytes=-10", size - 10, size), ("bytes=50-%d" % (size * 2), 50, size)]:
+            resp = self.client.get(self.url, headers = {"Range" : header})
+            self.assertEquals(resp.status_code, 206)
+            self.assertEquals(resp.data, self.content[start:stop])
+            self.assertEquals(resp.headers["Content-Range"], "bytes %d-%d/%d" % (start, stop - 1, size))
+            self.assertEquals(resp.headers["Content-Length"], str(stop - start))
+
+    def test_get_data_if_range(self):
+        '''Range is honoured only if the If-Range validator is still the current one'''
+        print '('+self.test_get_data_if_range.__name__+')', self.test_get_data_if_range.__doc__
+        full = self.client.get(self.url)
+        etag, last_modified = full.headers["ETag"], full.headers["Last-Modified"]
+        for validator in [etag, last_modified]:
+            resp = self.client.get(self.url, headers = {"Range" : "bytes=0-9", "If-Range" : validator})
+            self.assertEquals(resp.status_code, 206)
+            self.assertEquals(resp.data, self.content[:10])
+        for validator in ['"other"', "Thu, 01 Jan 2004 00:00:00 GMT"]:
+            resp = self.client.get(self.url, headers = {"Range" : "bytes=0-9", "If-Range" : validator})
+            self.assertEquals(resp.status_code, 200)
+            self.assertEquals(resp.data, self.content)
+
+#304
+    def test_get_data_not_modified(self):
+        print '('+self.test_get_data_not_modified.__name__+')', self.test_get_data_not_modified.__doc__
+        full = self.client.get(self.url)
+        full.close()
+        resp = self.client.get(self.url, headers = {"If-None-Match" : full.headers["ETag"]})
+        self.assertEquals(resp.status_code, 304)
+        self.assertEquals(resp.data, "")
+        resp = self.client.get(self.url, headers = {"If-Modified-Since" : full.headers["Last-Modified"]})
+        self.assertEquals(resp.status_code, 304)
+
+#404
+    def test_get_not_existing_data(self):
+        print '('+self.test_get_not_existing_data.__name__+')', self.test_get_not_existing_data.__doc__
+        resp = self.client.get(self.url_wrong)
+        self.assertEquals(resp.status_code, 404)
+
+#416
+    def test_get_data_range_not_satisfiable(self):
+        print '('+self.test_get_data_range_not_satisfiable.__name__+')', self.test_get_data_range_not_satisfiable.__doc__
+        size = len(self.content)
+        resp = self.client.get(self.url, headers = {"Range" : "bytes=%d-" % size})
+        self.assertEquals(resp.status_code, 416)
+        self.assertEquals(resp.headers["Content-Range"], "bytes */%d" % size)
+
+if __name__ == '__main__':
+    print 'Start running media item data tests'
+    unittest.main()
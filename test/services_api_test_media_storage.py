@@ -0,0 +1,159 @@
+import unittest
+import os
+import json
+import hashlib
+import shutil
+import tempfile
+import friendsNet.resources as resources
+import friendsNet.database as database
+from StringIO import StringIO
+
+DB_PATH = 'db/friendsNet_test.db'
+ENGINE = database.Engine(DB_PATH)
+
+HAL_JSON = "application/hal+json"
+JSON = "application/json"
+MULTIPART = "multipart/form-data"
+
+#Tell Flask that I am running it in testing mode.
+resources.app.config['TESTING'] = True
+#Necessary for correct translation in url_for
+resources.app.config['SERVER_NAME'] = 'localhost:5000'
+
+#Database Engine utilized in our testing
+resources.app.config.update({'Engine': ENGINE})
+
+test_image_url = "test/trial_image.jpg"
+test_image_name = "trial_image.jpg"
+
+class ResourcesAPITestCase(unittest.TestCase):
+    #INITIATION AND TEARDOWN METHODS
+    @classmethod
+    def setUpClass(cls):
+        ''' Creates the database structure. Removes first any preexisting database file.'''
+        print "Testing ", cls.__name__
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        '''Remove the testing database.'''
+        print "Testing ENDED for ", cls.__name__
+        ENGINE.remove_database()
+
+    def setUp(self):
+        '''Populates the database and stores the uploads in a temporary folder.'''
+        ENGINE.populate_tables()
+        self.blobs_folder = tempfile.mkdtemp()
+        self.default_blobs_folder = resources.app.config["MEDIA_BLOBS_FOLDER"]
+        resources.app.config.update({"MEDIA_BLOBS_FOLDER" : self.blobs_folder})
+        #No variants generated in background among the files checked
+        self.derivative_processes = resources.get_derivative_pipeline().processes
+        resources.get_derivative_pipeline().processes = 0
+        #Activate app_context for using url_for
+        self.app_context = resources.app.app_context()
+        self.app_context.push()
+        #Create a test client
+        self.client = resources.app.test_client()
+
+    def tearDown(self):
+        '''
+        Remove all records from database and the uploaded files.
+        '''
+        ENGINE.clear()
+        self.app_context.pop()
+        resources.app.config.update({"MEDIA_BLOBS_FOLDER" : self.default_blobs_folder})
+        resources.get_derivative_pipeline().processes = self.derivative_processes
+        shutil.rmtree(self.blobs_folder)
+
+class MediaStorageTestCase(ResourcesAPITestCase):
+
+    def setUp(self):
+        super(MediaStorageTestCase, self).setUp()
+        self.url = resources.api.url_for(resources.Media_list, _external = False)
+        with open(test_image_url, 'rb') as img:
+            self.image = img.read()
+
+    def upload(self, content):
+        resp = self.client.post(self.url, headers = {"Content-Type" : MULTIPART}, data = {resources.MULTIPART_FILE_KEY : (StringIO(content), test_image_name)})
+        self.assertEquals(resp.status_code, 201)
+        return resp.headers["Location"]
+
+    def stored_files(self):
+        return sorted(os.path.relpath(os.path.join(folder, name), self.blobs_folder) for folder, _, names in os.walk(self.blobs_folder) for name in names)
+
+#TEST POST
+#201
+    def test_post_duplicate(self):
+        '''Uploads with the same content are two media items sharing one file'''
+        print '('+self.test_post_duplicate.__name__+')', self.test_post_duplicate.__doc__
+        first = json.loads(self.client.get(self.upload(self.image), headers = {"Accept" : HAL_JSON}).data)
+        second = json.loads(self.client.get(self.upload(self.image), headers = {"Accept" : HAL_JSON}).data)
+        self.assertNotEquals(first["url"], second["url"])
+
+        content_hash = hashlib.sha256(self.image).hexdigest()
+        self.assertEquals(self.stored_files(), [os.path.join(content_hash[:2], content_hash[2:4], content_hash)])
+
+        for media in [first, second]:
+            resp = self.client.get(media["url"])
+            self.assertEquals(resp.status_code, 200)
+            self.assertEquals(resp.data, self.image)
+            self.assertEquals(resp.headers["Content-Type"], "image/jpg")
+            self.assertEquals(resp.headers["ETag"], '"%s"' % content_hash)
+
+        self.upload(self.image + "different")
+        self.assertEquals(len(self.stored_files()), 2)
+
+    def test_post_name_from_id(self):
+        '''Uploads are named after their id, which is never reused'''
+        print '('+self.test_post_name_from_id.__name__+')', self.test_post_name_from_id.__doc__
+        location = self.upload(self.image)
+        media = json.loads(self.client.get(location, headers = {"Accept" : HAL_JSON}).data)
+        self.assertTrue(media["url"].endswith("/media%s.jpg" % media["id"]))
+
+        #Ids come from the database: another process uploading at the same time gets the next one
+        other_id = ENGINE.connect().create_media({"media_type" : 0, "url_format" : "/friendsNet/media_uploads/media%s.jpg"})
+        self.assertEquals(other_id, media["id"] + 1)
+
+        self.assertEquals(self.client.delete(location).status_code, 204)
+        media = json.loads(self.client.get(self.upload(self.image), headers = {"Accept" : HAL_JSON}).data)
+        self.assertEquals(media["id"], other_id + 1)
+        self.assertTrue(media["url"].endswith("/media%s.jpg" % media["id"]))
+
+#TEST DELETE
+#204
+    def test_delete_shared(self):
+        '''The file is removed only with the last media item using it'''
+        print '('+self.test_delete_shared.__name__+')', self.test_delete_shared.__doc__
+        urls = [self.upload(self.image), self.upload(self.image)]
+        self.assertEquals(self.client.delete(urls[0]).status_code, 204)
+        self.assertEquals(len(self.stored_files()), 1)
+        self.assertEquals(self.client.delete(urls[1]).status_code, 204)
+        self.assertEquals(self.stored_files(), [])
+        self.assertEquals(self.client.get(urls[1], headers = {"Accept" : HAL_JSON}).status_code, 404)
+
+        #The same content uploaded again is stored again
+        self.upload(self.image)
+        self.assertEquals(len(self.stored_files()), 1)
+
+    def test_delete_atomic_batch(self):
+        '''File is removed only if the atomic batch deleting its media item commits'''
+        print '('+self.test_delete_atomic_batch.__name__+')', self.test_delete_atomic_batch.__doc__
+        location = self.upload(self.image)
+        media = json.loads(self.client.get(location, headers = {"Accept" : HAL_JSON}).data)
+        batch_url = resources.api.url_for(resources.Batch, _external = False) + "?atomic=true"
+        delete = {"method" : "DELETE", "path" : resources.api.url_for(resources.Media_item, media_id = media["id"], _external = False)}
+
+        resp = self.client.post(batch_url, data = json.dumps([delete, {"method" : "GET", "path" : "/friendsNet/api/statuses/1000/"}]), headers = {"Content-Type" : JSON})
+        self.assertEquals(resp.status_code, 409)
+        self.assertEquals([response["status"] for response in json.loads(resp.data)], [204, 404])
+        self.assertEquals(self.client.get(location, headers = {"Accept" : HAL_JSON}).status_code, 200)
+        self.assertEquals(self.client.get(media["url"]).data, self.image)
+
+        resp = self.client.post(batch_url, data = json.dumps([delete]), headers = {"Content-Type" : JSON})
+        self.assertEquals(resp.status_code, 200)
+        self.assertEquals(self.stored_files(), [])
+
+if __name__ == '__main__':
+    print 'Start running media storage tests'
+    unittest.main()
@@ -0,0 +1,245 @@
+import unittest
+import os
+import json
+import hashlib
+import fcntl
+import shutil
+import tempfile
+import friendsNet.resources as resources
+import friendsNet.database as database
+
+DB_PATH = 'db/friendsNet_test.db'
+ENGINE = database.Engine(DB_PATH)
+
+COLLECTION_JSON = "application/vnd.collection+json"
+HAL_JSON = "application/hal+json"
+JSON = "application/json"
+OCTET_STREAM = "application/octet-stream"
+
+#Tell Flask that I am running it in testing mode.
+resources.app.config['TESTING'] = True
+#Necessary for correct translation in url_for
+resources.app.config['SERVER_NAME'] = 'localhost:5000'
+
+#Database Engine utilized in our testing
+resources.app.config.update({'Engine': ENGINE})
+
+video = "".join(chr(i % 251) for i in range(300000))
+
+def upload_request(file_name, size):
+    return {"template" : {"data" : [{"name" : "file_name", "value" : file_name}, {"name" : "size", "value" : size}]}}
+
+class ResourcesAPITestCase(unittest.TestCase):
+    #INITIATION AND TEARDOWN METHODS
+    @classmethod
+    def setUpClass(cls):
+        ''' Creates the database structure. Removes first any preexisting database file.'''
+        print "Testing ", cls.__name__
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        '''Remove the testing database.'''
+        print "Testing ENDED for ", cls.__name__
+        ENGINE.remove_database()
+
+    def setUp(self):
+        '''Populates the database and stores the uploads in a temporary folder.'''
+        ENGINE.populate_tables()
+        self.blobs_folder = tempfile.mkdtemp()
+        self.default_blobs_folder = resources.app.config["MEDIA_BLOBS_FOLDER"]
+        resources.app.config.update({"MEDIA_BLOBS_FOLDER" : self.blobs_folder})
+        #Activate app_context for using url_for
+        self.app_context = resources.app.app_context()
+        self.app_context.push()
+        #Create a test client
+        self.client = resources.app.test_client()
+
+    def tearDown(self):
+        '''
+        Remove all records from database and the uploaded files.
+        '''
+        ENGINE.clear()
+        self.app_context.pop()
+        resources.app.config.update({"MEDIA_BLOBS_FOLDER" : self.default_blobs_folder, "MEDIA_UPLOAD_LIFETIME" : resources.MEDIA_UPLOAD_LIFETIME,
+                                     "MAX_MEDIA_UPLOADS" : resources.MAX_MEDIA_UPLOADS})
+        shutil.rmtree(self.blobs_folder)
+
+class MediaUploadsTestCase(ResourcesAPITestCase):
+
+    def setUp(self):
+        super(MediaUploadsTestCase, self).setUp()
+        self.url = resources.api.url_for(resources.Media_uploads, _external = False)
+
+    def start(self, size = len(video)):
+        resp = self.client.post(self.url, headers = {"Content-Type" : COLLECTION_JSON}, data = json.dumps(upload_request("holidays.mp4", size)))
+        self.assertEquals(resp.status_code, 201)
+        self.assertEquals(resp.headers[resources.UPLOAD_OFFSET_HEADER], "0")
+        return resp.headers["Location"]
+
+    def put_chunk(self, url, start, stop, total = len(video), data = None):
+        headers = {"Content-Type" : OCTET_STREAM, "Content-Range" : "bytes %d-%d/%d" % (start, stop - 1, total)}
+        return self.client.put(url, headers = headers, data = video[start:stop] if data is None else data)
+
+#TEST POST
+#201
+    def test_upload_chunks(self):
+        '''File sent in chunks, resumed after a wrong offset, becomes a media item'''
+        print '('+self.test_upload_chunks.__name__+')', self.test_upload_chunks.__doc__
+        url = self.start()
+        resp = self.put_chunk(url, 0, 100000)
+        self.assertEquals(resp.status_code, 204)
+        self.assertEquals(resp.headers[resources.UPLOAD_OFFSET_HEADER], "100000")
+
+        #A chunk starting elsewhere is refused: the client asks where to resume from
+        resp = self.put_chunk(url, 200000, len(video))
+        self.assertEquals(resp.status_code, 409)
+        self.assertEquals(resp.headers[resources.UPLOAD_OFFSET_HEADER], "100000")
+        upload = json.loads(self.client.get(url).data)
+        self.assertEquals((upload["size"], upload["offset"]), (len(video), 100000))
+
+        self.assertEquals(self.put_chunk(url, 100000, len(video)).status_code, 204)
+        resp = self.client.post(url)
+        self.assertEquals(resp.status_code, 201)
+        media = json.loads(self.client.get(resp.headers["Location"], headers = {"Accept" : HAL_JSON}).data)
+        self.assertEquals(media["media_item_type"], 1)
+        self.assertTrue(media["url"].endswith("/media%s.mp4" % media["id"]))
+        resp = self.client.get(media["url"])
+        self.assertEquals(resp.data, video)
+        self.assertEquals(resp.headers["ETag"], '"%s"' % hashlib.sha256(video).hexdigest())
+
+        #The upload is over
+        self.assertEquals(self.client.get(url).status_code, 404)
+        self.assertEquals(self.client.post(url).status_code, 404)
+        self.assertEquals(os.listdir(os.path.join(self.blobs_folder, "uploads")), [])
+
+    def test_upload_atomic_batch(self):
+        '''Upload completed in an atomic batch which fails can be completed again'''
+        print '('+self.test_upload_atomic_batch.__name__+')', self.test_upload_atomic_batch.__doc__
+        url = self.start()
+        self.put_chunk(url, 0, len(video))
+        batch_url = resources.api.url_for(resources.Batch, _external = False) + "?atomic=true"
+        complete = {"method" : "POST", "path" : url[url.find("/friendsNet"):]}
+        resp = self.client.post(batch_url, data = json.dumps([complete, {"method" : "GET", "path" : "/friendsNet/api/statuses/1000/"}]), headers = {"Content-Type" : JSON})
+        self.assertEquals(resp.status_code, 409)
+        self.assertEquals([response["status"] for response in json.loads(resp.data)], [201, 404])
+        self.assertEquals(json.loads(self.client.get(url).data)["offset"], len(video))
+
+        resp = self.client.post(url)
+        self.assertEquals(resp.status_code, 201)
+        media = json.loads(self.client.get(resp.headers["Location"], headers = {"Accept" : HAL_JSON}).data)
+        self.assertEquals(self.client.get(media["url"]).data, video)
+        self.assertEquals(os.listdir(os.path.join(self.blobs_folder, "uploads")), [])
+
+    def test_upload_expired(self):
+        '''Expired upload is gone, and swept with its file when another one starts'''
+        print '('+self.test_upload_expired.__name__+')', self.test_upload_expired.__doc__
+        url = self.start()
+        self.put_chunk(url, 0, 1000)
+        resources.app.config.update({"MEDIA_UPLOAD_LIFETIME" : -1})
+        self.assertEquals(self.client.get(url).status_code, 404)
+        self.assertEquals(self.put_chunk(url, 1000, 2000).status_code, 404)
+        self.assertEquals(len(os.listdir(os.path.join(self.blobs_folder, "uploads"))), 1)
+
+        new_url = self.start()
+        upload_id = new_url.rstrip("/").split("/")[-1]
+        self.assertEquals(os.listdir(os.path.join(self.blobs_folder, "uploads")), [upload_id])
+
+#400
+    def test_post_wrong_size(self):
+        '''Upload without size or larger than allowed'''
+        print '('+self.test_post_wrong_size.__name__+')', self.test_post_wrong_size.__doc__
+        resp = self.client.post(self.url, headers = {"Content-Type" : COLLECTION_JSON}, data = json.dumps(upload_request("holidays.mp4", resources.MAX_MEDIA_UPLOAD_SIZE + 1)))
+        self.assertEquals(resp.status_code, 400)
+        resp = self.client.post(self.url, headers = {"Content-Type" : COLLECTION_JSON}, data = json.dumps({"template" : {"data" : [{"name" : "file_name", "value" : "holidays.mp4"}]}}))
+        self.assertEquals(resp.status_code, 400)
+
+#409
+    def test_post_incomplete(self):
+        '''Upload completed before all its chunks arrived'''
+        print '('+self.test_post_incomplete.__name__+')', self.test_post_incomplete.__doc__
+        url = self.start()
+        self.put_chunk(url, 0, 1000)
+        resp = self.client.post(url)
+        self.assertEquals(resp.status_code, 409)
+        self.assertEquals(resp.headers[resources.UPLOAD_OFFSET_HEADER], "1000")
+
+#503
+    def test_post_too_many(self):
+        '''Upload started when too many are in progress'''
+        print '('+self.test_post_too_many.__name__+')', self.test_post_too_many.__doc__
+        resources.app.config.update({"MAX_MEDIA_UPLOADS" : 2})
+        self.start()
+        self.start()
+        resp = self.client.post(self.url, headers = {"Content-Type" : COLLECTION_JSON}, data = json.dumps(upload_request("holidays.mp4", len(video))))
+        self.assertEquals(resp.status_code, 503)
+        self.assertEquals(len(os.listdir(os.path.join(self.blobs_folder, "uploads"))), 2)
+
+#415
+    def test_post_wrong_type(self):
+        '''Upload of a file which is not allowed, or in a wrong format'''
+        print '('+self.test_post_wrong_type.__name__+')', self.test_post_wrong_type.__doc__
+        resp = self.client.post(self.url, headers = {"Content-Type" : COLLECTION_JSON}, data = json.dumps(upload_request("holidays.avi", 1000)))
+        self.assertEquals(resp.status_code, 415)
+        resp = self.client.post(self.url, headers = {"Content-Type" : "application/json"}, data = json.dumps(upload_request("holidays.mp4", 1000)))
+        self.assertEquals(resp.status_code, 415)
+
+#TEST PUT
+#400
+    def test_put_wrong_range(self):
+        '''Chunks without Content-Range, with another total size or longer than their range'''
+        print '('+self.test_put_wrong_range.__name__+')', self.test_put_wrong_range.__doc__
+        url = self.start()
+        resp = self.client.put(url, headers = {"Content-Type" : OCTET_STREAM}, data = video[:1000])
+        self.assertEquals(resp.status_code, 400)
+        self.assertEquals(self.put_chunk(url, 0, 1000, total = 1000).status_code, 400)
+        self.assertEquals(self.put_chunk(url, 0, 1000, data = video[:1001]).status_code, 400)
+        self.assertEquals(json.loads(self.client.get(url).data)["offset"], 0)
+
+#404
+    def test_put_not_existing(self):
+        '''Chunk of an upload which doesn't exist'''
+        print '('+self.test_put_not_existing.__name__+')', self.test_put_not_existing.__doc__
+        url = resources.api.url_for(resources.Media_upload, upload_id = "0123abcd", _external = False)
+        self.assertEquals(self.put_chunk(url, 0, 1000).status_code, 404)
+
+#409
+    def test_put_concurrent(self):
+        '''Chunk sent while another one of the same upload is being written'''
+        print '('+self.test_put_concurrent.__name__+')', self.test_put_concurrent.__doc__
+        url = self.start()
+        self.put_chunk(url, 0, 1000)
+        upload_id = url.rstrip("/").split("/")[-1]
+        with open(resources.get_blob_storage().upload_path_for(upload_id), "rb") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)       #Held as by the request writing the other chunk
+            resp = self.put_chunk(url, 1000, 2000)
+        self.assertEquals(resp.status_code, 409)
+        self.assertEquals(resp.headers[resources.UPLOAD_OFFSET_HEADER], "1000")
+        self.assertEquals(self.put_chunk(url, 1000, 2000).status_code, 204)
+
+#415
+    def test_put_wrong_type(self):
+        '''Chunk which is not an octet stream'''
+        print '('+self.test_put_wrong_type.__name__+')', self.test_put_wrong_type.__doc__
+        url = self.start()
+        resp = self.client.put(url, headers = {"Content-Type" : COLLECTION_JSON, "Content-Range" : "bytes 0-999/%d" % len(video)}, data = video[:1000])
+        self.assertEquals(resp.status_code, 415)
+
+#TEST DELETE
+#204
+    def test_delete_upload(self):
+        '''Upload given up'''
+        print '('+self.test_delete_upload.__name__+')', self.test_delete_upload.__doc__
+        url = self.start()
+        self.put_chunk(url, 0, 1000)
+        self.assertEquals(self.client.delete(url).status_code, 204)
+        self.assertEquals(self.client.get(url).status_code, 404)
+        self.assertEquals(self.put_chunk(url, 1000, 2000).status_code, 404)
+        self.assertEquals(os.listdir(os.path.join(self.blobs_folder, "uploads")), [])
+#404
+        self.assertEquals(self.client.delete(url).status_code, 404)
+
+if __name__ == '__main__':
+    print 'Start running media uploads tests'
+    unittest.main()
@@ -178,6 +178,18 @@ class StatusCommentsTestCase(ResourcesAPITestCase):
             resp = client.get(self.url_wrong, headers = {"Accept" : COLLECTION_JSON})
             self.assertEquals(resp.status_code, 404)
 
+#304 until the collection changes
+    def test_get_comments_not_modified(self):
+        print '('+self.test_get_comments_not_modified.__name__+')', self.test_get_comments_not_modified.__doc__
+        resp = self.client.get(self.url, headers = {"Accept" : COLLECTION_JSON})
+        etag = resp.headers.get("ETag", None)
+        resp2 = self.client.get(self.url, headers = {"Accept" : COLLECTION_JSON, "If-None-Match" : etag})
+        self.assertEquals(resp2.status_code, 304)
+        #A new comment changes the collection
+        self.client.post(self.url, data = json.dumps(self.comment_post_correct), headers = {"Content-Type" : COLLECTION_JSON})
+        resp3 = self.client.get(self.url, headers = {"Accept" : COLLECTION_JSON, "If-None-Match" : etag})
+        self.assertEquals(resp3.status_code, 200)
+
 #TEST POST
 #201
     def test_post_comment(self):
@@ -110,6 +110,17 @@ class StatusTagTestCase(ResourcesAPITestCase):
             self.assertEqual(resp.headers.get("Content-Type", None), HAL_JSON)
 
 
+    def test_get_tag_saved_queries(self):
+        '''User profile checked and then returned is queried once'''
+        print '('+self.test_get_tag_saved_queries.__name__+')', self.test_get_tag_saved_queries.__doc__
+        resources.app.config["IDENTITY_MAP_DEBUG"] = True
+        try:
+            resp = self.client.get(self.url, headers = {"Accept" : HAL_JSON})
+            self.assertEquals(resp.status_code, 200)
+            self.assertEquals(resp.headers.get("X-Saved-Queries", None), "1")
+        finally:
+            resources.app.config["IDENTITY_MAP_DEBUG"] = False
+
 #404
 #status wrong
     def test_get_not_existing_status(self):
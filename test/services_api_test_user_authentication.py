@@ -1,7 +1,9 @@
 import unittest
 import json
+import time
 import friendsNet.resources as resources
 import friendsNet.database as database
+from friendsNet.tokens import TokenCache
 
 DB_PATH = 'db/friendsNet_test.db'
 ENGINE = database.Engine(DB_PATH)
@@ -58,7 +60,8 @@ class UserCredentialsTestCase (ResourcesAPITestCase):
         "password" : "12345678"
     }
 
-    auth_user_token = {
+    #Signed in 2016 with a lifetime of 10^29 seconds: it has expired with the lifetime of the tokens bounded
+    old_user_token = {
         "token" : "eyJhbGciOiJIUzI1NiIsImV4cCI6MTAwMDAwMDAwMDAwMDAwMDAwMDAxNDYwNTY3MTUxLCJpYXQiOjE0NjA1NjcxNTJ9.eyJpZCI6MX0.t_MuyEEx14LBqbVDeJgFRbnP0DUrwN260-HXbOem_eU"
     }
 
@@ -70,6 +73,8 @@ class UserCredentialsTestCase (ResourcesAPITestCase):
     def setUp(self):
         super(UserCredentialsTestCase, self).setUp()
         self.url = resources.api.url_for(resources.User_authentication, _external = False)
+        resources.get_token_cache().clear()
+        self.auth_user_token = {"token" : resources.generate_auth_token(self.resp_auth["user_id"])}
 
 #TEST POST
 #201 + MIMETYPE & USER ID WITH EMAIL AND PASSWORD
@@ -96,6 +101,107 @@ class UserCredentialsTestCase (ResourcesAPITestCase):
             self.assertEquals(self.resp_auth["user_id"], data["user_id"])
             self.assertEqual(resp.headers.get("Content-Type", None), JSON)
 
+    def test_authenticate_user_with_cached_token(self):
+        '''Token already verified is found in the cache'''
+        print '('+self.test_authenticate_user_with_cached_token.__name__+')', self.test_authenticate_user_with_cached_token.__doc__
+        for _ in range(3):
+            resp = self.client.post(self.url, data = json.dumps(self.auth_user_token), headers = {"Content-Type" : JSON})
+            self.assertEquals(json.loads(resp.data)["user_id"], self.resp_auth["user_id"])
+        self.assertEquals((resources.get_token_cache().misses, resources.get_token_cache().hits), (1, 2))
+
+#401
+    def test_authenticate_user_with_wrong_token(self):
+        print '('+self.test_authenticate_user_with_wrong_token.__name__+')', self.test_authenticate_user_with_wrong_token.__doc__
+        for token in [self.auth_user_token["token"][:-1], "", 12]:
+            resp = self.client.post(self.url, data = json.dumps({"token" : token}), headers = {"Content-Type" : JSON})
+            self.assertEquals(resp.status_code, 401)
+
+    def test_authenticate_user_with_old_token(self):
+        '''Token older than the lifetime of the tokens is refused, whatever its own expiration'''
+        print '('+self.test_authenticate_user_with_old_token.__name__+')', self.test_authenticate_user_with_old_token.__doc__
+        resp = self.client.post(self.url, data = json.dumps(self.old_user_token), headers = {"Content-Type" : JSON})
+        self.assertEquals(resp.status_code, 401)
+
+#TEST DELETE
+#204
+    def test_revoke_token(self):
+        '''Revoked token is refused afterwards'''
+        print '('+self.test_revoke_token.__name__+')', self.test_revoke_token.__doc__
+        resp = self.client.post(self.url, data = json.dumps(self.auth_user_credentials), headers = {"Content-Type" : JSON})
+        token = json.loads(resp.data)["auth_token"]
+        resp = self.client.post(self.url, data = json.dumps({"token" : token}), headers = {"Content-Type" : JSON})
+        self.assertEquals(resp.status_code, 201)
+
+        resp = self.client.delete(self.url, headers = {"Authorization" : "Bearer " + token})
+        self.assertEquals(resp.status_code, 204)
+        resp = self.client.post(self.url, data = json.dumps({"token" : token}), headers = {"Content-Type" : JSON})
+        self.assertEquals(resp.status_code, 401)
+        resp = self.client.delete(self.url, headers = {"Authorization" : "Bearer " + token})
+        self.assertEquals(resp.status_code, 401)
+
+        #Other tokens of the user are still valid
+        resp = self.client.delete(self.url, headers = {"Authorization" : self.auth_user_token["token"]})
+        self.assertEquals(resp.status_code, 204)
+
+    def test_revoke_token_in_other_process(self):
+        '''Token revoked by another process is refused once its cached verification has expired'''
+        print '('+self.test_revoke_token_in_other_process.__name__+')', self.test_revoke_token_in_other_process.__doc__
+        token = self.auth_user_token["token"]
+        def decode(token):
+            with resources.app.test_request_context():
+                resources.connect_db()
+                try:
+                    return resources.decode_auth_token(token)
+                finally:
+                    resources.g.con.close()
+        other_cache = TokenCache(decode, ttl = 0)          #Cache of another process
+        self.assertEquals(other_cache.get_user_id(token), self.resp_auth["user_id"])
+
+        resp = self.client.delete(self.url, headers = {"Authorization" : "Bearer " + token})
+        self.assertEquals(resp.status_code, 204)
+        self.assertEquals(other_cache.get_user_id(token), None)
+        con = ENGINE.connect()
+        self.assertTrue(con.is_token_revoked(resources.get_auth_token_hash(token)))
+        con.close()
+
+#401
+    def test_revoke_without_token(self):
+        print '('+self.test_revoke_without_token.__name__+')', self.test_revoke_without_token.__doc__
+        resp = self.client.delete(self.url)
+        self.assertEquals(resp.status_code, 401)
+
+    def test_token_cache(self):
+        '''Least recently used tokens are evicted, expired tokens are verified again'''
+        print '('+self.test_token_cache.__name__+')', self.test_token_cache.__doc__
+        now = time.time()
+        tokens = {"a" : (1, None), "b" : (2, now + 1000), "c" : (3, now + 1000), "expired" : (4, now - 1)}
+        decoded = []
+        def decode(token):
+            decoded.append(token)
+            return tokens.get(token, None)
+        cache = TokenCache(decode, size = 2)
+        self.assertEquals([cache.get_user_id(token) for token in ["a", "b", "a", "c", "a", "b"]], [1, 2, 1, 3, 1, 2])
+        self.assertEquals(decoded, ["a", "b", "c", "b"])
+        self.assertEquals(len(cache), 2)
+
+        del decoded[:]
+        cache.get_user_id("expired")
+        cache.get_user_id("expired")
+        self.assertEquals(decoded, ["expired", "expired"])
+
+        cache.revoke("b")
+        self.assertEquals(cache.get_user_id("b"), None)
+
+        #Verified again once the ttl has elapsed: decode sees the revocations of the other processes
+        cache = TokenCache(decode, ttl = -1)
+        del decoded[:]
+        cache.get_user_id("a")
+        cache.get_user_id("a")
+        self.assertEquals(decoded, ["a", "a"])
+        cache.revoke("a")
+        cache.revoke("b")
+        self.assertEquals(len(cache._revoked), 1)       #Revocations older than the ttl are pruned
+
 if __name__ == '__main__':
     print 'Start running tests'
     unittest.main()
\ No newline at end of file
@@ -145,7 +145,8 @@ class UserFeedTestCase(ResourcesAPITestCase):
             "version" : "1.0",
             "href" : "/friendsNet/api/users/3/feed/",
             "links" : [
-                {"href" : "/friendsNet/api/users/3/profile/", "rel" : "user profile", "prompt" : "User profile"}
+                {"href" : "/friendsNet/api/users/3/profile/", "rel" : "user profile", "prompt" : "User profile"},
+                {"href" : "/friendsNet/api/users/3/feed/?limit=1&cursor=WyJhZnRlciIsIFsyMzAsIDhdXQ==", "rel" : "next", "prompt" : "Next page"}
             ],
             "items" : [
                 {
@@ -205,6 +206,8 @@ class UserFeedTestCase(ResourcesAPITestCase):
         self.url_limit = resources.api.url_for(resources.User_feed, user_id = 3, limit = 1, _external = False)
         self.url_empty = resources.api.url_for(resources.User_feed, user_id = 6, _external = False)
         self.url_wrong = resources.api.url_for(resources.User_feed, user_id = 999, _external = False)
+        self.url_bad_cursor = resources.api.url_for(resources.User_feed, user_id = 3, limit = 1, cursor = "notacursor", _external = False)
+        self.url_bad_limit = resources.api.url_for(resources.User_feed, user_id = 3, limit = 0, _external = False)
 
     def test_url(self):
         #Checks that the URL points to the right resource
@@ -252,6 +255,81 @@ class UserFeedTestCase(ResourcesAPITestCase):
             self.assertEquals(self.resp_get_limit, data)
             self.assertEqual(resp.headers.get("Content-Type", None), COLLECTION_JSON + ";profile=" + STATUS_PROFILE)
 
+#FOLLOW NEXT AND PREV LINKS
+    def test_get_feed_pages(self):
+        print '('+self.test_get_feed_pages.__name__+')', self.test_get_feed_pages.__doc__
+        with resources.app.test_client() as client:
+            seen = []
+            url = resources.api.url_for(resources.User_feed, user_id = 3, limit = 3, _external = False)
+            while url is not None:
+                resp = client.get(url, headers = {"Accept" : COLLECTION_JSON})
+                self.assertEquals(resp.status_code, 200)
+                collection = json.loads(resp.data)["collection"]
+                seen.extend(item["data"][0]["value"] for item in collection["items"])
+                links = dict((link["rel"], link["href"]) for link in collection["links"])
+                url = links.get("next", None)
+            all_items = json.loads(client.get(self.url_no_limit, headers = {"Accept" : COLLECTION_JSON}).data)["collection"]["items"]
+            self.assertEquals(seen, [item["data"][0]["value"] for item in all_items])
+
+            resp = client.get(links["prev"], headers = {"Accept" : COLLECTION_JSON})
+            collection = json.loads(resp.data)["collection"]
+            self.assertEquals([item["data"][0]["value"] for item in collection["items"]], seen[:3])
+            links = dict((link["rel"], link["href"]) for link in collection["links"])
+            self.assertIn("next", links)
+            self.assertNotIn("prev", links)
+
+#EMBEDDED sub-resources, the same of their own collections
+    def test_get_feed_embedded(self):
+        print '('+self.test_get_feed_embedded.__name__+')', self.test_get_feed_embedded.__doc__
+        with resources.app.test_client() as client:
+            resp = client.get(self.url_no_limit + "?embed=author,media,tags,comments:1,rates_summary", headers = {"Accept" : COLLECTION_JSON})
+            self.assertEquals(resp.status_code, 200)
+            items = json.loads(resp.data)["collection"]["items"]
+            self.assertTrue(len(items) > 0)
+            for item in items:
+                embedded = item["embedded"]
+                links = dict((link["rel"], link["href"]) for link in item["links"])
+                self.assertEquals(embedded["author"]["href"], links["author"])
+
+                media = json.loads(client.get(links["media list"]).data)["collection"]["items"]
+                self.assertEquals(embedded["media"], [{"href" : media_item["href"], "data" : media_item["data"]} for media_item in media])
+
+                tags = json.loads(client.get(links["status tags"]).data)["collection"]["items"]
+                self.assertEquals([user["href"] for user in embedded["tags"]], [user["href"] for user in tags])
+
+                comments = json.loads(client.get(links["status comments"]).data)["collection"]["items"]
+                self.assertEquals(embedded["comments"], comments[:1])
+
+                rates = json.loads(client.get(links["status rates"]).data)["collection"]["items"]
+                self.assertEquals(embedded["rates_summary"]["count"], len(rates))
+
+#400
+    def test_get_feed_bad_embed(self):
+        print '('+self.test_get_feed_bad_embed.__name__+')', self.test_get_feed_bad_embed.__doc__
+        with resources.app.test_client() as client:
+            for embed in ("likes", "comments:0", "comments:many", "author:2"):
+                resp = client.get(self.url_no_limit + "?embed=" + embed, headers = {"Accept" : COLLECTION_JSON})
+                self.assertEquals(resp.status_code, 400)
+
+#400
+    def test_get_feed_bad_page(self):
+        print '('+self.test_get_feed_bad_page.__name__+')', self.test_get_feed_bad_page.__doc__
+        with resources.app.test_client() as client:
+            resp = client.get(self.url_bad_cursor, headers = {"Accept" : COLLECTION_JSON})
+            self.assertEquals(resp.status_code, 400)
+            resp = client.get(self.url_bad_limit, headers = {"Accept" : COLLECTION_JSON})
+            self.assertEquals(resp.status_code, 400)
+
+#400
+    def test_get_feed_wrong_cursor_key(self):
+        '''Cursor whose key doesn't fit the feed, or the integers of the database'''
+        print '('+self.test_get_feed_wrong_cursor_key.__name__+')', self.test_get_feed_wrong_cursor_key.__doc__
+        url = resources.api.url_for(resources.User_feed, user_id = 3, _external = False)
+        for key in ([230], [230, 8, 1], [10 ** 30, 1], [-2 ** 63 - 1, 1]):
+            resp = self.client.get(url + "?cursor=" + resources.encode_cursor("after", key), headers = {"Accept" : COLLECTION_JSON})
+            self.assertEquals(resp.status_code, 400)
+            self.assertEquals(json.loads(resp.data)["collection"]["error"]["title"], "Page limit or cursor in bad format.")
+
 #EMPTY ITEMS
     def test_get_empty_feed(self):
         print '('+self.test_get_empty_feed.__name__+')', self.test_get_empty_feed.__doc__
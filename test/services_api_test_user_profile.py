@@ -175,6 +175,27 @@ class UserProfileTestCase (ResourcesAPITestCase):
             resp = client.get(self.url_wrong, headers = {"Accept" : HAL_JSON})
             self.assertEquals(resp.status_code, 404)
 
+#304 when the representation has not changed
+    def test_get_profile_not_modified(self):
+        print '('+self.test_get_profile_not_modified.__name__+')', self.test_get_profile_not_modified.__doc__
+        resp = self.client.get(self.url, headers = {"Accept" : HAL_JSON})
+        etag = resp.headers.get("ETag", None)
+        self.assertIsNotNone(etag)
+        resp2 = self.client.get(self.url, headers = {"Accept" : HAL_JSON, "If-None-Match" : etag})
+        self.assertEquals(resp2.status_code, 304)
+        self.assertEquals(resp2.data, "")
+        self.assertEquals(resp2.headers.get("ETag", None), etag)
+
+#200 with a new ETag after the profile has been modified
+    def test_get_profile_modified(self):
+        print '('+self.test_get_profile_modified.__name__+')', self.test_get_profile_modified.__doc__
+        resp = self.client.get(self.url, headers = {"Accept" : HAL_JSON})
+        etag = resp.headers.get("ETag", None)
+        self.client.patch(self.url, data = json.dumps(self.profile_patch_correct), headers = {"Content-Type" : COLLECTION_JSON})
+        resp2 = self.client.get(self.url, headers = {"Accept" : HAL_JSON, "If-None-Match" : etag})
+        self.assertEquals(resp2.status_code, 200)
+        self.assertNotEqual(resp2.headers.get("ETag", None), etag)
+
 #TEST PATCH
 #204
     def test_patch_profile(self):
@@ -222,6 +222,14 @@ class UserProfilesTestCase(ResourcesAPITestCase):
                         {"name" : "name", "value" : ""},
                         {"name" : "surname", "value" : ""}
                     ]
+                },
+                {
+                    "href" : "/friendsNet/api/users/",
+                    "rel" : "search",
+                    "prompt" : "Search user by any name",
+                    "data" : [
+                        {"name" : "q", "value" : ""}
+                    ]
                 }
             ]
         }
@@ -253,6 +261,14 @@ class UserProfilesTestCase(ResourcesAPITestCase):
                         {"name" : "name", "value" : ""},
                         {"name" : "surname", "value" : ""}
                     ]
+                },
+                {
+                    "href" : "/friendsNet/api/users/",
+                    "rel" : "search",
+                    "prompt" : "Search user by any name",
+                    "data" : [
+                        {"name" : "q", "value" : ""}
+                    ]
                 }
             ]
         }
@@ -305,6 +321,14 @@ class UserProfilesTestCase(ResourcesAPITestCase):
                         {"name" : "name", "value" : ""},
                         {"name" : "surname", "value" : ""}
                     ]
+                },
+                {
+                    "href" : "/friendsNet/api/users/",
+                    "rel" : "search",
+                    "prompt" : "Search user by any name",
+                    "data" : [
+                        {"name" : "q", "value" : ""}
+                    ]
                 }
             ]
         }
@@ -357,6 +381,14 @@ class UserProfilesTestCase(ResourcesAPITestCase):
                         {"name" : "name", "value" : ""},
                         {"name" : "surname", "value" : ""}
                     ]
+                },
+                {
+                    "href" : "/friendsNet/api/users/",
+                    "rel" : "search",
+                    "prompt" : "Search user by any name",
+                    "data" : [
+                        {"name" : "q", "value" : ""}
+                    ]
                 }
             ]
         }
@@ -466,6 +498,7 @@ class UserProfilesTestCase(ResourcesAPITestCase):
         self.url = resources.api.url_for(resources.User_profiles, _external = False)
         self.url_name = resources.api.url_for(resources.User_profiles, name = "Trial", _external = False)
         self.url_surname = resources.api.url_for(resources.User_profiles, surname = "Antonino", _external = False)
+        self.url_text = resources.api.url_for(resources.User_profiles, q = "tri us", _external = False)
 
 #TEST URL
     def test_url(self):
@@ -511,6 +544,18 @@ class UserProfilesTestCase(ResourcesAPITestCase):
             self.assertEquals(self.resp_get_surname_query, data)
             self.assertEqual(resp.headers.get("Content-Type", None), COLLECTION_JSON + ";profile=" + USER_PROFILE)
 
+#FREE TEXT SEARCH
+    def test_get_profiles_text(self):
+        print '('+self.test_get_profiles_text.__name__+')', self.test_get_profiles_text.__doc__
+        with resources.app.test_client() as client:
+            resp = client.get(self.url_text, headers = {"Accept" : COLLECTION_JSON})
+            self.assertEquals(resp.status_code, 200)
+            data = json.loads(resp.data)
+
+            user_ids = sorted(item["data"][0]["value"] for item in data["collection"]["items"])
+            self.assertEquals(user_ids, [6, 7])
+            self.assertEqual(resp.headers.get("Content-Type", None), COLLECTION_JSON + ";profile=" + USER_PROFILE)
+
 #TEST POST
 #201
     def test_post_profile(self):
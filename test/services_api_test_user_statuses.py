@@ -80,7 +80,9 @@ class UserStatusesTestCase (ResourcesAPITestCase):
             ],
             "template" : {
                 "data" : [
-                    {"name" : "content", "value" : "", "prompt" : "Status content", "required" : "true"}
+                    {"name" : "content", "value" : "", "prompt" : "Status content", "required" : "true"},
+                    {"name" : "media_ids", "value" : [], "prompt" : "Ids of the media items attached to the status", "required" : "false"},
+                    {"name" : "tagged_user_ids", "value" : [], "prompt" : "Ids of the users tagged in the status", "required" : "false"}
                 ]
             }
         }
@@ -96,7 +98,9 @@ class UserStatusesTestCase (ResourcesAPITestCase):
             "items" : [],
             "template" : {
                 "data" : [
-                    {"name" : "content", "value" : "", "prompt" : "Status content", "required" : "true"}
+                    {"name" : "content", "value" : "", "prompt" : "Status content", "required" : "true"},
+                    {"name" : "media_ids", "value" : [], "prompt" : "Ids of the media items attached to the status", "required" : "false"},
+                    {"name" : "tagged_user_ids", "value" : [], "prompt" : "Ids of the users tagged in the status", "required" : "false"}
                 ]
             }
         }
@@ -110,6 +114,34 @@ class UserStatusesTestCase (ResourcesAPITestCase):
         }
     }
 
+    status_post_attachments = {
+        "template" : {
+            "data" : [
+                {"name" : "content", "value" : "Hello!"},
+                {"name" : "media_ids", "value" : [2, 4]},
+                {"name" : "tagged_user_ids", "value" : [3]}
+            ]
+        }
+    }
+
+    status_post_wrong_media = {
+        "template" : {
+            "data" : [
+                {"name" : "content", "value" : "Hello!"},
+                {"name" : "media_ids", "value" : [2, 999]}
+            ]
+        }
+    }
+
+    status_post_wrong_ids = {
+        "template" : {
+            "data" : [
+                {"name" : "content", "value" : "Hello!"},
+                {"name" : "tagged_user_ids", "value" : "3"}
+            ]
+        }
+    }
+
     status_post_wrong = {
         "template" : {
             "data" : [
@@ -159,6 +191,53 @@ class UserStatusesTestCase (ResourcesAPITestCase):
             self.assertEquals(self.resp_get, data)
             self.assertEqual(resp.headers.get("Content-Type", None), COLLECTION_JSON + ";profile=" + STATUS_PROFILE)
 
+#PAGES streamed from the database
+    def test_get_statuses_pages(self):
+        print '('+self.test_get_statuses_pages.__name__+')', self.test_get_statuses_pages.__doc__
+        url = resources.api.url_for(resources.User_statuses, user_id = 3, _external = False)
+        resp = self.client.get(url + "?limit=2", headers = {"Accept" : COLLECTION_JSON})
+        self.assertEquals(resp.status_code, 200)
+        self.assertTrue(resp.is_streamed)
+        collection = json.loads(resp.data)["collection"]
+        self.assertEquals([item["data"][0]["value"] for item in collection["items"]], [9, 6])
+        next_page = [link["href"] for link in collection["links"] if link["rel"] == "next"]
+        self.assertEquals(len(next_page), 1)
+        self.assertEquals([link for link in collection["links"] if link["rel"] == "prev"], [])
+
+        resp2 = self.client.get(next_page[0], headers = {"Accept" : COLLECTION_JSON})
+        collection2 = json.loads(resp2.data)["collection"]
+        self.assertEquals([item["data"][0]["value"] for item in collection2["items"]], [5, 4])
+        self.assertEquals([link for link in collection2["links"] if link["rel"] == "next"], [])
+        prev_page = [link["href"] for link in collection2["links"] if link["rel"] == "prev"]
+
+        resp3 = self.client.get(prev_page[0], headers = {"Accept" : COLLECTION_JSON})
+        collection3 = json.loads(resp3.data)["collection"]
+        self.assertEquals([item["data"][0]["value"] for item in collection3["items"]], [9, 6])
+
+#400
+    def test_get_statuses_wrong_cursor_key(self):
+        '''Cursor whose key doesn't fit the statuses, or the integers of the database'''
+        print '('+self.test_get_statuses_wrong_cursor_key.__name__+')', self.test_get_statuses_wrong_cursor_key.__doc__
+        url = resources.api.url_for(resources.User_statuses, user_id = 1, _external = False)
+        for key in ([9], [10 ** 30, 1], [True, 1]):
+            resp = self.client.get(url + "?cursor=" + resources.encode_cursor("before", key), headers = {"Accept" : COLLECTION_JSON})
+            self.assertEquals(resp.status_code, 400)
+
+#EMBEDDED sub-resources
+    def test_get_statuses_embedded(self):
+        print '('+self.test_get_statuses_embedded.__name__+')', self.test_get_statuses_embedded.__doc__
+        url = resources.api.url_for(resources.User_statuses, user_id = 3, _external = False)
+        resp = self.client.get(url + "?limit=2&embed=comments:2,rates_summary", headers = {"Accept" : COLLECTION_JSON})
+        self.assertEquals(resp.status_code, 200)
+        collection = json.loads(resp.data)["collection"]
+        self.assertEquals([item["data"][0]["value"] for item in collection["items"]], [9, 6])
+        self.assertEquals([item["embedded"]["rates_summary"] for item in collection["items"]], [{"count" : 0, "average" : None}, {"count" : 3, "average" : 4.0}])
+        self.assertEquals([item["embedded"]["comments"] for item in collection["items"]], [[], []])
+        self.assertEquals(len([link for link in collection["links"] if link["rel"] == "next"]), 1)
+
+        resp = self.client.get(url + "?embed=unknown", headers = {"Accept" : COLLECTION_JSON})
+        self.assertEquals(resp.status_code, 400)
+
 #EMPTY ITEMS
     def test_get_empty_statuses(self):
         print '('+self.test_get_empty_statuses.__name__+')', self.test_get_empty_statuses.__doc__
@@ -189,11 +268,28 @@ class UserStatusesTestCase (ResourcesAPITestCase):
         resp2 = self.client.get(new_url, headers = {"Accept" : HAL_JSON})
         self.assertEquals(resp2.status_code, 200)
 
+    def test_post_status_attachments(self):
+        '''Status created with its media items and tagged users in one request'''
+        print '('+self.test_post_status_attachments.__name__+')', self.test_post_status_attachments.__doc__
+        resp = self.client.post(self.url, data = json.dumps(self.status_post_attachments), headers = {"Content-Type" : COLLECTION_JSON})
+        self.assertEquals(resp.status_code, 201)
+        status_id = int(resp.headers["Location"].rstrip("/").rsplit("/", 1)[1])
+
+        media_url = resources.api.url_for(resources.Status_media, status_id = status_id, _external = False)
+        media = json.loads(self.client.get(media_url, headers = {"Accept" : COLLECTION_JSON}).data)["collection"]["items"]
+        self.assertEquals([item["href"] for item in media], ["/friendsNet/api/media/2/", "/friendsNet/api/media/4/"])
+
+        tags_url = resources.api.url_for(resources.Status_tags, status_id = status_id, _external = False)
+        tags = json.loads(self.client.get(tags_url, headers = {"Accept" : COLLECTION_JSON}).data)["collection"]["items"]
+        self.assertEquals([item["href"] for item in tags], ["/friendsNet/api/users/3/profile/"])
+
 #400
     def test_post_wrong_status(self):
         print '('+self.test_post_wrong_status.__name__+')', self.test_post_wrong_status.__doc__
         resp = self.client.post(self.url, data = json.dumps(self.status_post_wrong), headers = {"Content-Type" : COLLECTION_JSON})
         self.assertEquals(resp.status_code, 400)
+        resp = self.client.post(self.url, data = json.dumps(self.status_post_wrong_ids), headers = {"Content-Type" : COLLECTION_JSON})
+        self.assertEquals(resp.status_code, 400)
 
 #404
     def test_post_not_existing_user(self):
@@ -201,6 +297,15 @@ class UserStatusesTestCase (ResourcesAPITestCase):
         resp = self.client.post(self.url_wrong, data = json.dumps(self.status_post_correct), headers = {"Content-Type" : COLLECTION_JSON})
         self.assertEquals(resp.status_code, 404)
 
+    def test_post_not_existing_media(self):
+        '''No status is created when one of its media items does not exist'''
+        print '('+self.test_post_not_existing_media.__name__+')', self.test_post_not_existing_media.__doc__
+        before = json.loads(self.client.get(self.url, headers = {"Accept" : COLLECTION_JSON}).data)["collection"]["items"]
+        resp = self.client.post(self.url, data = json.dumps(self.status_post_wrong_media), headers = {"Content-Type" : COLLECTION_JSON})
+        self.assertEquals(resp.status_code, 404)
+        after = json.loads(self.client.get(self.url, headers = {"Accept" : COLLECTION_JSON}).data)["collection"]["items"]
+        self.assertEquals(len(after), len(before))
+
 #415
     def test_post_wrong_header_status(self):
         print '('+self.test_post_wrong_header_status.__name__+')', self.test_post_wrong_header_status.__doc__